@@ -1,31 +1,75 @@
 from __future__ import annotations
 
+import importlib
 import math
+from typing import Any
 from typing import Optional
-
-from performance_calculator.models.difficulty import DifficultyAttributes
-from performance_calculator.models.mods import Mods
-from performance_calculator.models.oppai import OppaiWrapper
-from performance_calculator.models.path import Path
-from performance_calculator.models.score import Score
-from performance_calculator.rulesets.catch.difficulty import CatchDifficultyAttributes
-from performance_calculator.rulesets.catch.performance import CatchPerformanceCalculator
-from performance_calculator.rulesets.mania.difficulty import ManiaDifficultyAttributes
-from performance_calculator.rulesets.mania.performance import ManiaPerformanceCalculator
-from performance_calculator.rulesets.osu.difficulty import OsuDifficultyAttributes
-from performance_calculator.rulesets.osu.performance import OsuPerformanceCalculator
-from performance_calculator.rulesets.taiko.difficulty import TaikoDifficultyAttributes
-from performance_calculator.rulesets.taiko.performance import TaikoPerformanceCalculator
+from typing import TYPE_CHECKING
+from typing import Union
+
+if TYPE_CHECKING:
+    from performance_calculator.attribute_provider import AttributeKey
+    from performance_calculator.attribute_provider import DifficultyAttributeProvider
+    from performance_calculator.models.beatmap_source import BeatmapFile
+    from performance_calculator.models.difficulty import DifficultyAttributes
+    from performance_calculator.models.score import Score
+    from performance_calculator.rulesets.catch.difficulty import (
+        CatchDifficultyAttributes,
+    )
+    from performance_calculator.rulesets.mania.difficulty import (
+        ManiaDifficultyAttributes,
+    )
+    from performance_calculator.rulesets.osu.difficulty import OsuDifficultyAttributes
+    from performance_calculator.rulesets.taiko.difficulty import (
+        TaikoDifficultyAttributes,
+    )
 
 __name__ = "performance_calculator"
 __author__ = "tsunyoku"
 __version__ = "0.1.0"
 __all__ = ("calculate_score",)
 
+# the rulesets and oppai are only imported once something uses them, so
+# importing the package stays cheap
+_LAZY_ATTRIBUTES = {
+    "DifficultyAttributes": "performance_calculator.models.difficulty",
+    "Mods": "performance_calculator.models.mods",
+    "OppaiWrapper": "performance_calculator.models.oppai",
+    "Path": "performance_calculator.models.path",
+    "Score": "performance_calculator.models.score",
+    "CatchDifficultyAttributes": "performance_calculator.rulesets.catch.difficulty",
+    "CatchPerformanceCalculator": "performance_calculator.rulesets.catch.performance",
+    "ManiaDifficultyAttributes": "performance_calculator.rulesets.mania.difficulty",
+    "ManiaPerformanceCalculator": "performance_calculator.rulesets.mania.performance",
+    "OsuDifficultyAttributes": "performance_calculator.rulesets.osu.difficulty",
+    "OsuPerformanceCalculator": "performance_calculator.rulesets.osu.performance",
+    "TaikoDifficultyAttributes": "performance_calculator.rulesets.taiko.difficulty",
+    "TaikoPerformanceCalculator": "performance_calculator.rulesets.taiko.performance",
+}
+
+
+def __getattr__(name: str) -> Any:
+    module = _LAZY_ATTRIBUTES.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__} has no attribute {name}")
+
+    value = getattr(importlib.import_module(module), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> list[str]:
+    return sorted([*globals(), *_LAZY_ATTRIBUTES])
+
 
 def _calculate_oppai(
-    score: Score, oppai_path: str, osu_file_path: str
+    score: Score,
+    oppai_path: str,
+    osu_file_path: Union[str, BeatmapFile],
 ) -> tuple[float, float]:
+    from performance_calculator.models.oppai import OppaiWrapper
+    from performance_calculator.models.path import Path
+
     path = Path(oppai_path)
     if not path.exists():
         raise FileNotFoundError(f"oppai path {oppai_path} does not exist")
@@ -38,7 +82,11 @@ def _calculate_oppai(
             combo=score.max_combo,
             nmiss=score.num_misses,
         )
-        ezpp.calculate(Path(osu_file_path))
+        if isinstance(osu_file_path, str):
+            ezpp.calculate(Path(osu_file_path))
+        else:
+            # archived or compressed, oppai reads it from memory
+            ezpp.calculate_data(osu_file_path.read_bytes())
 
         pp = ezpp.get_pp()
         sr = ezpp.get_sr()
@@ -58,10 +106,16 @@ def _calculate_std(
     score: Score,
     attributes: Optional[OsuDifficultyAttributes] = None,
     oppai_path: Optional[str] = None,
-    osu_file_path: Optional[str] = None,
+    osu_file_path: Optional[Union[str, BeatmapFile]] = None,
 ) -> tuple[float, float]:
+    from performance_calculator.models.mods import Mods
+
     # use lazer pp if not rx/ap
     if not score.mods & Mods.RELAX and not score.mods & Mods.AUTOPILOT:
+        from performance_calculator.rulesets.osu.performance import (
+            OsuPerformanceCalculator,
+        )
+
         if attributes is None:
             raise ValueError("You must provide difficulty attributes")
 
@@ -82,10 +136,34 @@ def _calculate_std(
     return star_rating, result
 
 
+def _calculate_taiko_attributes(
+    score: Score,
+    osu_file_path: Union[str, BeatmapFile],
+) -> TaikoDifficultyAttributes:
+    # numpy is only needed once attributes are calculated locally
+    from performance_calculator.models.beatmap import parse_beatmap
+    from performance_calculator.models.path import Path
+    from performance_calculator.rulesets.taiko.difficulty_calculator import (
+        TaikoDifficultyCalculator,
+    )
+
+    if isinstance(osu_file_path, str):
+        beatmap = parse_beatmap(Path(osu_file_path))
+    else:
+        beatmap = parse_beatmap(osu_file_path.read_bytes())
+
+    calculator = TaikoDifficultyCalculator(beatmap)
+    return calculator.calculate(score.mods)
+
+
 def _calculate_taiko(
     score: Score,
     attributes: TaikoDifficultyAttributes,
 ) -> float:
+    from performance_calculator.rulesets.taiko.performance import (
+        TaikoPerformanceCalculator,
+    )
+
     calculator = TaikoPerformanceCalculator(attributes)
     calculator_result = calculator.calculate(score)
     result = calculator_result.total
@@ -97,6 +175,10 @@ def _calculate_catch(
     score: Score,
     attributes: CatchDifficultyAttributes,
 ) -> float:
+    from performance_calculator.rulesets.catch.performance import (
+        CatchPerformanceCalculator,
+    )
+
     calculator = CatchPerformanceCalculator(attributes)
     calculator_result = calculator.calculate(score)
     result = calculator_result.total
@@ -108,6 +190,10 @@ def _calculate_mania(
     score: Score,
     attributes: ManiaDifficultyAttributes,
 ) -> float:
+    from performance_calculator.rulesets.mania.performance import (
+        ManiaPerformanceCalculator,
+    )
+
     calculator = ManiaPerformanceCalculator(attributes)
     calculator_result = calculator.calculate(score)
     result = calculator_result.total
@@ -115,28 +201,62 @@ def _calculate_mania(
     return result
 
 
+def _resolve_attributes(
+    key: AttributeKey,
+    attribute_provider: Optional[DifficultyAttributeProvider],
+) -> DifficultyAttributes:
+    if attribute_provider is None:
+        raise ValueError("You must provide an attribute provider for keys")
+
+    attributes = attribute_provider.get(key)
+    if attributes is None:
+        raise ValueError(f"no difficulty attributes found for {key}")
+
+    return attributes
+
+
 def calculate_score(
     score: Score,
-    attributes: Optional[DifficultyAttributes] = None,  # doesn't exist if oppai is used
+    # doesn't exist if oppai is used, or a key of `attribute_provider`
+    attributes: Optional[Union[DifficultyAttributes, AttributeKey]] = None,
     oppai_path: Optional[str] = None,  # doesn't exist unless oppai is used
-    osu_file_path: Optional[str] = None,  # doesn't exist unless oppai is used
+    # for oppai, or local taiko attributes
+    osu_file_path: Optional[Union[str, BeatmapFile]] = None,
+    attribute_provider: Optional[DifficultyAttributeProvider] = None,
 ) -> tuple[float, float]:
+    from performance_calculator.models.difficulty import DifficultyAttributes
+
+    if attributes is not None and not isinstance(attributes, DifficultyAttributes):
+        attributes = _resolve_attributes(attributes, attribute_provider)
+
+    # only the score's ruleset is imported
     if score.mode == 0:
+        from performance_calculator.rulesets.osu.difficulty import (
+            OsuDifficultyAttributes,
+        )
+
         if attributes is not None and not isinstance(
             attributes,
             OsuDifficultyAttributes,
         ):
             raise ValueError("attributes must be OsuDifficultyAttributes")
 
-        result, star_rating = _calculate_std(
+        star_rating, result = _calculate_std(
             score,
             attributes,
             oppai_path,
             osu_file_path,
         )
     elif score.mode == 1:
+        from performance_calculator.rulesets.taiko.difficulty import (
+            TaikoDifficultyAttributes,
+        )
+
+        if attributes is None and osu_file_path is not None:
+            attributes = _calculate_taiko_attributes(score, osu_file_path)
+
         if attributes is None or not isinstance(attributes, TaikoDifficultyAttributes):
-            raise ValueError("You must provide difficulty attributes")
+            raise ValueError("You must provide difficulty attributes or a .osu file")
 
         result = _calculate_taiko(
             score,
@@ -145,6 +265,10 @@ def calculate_score(
 
         star_rating = attributes.star_rating
     elif score.mode == 2:
+        from performance_calculator.rulesets.catch.difficulty import (
+            CatchDifficultyAttributes,
+        )
+
         if attributes is None or not isinstance(attributes, CatchDifficultyAttributes):
             raise ValueError("you must provide difficulty attributes")
 
@@ -155,6 +279,10 @@ def calculate_score(
 
         star_rating = attributes.star_rating
     elif score.mode == 3:
+        from performance_calculator.rulesets.mania.difficulty import (
+            ManiaDifficultyAttributes,
+        )
+
         if attributes is None or not isinstance(attributes, ManiaDifficultyAttributes):
             raise ValueError("you must provide difficulty attributes")
 
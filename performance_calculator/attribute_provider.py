@@ -0,0 +1,320 @@
+from __future__ import annotations
+
+import dataclasses
+import json
+import os
+import sqlite3
+import threading
+import time
+from abc import ABC
+from abc import abstractmethod
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Mapping
+from typing import NamedTuple
+from typing import Optional
+from typing import Sequence
+from typing import TYPE_CHECKING
+from typing import Union
+
+from performance_calculator.models.difficulty import DifficultyAttributes
+from performance_calculator.models.mods import difficulty_mods
+from performance_calculator.models.path import Path
+from performance_calculator.pipeline.pool import ConnectionPool
+from performance_calculator.rulesets.catch.difficulty import CatchDifficultyAttributes
+from performance_calculator.rulesets.mania.difficulty import ManiaDifficultyAttributes
+from performance_calculator.rulesets.osu.difficulty import OsuDifficultyAttributes
+from performance_calculator.rulesets.taiko.difficulty import TaikoDifficultyAttributes
+
+if TYPE_CHECKING:
+    from performance_calculator.pipeline.recalculate import AttributeLookup
+
+DEFAULT_CACHE_SIZE = 65536
+# how long a map without attributes is remembered as missing, in seconds
+DEFAULT_NEGATIVE_TTL = 300.0
+
+# SQLite only takes so many parameters per statement
+QUERY_CHUNK_SIZE = 300
+
+ATTRIBUTE_CLASSES: dict[int, type[DifficultyAttributes]] = {
+    0: OsuDifficultyAttributes,
+    1: TaikoDifficultyAttributes,
+    2: CatchDifficultyAttributes,
+    3: ManiaDifficultyAttributes,
+}
+
+
+class AttributeKey(NamedTuple):
+    beatmap_id: int
+    mode: int
+    mods: int
+
+
+def canonical_key(key: AttributeKey) -> AttributeKey:
+    """The key with only the mods its attributes depend on."""
+    return AttributeKey(key.beatmap_id, key.mode, difficulty_mods(key.mods))
+
+
+def serialize_attributes(attributes: DifficultyAttributes) -> str:
+    return json.dumps(dataclasses.asdict(attributes))
+
+
+def deserialize_attributes(mode: int, data: Union[str, bytes]) -> DifficultyAttributes:
+    return ATTRIBUTE_CLASSES[mode](**json.loads(data))
+
+
+class DifficultyAttributeProvider(ABC):
+    """Difficulty attributes by (beatmap id, mode, mods), fetched in bulk."""
+
+    @abstractmethod
+    def _fetch_many(
+        self,
+        keys: Sequence[AttributeKey],
+    ) -> dict[AttributeKey, DifficultyAttributes]:
+        """The attributes of the (canonical, distinct) keys that have any."""
+        ...
+
+    def get_many(
+        self,
+        keys: Sequence[AttributeKey],
+    ) -> dict[AttributeKey, DifficultyAttributes]:
+        """The attributes of every key that has any, keyed as given. Keys
+        that only differ by mods attributes don't depend on share one
+        attributes object."""
+        canonical_keys = {key: canonical_key(AttributeKey(*key)) for key in keys}
+        found = self._fetch_many(list(dict.fromkeys(canonical_keys.values())))
+
+        return {
+            key: found[canonical]
+            for key, canonical in canonical_keys.items()
+            if canonical in found
+        }
+
+    def get(self, key: AttributeKey) -> Optional[DifficultyAttributes]:
+        return self.get_many([key]).get(key)
+
+
+class SQLiteAttributeStore(DifficultyAttributeProvider):
+    """Attributes in a SQLite table, read through a pool of connections."""
+
+    def __init__(self, pool: ConnectionPool) -> None:
+        self.pool = pool
+
+        with self.pool.connection() as connection:
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS difficulty_attributes ("
+                " beatmap_id INTEGER NOT NULL,"
+                " mode INTEGER NOT NULL,"
+                " mods INTEGER NOT NULL,"
+                " attributes TEXT NOT NULL,"
+                " PRIMARY KEY (beatmap_id, mode, mods))",
+            )
+            connection.commit()
+
+    @classmethod
+    def open(cls, path: Union[str, Path], pool_size: int = 4) -> SQLiteAttributeStore:
+        return cls(
+            ConnectionPool(
+                lambda: sqlite3.connect(str(path), check_same_thread=False),
+                pool_size,
+            ),
+        )
+
+    def _fetch_many(
+        self,
+        keys: Sequence[AttributeKey],
+    ) -> dict[AttributeKey, DifficultyAttributes]:
+        found = {}
+        with self.pool.connection() as connection:
+            for start in range(0, len(keys), QUERY_CHUNK_SIZE):
+                chunk = keys[start : start + QUERY_CHUNK_SIZE]
+                rows = connection.execute(
+                    "SELECT beatmap_id, mode, mods, attributes"
+                    " FROM difficulty_attributes WHERE "
+                    + " OR ".join(
+                        ["(beatmap_id = ? AND mode = ? AND mods = ?)"] * len(chunk),
+                    ),
+                    [value for key in chunk for value in key],
+                )
+                for beatmap_id, mode, mods, data in rows:
+                    key = AttributeKey(beatmap_id, mode, mods)
+                    found[key] = deserialize_attributes(mode, data)
+
+        return found
+
+    def put_many(self, attributes: Mapping[AttributeKey, DifficultyAttributes]) -> None:
+        rows = []
+        for key, map_attributes in attributes.items():
+            key = canonical_key(AttributeKey(*key))
+            rows.append((*key, serialize_attributes(map_attributes)))
+
+        with self.pool.connection() as connection:
+            connection.executemany(
+                "INSERT OR REPLACE INTO difficulty_attributes"
+                " (beatmap_id, mode, mods, attributes) VALUES (?, ?, ?, ?)",
+                rows,
+            )
+            connection.commit()
+
+
+class FileAttributeStore(DifficultyAttributeProvider):
+    """Attributes as one JSON file per key under `root`, read by a pool of
+    threads."""
+
+    def __init__(self, root: Union[str, Path], workers: int = 8) -> None:
+        self.root = Path(str(root))
+        self.root.mkdir(parents=True, exist_ok=True)
+        self._executor = ThreadPoolExecutor(max_workers=workers)
+
+    def _path(self, key: AttributeKey) -> Path:
+        return self.root / f"{key.beatmap_id}-{key.mode}-{key.mods}.json"
+
+    def _read(self, key: AttributeKey) -> Optional[DifficultyAttributes]:
+        try:
+            data = self._path(key).read_bytes()
+        except FileNotFoundError:
+            return None
+
+        return deserialize_attributes(key.mode, data)
+
+    def _fetch_many(
+        self,
+        keys: Sequence[AttributeKey],
+    ) -> dict[AttributeKey, DifficultyAttributes]:
+        return {
+            key: attributes
+            for key, attributes in zip(keys, self._executor.map(self._read, keys))
+            if attributes is not None
+        }
+
+    def put_many(self, attributes: Mapping[AttributeKey, DifficultyAttributes]) -> None:
+        for key, map_attributes in attributes.items():
+            path = self._path(canonical_key(AttributeKey(*key)))
+
+            # written whole, so readers never see half a file
+            temporary_path = Path(f"{path}.tmp")
+            temporary_path.write_text(serialize_attributes(map_attributes))
+            os.replace(str(temporary_path), str(path))
+
+    def close(self) -> None:
+        self._executor.shutdown()
+
+
+class CachedAttributeProvider(DifficultyAttributeProvider):
+    """An in-process LRU in front of another provider, which also remembers
+    keys the provider had nothing for, for `negative_ttl` seconds."""
+
+    def __init__(
+        self,
+        provider: DifficultyAttributeProvider,
+        maxsize: int = DEFAULT_CACHE_SIZE,
+        negative_ttl: float = DEFAULT_NEGATIVE_TTL,
+    ) -> None:
+        self.provider = provider
+        self.maxsize = maxsize
+        self.negative_ttl = negative_ttl
+
+        self._attributes: OrderedDict[
+            AttributeKey,
+            DifficultyAttributes,
+        ] = OrderedDict()
+        # key -> when it may be asked for again
+        self._missing: dict[AttributeKey, float] = {}
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._attributes)
+
+    def _fetch_many(
+        self,
+        keys: Sequence[AttributeKey],
+    ) -> dict[AttributeKey, DifficultyAttributes]:
+        found = {}
+        fetch = []
+
+        now = time.monotonic()
+        with self._lock:
+            for key in keys:
+                attributes = self._attributes.get(key)
+                if attributes is not None:
+                    self._attributes.move_to_end(key)
+                    found[key] = attributes
+                elif self._missing.get(key, 0.0) > now:
+                    continue
+                else:
+                    fetch.append(key)
+
+            self.hits += len(keys) - len(fetch)
+            self.misses += len(fetch)
+
+        if not fetch:
+            return found
+
+        fetched = self.provider._fetch_many(fetch)
+
+        with self._lock:
+            for key in fetch:
+                attributes = fetched.get(key)
+                if attributes is None:
+                    self._missing[key] = now + self.negative_ttl
+                    continue
+
+                self._missing.pop(key, None)
+                self._attributes[key] = attributes
+                found[key] = attributes
+
+            while len(self._attributes) > self.maxsize:
+                self._attributes.popitem(last=False)
+
+            if len(self._missing) > self.maxsize:
+                self._missing = {
+                    key: expiry for key, expiry in self._missing.items() if expiry > now
+                }
+
+        return found
+
+    def invalidate(self, keys: Optional[Sequence[AttributeKey]] = None) -> None:
+        """Forget the given keys, or everything, after attributes change."""
+        with self._lock:
+            if keys is None:
+                self._attributes.clear()
+                self._missing.clear()
+                return
+
+            for key in keys:
+                key = canonical_key(AttributeKey(*key))
+                self._attributes.pop(key, None)
+                self._missing.pop(key, None)
+
+
+def resolve_attributes(
+    attributes: Sequence[Union[DifficultyAttributes, AttributeKey]],
+    provider: Optional[DifficultyAttributeProvider],
+) -> list[DifficultyAttributes]:
+    """Replace keys with their attributes, fetched in one `get_many`."""
+    keys = [key for key in attributes if not isinstance(key, DifficultyAttributes)]
+    if not keys:
+        return list(attributes)  # type: ignore
+
+    if provider is None:
+        raise ValueError("You must provide an attribute provider for keys")
+
+    found = provider.get_many(keys)
+    resolved = []
+    for item in attributes:
+        if isinstance(item, DifficultyAttributes):
+            resolved.append(item)
+        elif item in found:
+            resolved.append(found[item])
+        else:
+            raise ValueError(f"no difficulty attributes found for {item}")
+
+    return resolved
+
+
+def attribute_lookup(provider: DifficultyAttributeProvider) -> AttributeLookup:
+    """A provider as `BatchRecalculator`'s lookup, for scores of any mode."""
+    return provider.get_many
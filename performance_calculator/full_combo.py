@@ -0,0 +1,131 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Hashable
+from typing import Optional
+from typing import Sequence
+from typing import TYPE_CHECKING
+from typing import Union
+
+import numpy as np
+
+from performance_calculator.attribute_provider import AttributeKey
+from performance_calculator.attribute_provider import DifficultyAttributeProvider
+from performance_calculator.attribute_provider import resolve_attributes
+from performance_calculator.live import performance_calculator_for
+from performance_calculator.models.difficulty import DifficultyAttributes
+from performance_calculator.models.mods import Mods
+from performance_calculator.models.score import Score
+from performance_calculator.models.score_arrays import full_combo_scores
+from performance_calculator.models.score_arrays import score_arrays
+from performance_calculator.rulesets.osu.oppai_performance import (
+    calculate_oppai_pp_many,
+)
+from performance_calculator.rulesets.osu.oppai_performance import (
+    OppaiAttributeCache,
+)
+
+if TYPE_CHECKING:
+    from performance_calculator.models.beatmap_source import BeatmapFile
+
+
+@dataclass
+class FullComboPerformance:
+    # both in the order the scores were given
+    pp: np.ndarray
+    full_combo_pp: np.ndarray
+
+
+def _groups(keys: Sequence[Hashable]) -> dict[Hashable, list[int]]:
+    groups: dict[Hashable, list[int]] = {}
+    for i, key in enumerate(keys):
+        groups.setdefault(key, []).append(i)
+
+    return groups
+
+
+def calculate_full_combo(
+    scores: Sequence[Score],
+    attributes: Sequence[Union[DifficultyAttributes, AttributeKey]],
+    provider: Optional[DifficultyAttributeProvider] = None,
+) -> FullComboPerformance:
+    """pp of each score and of the same score without its misses and
+    combo breaks, with `attributes[i]` being the attributes of `scores[i]`.
+
+    Scores sharing an attributes object are calculated together, real and
+    full combo scores in one vectorized pass. Attributes may be given as
+    keys of `provider`. osu! relax and autopilot scores are scored by
+    oppai, so go through `calculate_full_combo_oppai` instead.
+    """
+    if len(scores) != len(attributes):
+        raise ValueError("scores and attributes must match one to one")
+
+    if any(
+        score.mode == 0 and score.mods & (Mods.RELAX | Mods.AUTOPILOT)
+        for score in scores
+    ):
+        raise ValueError("relax and autopilot scores need calculate_full_combo_oppai")
+
+    resolved = resolve_attributes(attributes, provider)
+
+    pp = np.zeros(len(scores), dtype=np.float64)
+    full_combo_pp = np.zeros(len(scores), dtype=np.float64)
+
+    for indices in _groups([id(attrs) for attrs in resolved]).values():
+        map_attributes = resolved[indices[0]]
+        calculator = performance_calculator_for(map_attributes)
+
+        group = score_arrays([scores[i] for i in indices])
+        full_combo = full_combo_scores(
+            group,
+            scores[indices[0]].mode,
+            map_attributes.max_combo,
+        )
+
+        results = calculator.calculate_many(np.concatenate((group, full_combo)))
+        pp[indices] = results[: len(indices)]
+        full_combo_pp[indices] = results[len(indices) :]
+
+    return FullComboPerformance(pp=pp, full_combo_pp=full_combo_pp)
+
+
+def calculate_full_combo_oppai(
+    scores: Sequence[Score],
+    beatmaps: Sequence[Union[str, BeatmapFile]],
+    cache: OppaiAttributeCache,
+    beatmap_keys: Optional[Sequence[Hashable]] = None,
+) -> FullComboPerformance:
+    """`calculate_full_combo` for relax and autopilot scores, which oppai
+    scores. Each (map, mods) is only parsed once, through `cache`."""
+    if len(scores) != len(beatmaps):
+        raise ValueError("scores and beatmaps must match one to one")
+
+    if beatmap_keys is None:
+        beatmap_keys = [
+            beatmap if isinstance(beatmap, str) else None for beatmap in beatmaps
+        ]
+        if None in beatmap_keys:
+            raise ValueError("You must provide keys for beatmap sources")
+
+    pp = np.zeros(len(scores), dtype=np.float64)
+    full_combo_pp = np.zeros(len(scores), dtype=np.float64)
+
+    groups = _groups(
+        [(key, score.mods) for key, score in zip(beatmap_keys, scores)],
+    )
+    for (beatmap_key, mods), indices in groups.items():
+        attributes = cache.get(beatmaps[indices[0]], mods, beatmap_key)
+
+        group = score_arrays([scores[i] for i in indices])
+        full_combo = full_combo_scores(group, 0, attributes.max_combo)
+
+        results = calculate_oppai_pp_many(
+            attributes,
+            np.concatenate((group["accuracy"], full_combo["accuracy"])),
+            np.concatenate((group["max_combo"], full_combo["max_combo"])),
+            np.concatenate((group["num_misses"], full_combo["num_misses"])),
+        )
+        pp[indices] = results[: len(indices)]
+        full_combo_pp[indices] = results[len(indices) :]
+
+    return FullComboPerformance(pp=pp, full_combo_pp=full_combo_pp)
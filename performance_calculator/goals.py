@@ -0,0 +1,289 @@
+from __future__ import annotations
+
+from typing import Callable
+from typing import Optional
+from typing import Sequence
+from typing import Union
+
+import numpy as np
+import numpy.typing as npt
+
+from performance_calculator.attribute_provider import AttributeKey
+from performance_calculator.attribute_provider import DifficultyAttributeProvider
+from performance_calculator.attribute_provider import resolve_attributes
+from performance_calculator.live import performance_calculator_class
+from performance_calculator.models.difficulty import DifficultyAttributes
+from performance_calculator.models.hit_distribution import catch_hit_distribution
+from performance_calculator.models.hit_distribution import HitDistribution
+from performance_calculator.models.hit_distribution import mania_hit_distribution
+from performance_calculator.models.hit_distribution import osu_hit_distribution
+from performance_calculator.models.hit_distribution import taiko_hit_distribution
+from performance_calculator.rulesets.catch.difficulty import CatchDifficultyAttributes
+from performance_calculator.rulesets.mania.difficulty import ManiaDifficultyAttributes
+from performance_calculator.rulesets.osu.difficulty import OsuDifficultyAttributes
+from performance_calculator.rulesets.taiko.difficulty import TaikoDifficultyAttributes
+
+# every round narrows the bracket to 1 / SEARCH_POINTS of its size,
+# so accuracies are found to within 32 ** -5 (about 3e-8)
+SEARCH_POINTS = 32
+SEARCH_ROUNDS = 5
+
+# catch attributes don't count tiny droplets, which only matter through
+# accuracy, so a nominal count of them is used to spread accuracy over
+CATCH_TINY_DROPLETS_PER_OBJECT = 10
+
+
+def _total_hits(attributes: DifficultyAttributes) -> int:
+    if isinstance(attributes, OsuDifficultyAttributes):
+        return (
+            attributes.hit_circle_count
+            + attributes.slider_count
+            + attributes.spinner_count
+        )
+
+    # taiko and catch count their combo objects, and mania's
+    # combo is the closest thing its attributes have
+    return attributes.max_combo
+
+
+def _hit_distribution(
+    attributes: DifficultyAttributes,
+    accuracy: np.ndarray,
+    total_hits: np.ndarray,
+    misses: np.ndarray,
+) -> HitDistribution:
+    if isinstance(attributes, OsuDifficultyAttributes):
+        return osu_hit_distribution(accuracy, total_hits, misses)
+    elif isinstance(attributes, TaikoDifficultyAttributes):
+        return taiko_hit_distribution(accuracy, total_hits, misses)
+    elif isinstance(attributes, CatchDifficultyAttributes):
+        return catch_hit_distribution(
+            accuracy,
+            fruits=total_hits,
+            droplets=0,
+            tiny_droplets=total_hits * CATCH_TINY_DROPLETS_PER_OBJECT,
+            misses=misses,
+        )
+    elif isinstance(attributes, ManiaDifficultyAttributes):
+        return mania_hit_distribution(accuracy, total_hits, misses)
+
+    raise NotImplementedError(
+        f"no hit distribution found for {type(attributes).__name__}",
+    )
+
+
+def _search(
+    evaluate: Callable[[np.ndarray], np.ndarray],
+    lower: np.ndarray,
+    upper: np.ndarray,
+    target: np.ndarray,
+    integer: bool,
+) -> np.ndarray:
+    """The smallest value in [lower, upper] at which `evaluate` (which is
+    non-decreasing) reaches `target`, nan if it never does.
+
+    `evaluate` takes an (n, k) array of values and returns their pp, and
+    is called once per round for every problem at once.
+    """
+    ends = evaluate(np.stack((lower, upper), axis=1))
+    at_lower = ends[:, 0] >= target
+    reachable = ends[:, 1] >= target
+
+    # the bracket always has `lower` under the target and `upper` reaching it
+    rows = np.arange(len(target))
+    steps = np.linspace(0.0, 1.0, SEARCH_POINTS + 1)[1:]
+    for _ in range(SEARCH_ROUNDS):
+        if integer and (upper - lower <= 1).all():
+            break
+
+        candidates = lower[:, None] + (upper - lower)[:, None] * steps
+        if integer:
+            candidates = np.ceil(candidates)
+
+        reached = evaluate(candidates) >= target[:, None]
+        # the last candidate is `upper`, so something always reaches it
+        first = np.argmax(reached | (steps == 1.0), axis=1)
+
+        lower = np.where(first > 0, candidates[rows, first - 1], lower)
+        upper = candidates[rows, first]
+
+    return np.where(at_lower, lower, np.where(reachable, upper, np.nan))
+
+
+def _solve(
+    attributes: Sequence[DifficultyAttributes],
+    solve_group: Callable[[list[DifficultyAttributes], np.ndarray], np.ndarray],
+) -> np.ndarray:
+    """Solve the problems of each ruleset with `solve_group`, which gets
+    the attributes of each problem's map and the problems' indices. Every
+    map of a ruleset is solved together, by one calculator for all of them."""
+    results = np.full(len(attributes), np.nan)
+
+    groups: dict[type, list[int]] = {}
+    for i, map_attributes in enumerate(attributes):
+        groups.setdefault(type(map_attributes), []).append(i)
+
+    for indices in groups.values():
+        results[indices] = solve_group(
+            [attributes[i] for i in indices],
+            np.array(indices),
+        )
+
+    return results
+
+
+def minimum_accuracy(
+    attributes: Sequence[Union[DifficultyAttributes, AttributeKey]],
+    target_pp: npt.ArrayLike,
+    mods: npt.ArrayLike = 0,
+    misses: npt.ArrayLike = 0,
+    max_combo: Optional[npt.ArrayLike] = None,
+    total_hits: Optional[npt.ArrayLike] = None,
+    provider: Optional[DifficultyAttributeProvider] = None,
+) -> np.ndarray:
+    """The lowest accuracy (as a fraction) that gets each score on
+    `attributes[i]` to `target_pp[i]`, or nan if even an SS doesn't. It's
+    the accuracy of whole judgements, so it can be played.
+
+    Scores are full combos with no misses unless `max_combo` and `misses`
+    say otherwise, and judgements come from the ruleset's hit distribution
+    solver. Problems of the same ruleset are solved together, whatever
+    their maps. Attributes may be given as keys of `provider`.
+    """
+    resolved = resolve_attributes(attributes, provider)
+    count = len(resolved)
+    target = np.broadcast_to(np.asarray(target_pp, dtype=np.float64), count)
+    mods = np.broadcast_to(np.asarray(mods, dtype=np.int64), count)
+    misses = np.broadcast_to(np.asarray(misses, dtype=np.int64), count)
+    if max_combo is not None:
+        max_combo = np.broadcast_to(np.asarray(max_combo, dtype=np.int64), count)
+    if total_hits is not None:
+        total_hits = np.broadcast_to(np.asarray(total_hits, dtype=np.int64), count)
+
+    def solve_group(
+        group_attributes: list[DifficultyAttributes],
+        indices: np.ndarray,
+    ) -> np.ndarray:
+        ruleset_attributes = group_attributes[0]
+        calculator = performance_calculator_class(ruleset_attributes).for_maps(
+            group_attributes,
+        )
+
+        group_hits = (
+            total_hits[indices]
+            if total_hits is not None
+            else np.array(
+                [_total_hits(map_attributes) for map_attributes in group_attributes],
+            )
+        )
+        group_combo = (
+            max_combo[indices]
+            if max_combo is not None
+            else np.array(
+                [map_attributes.max_combo for map_attributes in group_attributes],
+            )
+        )
+
+        def evaluate(accuracy: np.ndarray) -> np.ndarray:
+            columns = accuracy.shape[1]
+            distribution = _hit_distribution(
+                ruleset_attributes,
+                accuracy.ravel(),
+                np.repeat(group_hits, columns),
+                np.repeat(misses[indices], columns),
+            )
+            scores = distribution.score_arrays(
+                np.repeat(mods[indices], columns),
+                np.repeat(group_combo, columns),
+            )
+            # the calculator's maps run along the last axis
+            return calculator.calculate_many(scores.reshape(accuracy.shape).T).T
+
+        found = _search(
+            evaluate,
+            np.zeros(len(indices)),
+            np.ones(len(indices)),
+            target[indices],
+            integer=False,
+        )
+
+        # what the judgements found give, which can be a fraction of a
+        # judgement away from the searched value
+        reachable = ~np.isnan(found)
+        distribution = _hit_distribution(
+            ruleset_attributes,
+            np.where(reachable, found, 0.0),
+            group_hits,
+            misses[indices],
+        )
+        return np.where(reachable, distribution.accuracy, np.nan)
+
+    return _solve(resolved, solve_group)
+
+
+def minimum_combo(
+    attributes: Sequence[Union[DifficultyAttributes, AttributeKey]],
+    target_pp: npt.ArrayLike,
+    accuracy: npt.ArrayLike,
+    mods: npt.ArrayLike = 0,
+    misses: npt.ArrayLike = 0,
+    total_hits: Optional[npt.ArrayLike] = None,
+    provider: Optional[DifficultyAttributeProvider] = None,
+) -> np.ndarray:
+    """The lowest max combo that gets each score on `attributes[i]` to
+    `target_pp[i]` at `accuracy[i]`, or nan if a full combo doesn't."""
+    resolved = resolve_attributes(attributes, provider)
+    count = len(resolved)
+    target = np.broadcast_to(np.asarray(target_pp, dtype=np.float64), count)
+    accuracy = np.broadcast_to(np.asarray(accuracy, dtype=np.float64), count)
+    mods = np.broadcast_to(np.asarray(mods, dtype=np.int64), count)
+    misses = np.broadcast_to(np.asarray(misses, dtype=np.int64), count)
+    if total_hits is not None:
+        total_hits = np.broadcast_to(np.asarray(total_hits, dtype=np.int64), count)
+
+    def solve_group(
+        group_attributes: list[DifficultyAttributes],
+        indices: np.ndarray,
+    ) -> np.ndarray:
+        ruleset_attributes = group_attributes[0]
+        calculator = performance_calculator_class(ruleset_attributes).for_maps(
+            group_attributes,
+        )
+
+        group_hits = (
+            total_hits[indices]
+            if total_hits is not None
+            else np.array(
+                [_total_hits(map_attributes) for map_attributes in group_attributes],
+            )
+        )
+        # the judgements don't depend on the combo
+        distribution = _hit_distribution(
+            ruleset_attributes,
+            accuracy[indices],
+            group_hits,
+            misses[indices],
+        )
+
+        scores = distribution.score_arrays(mods[indices], 0)
+
+        def evaluate(combo: np.ndarray) -> np.ndarray:
+            candidates = np.repeat(scores, combo.shape[1])
+            candidates["max_combo"] = combo.ravel()
+            # the calculator's maps run along the last axis
+            return calculator.calculate_many(candidates.reshape(combo.shape).T).T
+
+        return _search(
+            evaluate,
+            np.zeros(len(indices)),
+            np.array(
+                [
+                    float(map_attributes.max_combo)
+                    for map_attributes in group_attributes
+                ],
+            ),
+            target[indices],
+            integer=True,
+        )
+
+    return _solve(resolved, solve_group)
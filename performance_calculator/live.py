@@ -0,0 +1,161 @@
+from __future__ import annotations
+
+from typing import Optional
+
+from performance_calculator.models.difficulty import DifficultyAttributes
+from performance_calculator.models.performance import PerformanceCalculator
+from performance_calculator.models.score import Score
+from performance_calculator.rulesets.catch.difficulty import CatchDifficultyAttributes
+from performance_calculator.rulesets.catch.performance import CatchPerformanceCalculator
+from performance_calculator.rulesets.mania.difficulty import ManiaDifficultyAttributes
+from performance_calculator.rulesets.mania.performance import ManiaPerformanceCalculator
+from performance_calculator.rulesets.osu.difficulty import OsuDifficultyAttributes
+from performance_calculator.rulesets.osu.performance import OsuPerformanceCalculator
+from performance_calculator.rulesets.taiko.difficulty import TaikoDifficultyAttributes
+from performance_calculator.rulesets.taiko.performance import TaikoPerformanceCalculator
+
+
+class Judgement:
+    GREAT = 0  # 300, or a caught fruit
+    OK = 1  # 100, or a caught droplet
+    MEH = 2  # 50, or a caught tiny droplet
+    MISS = 3
+    GEKI = 4  # mania's perfect
+    KATU = 5  # mania's good, or a missed tiny droplet
+
+
+# the score field each judgement counts towards
+_JUDGEMENT_FIELDS = (
+    "num_300s",
+    "num_100s",
+    "num_50s",
+    "num_misses",
+    "num_gekis",
+    "num_katus",
+)
+
+_MODES: dict[type, int] = {
+    OsuPerformanceCalculator: 0,
+    TaikoPerformanceCalculator: 1,
+    CatchPerformanceCalculator: 2,
+    ManiaPerformanceCalculator: 3,
+}
+
+
+def performance_calculator_class(
+    attributes: DifficultyAttributes,
+) -> type[PerformanceCalculator]:
+    if isinstance(attributes, OsuDifficultyAttributes):
+        return OsuPerformanceCalculator
+    elif isinstance(attributes, TaikoDifficultyAttributes):
+        return TaikoPerformanceCalculator
+    elif isinstance(attributes, CatchDifficultyAttributes):
+        return CatchPerformanceCalculator
+    elif isinstance(attributes, ManiaDifficultyAttributes):
+        return ManiaPerformanceCalculator
+
+    raise NotImplementedError(
+        f"no performance calculator found for {type(attributes).__name__}",
+    )
+
+
+def performance_calculator_for(
+    attributes: DifficultyAttributes,
+) -> PerformanceCalculator:
+    return performance_calculator_class(attributes)(attributes)
+
+
+class LivePerformanceTracker:
+    """pp of a play in progress, updated one judgement at a time.
+
+    Calculators keep everything that only depends on the map, so one
+    calculator should be shared by every tracker spectating that map.
+    """
+
+    __slots__ = ("calculator", "score", "combo", "_hit_value", "_pp")
+
+    def __init__(self, calculator: PerformanceCalculator, mods: int = 0) -> None:
+        mode = _MODES.get(type(calculator))
+        if mode is None:
+            raise ValueError(f"{type(calculator).__name__} can't track live plays")
+
+        self.calculator = calculator
+        self.score = Score(
+            mode=mode,
+            score=0,
+            max_combo=0,
+            mods=mods,
+            accuracy=1.0,
+            num_300s=0,
+            num_100s=0,
+            num_50s=0,
+            num_gekis=0,
+            num_katus=0,
+            num_misses=0,
+        )
+        self.combo = 0
+
+        # osu!'s accuracy, in 50s
+        self._hit_value = 0
+        self._pp: Optional[float] = None
+
+    @classmethod
+    def from_attributes(
+        cls,
+        attributes: DifficultyAttributes,
+        mods: int = 0,
+    ) -> LivePerformanceTracker:
+        return cls(performance_calculator_for(attributes), mods)
+
+    @property
+    def star_rating(self) -> float:
+        return self.calculator.difficulty_attributes.star_rating
+
+    def judge(self, judgement: int, count: int = 1) -> None:
+        score = self.score
+        field = _JUDGEMENT_FIELDS[judgement]
+        setattr(score, field, getattr(score, field) + count)
+
+        if judgement == Judgement.MISS:
+            self.combo = 0
+        elif score.mode == 2 and judgement in (Judgement.MEH, Judgement.KATU):
+            # tiny droplets don't affect combo
+            pass
+        else:
+            self.combo += count
+            if self.combo > score.max_combo:
+                score.max_combo = self.combo
+
+        if score.mode == 0:
+            if judgement == Judgement.GREAT:
+                self._hit_value += 6 * count
+            elif judgement == Judgement.OK:
+                self._hit_value += 2 * count
+            elif judgement == Judgement.MEH:
+                self._hit_value += count
+
+            total_hits = (
+                score.num_300s + score.num_100s + score.num_50s + score.num_misses
+            )
+            score.accuracy = self._hit_value / (6 * total_hits)
+
+        self._pp = None
+
+    def add_combo(self, count: int = 1) -> None:
+        """Combo without a judgement, like slider ticks."""
+        self.combo += count
+        if self.combo > self.score.max_combo:
+            self.score.max_combo = self.combo
+
+        self._pp = None
+
+    def break_combo(self) -> None:
+        """A combo break without a miss, like a slider break."""
+        self.combo = 0
+
+    @property
+    def pp(self) -> float:
+        if self._pp is None:
+            self._pp = self.calculator.calculate(self.score).total
+
+        return self._pp
@@ -0,0 +1,408 @@
+from __future__ import annotations
+
+import io
+import math
+from bisect import bisect_right
+from dataclasses import dataclass
+from dataclasses import field
+from typing import BinaryIO
+from typing import Union
+
+from performance_calculator.models.path import Path
+
+BeatmapSource = Union[Path, str, bytes]
+
+BASE_SCORING_DISTANCE = 100.0
+MAX_SLIDER_LENGTH = 100000.0
+
+
+class HitObjectType:
+    CIRCLE = 1 << 0
+    SLIDER = 1 << 1
+    NEW_COMBO = 1 << 2
+    SPINNER = 1 << 3
+    HOLD = 1 << 7
+
+
+class BeatmapQuery:
+    """How much of a .osu file `parse_beatmap` should read.
+
+    Each level includes everything the previous ones do, and the parser
+    stops reading the file as soon as the requested data is available.
+    """
+
+    # [General] and [Difficulty]: mode, stack leniency and base stats
+    STATS = 0
+    # + the object type of every line in [HitObjects]
+    COUNTS = 1
+    # + [TimingPoints] and the slider fields needed for max combo
+    MAX_COMBO = 2
+    # + full hit objects, including slider curves
+    FULL = 3
+
+
+@dataclass
+class BeatmapDifficulty:
+    hp_drain_rate: float = 5.0
+    circle_size: float = 5.0
+    overall_difficulty: float = 5.0
+    approach_rate: float = 5.0
+    slider_multiplier: float = 1.4
+    slider_tick_rate: float = 1.0
+
+
+@dataclass
+class TimingPoint:
+    time: float
+    beat_length: float
+    uninherited: bool
+
+    @property
+    def slider_velocity(self) -> float:
+        if self.beat_length >= 0:
+            return 1.0
+
+        return min(max(100.0 / -self.beat_length, 0.1), 10.0)
+
+
+@dataclass
+class HitObject:
+    x: float
+    y: float
+    time: float
+    type: int
+    hitsound: int
+    end_time: float
+
+    # sliders only
+    curve_type: str = ""
+    curve_points: list[tuple[float, float]] = field(default_factory=list)
+    repeat_count: int = 0
+    pixel_length: float = 0.0
+    tick_count: int = 0  # per span
+
+    @property
+    def span_count(self) -> int:
+        return self.repeat_count + 1
+
+    @property
+    def max_combo(self) -> int:
+        if self.type & HitObjectType.SLIDER:
+            # head, ticks in every span, repeats and tail
+            return 1 + self.tick_count * self.span_count + self.repeat_count + 1
+
+        return 1
+
+
+@dataclass
+class Beatmap:
+    format_version: int = 14
+    mode: int = 0
+    stack_leniency: float = 0.7
+    difficulty: BeatmapDifficulty = field(default_factory=BeatmapDifficulty)
+    timing_points: list[TimingPoint] = field(default_factory=list)
+    hit_objects: list[HitObject] = field(default_factory=list)
+
+    hit_circle_count: int = 0
+    slider_count: int = 0
+    spinner_count: int = 0
+    hold_count: int = 0
+
+    # follows osu!standard judgement rules, the other rulesets
+    # derive their own max combo from the hit objects.
+    max_combo: int = 0
+
+    @property
+    def object_count(self) -> int:
+        return (
+            self.hit_circle_count
+            + self.slider_count
+            + self.spinner_count
+            + self.hold_count
+        )
+
+
+class _ControlPoints:
+    """Timing point lookups used to derive slider velocity and ticks."""
+
+    def __init__(self, timing_points: list[TimingPoint]) -> None:
+        uninherited = [point for point in timing_points if point.uninherited]
+
+        self._uninherited_times = [point.time for point in uninherited]
+        self._beat_lengths = [
+            min(max(point.beat_length, 6.0), 60000.0) for point in uninherited
+        ]
+
+        self._times = [point.time for point in timing_points]
+        self._slider_velocities = [point.slider_velocity for point in timing_points]
+
+    def beat_length_at(self, time: float) -> float:
+        if not self._beat_lengths:
+            return 1000.0
+
+        index = bisect_right(self._uninherited_times, time) - 1
+        return self._beat_lengths[max(index, 0)]
+
+    def slider_velocity_at(self, time: float) -> float:
+        index = bisect_right(self._times, time) - 1
+        if index < 0:
+            return 1.0
+
+        return self._slider_velocities[index]
+
+
+def _open(source: BeatmapSource) -> BinaryIO:
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        return io.BytesIO(source)
+
+    return open(str(source), "rb")
+
+
+def _polyline_length(x: float, y: float, points: list[tuple[float, float]]) -> float:
+    length = 0.0
+    for point_x, point_y in points:
+        length += math.hypot(point_x - x, point_y - y)
+        x, y = point_x, point_y
+
+    return length
+
+
+def _parse_curve_points(curve: bytes) -> tuple[str, list[tuple[float, float]]]:
+    curve_type, *raw_points = curve.split(b"|")
+
+    points = []
+    for raw_point in raw_points:
+        point_x, _, point_y = raw_point.partition(b":")
+        points.append((float(point_x), float(point_y)))
+
+    return curve_type.decode(), points
+
+
+def _slider_timing(
+    time: float,
+    span_count: int,
+    pixel_length: float,
+    beatmap: Beatmap,
+    control_points: _ControlPoints,
+) -> tuple[float, int]:
+    """Returns the end time and per-span tick count of a slider."""
+    beat_length = control_points.beat_length_at(time)
+    slider_velocity = control_points.slider_velocity_at(time)
+
+    scoring_distance = (
+        BASE_SCORING_DISTANCE * beatmap.difficulty.slider_multiplier * slider_velocity
+    )
+    velocity = scoring_distance / beat_length
+
+    tick_distance = scoring_distance / beatmap.difficulty.slider_tick_rate
+    if beatmap.format_version < 8:
+        tick_distance /= slider_velocity
+
+    length = min(pixel_length, MAX_SLIDER_LENGTH)
+    tick_distance = min(max(tick_distance, 0.0), length)
+
+    end_time = time
+    if velocity > 0:
+        end_time += span_count * pixel_length / velocity
+
+    tick_count = 0
+    if tick_distance > 0:
+        # ticks are placed every tick distance, stopping 10ms of
+        # slider travel short of the span's end
+        min_distance_from_end = velocity * 10
+        tick_count = max(
+            math.ceil((length - min_distance_from_end) / tick_distance) - 1,
+            0,
+        )
+
+    return end_time, tick_count
+
+
+def _parse_hit_object(line: bytes) -> HitObject:
+    fields = line.split(b",", 10)
+
+    object_type = int(fields[3])
+    time = float(fields[2])
+
+    hit_object = HitObject(
+        x=float(fields[0]),
+        y=float(fields[1]),
+        time=time,
+        type=object_type,
+        hitsound=int(fields[4]),
+        end_time=time,
+    )
+
+    if object_type & HitObjectType.SLIDER:
+        hit_object.repeat_count = max(int(fields[6]) - 1, 0)
+
+        curve_type, curve_points = _parse_curve_points(fields[5])
+        hit_object.curve_type = curve_type
+        hit_object.curve_points = curve_points
+
+        if len(fields) >= 8:
+            hit_object.pixel_length = float(fields[7])
+        else:
+            hit_object.pixel_length = _polyline_length(
+                hit_object.x,
+                hit_object.y,
+                hit_object.curve_points,
+            )
+    elif object_type & HitObjectType.SPINNER:
+        hit_object.end_time = float(fields[5])
+    elif object_type & HitObjectType.HOLD:
+        hit_object.end_time = float(fields[5].partition(b":")[0])
+
+    return hit_object
+
+
+def parse_beatmap(source: BeatmapSource, query: int = BeatmapQuery.FULL) -> Beatmap:
+    """Parse a .osu file from a path or its raw bytes.
+
+    The file is streamed line by line and only the sections needed
+    for `query` (see `BeatmapQuery`) are read.
+    """
+    beatmap = Beatmap()
+
+    approach_rate_set = False
+    control_points = None
+    section = b""
+
+    with _open(source) as f:
+        for raw_line in f:
+            line = raw_line.strip()
+            if not line or line.startswith(b"//"):
+                continue
+
+            if line.startswith(b"[") and line.endswith(b"]"):
+                section = line[1:-1]
+
+                if section == b"Events" and query == BeatmapQuery.STATS:
+                    break
+
+                continue
+
+            if section == b"HitObjects":
+                if query == BeatmapQuery.COUNTS:
+                    object_type = int(line.split(b",", 4)[3])
+
+                    if object_type & HitObjectType.CIRCLE:
+                        beatmap.hit_circle_count += 1
+                    elif object_type & HitObjectType.SLIDER:
+                        beatmap.slider_count += 1
+                    elif object_type & HitObjectType.SPINNER:
+                        beatmap.spinner_count += 1
+                    elif object_type & HitObjectType.HOLD:
+                        beatmap.hold_count += 1
+
+                    continue
+
+                if control_points is None:
+                    control_points = _ControlPoints(beatmap.timing_points)
+
+                if query == BeatmapQuery.MAX_COMBO:
+                    fields = line.split(b",", 8)
+                    object_type = int(fields[3])
+
+                    if object_type & HitObjectType.CIRCLE:
+                        beatmap.hit_circle_count += 1
+                    elif object_type & HitObjectType.SLIDER:
+                        beatmap.slider_count += 1
+
+                        span_count = max(int(fields[6]), 1)
+                        if len(fields) >= 8:
+                            pixel_length = float(fields[7])
+                        else:
+                            _, curve_points = _parse_curve_points(fields[5])
+                            pixel_length = _polyline_length(
+                                float(fields[0]),
+                                float(fields[1]),
+                                curve_points,
+                            )
+
+                        _, tick_count = _slider_timing(
+                            float(fields[2]),
+                            span_count,
+                            pixel_length,
+                            beatmap,
+                            control_points,
+                        )
+                        beatmap.max_combo += tick_count * span_count + span_count
+                    elif object_type & HitObjectType.SPINNER:
+                        beatmap.spinner_count += 1
+                    elif object_type & HitObjectType.HOLD:
+                        beatmap.hold_count += 1
+
+                    beatmap.max_combo += 1
+                    continue
+
+                hit_object = _parse_hit_object(line)
+                if hit_object.type & HitObjectType.CIRCLE:
+                    beatmap.hit_circle_count += 1
+                elif hit_object.type & HitObjectType.SLIDER:
+                    beatmap.slider_count += 1
+                    hit_object.end_time, hit_object.tick_count = _slider_timing(
+                        hit_object.time,
+                        hit_object.span_count,
+                        hit_object.pixel_length,
+                        beatmap,
+                        control_points,
+                    )
+                elif hit_object.type & HitObjectType.SPINNER:
+                    beatmap.spinner_count += 1
+                elif hit_object.type & HitObjectType.HOLD:
+                    beatmap.hold_count += 1
+
+                beatmap.max_combo += hit_object.max_combo
+                beatmap.hit_objects.append(hit_object)
+            elif section == b"TimingPoints":
+                if query < BeatmapQuery.MAX_COMBO:
+                    continue
+
+                fields = line.split(b",")
+                if len(fields) < 2:
+                    continue
+
+                beatmap.timing_points.append(
+                    TimingPoint(
+                        time=float(fields[0]),
+                        beat_length=float(fields[1]),
+                        uninherited=len(fields) < 7 or fields[6].startswith(b"1"),
+                    ),
+                )
+            elif section == b"Difficulty":
+                key, _, value = line.partition(b":")
+                key = key.strip()
+
+                if key == b"HPDrainRate":
+                    beatmap.difficulty.hp_drain_rate = float(value)
+                elif key == b"CircleSize":
+                    beatmap.difficulty.circle_size = float(value)
+                elif key == b"OverallDifficulty":
+                    beatmap.difficulty.overall_difficulty = float(value)
+                elif key == b"ApproachRate":
+                    beatmap.difficulty.approach_rate = float(value)
+                    approach_rate_set = True
+                elif key == b"SliderMultiplier":
+                    beatmap.difficulty.slider_multiplier = float(value)
+                elif key == b"SliderTickRate":
+                    beatmap.difficulty.slider_tick_rate = float(value)
+            elif section == b"General":
+                key, _, value = line.partition(b":")
+                key = key.strip()
+
+                if key == b"Mode":
+                    beatmap.mode = int(value)
+                elif key == b"StackLeniency":
+                    beatmap.stack_leniency = float(value)
+            elif not section:
+                # the header line, optionally preceded by a BOM
+                _, _, version = line.rpartition(b"osu file format v")
+                if version.isdigit():
+                    beatmap.format_version = int(version)
+
+    # maps predating ApproachRate use their OD for it
+    if not approach_rate_set:
+        beatmap.difficulty.approach_rate = beatmap.difficulty.overall_difficulty
+
+    return beatmap
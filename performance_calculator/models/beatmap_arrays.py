@@ -0,0 +1,159 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from dataclasses import field
+
+import numpy as np
+
+from performance_calculator.models.beatmap import Beatmap
+from performance_calculator.models.beatmap import BeatmapDifficulty
+from performance_calculator.models.beatmap import HitObjectType
+
+HIT_OBJECT_DTYPE = np.dtype(
+    [
+        ("time", np.float64),
+        ("end_time", np.float64),
+        ("x", np.float32),
+        ("y", np.float32),
+        ("type", np.uint8),
+        ("hitsound", np.uint8),
+        ("repeat_count", np.int32),
+        ("pixel_length", np.float64),
+        ("tick_count", np.int32),
+        ("curve_type", "S1"),
+        # slice of `BeatmapArrays.curve_points`
+        ("curve_start", np.int32),
+        ("curve_count", np.int32),
+    ],
+)
+
+TIMING_POINT_DTYPE = np.dtype(
+    [
+        ("time", np.float64),
+        ("beat_length", np.float64),
+        ("uninherited", np.bool_),
+    ],
+)
+
+
+@dataclass
+class BeatmapArrays:
+    """A beatmap with its hit objects and timing points as structured arrays."""
+
+    format_version: int
+    mode: int
+    stack_leniency: float
+    difficulty: BeatmapDifficulty
+    max_combo: int
+
+    hit_objects: np.ndarray = field(
+        default_factory=lambda: np.empty(0, dtype=HIT_OBJECT_DTYPE),
+    )
+    timing_points: np.ndarray = field(
+        default_factory=lambda: np.empty(0, dtype=TIMING_POINT_DTYPE),
+    )
+    # absolute positions, (n, 2)
+    curve_points: np.ndarray = field(
+        default_factory=lambda: np.empty((0, 2), dtype=np.float32),
+    )
+
+    @classmethod
+    def from_beatmap(cls, beatmap: Beatmap) -> BeatmapArrays:
+        hit_objects = np.empty(len(beatmap.hit_objects), dtype=HIT_OBJECT_DTYPE)
+        curve_points: list[tuple[float, float]] = []
+
+        for i, hit_object in enumerate(beatmap.hit_objects):
+            hit_objects[i] = (
+                hit_object.time,
+                hit_object.end_time,
+                hit_object.x,
+                hit_object.y,
+                hit_object.type & 0xFF,
+                hit_object.hitsound & 0xFF,
+                hit_object.repeat_count,
+                hit_object.pixel_length,
+                hit_object.tick_count,
+                hit_object.curve_type.encode(),
+                len(curve_points),
+                len(hit_object.curve_points),
+            )
+            curve_points.extend(hit_object.curve_points)
+
+        timing_points = np.array(
+            [
+                (point.time, point.beat_length, point.uninherited)
+                for point in beatmap.timing_points
+            ],
+            dtype=TIMING_POINT_DTYPE,
+        )
+
+        return cls(
+            format_version=beatmap.format_version,
+            mode=beatmap.mode,
+            stack_leniency=beatmap.stack_leniency,
+            difficulty=beatmap.difficulty,
+            max_combo=beatmap.max_combo,
+            hit_objects=hit_objects,
+            timing_points=timing_points,
+            curve_points=np.array(curve_points, dtype=np.float32).reshape(-1, 2),
+        )
+
+    def _count(self, object_type: int) -> int:
+        return int(np.count_nonzero(self.hit_objects["type"] & object_type))
+
+    @property
+    def hit_circle_count(self) -> int:
+        return self._count(HitObjectType.CIRCLE)
+
+    @property
+    def slider_count(self) -> int:
+        return self._count(HitObjectType.SLIDER)
+
+    @property
+    def spinner_count(self) -> int:
+        return self._count(HitObjectType.SPINNER)
+
+    @property
+    def hold_count(self) -> int:
+        return self._count(HitObjectType.HOLD)
+
+    def object_combos(self) -> np.ndarray:
+        """How much combo each hit object gives."""
+        hit_objects = self.hit_objects
+        is_slider = (hit_objects["type"] & HitObjectType.SLIDER) != 0
+
+        # head, ticks in every span, repeats and tail
+        repeat_count = hit_objects["repeat_count"].astype(np.int64)
+        slider_combo = 2 + hit_objects["tick_count"] * (repeat_count + 1) + repeat_count
+
+        return np.where(is_slider, slider_combo, 1)
+
+    def curve_points_of(self, index: int) -> np.ndarray:
+        hit_object = self.hit_objects[index]
+        start = hit_object["curve_start"]
+        return self.curve_points[start : start + hit_object["curve_count"]]
+
+    def beat_lengths_at(self, times: np.ndarray) -> np.ndarray:
+        """The beat length of the timing point active at each time."""
+        uninherited = self.timing_points[self.timing_points["uninherited"]]
+        if not len(uninherited):
+            return np.full(len(times), 1000.0)
+
+        index = np.searchsorted(uninherited["time"], times, side="right") - 1
+        beat_lengths = np.clip(uninherited["beat_length"], 6.0, 60000.0)
+        return beat_lengths[np.maximum(index, 0)]
+
+    def slider_velocities_at(self, times: np.ndarray) -> np.ndarray:
+        """The slider velocity multiplier active at each time."""
+        if not len(self.timing_points):
+            return np.ones(len(times))
+
+        beat_lengths = self.timing_points["beat_length"]
+        slider_velocities = np.where(
+            beat_lengths < 0,
+            np.clip(100.0 / -np.minimum(beat_lengths, -1e-9), 0.1, 10.0),
+            1.0,
+        )
+
+        index = np.searchsorted(self.timing_points["time"], times, side="right") - 1
+        return np.where(index >= 0, slider_velocities[np.maximum(index, 0)], 1.0)
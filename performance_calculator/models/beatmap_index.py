@@ -0,0 +1,210 @@
+from __future__ import annotations
+
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from dataclasses import field
+from typing import Callable
+from typing import Iterator
+from typing import Optional
+
+from performance_calculator.models.compiled_beatmap import beatmap_checksum
+from performance_calculator.models.path import Path
+
+INDEX_VERSION = 1
+
+
+@dataclass
+class IndexedBeatmap:
+    path: str
+    checksum: str
+    size: int
+    mtime_ns: int
+
+
+@dataclass
+class RescanResult:
+    added: list[str] = field(default_factory=list)
+    # paths whose content changed
+    changed: list[str] = field(default_factory=list)
+    removed: list[str] = field(default_factory=list)
+    unchanged: int = 0
+
+
+def _hash_file(path: str) -> str:
+    with open(path, "rb") as f:
+        return beatmap_checksum(f.read())
+
+
+def _hash_if_exists(path: str) -> Optional[str]:
+    """`_hash_file`, or None if the file was deleted since it was listed."""
+    try:
+        return _hash_file(path)
+    except FileNotFoundError:
+        return None
+
+
+def _scan(directory: str) -> Iterator[os.DirEntry]:
+    with os.scandir(directory) as entries:
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False):
+                yield from _scan(entry.path)
+            elif entry.name.endswith(".osu"):
+                yield entry
+
+
+def _delete_compiled(path: str, compiled_directory: Optional[Path]) -> None:
+    compiled_path = Path(path).compiled_path(compiled_directory)
+    if compiled_path.exists():
+        os.remove(str(compiled_path))
+
+
+class BeatmapIndex:
+    """A persistent md5 -> .osu file index of a beatmap directory.
+
+    `rescan` only hashes files whose size or mtime changed since the last
+    scan. When a file's content changes, its compiled beatmap is deleted
+    and every `on_invalidate` callback is called with its old checksum.
+    """
+
+    def __init__(
+        self,
+        directory: Path,
+        index_path: Optional[Path] = None,
+        compiled_directory: Optional[Path] = None,
+    ) -> None:
+        self.directory = directory
+        self.index_path = index_path or directory / ".beatmap_index.json"
+        self.compiled_directory = compiled_directory
+        self.on_invalidate: list[Callable[[str], None]] = []
+
+        self._by_path: dict[str, IndexedBeatmap] = {}
+        self._by_checksum: dict[str, set[str]] = {}
+
+        self.load()
+
+    def __len__(self) -> int:
+        return len(self._by_path)
+
+    def __contains__(self, checksum: str) -> bool:
+        return checksum in self._by_checksum
+
+    def path_of(self, checksum: str) -> Optional[Path]:
+        paths = self._by_checksum.get(checksum)
+        if not paths:
+            return None
+
+        return Path(min(paths))
+
+    def checksum_of(self, path: Path) -> Optional[str]:
+        beatmap = self._by_path.get(str(path))
+        if beatmap is None:
+            return None
+
+        return beatmap.checksum
+
+    def _add(self, beatmap: IndexedBeatmap) -> None:
+        self._by_path[beatmap.path] = beatmap
+        self._by_checksum.setdefault(beatmap.checksum, set()).add(beatmap.path)
+
+    def _remove(self, path: str) -> IndexedBeatmap:
+        beatmap = self._by_path.pop(path)
+
+        paths = self._by_checksum[beatmap.checksum]
+        paths.discard(path)
+        if not paths:
+            del self._by_checksum[beatmap.checksum]
+
+        return beatmap
+
+    def _invalidate(self, beatmap: IndexedBeatmap) -> None:
+        _delete_compiled(beatmap.path, self.compiled_directory)
+
+        for callback in self.on_invalidate:
+            callback(beatmap.checksum)
+
+    def load(self) -> None:
+        self._by_path.clear()
+        self._by_checksum.clear()
+
+        if not self.index_path.exists():
+            return
+
+        index = json.loads(self.index_path.read_text())
+        if index.get("version") != INDEX_VERSION:
+            return
+
+        for path, checksum, size, mtime_ns in index["beatmaps"]:
+            self._add(IndexedBeatmap(path, checksum, size, mtime_ns))
+
+    def save(self) -> None:
+        index = {
+            "version": INDEX_VERSION,
+            "beatmaps": [
+                [beatmap.path, beatmap.checksum, beatmap.size, beatmap.mtime_ns]
+                for beatmap in self._by_path.values()
+            ],
+        }
+
+        # write then rename, so a crash never leaves a partial index
+        temporary_path = Path(f"{self.index_path}.{os.getpid()}.tmp")
+        temporary_path.write_text(json.dumps(index))
+        os.replace(str(temporary_path), str(self.index_path))
+
+    def rescan(self, workers: Optional[int] = None) -> RescanResult:
+        """Bring the index up to date with the directory, then save it."""
+        result = RescanResult()
+
+        seen = set()
+        stale = []
+        for entry in _scan(str(self.directory)):
+            try:
+                stat = entry.stat()
+            except FileNotFoundError:
+                # deleted since it was listed, so it's removed below
+                continue
+
+            seen.add(entry.path)
+            beatmap = self._by_path.get(entry.path)
+            if (
+                beatmap is not None
+                and beatmap.size == stat.st_size
+                and beatmap.mtime_ns == stat.st_mtime_ns
+            ):
+                result.unchanged += 1
+                continue
+
+            stale.append((entry.path, stat.st_size, stat.st_mtime_ns))
+
+        with ThreadPoolExecutor(workers) as executor:
+            checksums = executor.map(
+                _hash_if_exists,
+                [path for path, _, _ in stale],
+            )
+
+            for (path, size, mtime_ns), checksum in zip(stale, checksums):
+                if checksum is None:
+                    # deleted before it was hashed
+                    seen.discard(path)
+                    continue
+
+                if path not in self._by_path:
+                    result.added.append(path)
+                else:
+                    previous = self._remove(path)
+                    if previous.checksum != checksum:
+                        result.changed.append(path)
+                        self._invalidate(previous)
+                    else:
+                        # touched, but the same content
+                        result.unchanged += 1
+
+                self._add(IndexedBeatmap(path, checksum, size, mtime_ns))
+
+        for path in [path for path in self._by_path if path not in seen]:
+            self._invalidate(self._remove(path))
+            result.removed.append(path)
+
+        self.save()
+        return result
@@ -0,0 +1,199 @@
+from __future__ import annotations
+
+import lzma
+import os
+import struct
+import threading
+import zipfile
+import zlib
+from abc import ABC
+from abc import abstractmethod
+from collections import OrderedDict
+from typing import Optional
+from typing import Union
+
+from performance_calculator.models.path import Path
+
+ARCHIVE_SUFFIXES = (".osz", ".zip")
+COMPRESSED_SUFFIXES = (".xz", ".lzma", ".zst")
+
+# how many archives keep their central directory in memory
+ARCHIVE_CACHE_SIZE = 64
+
+_ZSTD_MAGIC = b"\x28\xb5\x2f\xfd"
+
+_LOCAL_HEADER = struct.Struct("<4s5H3L2H")
+_LOCAL_HEADER_MAGIC = b"PK\x03\x04"
+
+
+class BeatmapFile(ABC):
+    """Somewhere the contents of a single .osu file can be read from."""
+
+    @abstractmethod
+    def read_bytes(self) -> bytes:
+        ...
+
+
+class LocalBeatmapFile(BeatmapFile):
+    def __init__(self, path: Path) -> None:
+        self.path = path
+
+    def __repr__(self) -> str:
+        return f"LocalBeatmapFile({str(self.path)!r})"
+
+    def read_bytes(self) -> bytes:
+        return self.path.read_bytes()
+
+
+class MemoryBeatmapFile(BeatmapFile):
+    """A .osu file that has already been read."""
+
+    def __init__(self, content: bytes) -> None:
+        self.content = content
+
+    def __repr__(self) -> str:
+        return f"MemoryBeatmapFile(<{len(self.content)} bytes>)"
+
+    def read_bytes(self) -> bytes:
+        return self.content
+
+
+# (path, size, mtime_ns) -> entry name -> zip info
+_archive_directories: OrderedDict[
+    tuple[str, int, int],
+    dict[str, zipfile.ZipInfo],
+] = OrderedDict()
+_archive_directories_lock = threading.Lock()
+
+
+def archive_entries(archive_path: Path) -> dict[str, zipfile.ZipInfo]:
+    """The central directory of a zip archive, cached until
+    the archive's size or modification time changes."""
+    stat = os.stat(str(archive_path))
+    key = (str(archive_path), stat.st_size, stat.st_mtime_ns)
+
+    with _archive_directories_lock:
+        entries = _archive_directories.get(key)
+        if entries is not None:
+            _archive_directories.move_to_end(key)
+            return entries
+
+    with zipfile.ZipFile(str(archive_path)) as archive:
+        entries = {info.filename: info for info in archive.infolist()}
+
+    with _archive_directories_lock:
+        _archive_directories[key] = entries
+        while len(_archive_directories) > ARCHIVE_CACHE_SIZE:
+            _archive_directories.popitem(last=False)
+
+    return entries
+
+
+def clear_archive_cache() -> None:
+    with _archive_directories_lock:
+        _archive_directories.clear()
+
+
+def _read_entry(archive_path: Path, info: zipfile.ZipInfo) -> bytes:
+    if info.compress_type not in (zipfile.ZIP_STORED, zipfile.ZIP_DEFLATED):
+        with zipfile.ZipFile(str(archive_path)) as archive:
+            return archive.read(info)
+
+    # jump straight to the entry using the cached central directory,
+    # rather than letting zipfile read the whole directory again
+    with open(str(archive_path), "rb") as f:
+        f.seek(info.header_offset)
+        header = _LOCAL_HEADER.unpack(f.read(_LOCAL_HEADER.size))
+        if header[0] != _LOCAL_HEADER_MAGIC:
+            raise zipfile.BadZipFile(f"bad local header for {info.filename}")
+
+        name_length, extra_length = header[-2:]
+        f.seek(name_length + extra_length, os.SEEK_CUR)
+        content = f.read(info.compress_size)
+
+    if info.compress_type == zipfile.ZIP_DEFLATED:
+        content = zlib.decompress(content, -zlib.MAX_WBITS)
+
+    if zlib.crc32(content) != info.CRC:
+        raise zipfile.BadZipFile(f"bad CRC for {info.filename}")
+
+    return content
+
+
+class ArchivedBeatmapFile(BeatmapFile):
+    """A named .osu entry inside a .osz (zip) archive."""
+
+    def __init__(self, archive_path: Path, entry_name: str) -> None:
+        self.archive_path = archive_path
+        self.entry_name = entry_name
+
+    def __repr__(self) -> str:
+        return f"ArchivedBeatmapFile({str(self.archive_path)!r}, {self.entry_name!r})"
+
+    def read_bytes(self) -> bytes:
+        info = archive_entries(self.archive_path).get(self.entry_name)
+        if info is None:
+            raise FileNotFoundError(
+                f"{self.entry_name} is not in {self.archive_path}",
+            )
+
+        return _read_entry(self.archive_path, info)
+
+
+def _decompress_zstd(content: bytes) -> bytes:
+    try:
+        import zstandard
+    except ImportError as exc:
+        raise ImportError(
+            "reading zstd compressed beatmaps requires the zstandard package",
+        ) from exc
+
+    # streaming, as frames don't always record their decompressed size
+    return zstandard.ZstdDecompressor().decompressobj().decompress(content)
+
+
+def decompress_beatmap(content: bytes) -> bytes:
+    """Decompress a zstd, xz or legacy lzma blob, detected by its header."""
+    if content.startswith(_ZSTD_MAGIC):
+        return _decompress_zstd(content)
+
+    return lzma.decompress(content)
+
+
+class CompressedBeatmapFile(BeatmapFile):
+    """A single .osu file compressed with lzma or zstd,
+    either on disk or already in memory."""
+
+    def __init__(self, source: Union[Path, bytes]) -> None:
+        self.source = source
+
+    def __repr__(self) -> str:
+        if isinstance(self.source, bytes):
+            return f"CompressedBeatmapFile(<{len(self.source)} bytes>)"
+
+        return f"CompressedBeatmapFile({str(self.source)!r})"
+
+    def read_bytes(self) -> bytes:
+        if isinstance(self.source, bytes):
+            return decompress_beatmap(self.source)
+
+        return decompress_beatmap(self.source.read_bytes())
+
+
+def open_beatmap(path: Path, entry_name: Optional[str] = None) -> BeatmapFile:
+    """Pick how to read `path` from its suffix. Archives need an entry name."""
+    suffix = os.path.splitext(str(path))[1].lower()
+
+    if suffix in ARCHIVE_SUFFIXES:
+        if entry_name is None:
+            raise ValueError("You must provide the .osu entry to read from archives")
+
+        return ArchivedBeatmapFile(path, entry_name)
+
+    if entry_name is not None:
+        raise ValueError(f"{path} is not an archive")
+
+    if suffix in COMPRESSED_SUFFIXES:
+        return CompressedBeatmapFile(path)
+
+    return LocalBeatmapFile(path)
@@ -0,0 +1,210 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+
+import numpy as np
+import numpy.typing as npt
+
+from performance_calculator.models.mods import Mods
+
+
+@dataclass
+class BeatmapStats:
+    clock_rate: np.ndarray
+    circle_size: np.ndarray
+    approach_rate: np.ndarray
+    overall_difficulty: np.ndarray
+    drain_rate: np.ndarray
+
+    # in milliseconds, adjusted for clock rate.
+    # NaN where the ruleset doesn't have the window.
+    great_hit_window: np.ndarray
+    ok_hit_window: np.ndarray
+    meh_hit_window: np.ndarray
+
+
+def difficulty_range(
+    difficulty: npt.ArrayLike,
+    minimum: float,
+    middle: float,
+    maximum: float,
+) -> np.ndarray:
+    """Maps a 0-10 difficulty value onto a range, lazer's `DifficultyRange`."""
+    difficulty = np.asarray(difficulty, dtype=np.float64)
+
+    return np.where(
+        difficulty > 5,
+        middle + (maximum - middle) * (difficulty - 5) / 5,
+        np.where(
+            difficulty < 5,
+            middle - (middle - minimum) * (5 - difficulty) / 5,
+            middle,
+        ),
+    )
+
+
+def clock_rate(mods: npt.ArrayLike) -> np.ndarray:
+    mods = np.asarray(mods, dtype=np.int64)
+
+    return np.where(
+        mods & (Mods.DOUBLETIME | Mods.NIGHTCORE),
+        1.5,
+        np.where(mods & Mods.HALFTIME, 0.75, 1.0),
+    )
+
+
+def _apply_difficulty_mods(
+    value: np.ndarray,
+    mods: np.ndarray,
+    hardrock_ratio: float,
+) -> np.ndarray:
+    value = np.where(
+        mods & Mods.HARDROCK,
+        np.minimum(value * hardrock_ratio, 10),
+        value,
+    )
+    return np.where(mods & Mods.EASY, value * 0.5, value)
+
+
+def _preempt_to_approach_rate(preempt: np.ndarray) -> np.ndarray:
+    return np.where(
+        preempt > 1200,
+        (1800 - preempt) / 120,
+        (1200 - preempt) / 150 + 5,
+    )
+
+
+def _mania_great_hit_window(
+    overall_difficulty: np.ndarray,
+    mods: np.ndarray,
+    converted: np.ndarray,
+    rate: np.ndarray,
+) -> np.ndarray:
+    # mania applies mods to the window itself rather than to the base OD
+    great_hit_window = np.where(
+        converted,
+        np.where(np.round(overall_difficulty) > 4, 34.0, 47.0),
+        34 + 3 * np.clip(10 - overall_difficulty, 0, 10),
+    )
+
+    great_hit_window = np.where(
+        mods & Mods.HARDROCK,
+        great_hit_window / 1.4,
+        np.where(mods & Mods.EASY, great_hit_window * 1.4, great_hit_window),
+    )
+    great_hit_window = np.where(
+        mods & (Mods.DOUBLETIME | Mods.NIGHTCORE),
+        great_hit_window * 1.5,
+        np.where(mods & Mods.HALFTIME, great_hit_window * 0.75, great_hit_window),
+    )
+
+    return np.ceil(great_hit_window / rate)
+
+
+def calculate_beatmap_stats(
+    mode: npt.ArrayLike,
+    circle_size: npt.ArrayLike,
+    approach_rate: npt.ArrayLike,
+    overall_difficulty: npt.ArrayLike,
+    drain_rate: npt.ArrayLike,
+    mods: npt.ArrayLike,
+    converted: npt.ArrayLike = False,
+) -> BeatmapStats:
+    """Apply HR/EZ/DT/NC/HT to base beatmap stats, for any ruleset.
+
+    All arguments broadcast against each other, so passing base stats of
+    shape (n, 1) and mods of shape (m,) evaluates every mod combination on
+    every map at once. `converted` only affects mania hit windows.
+    """
+    mode = np.asarray(mode, dtype=np.int64)
+    mods = np.asarray(mods, dtype=np.int64)
+    converted = np.asarray(converted, dtype=bool)
+    base_overall_difficulty = np.asarray(overall_difficulty, dtype=np.float64)
+
+    rate = clock_rate(mods)
+
+    circle_size = _apply_difficulty_mods(
+        np.asarray(circle_size, dtype=np.float64),
+        mods,
+        1.3,
+    )
+    approach_rate = _apply_difficulty_mods(
+        np.asarray(approach_rate, dtype=np.float64),
+        mods,
+        1.4,
+    )
+    overall_difficulty = _apply_difficulty_mods(base_overall_difficulty, mods, 1.4)
+    drain_rate = _apply_difficulty_mods(
+        np.asarray(drain_rate, dtype=np.float64),
+        mods,
+        1.4,
+    )
+
+    preempt = difficulty_range(approach_rate, 1800, 1200, 450) / rate
+    adjusted_approach_rate = _preempt_to_approach_rate(preempt)
+
+    osu_great = difficulty_range(overall_difficulty, 80, 50, 20) / rate
+    taiko_great = difficulty_range(overall_difficulty, 50, 35, 20) / rate
+    mania_great = _mania_great_hit_window(
+        base_overall_difficulty,
+        mods,
+        converted,
+        rate,
+    )
+
+    is_osu = mode == 0
+    is_taiko = mode == 1
+    is_catch = mode == 2
+
+    great_hit_window = np.select(
+        [is_osu, is_taiko, is_catch],
+        [osu_great, taiko_great, np.nan],
+        mania_great,
+    )
+    ok_hit_window = np.select(
+        [is_osu, is_taiko],
+        [
+            difficulty_range(overall_difficulty, 140, 100, 60) / rate,
+            difficulty_range(overall_difficulty, 120, 80, 50) / rate,
+        ],
+        np.nan,
+    )
+    meh_hit_window = np.where(
+        is_osu,
+        difficulty_range(overall_difficulty, 200, 150, 100) / rate,
+        np.nan,
+    )
+
+    adjusted_overall_difficulty = np.select(
+        [is_osu, is_taiko],
+        [(80 - osu_great) / 6, (50 - taiko_great) / 3],
+        overall_difficulty,
+    )
+
+    # approach rate only means something for osu!standard and catch
+    adjusted_approach_rate = np.where(
+        is_osu | is_catch,
+        adjusted_approach_rate,
+        approach_rate,
+    )
+
+    shape = np.broadcast_shapes(
+        mode.shape,
+        mods.shape,
+        converted.shape,
+        circle_size.shape,
+        approach_rate.shape,
+        overall_difficulty.shape,
+        drain_rate.shape,
+    )
+
+    return BeatmapStats(
+        clock_rate=np.broadcast_to(rate, shape),
+        circle_size=np.broadcast_to(circle_size, shape),
+        approach_rate=np.broadcast_to(adjusted_approach_rate, shape),
+        overall_difficulty=np.broadcast_to(adjusted_overall_difficulty, shape),
+        drain_rate=np.broadcast_to(drain_rate, shape),
+        great_hit_window=np.broadcast_to(great_hit_window, shape),
+        ok_hit_window=np.broadcast_to(ok_hit_window, shape),
+        meh_hit_window=np.broadcast_to(meh_hit_window, shape),
+    )
@@ -0,0 +1,213 @@
+from __future__ import annotations
+
+import hashlib
+import mmap
+import os
+from typing import Optional
+
+import numpy as np
+
+from performance_calculator.models.beatmap import BeatmapDifficulty
+from performance_calculator.models.beatmap import parse_beatmap
+from performance_calculator.models.beatmap_arrays import BeatmapArrays
+from performance_calculator.models.beatmap_arrays import HIT_OBJECT_DTYPE
+from performance_calculator.models.beatmap_arrays import TIMING_POINT_DTYPE
+from performance_calculator.models.path import Path
+
+# bump whenever the header or any of the array dtypes change
+COMPILED_BEATMAP_VERSION = 1
+
+_MAGIC = b"OSUC"
+_ALIGNMENT = 8
+
+HEADER_DTYPE = np.dtype(
+    [
+        ("magic", "S4"),
+        ("version", "<u4"),
+        # md5 of the .osu file this was compiled from
+        ("checksum", "S32"),
+        ("format_version", "<i4"),
+        ("mode", "<i4"),
+        ("stack_leniency", "<f8"),
+        ("hp_drain_rate", "<f8"),
+        ("circle_size", "<f8"),
+        ("overall_difficulty", "<f8"),
+        ("approach_rate", "<f8"),
+        ("slider_multiplier", "<f8"),
+        ("slider_tick_rate", "<f8"),
+        ("max_combo", "<i8"),
+        ("hit_object_count", "<i8"),
+        ("timing_point_count", "<i8"),
+        ("curve_point_count", "<i8"),
+    ],
+)
+
+CURVE_POINT_DTYPE = np.dtype(np.float32)
+
+
+def _aligned(offset: int) -> int:
+    return -(-offset // _ALIGNMENT) * _ALIGNMENT
+
+
+def beatmap_checksum(content: bytes) -> str:
+    return hashlib.md5(content).hexdigest()
+
+
+def write_compiled_beatmap(
+    path: Path,
+    beatmap: BeatmapArrays,
+    checksum: str,
+) -> None:
+    """Write `beatmap` as a compiled file: a fixed header followed by the
+    raw hit object, timing point and curve point arrays."""
+    header = np.zeros(1, dtype=HEADER_DTYPE)
+    header["magic"] = _MAGIC
+    header["version"] = COMPILED_BEATMAP_VERSION
+    header["checksum"] = checksum.encode()
+    header["format_version"] = beatmap.format_version
+    header["mode"] = beatmap.mode
+    header["stack_leniency"] = beatmap.stack_leniency
+    header["hp_drain_rate"] = beatmap.difficulty.hp_drain_rate
+    header["circle_size"] = beatmap.difficulty.circle_size
+    header["overall_difficulty"] = beatmap.difficulty.overall_difficulty
+    header["approach_rate"] = beatmap.difficulty.approach_rate
+    header["slider_multiplier"] = beatmap.difficulty.slider_multiplier
+    header["slider_tick_rate"] = beatmap.difficulty.slider_tick_rate
+    header["max_combo"] = beatmap.max_combo
+    header["hit_object_count"] = len(beatmap.hit_objects)
+    header["timing_point_count"] = len(beatmap.timing_points)
+    header["curve_point_count"] = len(beatmap.curve_points)
+
+    sections = [
+        header.tobytes(),
+        np.ascontiguousarray(beatmap.hit_objects, dtype=HIT_OBJECT_DTYPE).tobytes(),
+        np.ascontiguousarray(
+            beatmap.timing_points,
+            dtype=TIMING_POINT_DTYPE,
+        ).tobytes(),
+        np.ascontiguousarray(beatmap.curve_points, dtype=CURVE_POINT_DTYPE).tobytes(),
+    ]
+
+    content = bytearray()
+    for section in sections:
+        content += b"\0" * (_aligned(len(content)) - len(content))
+        content += section
+
+    # write then rename, so readers never map a partial file
+    temporary_path = Path(f"{path}.{os.getpid()}.tmp")
+    temporary_path.write_bytes(bytes(content))
+    os.replace(str(temporary_path), str(path))
+
+
+def read_compiled_beatmap(
+    path: Path,
+    checksum: Optional[str] = None,
+) -> Optional[BeatmapArrays]:
+    """Memory-map a compiled beatmap.
+
+    Returns None if the file doesn't exist, was written by another version
+    or, when `checksum` is given, was compiled from a different .osu file.
+    The returned arrays are read-only views of the file.
+    """
+    try:
+        with open(str(path), "rb") as f:
+            data = np.frombuffer(
+                mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ),
+                dtype=np.uint8,
+            )
+    except (FileNotFoundError, ValueError):
+        # missing, or empty and so unmappable
+        return None
+
+    if len(data) < HEADER_DTYPE.itemsize:
+        return None
+
+    header = data[: HEADER_DTYPE.itemsize].view(HEADER_DTYPE)[0].item()
+    (
+        magic,
+        version,
+        compiled_checksum,
+        format_version,
+        mode,
+        stack_leniency,
+        hp_drain_rate,
+        circle_size,
+        overall_difficulty,
+        approach_rate,
+        slider_multiplier,
+        slider_tick_rate,
+        max_combo,
+        hit_object_count,
+        timing_point_count,
+        curve_point_count,
+    ) = header
+
+    if magic != _MAGIC or version != COMPILED_BEATMAP_VERSION:
+        return None
+
+    if checksum is not None and compiled_checksum.decode() != checksum:
+        return None
+
+    arrays = []
+    offset = HEADER_DTYPE.itemsize
+    for dtype, count in (
+        (HIT_OBJECT_DTYPE, hit_object_count),
+        (TIMING_POINT_DTYPE, timing_point_count),
+        (CURVE_POINT_DTYPE, curve_point_count * 2),
+    ):
+        offset = _aligned(offset)
+        end = offset + count * dtype.itemsize
+        if end > len(data):
+            return None
+
+        arrays.append(data[offset:end].view(dtype))
+        offset = end
+
+    hit_objects, timing_points, curve_points = arrays
+
+    return BeatmapArrays(
+        format_version=format_version,
+        mode=mode,
+        stack_leniency=stack_leniency,
+        difficulty=BeatmapDifficulty(
+            hp_drain_rate=hp_drain_rate,
+            circle_size=circle_size,
+            overall_difficulty=overall_difficulty,
+            approach_rate=approach_rate,
+            slider_multiplier=slider_multiplier,
+            slider_tick_rate=slider_tick_rate,
+        ),
+        max_combo=max_combo,
+        hit_objects=hit_objects,
+        timing_points=timing_points,
+        curve_points=curve_points.reshape(-1, 2),
+    )
+
+
+def load_beatmap_arrays(
+    osu_file_path: Path,
+    compiled_directory: Optional[Path] = None,
+    checksum: Optional[str] = None,
+) -> BeatmapArrays:
+    """Load a beatmap from its compiled file, compiling it first if
+    the compiled file is missing, outdated or from different content.
+
+    If the map's checksum is already known (scores carry it), pass it to
+    skip reading and hashing the .osu file when the compiled file is valid.
+    """
+    compiled_path = osu_file_path.compiled_path(compiled_directory)
+
+    if checksum is not None:
+        beatmap = read_compiled_beatmap(compiled_path, checksum)
+        if beatmap is not None:
+            return beatmap
+
+    content = osu_file_path.read_bytes()
+    checksum = beatmap_checksum(content)
+
+    beatmap = read_compiled_beatmap(compiled_path, checksum)
+    if beatmap is None:
+        beatmap = BeatmapArrays.from_beatmap(parse_beatmap(content))
+        write_compiled_beatmap(compiled_path, beatmap, checksum)
+
+    return beatmap
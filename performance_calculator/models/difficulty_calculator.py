@@ -0,0 +1,27 @@
+from __future__ import annotations
+
+from abc import ABC
+from abc import abstractmethod
+from typing import Iterable
+from typing import Union
+
+from performance_calculator.models.beatmap import Beatmap
+from performance_calculator.models.beatmap_arrays import BeatmapArrays
+from performance_calculator.models.difficulty import DifficultyAttributes
+
+
+class DifficultyCalculator(ABC):
+    def __init__(self, beatmap: Union[Beatmap, BeatmapArrays]) -> None:
+        if isinstance(beatmap, Beatmap):
+            beatmap = BeatmapArrays.from_beatmap(beatmap)
+
+        self.beatmap = beatmap
+
+    @abstractmethod
+    def calculate(self, mods: int = 0) -> DifficultyAttributes:
+        ...
+
+    def calculate_many(self, mods: Iterable[int]) -> list[DifficultyAttributes]:
+        """Attributes for several mod combinations of the same map,
+        sharing whatever preprocessing doesn't depend on the mods."""
+        return [self.calculate(mod_combination) for mod_combination in mods]
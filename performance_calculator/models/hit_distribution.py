@@ -0,0 +1,241 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Sequence
+
+import numpy as np
+import numpy.typing as npt
+
+from performance_calculator.models.score import Score
+from performance_calculator.models.score_arrays import SCORE_DTYPE
+
+
+@dataclass
+class HitDistribution:
+    """Judgement counts for many scores at once, laid out the way each
+    ruleset's performance calculator reads `Score`."""
+
+    num_300s: np.ndarray
+    num_100s: np.ndarray
+    num_50s: np.ndarray
+    num_gekis: np.ndarray
+    num_katus: np.ndarray
+    num_misses: np.ndarray
+    # what the counts actually give, which can be off
+    # the target by a fraction of a judgement
+    accuracy: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.accuracy)
+
+    def score_arrays(self, mods: npt.ArrayLike, max_combo: npt.ArrayLike) -> np.ndarray:
+        """The distributions as a `SCORE_DTYPE` array, for `calculate_many`."""
+        scores = np.empty(self.accuracy.shape, dtype=SCORE_DTYPE)
+        scores["mods"] = mods
+        scores["max_combo"] = max_combo
+        scores["accuracy"] = self.accuracy
+        scores["num_300s"] = self.num_300s
+        scores["num_100s"] = self.num_100s
+        scores["num_50s"] = self.num_50s
+        scores["num_gekis"] = self.num_gekis
+        scores["num_katus"] = self.num_katus
+        scores["num_misses"] = self.num_misses
+        return scores
+
+    def scores(
+        self,
+        mode: int,
+        mods: npt.ArrayLike,
+        max_combo: npt.ArrayLike,
+    ) -> list[Score]:
+        mods = np.broadcast_to(mods, self.accuracy.shape)
+        max_combo = np.broadcast_to(max_combo, self.accuracy.shape)
+
+        return [
+            Score(
+                mode=mode,
+                score=0,
+                max_combo=int(max_combo[i]),
+                mods=int(mods[i]),
+                accuracy=float(self.accuracy[i]),
+                num_300s=int(self.num_300s[i]),
+                num_100s=int(self.num_100s[i]),
+                num_50s=int(self.num_50s[i]),
+                num_gekis=int(self.num_gekis[i]),
+                num_katus=int(self.num_katus[i]),
+                num_misses=int(self.num_misses[i]),
+            )
+            for i in range(len(self))
+        ]
+
+
+def _fraction(accuracy: npt.ArrayLike) -> np.ndarray:
+    # percentages are accepted too, like the osu! calculator does
+    accuracy = np.asarray(accuracy, dtype=np.float64)
+    return np.clip(np.where(accuracy > 1.0, accuracy / 100, accuracy), 0.0, 1.0)
+
+
+def _distribute(
+    target_value: np.ndarray,
+    hit_count: np.ndarray,
+    values: Sequence[float],
+) -> list[np.ndarray]:
+    """Split `hit_count` hits between judgements worth `values` (best first)
+    so they're worth `target_value` in total.
+
+    Starting from all best judgements, hits are moved one judgement down at
+    a time, so scores have as few distinct poor judgements as possible.
+    """
+    counts = [hit_count.copy()]
+    deficit = values[0] * hit_count - target_value
+
+    for better, worse in zip(values[:-1], values[1:]):
+        step = better - worse
+        moved = np.clip(np.round(deficit / step), 0, counts[-1]).astype(np.int64)
+
+        counts[-1] = counts[-1] - moved
+        counts.append(moved)
+        deficit = deficit - moved * step
+
+    return counts
+
+
+def _hits_and_misses(
+    total_hits: npt.ArrayLike,
+    misses: npt.ArrayLike,
+    accuracy: npt.ArrayLike,
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    accuracy, total_hits, misses = np.broadcast_arrays(
+        _fraction(accuracy),
+        np.asarray(total_hits, dtype=np.int64),
+        np.asarray(misses, dtype=np.int64),
+    )
+    misses = np.clip(misses, 0, total_hits)
+    return accuracy, total_hits, misses
+
+
+def osu_hit_distribution(
+    accuracy: npt.ArrayLike,
+    total_hits: npt.ArrayLike,
+    misses: npt.ArrayLike = 0,
+) -> HitDistribution:
+    """300s, 100s and 50s of osu! scores with the given accuracies,
+    preferring 100s over 50s."""
+    accuracy, total_hits, misses = _hits_and_misses(total_hits, misses, accuracy)
+
+    num_300s, num_100s, num_50s = _distribute(
+        accuracy * total_hits * 6,
+        total_hits - misses,
+        (6, 2, 1),
+    )
+
+    zeros = np.zeros_like(total_hits)
+    return HitDistribution(
+        num_300s=num_300s,
+        num_100s=num_100s,
+        num_50s=num_50s,
+        num_gekis=zeros,
+        num_katus=zeros,
+        num_misses=misses,
+        accuracy=(num_300s * 6 + num_100s * 2 + num_50s)
+        / np.maximum(6 * total_hits, 1),
+    )
+
+
+def taiko_hit_distribution(
+    accuracy: npt.ArrayLike,
+    total_hits: npt.ArrayLike,
+    misses: npt.ArrayLike = 0,
+) -> HitDistribution:
+    """Greats and goods (as 300s and 100s) of taiko scores."""
+    accuracy, total_hits, misses = _hits_and_misses(total_hits, misses, accuracy)
+
+    num_300s, num_100s = _distribute(
+        accuracy * total_hits * 2,
+        total_hits - misses,
+        (2, 1),
+    )
+
+    zeros = np.zeros_like(total_hits)
+    return HitDistribution(
+        num_300s=num_300s,
+        num_100s=num_100s,
+        num_50s=zeros,
+        num_gekis=zeros,
+        num_katus=zeros,
+        num_misses=misses,
+        accuracy=(num_300s * 2 + num_100s) / np.maximum(2 * total_hits, 1),
+    )
+
+
+def mania_hit_distribution(
+    accuracy: npt.ArrayLike,
+    total_hits: npt.ArrayLike,
+    misses: npt.ArrayLike = 0,
+) -> HitDistribution:
+    """Judgements of mania scores, with perfects weighted at 320:
+    perfects turn into greats first, then goods, oks and mehs."""
+    accuracy, total_hits, misses = _hits_and_misses(total_hits, misses, accuracy)
+
+    num_gekis, num_300s, num_katus, num_100s, num_50s = _distribute(
+        accuracy * total_hits * 64,
+        total_hits - misses,
+        (64, 60, 40, 20, 10),
+    )
+
+    achieved = (
+        num_gekis * 64 + num_300s * 60 + num_katus * 40 + num_100s * 20 + num_50s * 10
+    )
+    return HitDistribution(
+        num_300s=num_300s,
+        num_100s=num_100s,
+        num_50s=num_50s,
+        num_gekis=num_gekis,
+        num_katus=num_katus,
+        num_misses=misses,
+        accuracy=achieved / np.maximum(64 * total_hits, 1),
+    )
+
+
+def catch_hit_distribution(
+    accuracy: npt.ArrayLike,
+    fruits: npt.ArrayLike,
+    droplets: npt.ArrayLike,
+    tiny_droplets: npt.ArrayLike,
+    misses: npt.ArrayLike = 0,
+) -> HitDistribution:
+    """Catch scores as its calculator reads them: fruits as 300s,
+    droplets as 100s, tiny droplets as 50s and missed tiny droplets as
+    katus. Misses take droplets first, and accuracy is made up by
+    missing tiny droplets."""
+    accuracy, fruits, droplets, tiny_droplets, misses = np.broadcast_arrays(
+        _fraction(accuracy),
+        np.asarray(fruits, dtype=np.int64),
+        np.asarray(droplets, dtype=np.int64),
+        np.asarray(tiny_droplets, dtype=np.int64),
+        np.asarray(misses, dtype=np.int64),
+    )
+
+    total_combo_objects = fruits + droplets
+    misses = np.clip(misses, 0, total_combo_objects)
+
+    num_100s = np.maximum(0, droplets - misses)
+    num_300s = fruits - (misses - (droplets - num_100s))
+
+    total_hits = total_combo_objects + tiny_droplets
+    num_50s = np.clip(
+        np.round(accuracy * total_hits).astype(np.int64) - num_300s - num_100s,
+        0,
+        tiny_droplets,
+    )
+    num_katus = tiny_droplets - num_50s
+
+    return HitDistribution(
+        num_300s=num_300s,
+        num_100s=num_100s,
+        num_50s=num_50s,
+        num_gekis=np.zeros_like(fruits),
+        num_katus=num_katus,
+        num_misses=misses,
+        accuracy=(num_300s + num_100s + num_50s) / np.maximum(total_hits, 1),
+    )
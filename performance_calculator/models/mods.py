@@ -35,3 +35,15 @@ class Mods:
     MIRROR = 1 << 30
 
     SPEED_MODS = DOUBLETIME | NIGHTCORE | HALFTIME
+
+    # mods that change a map's difficulty attributes
+    DIFFICULTY_MODS = EASY | TOUCHSCREEN | HIDDEN | HARDROCK | SPEED_MODS | FLASHLIGHT
+
+
+def difficulty_mods(mods: int) -> int:
+    """The mods a score's difficulty attributes depend on, with nightcore
+    as double time, so scores sharing attributes share a key."""
+    if mods & Mods.NIGHTCORE:
+        mods = (mods & ~Mods.NIGHTCORE) | Mods.DOUBLETIME
+
+    return mods & Mods.DIFFICULTY_MODS
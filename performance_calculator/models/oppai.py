@@ -1,8 +1,10 @@
 from __future__ import annotations
 
+import array
 import ctypes
 import functools
 from types import TracebackType
+from typing import Any
 from typing import Optional
 from typing import Type
 from typing import TYPE_CHECKING
@@ -10,6 +12,84 @@ from typing import TYPE_CHECKING
 if TYPE_CHECKING:
     from performance_calculator.models.path import Path
 
+# the c types of each oppai-ng function, registered the first time it's used
+PROTOTYPES: dict[str, tuple[tuple[Any, ...], Any]] = {
+    # main api
+    "ezpp_new": ((), ctypes.c_int),
+    "ezpp_free": ((), ctypes.c_void_p),
+    "ezpp": ((ctypes.c_int, ctypes.c_char_p), ctypes.c_int),
+    "ezpp_data": ((ctypes.c_int, ctypes.c_char_p, ctypes.c_int), ctypes.c_int),
+    "ezpp_dup": ((ctypes.c_int, ctypes.c_char_p), ctypes.c_int),
+    "ezpp_data_dup": ((ctypes.c_int, ctypes.c_char_p, ctypes.c_int), ctypes.c_int),
+    # getting internals
+    "ezpp_pp": ((ctypes.c_int,), ctypes.c_float),
+    "ezpp_stars": ((ctypes.c_int,), ctypes.c_float),
+    "ezpp_mode": ((ctypes.c_int,), ctypes.c_int),
+    "ezpp_combo": ((ctypes.c_int,), ctypes.c_int),
+    "ezpp_max_combo": ((ctypes.c_int,), ctypes.c_int),
+    "ezpp_mods": ((ctypes.c_int,), ctypes.c_int),
+    "ezpp_score_version": ((ctypes.c_int,), ctypes.c_int),
+    "ezpp_aim_stars": ((ctypes.c_int,), ctypes.c_float),
+    "ezpp_speed_stars": ((ctypes.c_int,), ctypes.c_float),
+    "ezpp_aim_pp": ((ctypes.c_int,), ctypes.c_float),
+    "ezpp_speed_pp": ((ctypes.c_int,), ctypes.c_float),
+    "ezpp_acc_pp": ((ctypes.c_int,), ctypes.c_float),
+    "ezpp_accuracy_percent": ((ctypes.c_int,), ctypes.c_float),
+    "ezpp_n300": ((ctypes.c_int,), ctypes.c_int),
+    "ezpp_n100": ((ctypes.c_int,), ctypes.c_int),
+    "ezpp_n50": ((ctypes.c_int,), ctypes.c_int),
+    "ezpp_nmiss": ((ctypes.c_int,), ctypes.c_int),
+    "ezpp_title": ((ctypes.c_int,), ctypes.c_char_p),
+    "ezpp_title_unicode": ((ctypes.c_int,), ctypes.c_char_p),
+    "ezpp_artist": ((ctypes.c_int,), ctypes.c_char_p),
+    "ezpp_artist_unicode": ((ctypes.c_int,), ctypes.c_char_p),
+    "ezpp_creator": ((ctypes.c_int,), ctypes.c_char_p),
+    "ezpp_version": ((ctypes.c_int,), ctypes.c_char_p),
+    "ezpp_ncircles": ((ctypes.c_int,), ctypes.c_int),
+    "ezpp_nsliders": ((ctypes.c_int,), ctypes.c_int),
+    "ezpp_nspinners": ((ctypes.c_int,), ctypes.c_int),
+    "ezpp_nobjects": ((ctypes.c_int,), ctypes.c_int),
+    "ezpp_ar": ((ctypes.c_int,), ctypes.c_float),
+    "ezpp_cs": ((ctypes.c_int,), ctypes.c_float),
+    "ezpp_od": ((ctypes.c_int,), ctypes.c_float),
+    "ezpp_hp": ((ctypes.c_int,), ctypes.c_float),
+    "ezpp_odms": ((ctypes.c_int,), ctypes.c_float),
+    "ezpp_autocalc": ((ctypes.c_int,), ctypes.c_int),
+    "ezpp_time_at": ((ctypes.c_int, ctypes.c_int), ctypes.c_float),
+    "ezpp_strain_at": ((ctypes.c_int, ctypes.c_int, ctypes.c_int), ctypes.c_float),
+    "ezpp_ntiming_points": ((ctypes.c_int,), ctypes.c_int),
+    "ezpp_timing_time": ((ctypes.c_int, ctypes.c_int), ctypes.c_float),
+    "ezpp_timing_ms_per_beat": ((ctypes.c_int, ctypes.c_int), ctypes.c_float),
+    "ezpp_timing_change": ((ctypes.c_int, ctypes.c_int), ctypes.c_int),
+    # setting internals
+    "ezpp_set_aim_stars": ((ctypes.c_int, ctypes.c_float), ctypes.c_void_p),
+    "ezpp_set_speed_stars": ((ctypes.c_int, ctypes.c_float), ctypes.c_void_p),
+    "ezpp_set_base_ar": ((ctypes.c_int, ctypes.c_float), ctypes.c_void_p),
+    "ezpp_set_base_od": ((ctypes.c_int, ctypes.c_float), ctypes.c_void_p),
+    "ezpp_set_base_hp": ((ctypes.c_int, ctypes.c_float), ctypes.c_void_p),
+    "ezpp_set_mode": ((ctypes.c_int, ctypes.c_int), ctypes.c_void_p),
+    "ezpp_set_combo": ((ctypes.c_int, ctypes.c_int), ctypes.c_void_p),
+    "ezpp_set_score_version": ((ctypes.c_int, ctypes.c_int), ctypes.c_void_p),
+    "ezpp_set_accuracy_percent": ((ctypes.c_int, ctypes.c_float), ctypes.c_void_p),
+    "ezpp_set_autocalc": ((ctypes.c_int, ctypes.c_int), ctypes.c_void_p),
+    # forces map re-parse for map-changing mods
+    # (this is an implementation detail of oppai-ng)
+    "ezpp_set_mods": ((ctypes.c_int, ctypes.c_int), ctypes.c_void_p),
+    # forces map re-parse
+    "ezpp_set_base_cs": ((ctypes.c_int, ctypes.c_float), ctypes.c_void_p),
+    "ezpp_set_mode_override": ((ctypes.c_int, ctypes.c_int), ctypes.c_void_p),
+    # forces map re-parse & clobbers acc
+    "ezpp_set_nmiss": ((ctypes.c_int, ctypes.c_int), ctypes.c_void_p),
+    "ezpp_set_end": ((ctypes.c_int, ctypes.c_int), ctypes.c_void_p),
+    "ezpp_set_end_time": ((ctypes.c_int, ctypes.c_float), ctypes.c_void_p),
+    "ezpp_set_accuracy": ((ctypes.c_int, ctypes.c_int, ctypes.c_int), ctypes.c_void_p),
+}
+
+
+class DifficultyType:
+    SPEED = 0
+    AIM = 1
+
 
 class OppaiWrapper:
     """Lightweight wrapper around franc[e]sco's c89 oppai-ng library.
@@ -212,6 +292,40 @@ class OppaiWrapper:
     def get_timing_change(self, i: int) -> int:
         return self.static_lib.ezpp_timing_change(self._ez, i)
 
+    # bulk get stuff
+    # NOTE: oppai-ng only has per-element getters, these
+    # just keep the loop over them as tight as possible.
+
+    def get_times(self) -> array.array[float]:
+        time_at = self.static_lib.ezpp_time_at
+        ez = self._ez
+        return array.array("f", [time_at(ez, i) for i in range(self.get_nobjects())])
+
+    def get_strains(self, difficulty_type: int) -> array.array[float]:
+        strain_at = self.static_lib.ezpp_strain_at
+        ez = self._ez
+        return array.array(
+            "f",
+            [strain_at(ez, i, difficulty_type) for i in range(self.get_nobjects())],
+        )
+
+    def get_timing_points(
+        self,
+    ) -> tuple[array.array[float], array.array[float], array.array[int]]:
+        """The time, ms per beat and whether it's uninherited
+        of every timing point."""
+        timing_time = self.static_lib.ezpp_timing_time
+        timing_ms_per_beat = self.static_lib.ezpp_timing_ms_per_beat
+        timing_change = self.static_lib.ezpp_timing_change
+        ez = self._ez
+
+        indices = range(self.get_ntiming_points())
+        return (
+            array.array("f", [timing_time(ez, i) for i in indices]),
+            array.array("f", [timing_ms_per_beat(ez, i) for i in indices]),
+            array.array("b", [timing_change(ez, i) for i in indices]),
+        )
+
     # set stuff
     # NOTE: the order you call these in matters due to
     # memory clobbering (for example setting misscount
@@ -282,276 +396,28 @@ class OppaiWrapper:
 
     @staticmethod
     @functools.cache
-    def load_static_library(lib_path: str) -> ctypes.CDLL:
-        """Load the oppai-ng static library,
-        and register c types to it's api."""
+    def load_static_library(lib_path: str) -> _StaticLibrary:
+        """Load the oppai-ng static library. The c types of its
+        api are registered as each function is first used."""
         static_lib = ctypes.cdll.LoadLibrary(lib_path)
 
         if not static_lib:
             raise RuntimeError(f"Failed to load {lib_path}.")
 
-        # main api
-
-        ezpp_new = static_lib.ezpp_new
-        ezpp_new.argtypes = ()
-        ezpp_new.restype = ctypes.c_int
-
-        ezpp_free = static_lib.ezpp_free
-        ezpp_free.argtypes = ()
-        ezpp_free.restype = ctypes.c_void_p
-
-        ezpp = static_lib.ezpp
-        ezpp.argtypes = (ctypes.c_int, ctypes.c_char_p)
-        ezpp.restype = ctypes.c_int
-
-        ezpp_data = static_lib.ezpp_data
-        ezpp_data.argtypes = (ctypes.c_int, ctypes.c_char_p, ctypes.c_int)
-        ezpp_data.restype = ctypes.c_int
-
-        ezpp_dup = static_lib.ezpp_dup
-        ezpp_dup.argtypes = (ctypes.c_int, ctypes.c_char_p)
-        ezpp_dup.restype = ctypes.c_int
-
-        ezpp_data_dup = static_lib.ezpp_data_dup
-        ezpp_data_dup.argtypes = (ctypes.c_int, ctypes.c_char_p, ctypes.c_int)
-
-        # getting internals
-
-        ezpp_pp = static_lib.ezpp_pp
-        ezpp_pp.argtypes = (ctypes.c_int,)
-        ezpp_pp.restype = ctypes.c_float
-
-        ezpp_stars = static_lib.ezpp_stars
-        ezpp_stars.argtypes = (ctypes.c_int,)
-        ezpp_stars.restype = ctypes.c_float
-
-        ezpp_mode = static_lib.ezpp_mode
-        ezpp_mode.argtypes = (ctypes.c_int,)
-        ezpp_mode.restype = ctypes.c_int
-
-        ezpp_combo = static_lib.ezpp_combo
-        ezpp_combo.argtypes = (ctypes.c_int,)
-        ezpp_combo.restype = ctypes.c_int
-
-        ezpp_max_combo = static_lib.ezpp_max_combo
-        ezpp_max_combo.argtypes = (ctypes.c_int,)
-        ezpp_max_combo.restype = ctypes.c_int
-
-        ezpp_mods = static_lib.ezpp_mods
-        ezpp_mods.argtypes = (ctypes.c_int,)
-        ezpp_mods.restype = ctypes.c_int
-
-        ezpp_score_version = static_lib.ezpp_score_version
-        ezpp_score_version.argtypes = (ctypes.c_int,)
-        ezpp_score_version.restype = ctypes.c_int
-
-        ezpp_aim_stars = static_lib.ezpp_aim_stars
-        ezpp_aim_stars.argtypes = (ctypes.c_int,)
-        ezpp_aim_stars.restype = ctypes.c_float
-
-        ezpp_speed_stars = static_lib.ezpp_speed_stars
-        ezpp_speed_stars.argtypes = (ctypes.c_int,)
-        ezpp_speed_stars.restype = ctypes.c_float
-
-        ezpp_aim_pp = static_lib.ezpp_aim_pp
-        ezpp_aim_pp.argtypes = (ctypes.c_int,)
-        ezpp_aim_pp.restype = ctypes.c_float
-
-        ezpp_speed_pp = static_lib.ezpp_speed_pp
-        ezpp_speed_pp.argtypes = (ctypes.c_int,)
-        ezpp_speed_pp.restype = ctypes.c_float
-
-        ezpp_acc_pp = static_lib.ezpp_acc_pp
-        ezpp_acc_pp.argtypes = (ctypes.c_int,)
-        ezpp_acc_pp.restype = ctypes.c_float
-
-        ezpp_accuracy_percent = static_lib.ezpp_accuracy_percent
-        ezpp_accuracy_percent.argtypes = (ctypes.c_int,)
-        ezpp_accuracy_percent.restype = ctypes.c_float
-
-        ezpp_n300 = static_lib.ezpp_n300
-        ezpp_n300.argtypes = (ctypes.c_int,)
-        ezpp_n300.restype = ctypes.c_int
-
-        ezpp_n100 = static_lib.ezpp_n100
-        ezpp_n100.argtypes = (ctypes.c_int,)
-        ezpp_n100.restype = ctypes.c_int
-
-        ezpp_n50 = static_lib.ezpp_n50
-        ezpp_n50.argtypes = (ctypes.c_int,)
-        ezpp_n50.restype = ctypes.c_int
-
-        ezpp_nmiss = static_lib.ezpp_nmiss
-        ezpp_nmiss.argtypes = (ctypes.c_int,)
-        ezpp_nmiss.restype = ctypes.c_int
-
-        ezpp_title = static_lib.ezpp_title
-        ezpp_title.argtypes = (ctypes.c_int,)
-        ezpp_title.restype = ctypes.c_char_p
-
-        ezpp_title_unicode = static_lib.ezpp_title_unicode
-        ezpp_title_unicode.argtypes = (ctypes.c_int,)
-        ezpp_title_unicode.restype = ctypes.c_char_p
-
-        ezpp_artist = static_lib.ezpp_artist
-        ezpp_artist.argtypes = (ctypes.c_int,)
-        ezpp_artist.restype = ctypes.c_char_p
-
-        ezpp_artist_unicode = static_lib.ezpp_artist_unicode
-        ezpp_artist_unicode.argtypes = (ctypes.c_int,)
-        ezpp_artist_unicode.restype = ctypes.c_char_p
-
-        ezpp_creator = static_lib.ezpp_creator
-        ezpp_creator.argtypes = (ctypes.c_int,)
-        ezpp_creator.restype = ctypes.c_char_p
-
-        ezpp_version = static_lib.ezpp_version
-        ezpp_version.argtypes = (ctypes.c_int,)
-        ezpp_version.restype = ctypes.c_char_p
-
-        ezpp_ncircles = static_lib.ezpp_ncircles
-        ezpp_ncircles.argtypes = (ctypes.c_int,)
-        ezpp_ncircles.restype = ctypes.c_int
-
-        ezpp_nsliders = static_lib.ezpp_nsliders
-        ezpp_nsliders.argtypes = (ctypes.c_int,)
-        ezpp_nsliders.restype = ctypes.c_int
-
-        ezpp_nspinners = static_lib.ezpp_nspinners
-        ezpp_nspinners.argtypes = (ctypes.c_int,)
-        ezpp_nspinners.restype = ctypes.c_int
-
-        ezpp_nobjects = static_lib.ezpp_nobjects
-        ezpp_nobjects.argtypes = (ctypes.c_int,)
-        ezpp_nobjects.restype = ctypes.c_int
-
-        ezpp_ar = static_lib.ezpp_ar
-        ezpp_ar.argtypes = (ctypes.c_int,)
-        ezpp_ar.restype = ctypes.c_float
-
-        ezpp_cs = static_lib.ezpp_cs
-        ezpp_cs.argtypes = (ctypes.c_int,)
-        ezpp_cs.restype = ctypes.c_float
-
-        ezpp_od = static_lib.ezpp_od
-        ezpp_od.argtypes = (ctypes.c_int,)
-        ezpp_od.restype = ctypes.c_float
-
-        ezpp_hp = static_lib.ezpp_hp
-        ezpp_hp.argtypes = (ctypes.c_int,)
-        ezpp_hp.restype = ctypes.c_float
-
-        ezpp_odms = static_lib.ezpp_odms
-        ezpp_odms.argtypes = (ctypes.c_int,)
-        ezpp_odms.restype = ctypes.c_float
-
-        ezpp_autocalc = static_lib.ezpp_autocalc
-        ezpp_autocalc.argtypes = (ctypes.c_int,)
-        ezpp_autocalc.restype = ctypes.c_int
-
-        ezpp_time_at = static_lib.ezpp_time_at
-        ezpp_time_at.argtypes = (ctypes.c_int, ctypes.c_int)
-        ezpp_time_at.restype = ctypes.c_float
-
-        ezpp_strain_at = static_lib.ezpp_strain_at
-        ezpp_strain_at.argtypes = (ctypes.c_int, ctypes.c_int, ctypes.c_int)
-        ezpp_strain_at.restype = ctypes.c_float
-
-        ezpp_strain_at = static_lib.ezpp_strain_at
-        ezpp_strain_at.argtypes = (ctypes.c_int, ctypes.c_int, ctypes.c_int)
-        ezpp_strain_at.restype = ctypes.c_float
-
-        ezpp_ntiming_points = static_lib.ezpp_ntiming_points
-        ezpp_ntiming_points.argtypes = (ctypes.c_int,)
-        ezpp_ntiming_points.restype = ctypes.c_int
-
-        ezpp_timing_time = static_lib.ezpp_timing_time
-        ezpp_timing_time.argtypes = (ctypes.c_int, ctypes.c_int)
-        ezpp_timing_time.restype = ctypes.c_float
-
-        ezpp_timing_ms_per_beat = static_lib.ezpp_timing_ms_per_beat
-        ezpp_timing_ms_per_beat.argtypes = (ctypes.c_int, ctypes.c_int)
-        ezpp_timing_ms_per_beat.restype = ctypes.c_float
-
-        ezpp_timing_change = static_lib.ezpp_timing_change
-        ezpp_timing_change.argtypes = (ctypes.c_int, ctypes.c_int)
-        ezpp_timing_change.restype = ctypes.c_int
-
-        # setting internals
-
-        ezpp_set_aim_stars = static_lib.ezpp_set_aim_stars
-        ezpp_set_aim_stars.argtypes = (ctypes.c_int, ctypes.c_float)
-        ezpp_set_aim_stars.restype = ctypes.c_void_p
-
-        ezpp_set_speed_stars = static_lib.ezpp_set_speed_stars
-        ezpp_set_speed_stars.argtypes = (ctypes.c_int, ctypes.c_float)
-        ezpp_set_speed_stars.restype = ctypes.c_void_p
-
-        ezpp_set_base_ar = static_lib.ezpp_set_base_ar
-        ezpp_set_base_ar.argtypes = (ctypes.c_int, ctypes.c_float)
-        ezpp_set_base_ar.restype = ctypes.c_void_p
-
-        ezpp_set_base_od = static_lib.ezpp_set_base_od
-        ezpp_set_base_od.argtypes = (ctypes.c_int, ctypes.c_float)
-        ezpp_set_base_od.restype = ctypes.c_void_p
-
-        ezpp_set_base_hp = static_lib.ezpp_set_base_hp
-        ezpp_set_base_hp.argtypes = (ctypes.c_int, ctypes.c_float)
-        ezpp_set_base_hp.restype = ctypes.c_void_p
-
-        ezpp_set_mode = static_lib.ezpp_set_mode
-        ezpp_set_mode.argtypes = (ctypes.c_int, ctypes.c_int)
-        ezpp_set_mode.restype = ctypes.c_void_p
-
-        ezpp_set_combo = static_lib.ezpp_set_combo
-        ezpp_set_combo.argtypes = (ctypes.c_int, ctypes.c_int)
-        ezpp_set_combo.restype = ctypes.c_void_p
-
-        ezpp_set_score_version = static_lib.ezpp_set_score_version
-        ezpp_set_score_version.argtypes = (ctypes.c_int, ctypes.c_int)
-        ezpp_set_score_version.restype = ctypes.c_void_p
-
-        ezpp_set_accuracy_percent = static_lib.ezpp_set_accuracy_percent
-        ezpp_set_accuracy_percent.argtypes = (ctypes.c_int, ctypes.c_float)
-        ezpp_set_accuracy_percent.restype = ctypes.c_void_p
-
-        ezpp_set_autocalc = static_lib.ezpp_set_autocalc
-        ezpp_set_autocalc.argtypes = (ctypes.c_int, ctypes.c_int)
-        ezpp_set_autocalc.restype = ctypes.c_void_p
-
-        # forces map re-parse for map-changing mods
-        # (this is an implementation detail of oppai-ng)
-
-        ezpp_set_mods = static_lib.ezpp_set_mods
-        ezpp_set_mods.argtypes = (ctypes.c_int, ctypes.c_int)
-        ezpp_set_mods.restype = ctypes.c_void_p
-
-        # forces map re-parse
-
-        ezpp_set_base_cs = static_lib.ezpp_set_base_cs
-        ezpp_set_base_cs.argtypes = (ctypes.c_int, ctypes.c_float)
-        ezpp_set_base_cs.restype = ctypes.c_void_p
-
-        ezpp_set_mode_override = static_lib.ezpp_set_mode_override
-        ezpp_set_mode_override.argtypes = (ctypes.c_int, ctypes.c_int)
-        ezpp_set_mode_override.restype = ctypes.c_void_p
-
-        # forces map re-parse & clobbers acc
+        return _StaticLibrary(static_lib)
 
-        ezpp_set_nmiss = static_lib.ezpp_set_nmiss
-        ezpp_set_nmiss.argtypes = (ctypes.c_int, ctypes.c_int)
-        ezpp_set_nmiss.restype = ctypes.c_void_p
 
-        ezpp_set_end = static_lib.ezpp_set_end
-        ezpp_set_end.argtypes = (ctypes.c_int, ctypes.c_int)
-        ezpp_set_end.restype = ctypes.c_void_p
+class _StaticLibrary:
+    """A loaded oppai-ng library, binding functions as they're used."""
 
-        ezpp_set_end_time = static_lib.ezpp_set_end_time
-        ezpp_set_end_time.argtypes = (ctypes.c_int, ctypes.c_float)
-        ezpp_set_end_time.restype = ctypes.c_void_p
+    def __init__(self, library: ctypes.CDLL) -> None:
+        self._library = library
 
-        ezpp_set_accuracy = static_lib.ezpp_set_accuracy
-        ezpp_set_accuracy.argtypes = (ctypes.c_int, ctypes.c_int, ctypes.c_int)
-        ezpp_set_accuracy.restype = ctypes.c_void_p
+    def __getattr__(self, name: str) -> Any:
+        function = getattr(self._library, name)
+        if name in PROTOTYPES:
+            function.argtypes, function.restype = PROTOTYPES[name]
 
-        return static_lib
+        # later lookups find it here, without coming back through this
+        setattr(self, name, function)
+        return function
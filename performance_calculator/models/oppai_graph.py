@@ -0,0 +1,175 @@
+from __future__ import annotations
+
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Hashable
+from typing import Optional
+from typing import TYPE_CHECKING
+from typing import Union
+
+import numpy as np
+
+from performance_calculator.models.oppai import DifficultyType
+from performance_calculator.models.oppai import OppaiWrapper
+from performance_calculator.models.path import Path
+
+if TYPE_CHECKING:
+    from performance_calculator.models.beatmap_source import BeatmapFile
+
+DEFAULT_CACHE_SIZE = 256
+
+
+def downsample(
+    times: np.ndarray,
+    values: np.ndarray,
+    buckets: int,
+) -> tuple[np.ndarray, np.ndarray]:
+    """Split `times` into `buckets` equally long sections and keep the
+    highest value of each, as difficulty graphs show peaks.
+
+    Returns the start time and value of every bucket, empty buckets are 0.
+    """
+    if buckets < 1:
+        raise ValueError("buckets must be at least 1")
+
+    if not len(times):
+        return np.zeros(buckets), np.zeros(buckets)
+
+    start, end = float(times[0]), float(times[-1])
+    bucket_times = np.linspace(start, end, buckets, endpoint=False)
+
+    length = end - start
+    if length <= 0:
+        indices = np.zeros(len(times), dtype=np.intp)
+    else:
+        indices = ((times - start) * (buckets / length)).astype(np.intp)
+        np.clip(indices, 0, buckets - 1, out=indices)
+
+    peaks = np.zeros(buckets)
+    np.maximum.at(peaks, indices, values)
+
+    return bucket_times, peaks
+
+
+@dataclass
+class StrainGraph:
+    # object start times, and the strain at each
+    times: np.ndarray
+    aim: np.ndarray
+    speed: np.ndarray
+
+    def downsampled(self, buckets: int) -> StrainGraph:
+        times, aim = downsample(self.times, self.aim, buckets)
+        _, speed = downsample(self.times, self.speed, buckets)
+        return StrainGraph(times=times, aim=aim, speed=speed)
+
+
+@dataclass
+class TimingPointSeries:
+    times: np.ndarray
+    ms_per_beat: np.ndarray
+    # whether each point is uninherited
+    changes: np.ndarray
+
+
+@dataclass
+class OppaiGraph:
+    strains: StrainGraph
+    timing_points: TimingPointSeries
+
+
+def read_oppai_graph(ezpp: OppaiWrapper) -> OppaiGraph:
+    """Export the strains and timing points of the last map `ezpp` calculated."""
+    times, ms_per_beat, changes = ezpp.get_timing_points()
+
+    return OppaiGraph(
+        strains=StrainGraph(
+            times=np.frombuffer(ezpp.get_times(), dtype=np.float32),
+            aim=np.frombuffer(ezpp.get_strains(DifficultyType.AIM), dtype=np.float32),
+            speed=np.frombuffer(
+                ezpp.get_strains(DifficultyType.SPEED),
+                dtype=np.float32,
+            ),
+        ),
+        timing_points=TimingPointSeries(
+            times=np.frombuffer(times, dtype=np.float32),
+            ms_per_beat=np.frombuffer(ms_per_beat, dtype=np.float32),
+            changes=np.frombuffer(changes, dtype=np.int8).astype(bool),
+        ),
+    )
+
+
+class OppaiGraphCache:
+    """Strain graphs and timing points from oppai, cached per (map, mods)."""
+
+    def __init__(self, oppai_path: str, maxsize: int = DEFAULT_CACHE_SIZE) -> None:
+        self.oppai_path = oppai_path
+        self.maxsize = maxsize
+
+        self._graphs: OrderedDict[tuple[Hashable, int], OppaiGraph] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._graphs)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._graphs.clear()
+
+    def _calculate(
+        self,
+        osu_file_path: Union[str, BeatmapFile],
+        mods: int,
+    ) -> OppaiGraph:
+        with OppaiWrapper(self.oppai_path) as ezpp:
+            ezpp.configure(mods=mods)
+            if isinstance(osu_file_path, str):
+                ezpp.calculate(Path(osu_file_path))
+            else:
+                ezpp.calculate_data(osu_file_path.read_bytes())
+
+            return read_oppai_graph(ezpp)
+
+    def get(
+        self,
+        osu_file_path: Union[str, BeatmapFile],
+        mods: int = 0,
+        beatmap_key: Optional[Hashable] = None,
+    ) -> OppaiGraph:
+        """The graph of a map, keyed by its path unless a key (like its
+        checksum or id) is given. Sources other than paths need a key."""
+        if beatmap_key is None:
+            if not isinstance(osu_file_path, str):
+                raise ValueError("You must provide a key for beatmap sources")
+
+            beatmap_key = osu_file_path
+
+        key = (beatmap_key, mods)
+        with self._lock:
+            graph = self._graphs.get(key)
+            if graph is not None:
+                self._graphs.move_to_end(key)
+                return graph
+
+        graph = self._calculate(osu_file_path, mods)
+
+        with self._lock:
+            self._graphs[key] = graph
+            while len(self._graphs) > self.maxsize:
+                self._graphs.popitem(last=False)
+
+        return graph
+
+    def strains(
+        self,
+        osu_file_path: Union[str, BeatmapFile],
+        mods: int = 0,
+        buckets: Optional[int] = None,
+        beatmap_key: Optional[Hashable] = None,
+    ) -> StrainGraph:
+        strains = self.get(osu_file_path, mods, beatmap_key).strains
+        if buckets is not None:
+            strains = strains.downsampled(buckets)
+
+        return strains
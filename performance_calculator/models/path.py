@@ -2,8 +2,11 @@ from __future__ import annotations
 
 import glob
 import os
+from typing import Optional
 from typing import Union
 
+COMPILED_BEATMAP_SUFFIX = ".osuc"
+
 
 class Path:
     def __init__(self, file_path: str) -> None:
@@ -23,6 +26,18 @@ class Path:
         # not sure if this even makes sense lol?
         return Path(os.path.join(self._path, other_path._path))
 
+    @property
+    def name(self) -> str:
+        return os.path.basename(self._path)
+
+    def compiled_path(self, directory: Optional[Path] = None) -> Path:
+        """Where the compiled form of this .osu file lives,
+        next to it unless a directory is given."""
+        if directory is None:
+            return Path(self._path + COMPILED_BEATMAP_SUFFIX)
+
+        return directory / (self.name + COMPILED_BEATMAP_SUFFIX)
+
     def exists(self) -> bool:
         return os.path.exists(self._path)
 
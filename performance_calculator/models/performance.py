@@ -1,22 +1,108 @@
 from __future__ import annotations
 
+import dataclasses
+import math
 from abc import ABC
 from abc import abstractmethod
 from dataclasses import dataclass
+from typing import Any
+from typing import Sequence
+from typing import TYPE_CHECKING
 
 from performance_calculator.models.difficulty import DifficultyAttributes
 from performance_calculator.models.score import Score
 
+if TYPE_CHECKING:
+    import numpy as np
+
 
 @dataclass
 class PerformanceAttributes:
     total: float
 
 
+class ScalarMath:
+    """The numpy functions the pp formulas use, for a single score."""
+
+    power = staticmethod(math.pow)
+    log10 = staticmethod(math.log10)
+    minimum = staticmethod(min)
+    maximum = staticmethod(max)
+
+    @staticmethod
+    def where(condition: Any, x: Any, y: Any) -> Any:
+        return x if condition else y
+
+    @staticmethod
+    def clip(x: Any, lower: Any, upper: Any) -> Any:
+        return lower if x < lower else upper if x > upper else x
+
+
+class ScoreColumns:
+    """The columns of a `SCORE_DTYPE` array, named like a `Score`'s fields."""
+
+    def __init__(self, scores: np.ndarray) -> None:
+        import numpy as np
+
+        self.mods = scores["mods"]
+        self.accuracy = scores["accuracy"]
+        self.max_combo = scores["max_combo"].astype(np.float64)
+        self.num_300s = scores["num_300s"].astype(np.float64)
+        self.num_100s = scores["num_100s"].astype(np.float64)
+        self.num_50s = scores["num_50s"].astype(np.float64)
+        self.num_gekis = scores["num_gekis"].astype(np.float64)
+        self.num_katus = scores["num_katus"].astype(np.float64)
+        self.num_misses = scores["num_misses"].astype(np.float64)
+
+
 class PerformanceCalculator(ABC):
-    def __init__(self, difficulty_attributes: DifficultyAttributes) -> None:
+    def __init__(
+        self,
+        difficulty_attributes: DifficultyAttributes,
+        # what the map's own terms are computed with, numpy for `for_maps`
+        xp: Any = ScalarMath,
+    ) -> None:
         self.difficulty_attributes = difficulty_attributes
 
-    @abstractmethod
+    @classmethod
+    def for_maps(
+        cls,
+        attributes: Sequence[DifficultyAttributes],
+    ) -> PerformanceCalculator:
+        """A calculator for scores on many maps at once, whose attributes
+        are arrays of `attributes`' values. The last axis of the scores given
+        to its `calculate_many` runs along `attributes`; `calculate` can't
+        be used."""
+        import numpy as np
+
+        stacked = type(attributes[0])(
+            **{
+                field.name: np.array(
+                    [
+                        getattr(map_attributes, field.name)
+                        for map_attributes in attributes
+                    ],
+                )
+                for field in dataclasses.fields(attributes[0])
+            },
+        )
+        return cls(stacked, np)
+
     def calculate(self, score: Score) -> PerformanceAttributes:
+        return self._calculate(ScalarMath, score)
+
+    def calculate_many(self, scores: np.ndarray) -> np.ndarray:
+        """Total pp of a `SCORE_DTYPE` array of scores on this map."""
+        # numpy is only needed for batches
+        import numpy as np
+
+        total = self._calculate(np, ScoreColumns(scores)).total
+        return np.broadcast_to(total, scores.shape).astype(np.float64)
+
+    @abstractmethod
+    def _calculate(self, xp: Any, score: Any) -> PerformanceAttributes:
+        """The ruleset's formula, the one both `calculate` and
+        `calculate_many` use. It's written against `xp`, which is
+        `ScalarMath` for a `Score`, or numpy for `ScoreColumns`, where
+        every attribute it returns is an array."""
         ...
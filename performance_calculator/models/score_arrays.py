@@ -0,0 +1,74 @@
+from __future__ import annotations
+
+from typing import Sequence
+
+import numpy as np
+
+from performance_calculator.models.score import Score
+
+SCORE_DTYPE = np.dtype(
+    [
+        ("mods", np.int64),
+        ("max_combo", np.int64),
+        ("accuracy", np.float64),
+        ("num_300s", np.int64),
+        ("num_100s", np.int64),
+        ("num_50s", np.int64),
+        ("num_gekis", np.int64),
+        ("num_katus", np.int64),
+        ("num_misses", np.int64),
+    ],
+)
+
+
+def score_arrays(scores: Sequence[Score]) -> np.ndarray:
+    """Scores as a `SCORE_DTYPE` array, which `calculate_many` takes."""
+    return np.array(
+        [
+            (
+                score.mods,
+                score.max_combo,
+                score.accuracy,
+                score.num_300s,
+                score.num_100s,
+                score.num_50s,
+                score.num_gekis,
+                score.num_katus,
+                score.num_misses,
+            )
+            for score in scores
+        ],
+        dtype=SCORE_DTYPE,
+    )
+
+
+def osu_accuracy(scores: np.ndarray) -> np.ndarray:
+    total_hits = (
+        scores["num_300s"]
+        + scores["num_100s"]
+        + scores["num_50s"]
+        + scores["num_misses"]
+    )
+    return (
+        scores["num_300s"] * 6 + scores["num_100s"] * 2 + scores["num_50s"]
+    ) / np.maximum(6 * total_hits, 1)
+
+
+def full_combo_scores(scores: np.ndarray, mode: int, max_combo: int) -> np.ndarray:
+    """The full combo counterparts of `scores`: misses become 300s and
+    every score reaches `max_combo`."""
+    full_combo = scores.copy()
+    full_combo["num_300s"] += full_combo["num_misses"]
+    full_combo["num_misses"] = 0
+    full_combo["max_combo"] = max_combo
+
+    if mode == 0:
+        # osu! reads accuracy rather than counting it
+        accuracy = osu_accuracy(full_combo)
+        full_combo["accuracy"] = np.where(
+            scores["accuracy"] > 1.0,
+            accuracy * 100,
+            accuracy,
+        )
+
+    return full_combo
@@ -0,0 +1,220 @@
+from __future__ import annotations
+
+import math
+from typing import Optional
+
+import numpy as np
+import numpy.typing as npt
+
+BEZIER_SEGMENT_LENGTH = 2.0
+CIRCULAR_ARC_TOLERANCE = 0.1
+CATMULL_DETAIL = 50
+
+
+def _approximate_linear(points: np.ndarray) -> np.ndarray:
+    return points
+
+
+def _approximate_bezier(points: np.ndarray) -> np.ndarray:
+    if len(points) < 3:
+        return points
+
+    control_length = np.hypot(*np.diff(points, axis=0).T).sum()
+    sample_count = max(2, math.ceil(control_length / BEZIER_SEGMENT_LENGTH) + 1)
+    t = np.linspace(0.0, 1.0, sample_count)[:, None, None]
+
+    # de casteljau's algorithm, for every sample at once
+    curve = np.broadcast_to(points, (sample_count, *points.shape))
+    while curve.shape[1] > 1:
+        curve = (1 - t) * curve[:, :-1] + t * curve[:, 1:]
+
+    return curve[:, 0]
+
+
+def _approximate_catmull(points: np.ndarray) -> np.ndarray:
+    t = np.linspace(0.0, 1.0, CATMULL_DETAIL + 1)[:, None]
+
+    output = []
+    for i in range(len(points) - 1):
+        v1 = points[i - 1] if i > 0 else points[i]
+        v2 = points[i]
+        v3 = points[i + 1] if i < len(points) - 1 else v2 + v2 - v1
+        v4 = points[i + 2] if i < len(points) - 2 else v3 + v3 - v2
+
+        output.append(
+            0.5
+            * (
+                2 * v2
+                + (-v1 + v3) * t
+                + (2 * v1 - 5 * v2 + 4 * v3 - v4) * t**2
+                + (-v1 + 3 * v2 - 3 * v3 + v4) * t**3
+            ),
+        )
+
+    if not output:
+        return points
+
+    return np.concatenate(output)
+
+
+def _approximate_circular_arc(points: np.ndarray) -> np.ndarray:
+    a, b, c = points
+
+    if abs((b[1] - a[1]) * (c[0] - a[0]) - (b[0] - a[0]) * (c[1] - a[1])) < 1e-3:
+        return _approximate_bezier(points)
+
+    d = 2 * (a[0] * (b - c)[1] + b[0] * (c - a)[1] + c[0] * (a - b)[1])
+    a_squared, b_squared, c_squared = (a**2).sum(), (b**2).sum(), (c**2).sum()
+
+    centre = (
+        np.array(
+            [
+                a_squared * (b - c)[1]
+                + b_squared * (c - a)[1]
+                + c_squared * (a - b)[1],
+                a_squared * (c - b)[0]
+                + b_squared * (a - c)[0]
+                + c_squared * (b - a)[0],
+            ],
+        )
+        / d
+    )
+
+    d_a = a - centre
+    d_c = c - centre
+
+    radius = math.hypot(*d_a)
+    theta_start = math.atan2(d_a[1], d_a[0])
+    theta_end = math.atan2(d_c[1], d_c[0])
+    while theta_end < theta_start:
+        theta_end += 2 * math.pi
+
+    direction = 1
+    theta_range = theta_end - theta_start
+
+    # draw the arc on the side of AC that B lies on
+    ortho_a_to_c = np.array([(c - a)[1], -(c - a)[0]])
+    if np.dot(ortho_a_to_c, b - a) < 0:
+        direction = -1
+        theta_range = 2 * math.pi - theta_range
+
+    if 2 * radius <= CIRCULAR_ARC_TOLERANCE:
+        point_count = 2
+    else:
+        point_count = max(
+            2,
+            math.ceil(
+                theta_range / (2 * math.acos(1 - CIRCULAR_ARC_TOLERANCE / radius)),
+            ),
+        )
+
+    theta = theta_start + direction * np.linspace(0.0, 1.0, point_count) * theta_range
+    return centre + radius * np.stack([np.cos(theta), np.sin(theta)], axis=1)
+
+
+class SliderPath:
+    """The polyline approximation of a slider's curve, relative to its head."""
+
+    def __init__(
+        self,
+        curve_type: str,
+        control_points: npt.ArrayLike,
+        expected_distance: Optional[float] = None,
+    ) -> None:
+        control_points = np.asarray(control_points, dtype=np.float64).reshape(-1, 2)
+
+        if curve_type == "P" and (
+            len(control_points) != 3 or self._is_linear(control_points)
+        ):
+            curve_type = "B" if len(control_points) != 3 else "L"
+
+        approximate = {
+            "L": _approximate_linear,
+            "P": _approximate_circular_arc,
+            "C": _approximate_catmull,
+        }.get(curve_type, _approximate_bezier)
+
+        # two sequential identical control points start a new segment
+        boundaries = np.flatnonzero(
+            np.all(control_points[1:] == control_points[:-1], axis=1),
+        )
+        segment_starts = [0, *(boundaries + 1)]
+        segment_ends = [*(boundaries + 1), len(control_points)]
+
+        path = [control_points[:1]]
+        for start, end in zip(segment_starts, segment_ends):
+            segment = control_points[start:end]
+            if len(segment) < 2:
+                continue
+
+            path.append(approximate(segment)[1:])
+
+        self._points = np.concatenate(path)
+        self._lengths = np.concatenate(
+            ([0.0], np.cumsum(np.hypot(*np.diff(self._points, axis=0).T))),
+        )
+
+        if expected_distance is not None and expected_distance > 0:
+            self._apply_expected_distance(control_points, expected_distance)
+
+    @staticmethod
+    def _is_linear(control_points: np.ndarray) -> bool:
+        a, b, c = control_points
+        return abs((b[1] - a[1]) * (c[0] - a[0]) - (b[0] - a[0]) * (c[1] - a[1])) < 1e-3
+
+    def _apply_expected_distance(
+        self,
+        control_points: np.ndarray,
+        expected_distance: float,
+    ) -> None:
+        calculated_distance = self._lengths[-1]
+        if calculated_distance == expected_distance:
+            return
+
+        # osu!stable doesn't extend sliders ending on two equal control points
+        if (
+            len(control_points) >= 2
+            and np.all(control_points[-1] == control_points[-2])
+            and expected_distance > calculated_distance
+        ):
+            return
+
+        end_index = np.searchsorted(self._lengths, expected_distance, side="left")
+        end_index = min(max(int(end_index), 1), len(self._points) - 1)
+        if end_index == 0 or len(self._points) < 2:
+            return
+
+        points = self._points[: end_index + 1].copy()
+        lengths = self._lengths[: end_index + 1].copy()
+
+        direction = points[end_index] - points[end_index - 1]
+        direction_length = math.hypot(*direction)
+        if direction_length > 0:
+            points[end_index] = points[end_index - 1] + direction / direction_length * (
+                expected_distance - lengths[end_index - 1]
+            )
+
+        lengths[end_index] = expected_distance
+
+        self._points = points
+        self._lengths = lengths
+
+    @property
+    def distance(self) -> float:
+        return float(self._lengths[-1])
+
+    @property
+    def end_position(self) -> np.ndarray:
+        return self._points[-1]
+
+    def position_at(self, progress: npt.ArrayLike) -> np.ndarray:
+        """Positions at the given 0-1 progress along the path."""
+        distance = np.clip(np.asarray(progress, dtype=np.float64), 0, 1) * self.distance
+
+        return np.stack(
+            [
+                np.interp(distance, self._lengths, self._points[:, 0]),
+                np.interp(distance, self._lengths, self._points[:, 1]),
+            ],
+            axis=-1,
+        )
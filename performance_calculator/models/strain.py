@@ -0,0 +1,161 @@
+from __future__ import annotations
+
+import math
+from typing import Sequence
+
+import numpy as np
+import numpy.typing as npt
+
+SECTION_LENGTH = 400.0
+DECAY_WEIGHT = 0.9
+
+# the largest decay exponent accumulated before rebasing, keeps exp() finite
+_MAX_DECAY_EXPONENT = 500.0
+
+
+def decayed_cumsum(values: npt.ArrayLike, log_decays: npt.ArrayLike) -> np.ndarray:
+    """Evaluates `strain[i] = strain[i - 1] * exp(log_decays[i]) + values[i]`.
+
+    This is the recurrence behind every decaying strain skill, computed
+    with cumulative sums rather than a loop over objects.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    cumulative_decay = np.cumsum(np.asarray(log_decays, dtype=np.float64))
+
+    result = np.empty_like(values)
+    if not len(values):
+        return result
+
+    # split where the accumulated decay would over/underflow exp()
+    blocks = np.floor(-cumulative_decay / _MAX_DECAY_EXPONENT)
+    block_starts = np.flatnonzero(np.diff(blocks, prepend=blocks[0] - 1))
+    block_ends = [*block_starts[1:], len(values)]
+
+    carry = 0.0
+    previous_decay = 0.0
+    for start, end in zip(block_starts, block_ends):
+        reference = cumulative_decay[start]
+        block_decay = cumulative_decay[start:end]
+
+        accumulated = carry * math.exp(reference - previous_decay) + np.cumsum(
+            values[start:end] * np.exp(reference - block_decay),
+        )
+        result[start:end] = np.exp(block_decay - reference) * accumulated
+
+        carry = result[end - 1]
+        previous_decay = cumulative_decay[end - 1]
+
+    return result
+
+
+def strain_decay(delta_times: npt.ArrayLike, decay_base: float) -> np.ndarray:
+    """The log of `decay_base ** (delta_time / 1000)`."""
+    return np.asarray(delta_times, dtype=np.float64) / 1000 * math.log(decay_base)
+
+
+def strain_peaks(
+    start_times: npt.ArrayLike,
+    strains: npt.ArrayLike,
+    components: Sequence[tuple[np.ndarray, float]],
+    section_length: float = SECTION_LENGTH,
+) -> np.ndarray:
+    """The highest strain within each section of the map.
+
+    Sections without objects start from the strain left behind by the
+    previous object; `components` are the (strains, decay base) pairs it is
+    made of, so skills with several separately decaying parts decay
+    correctly between objects.
+    """
+    start_times = np.asarray(start_times, dtype=np.float64)
+    strains = np.asarray(strains, dtype=np.float64)
+
+    if not len(start_times):
+        return np.empty(0)
+
+    first_section_end = math.ceil(start_times[0] / section_length) * section_length
+    sections = np.maximum(
+        0,
+        np.ceil((start_times - first_section_end) / section_length),
+    ).astype(np.int64)
+
+    section_count = int(sections[-1]) + 1
+    peaks = np.zeros(section_count)
+
+    if section_count > 1:
+        section_indices = np.arange(1, section_count)
+        section_starts = first_section_end + (section_indices - 1) * section_length
+
+        # the last object processed before each section starts
+        previous = np.searchsorted(sections, section_indices, side="left") - 1
+        elapsed = section_starts - start_times[previous]
+
+        for component, decay_base in components:
+            peaks[1:] += np.asarray(component)[previous] * np.power(
+                decay_base,
+                elapsed / 1000,
+            )
+
+    np.maximum.at(peaks, sections, strains)
+    return peaks
+
+
+def progressive_strain_peaks(
+    start_times: npt.ArrayLike,
+    strains: npt.ArrayLike,
+    components: Sequence[tuple[np.ndarray, float]],
+    section_length: float = SECTION_LENGTH,
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """`strain_peaks` as it stands after each object.
+
+    Returns the section of every object, the peak of every section and the
+    peak of each object's section so far. The peaks of the first `i + 1`
+    objects are `peaks[: sections[i]]` followed by `partial_peaks[i]`.
+    """
+    start_times = np.asarray(start_times, dtype=np.float64)
+    strains = np.asarray(strains, dtype=np.float64)
+
+    peaks = strain_peaks(start_times, strains, components, section_length)
+    # what each section starts from, before any of its own objects
+    initial_peaks = strain_peaks(
+        start_times,
+        np.zeros_like(strains),
+        components,
+        section_length,
+    )
+
+    if not len(start_times):
+        return np.empty(0, dtype=np.int64), peaks, np.empty(0)
+
+    first_section_end = math.ceil(start_times[0] / section_length) * section_length
+    sections = np.maximum(
+        0,
+        np.ceil((start_times - first_section_end) / section_length),
+    ).astype(np.int64)
+
+    partial_peaks = np.maximum(strains, initial_peaks[sections])
+    boundaries = [0, *(np.flatnonzero(np.diff(sections)) + 1), len(sections)]
+    for start, end in zip(boundaries[:-1], boundaries[1:]):
+        np.maximum.accumulate(partial_peaks[start:end], out=partial_peaks[start:end])
+
+    return sections, peaks, partial_peaks
+
+
+def prefix_peaks(
+    sections: np.ndarray,
+    peaks: np.ndarray,
+    partial_peaks: np.ndarray,
+    index: int,
+) -> np.ndarray:
+    """The section peaks after object `index`, from `progressive_strain_peaks`."""
+    return np.append(peaks[: sections[index]], partial_peaks[index])
+
+
+def weighted_peak_sum(
+    peaks: npt.ArrayLike,
+    decay_weight: float = DECAY_WEIGHT,
+) -> float:
+    """The weighted sum of section peaks, hardest first."""
+    peaks = np.sort(np.asarray(peaks, dtype=np.float64))[::-1]
+    peaks = peaks[peaks > 0]
+
+    return float(np.sum(peaks * np.power(decay_weight, np.arange(len(peaks)))))
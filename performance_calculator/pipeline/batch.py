@@ -0,0 +1,68 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Callable
+from typing import Iterator
+from typing import Sequence
+
+import numpy as np
+
+from performance_calculator.live import performance_calculator_for
+from performance_calculator.models.difficulty import DifficultyAttributes
+from performance_calculator.models.performance import PerformanceCalculator
+
+# builds the calculator of one version of the pp formulas for a map,
+# `performance_calculator_for` being the current formulas
+CalculatorFactory = Callable[[DifficultyAttributes], PerformanceCalculator]
+
+
+@dataclass
+class ScoreBatch:
+    """Many scores on many maps, as arrays.
+
+    The scores on one (map, mods) point at the same entry of `attributes`
+    through `attribute_indices`, so they're calculated together.
+    """
+
+    # SCORE_DTYPE
+    scores: np.ndarray
+    user_ids: np.ndarray
+    beatmap_ids: np.ndarray
+    attributes: Sequence[DifficultyAttributes]
+    attribute_indices: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.scores)
+
+    def take(self, indices: np.ndarray) -> ScoreBatch:
+        """The scores at `indices`, sharing this batch's attributes."""
+        return ScoreBatch(
+            scores=self.scores[indices],
+            user_ids=self.user_ids[indices],
+            beatmap_ids=self.beatmap_ids[indices],
+            attributes=self.attributes,
+            attribute_indices=self.attribute_indices[indices],
+        )
+
+    def groups(self) -> Iterator[tuple[DifficultyAttributes, np.ndarray]]:
+        """Each entry of `attributes` in use, with the indices of its scores."""
+        order = np.argsort(self.attribute_indices, kind="stable")
+        boundaries = np.flatnonzero(np.diff(self.attribute_indices[order])) + 1
+
+        for indices in np.split(order, boundaries):
+            if len(indices):
+                yield self.attributes[self.attribute_indices[indices[0]]], indices
+
+
+def calculate_batch(
+    batch: ScoreBatch,
+    calculator_factory: CalculatorFactory = performance_calculator_for,
+) -> np.ndarray:
+    """pp of every score in `batch`, one `calculate_many` call per map."""
+    pp = np.zeros(len(batch), dtype=np.float64)
+    for attributes, indices in batch.groups():
+        pp[indices] = calculator_factory(attributes).calculate_many(
+            batch.scores[indices],
+        )
+
+    return pp
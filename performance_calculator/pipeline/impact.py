@@ -0,0 +1,201 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from statistics import NormalDist
+from typing import Optional
+from typing import Sequence
+
+import numpy as np
+
+from performance_calculator.pipeline.batch import CalculatorFactory
+from performance_calculator.pipeline.batch import ScoreBatch
+
+DEFAULT_HISTOGRAM_BINS = 20
+DEFAULT_TOP_MOVERS = 10
+
+# how much each of a user's scores counts towards their total, by rank
+PP_WEIGHTING = 0.95
+
+
+class FormulaVersions:
+    """Several versions of the pp formulas, evaluated side by side."""
+
+    def __init__(self) -> None:
+        self.factories: dict[str, CalculatorFactory] = {}
+
+    def register(self, name: str, calculator_factory: CalculatorFactory) -> None:
+        if name in self.factories:
+            raise ValueError(f"version {name} is already registered")
+
+        self.factories[name] = calculator_factory
+
+    def evaluate(
+        self,
+        batch: ScoreBatch,
+        names: Optional[Sequence[str]] = None,
+    ) -> dict[str, np.ndarray]:
+        """pp of every score under every version (or those in `names`), in
+        one pass over the batch: each map's scores are gathered once for
+        all versions."""
+        if names is None:
+            names = list(self.factories)
+
+        results = {name: np.zeros(len(batch), dtype=np.float64) for name in names}
+
+        for attributes, indices in batch.groups():
+            scores = batch.scores[indices]
+            for name in names:
+                calculator = self.factories[name](attributes)
+                results[name][indices] = calculator.calculate_many(scores)
+
+        return results
+
+
+def user_totals(
+    user_ids: np.ndarray,
+    pp: np.ndarray,
+) -> tuple[np.ndarray, np.ndarray]:
+    """(user ids, total pp), with each user's scores weighted by rank.
+    Scores are taken as they are, so they should be one per map."""
+    order = np.lexsort((-pp, user_ids))
+    sorted_users = user_ids[order]
+
+    users, starts, counts = np.unique(
+        sorted_users,
+        return_index=True,
+        return_counts=True,
+    )
+    ranks = np.arange(len(order)) - np.repeat(starts, counts)
+
+    inverse = np.repeat(np.arange(len(users)), counts)
+    totals = np.bincount(
+        inverse,
+        weights=pp[order] * np.power(PP_WEIGHTING, ranks),
+        minlength=len(users),
+    )
+    return users, totals
+
+
+@dataclass
+class ImpactReport:
+    # candidate - baseline, for each score
+    score_deltas: np.ndarray
+
+    histogram: np.ndarray
+    bin_edges: np.ndarray
+
+    beatmap_ids: np.ndarray
+    # mean score delta of each map
+    map_deltas: np.ndarray
+
+    user_ids: np.ndarray
+    user_deltas: np.ndarray
+
+    # ids of the biggest movers either way, biggest first
+    top_maps: np.ndarray
+    top_users: np.ndarray
+
+
+def _top_movers(ids: np.ndarray, deltas: np.ndarray, top: int) -> np.ndarray:
+    return ids[np.argsort(-np.abs(deltas), kind="stable")[:top]]
+
+
+def impact_report(
+    batch: ScoreBatch,
+    baseline: np.ndarray,
+    candidate: np.ndarray,
+    bins: int = DEFAULT_HISTOGRAM_BINS,
+    top: int = DEFAULT_TOP_MOVERS,
+) -> ImpactReport:
+    """How the pp of `batch` moves from `baseline` to `candidate`, two
+    results of `FormulaVersions.evaluate`."""
+    score_deltas = candidate - baseline
+    histogram, bin_edges = np.histogram(score_deltas, bins=bins)
+
+    beatmap_ids, map_inverse = np.unique(batch.beatmap_ids, return_inverse=True)
+    map_deltas = np.bincount(map_inverse, weights=score_deltas) / np.bincount(
+        map_inverse,
+    )
+
+    user_ids, baseline_totals = user_totals(batch.user_ids, baseline)
+    _, candidate_totals = user_totals(batch.user_ids, candidate)
+    user_deltas = candidate_totals - baseline_totals
+
+    return ImpactReport(
+        score_deltas=score_deltas,
+        histogram=histogram,
+        bin_edges=bin_edges,
+        beatmap_ids=beatmap_ids,
+        map_deltas=map_deltas,
+        user_ids=user_ids,
+        user_deltas=user_deltas,
+        top_maps=_top_movers(beatmap_ids, map_deltas, top),
+        top_users=_top_movers(user_ids, user_deltas, top),
+    )
+
+
+@dataclass
+class ImpactEstimate:
+    sample_size: int
+    confidence: float
+
+    mean_delta: float
+    mean_delta_interval: tuple[float, float]
+    # delta over baseline pp, for scores worth anything under the baseline
+    mean_relative_delta: float
+    mean_relative_delta_interval: tuple[float, float]
+
+
+def _mean_interval(
+    values: np.ndarray,
+    population: int,
+    z: float,
+) -> tuple[float, tuple[float, float]]:
+    mean = float(np.mean(values)) if len(values) else 0.0
+    if len(values) < 2:
+        return mean, (-np.inf, np.inf)
+
+    # sampled without replacement, so large samples of
+    # small batches are more certain than the usual interval
+    correction = np.sqrt(max(0.0, (population - len(values)) / (population - 1)))
+    error = z * np.std(values, ddof=1) / np.sqrt(len(values)) * correction
+    return mean, (mean - error, mean + error)
+
+
+def estimate_impact(
+    versions: FormulaVersions,
+    batch: ScoreBatch,
+    baseline: str,
+    candidate: str,
+    sample_size: int,
+    confidence: float = 0.95,
+    seed: Optional[int] = None,
+) -> ImpactEstimate:
+    """Estimate the mean pp change from `baseline` to `candidate` from a
+    random sample of `batch`, rather than calculating all of it."""
+    rng = np.random.default_rng(seed)
+    sample_size = min(sample_size, len(batch))
+    sample = batch.take(rng.choice(len(batch), sample_size, replace=False))
+
+    results = versions.evaluate(sample, (baseline, candidate))
+    deltas = results[candidate] - results[baseline]
+
+    worth_anything = results[baseline] > 0
+    relative_deltas = deltas[worth_anything] / results[baseline][worth_anything]
+
+    z = NormalDist().inv_cdf(0.5 + confidence / 2)
+    mean_delta, mean_delta_interval = _mean_interval(deltas, len(batch), z)
+    mean_relative_delta, mean_relative_delta_interval = _mean_interval(
+        relative_deltas,
+        int(np.count_nonzero(worth_anything) * len(batch) / max(sample_size, 1)),
+        z,
+    )
+
+    return ImpactEstimate(
+        sample_size=sample_size,
+        confidence=confidence,
+        mean_delta=mean_delta,
+        mean_delta_interval=mean_delta_interval,
+        mean_relative_delta=mean_relative_delta,
+        mean_relative_delta_interval=mean_relative_delta_interval,
+    )
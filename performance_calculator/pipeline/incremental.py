@@ -0,0 +1,245 @@
+from __future__ import annotations
+
+import sqlite3
+from dataclasses import dataclass
+from typing import Iterable
+from typing import Mapping
+from typing import Optional
+
+import numpy as np
+
+from performance_calculator.attribute_provider import AttributeKey
+from performance_calculator.attribute_provider import canonical_key
+from performance_calculator.live import performance_calculator_for
+from performance_calculator.models.difficulty import DifficultyAttributes
+from performance_calculator.models.mods import difficulty_mods
+from performance_calculator.models.mods import Mods
+from performance_calculator.models.score_arrays import SCORE_DTYPE
+from performance_calculator.pipeline.batch import calculate_batch
+from performance_calculator.pipeline.batch import CalculatorFactory
+from performance_calculator.pipeline.batch import ScoreBatch
+from performance_calculator.pipeline.impact import user_totals
+from performance_calculator.pipeline.score_table import SCORE_COLUMNS
+
+# scores whose pp moves less than this aren't written back
+DEFAULT_EPSILON = 1e-6
+
+# SQLite only takes so many parameters per statement
+QUERY_CHUNK_SIZE = 500
+
+# osu! scores with these are scored by oppai, not the lazer formulas
+OPPAI_MODS = Mods.RELAX | Mods.AUTOPILOT
+
+
+def _chunks(values: list[int]) -> Iterable[list[int]]:
+    for start in range(0, len(values), QUERY_CHUNK_SIZE):
+        yield values[start : start + QUERY_CHUNK_SIZE]
+
+
+class DependencyIndex:
+    """Which scores depend on each (beatmap, mode, difficulty mods), and
+    whose scores they are. osu! relax and autopilot scores are left out, as
+    they're oppai's to score."""
+
+    def __init__(self) -> None:
+        self._scores: dict[AttributeKey, list[int]] = {}
+        self._maps: dict[int, list[AttributeKey]] = {}
+        self._users: dict[int, int] = {}
+
+    def __len__(self) -> int:
+        return len(self._users)
+
+    @classmethod
+    def from_connection(cls, connection: sqlite3.Connection) -> DependencyIndex:
+        index = cls()
+        for score_id, user_id, beatmap_id, mode, mods in connection.execute(
+            "SELECT id, user_id, beatmap_id, mode, mods FROM scores",
+        ):
+            index.add(score_id, user_id, beatmap_id, mode, mods)
+
+        return index
+
+    @property
+    def user_count(self) -> int:
+        return len(set(self._users.values()))
+
+    def add(
+        self,
+        score_id: int,
+        user_id: int,
+        beatmap_id: int,
+        mode: int,
+        mods: int,
+    ) -> None:
+        if mode == 0 and mods & OPPAI_MODS:
+            return
+
+        key = canonical_key(AttributeKey(beatmap_id, mode, mods))
+        if key not in self._scores:
+            self._scores[key] = []
+            self._maps.setdefault(beatmap_id, []).append(key)
+
+        self._scores[key].append(score_id)
+        self._users[score_id] = user_id
+
+    def scores_for(
+        self,
+        beatmap_id: int,
+        mode: Optional[int] = None,
+        mods: Optional[int] = None,
+    ) -> list[int]:
+        """Scores on a map in the given mode with the given difficulty mods,
+        or in any mode or with any mods."""
+        if mode is not None and mods is not None:
+            key = canonical_key(AttributeKey(beatmap_id, mode, mods))
+            return self._scores.get(key, [])
+
+        return [
+            score_id
+            for key in self._maps.get(beatmap_id, [])
+            if mode is None or key.mode == mode
+            if mods is None or key.mods == difficulty_mods(mods)
+            for score_id in self._scores[key]
+        ]
+
+    def users_for(self, score_ids: Iterable[int]) -> set[int]:
+        return {self._users[score_id] for score_id in score_ids}
+
+
+@dataclass
+class RecalculationReport:
+    scores_touched: int
+    scores_changed: int
+    scores_skipped: int
+    users_touched: int
+    users_skipped: int
+
+
+class IncrementalRecalculator:
+    """Recalculates only the scores whose map attributes changed, and the
+    totals of the users who set them."""
+
+    def __init__(
+        self,
+        connection: sqlite3.Connection,
+        index: Optional[DependencyIndex] = None,
+        calculator_factory: CalculatorFactory = performance_calculator_for,
+        epsilon: float = DEFAULT_EPSILON,
+    ) -> None:
+        self.connection = connection
+        self.index = index or DependencyIndex.from_connection(connection)
+        self.calculator_factory = calculator_factory
+        self.epsilon = epsilon
+
+    def _load(
+        self,
+        score_ids: list[int],
+        attributes: Mapping[AttributeKey, DifficultyAttributes],
+    ) -> tuple[np.ndarray, np.ndarray, ScoreBatch]:
+        rows = []
+        for chunk in _chunks(score_ids):
+            rows.extend(
+                self.connection.execute(
+                    "SELECT id, user_id, beatmap_id, mode, pp, "
+                    + ", ".join(SCORE_COLUMNS)
+                    + f" FROM scores WHERE id IN ({', '.join('?' * len(chunk))})",
+                    chunk,
+                ),
+            )
+
+        ids = np.array([row[0] for row in rows], dtype=np.int64)
+        old_pp = np.array([row[4] for row in rows], dtype=np.float64)
+        scores = np.array([tuple(row[5:]) for row in rows], dtype=SCORE_DTYPE)
+
+        keys = list(attributes)
+        key_indices = {key: i for i, key in enumerate(keys)}
+        batch = ScoreBatch(
+            scores=scores,
+            user_ids=np.array([row[1] for row in rows], dtype=np.int64),
+            beatmap_ids=np.array([row[2] for row in rows], dtype=np.int64),
+            attributes=[attributes[key] for key in keys],
+            attribute_indices=np.array(
+                [
+                    key_indices[canonical_key(AttributeKey(row[2], row[3], row[5]))]
+                    for row in rows
+                ],
+                dtype=np.int64,
+            ),
+        )
+        return ids, old_pp, batch
+
+    def _update_user_totals(self, user_ids: set[int]) -> None:
+        # each user's total in every mode they have scores in, counting only
+        # their best score on each map
+        rows = []
+        for chunk in _chunks(sorted(user_ids)):
+            rows.extend(
+                self.connection.execute(
+                    "SELECT user_id, mode, MAX(pp) FROM scores"
+                    f" WHERE user_id IN ({', '.join('?' * len(chunk))})"
+                    " GROUP BY user_id, beatmap_id, mode",
+                    chunk,
+                ),
+            )
+
+        if not rows:
+            return
+
+        users = np.array([row[0] for row in rows], dtype=np.int64)
+        modes = np.array([row[1] for row in rows], dtype=np.int64)
+        pp = np.array([row[2] for row in rows], dtype=np.float64)
+
+        for mode in np.unique(modes):
+            in_mode = modes == mode
+            mode_users, totals = user_totals(users[in_mode], pp[in_mode])
+            self.connection.executemany(
+                "INSERT OR REPLACE INTO user_stats (user_id, mode, pp)"
+                " VALUES (?, ?, ?)",
+                [
+                    (int(user_id), int(mode), float(total))
+                    for user_id, total in zip(mode_users, totals)
+                ],
+            )
+
+    def attributes_changed(
+        self,
+        attributes: Mapping[AttributeKey, DifficultyAttributes],
+    ) -> RecalculationReport:
+        """Recalculate after the attributes of some (beatmap id, mode, mods)
+        changed to `attributes`. Mods are reduced to the ones that affect
+        difficulty."""
+        attributes = {
+            canonical_key(AttributeKey(*key)): map_attributes
+            for key, map_attributes in attributes.items()
+        }
+
+        score_ids = [
+            score_id for key in attributes for score_id in self.index.scores_for(*key)
+        ]
+        changed_users: set[int] = set()
+
+        scores_changed = 0
+        if score_ids:
+            ids, old_pp, batch = self._load(score_ids, attributes)
+            new_pp = calculate_batch(batch, self.calculator_factory)
+
+            changed = np.abs(new_pp - old_pp) > self.epsilon
+            scores_changed = int(np.count_nonzero(changed))
+
+            with self.connection:
+                self.connection.executemany(
+                    "UPDATE scores SET pp = ? WHERE id = ?",
+                    zip(new_pp[changed].tolist(), ids[changed].tolist()),
+                )
+
+                changed_users = set(batch.user_ids[changed].tolist())
+                self._update_user_totals(changed_users)
+
+        user_count = self.index.user_count
+        return RecalculationReport(
+            scores_touched=len(score_ids),
+            scores_changed=scores_changed,
+            scores_skipped=len(self.index) - len(score_ids),
+            users_touched=len(changed_users),
+            users_skipped=user_count - len(changed_users),
+        )
@@ -0,0 +1,300 @@
+from __future__ import annotations
+
+import dataclasses
+import json
+import time
+from dataclasses import dataclass
+from typing import Any
+from typing import Callable
+from typing import NamedTuple
+from typing import Optional
+from typing import Sequence
+
+from performance_calculator.pipeline.pool import ConnectionPool
+from performance_calculator.pipeline.recalculate import PagedRecalculator
+from performance_calculator.pipeline.recalculate import RecalculationStats
+from performance_calculator.pipeline.score_table import placeholders
+
+DEFAULT_CHUNK_SIZE = 100_000
+
+# kept in the same database as the job's output, so a chunk's output and
+# its checkpoint are committed in one transaction
+CHECKPOINT_SCHEMA = """
+CREATE TABLE IF NOT EXISTS job_chunks (
+    job TEXT NOT NULL,
+    chunk INTEGER NOT NULL,
+    start_after INTEGER NOT NULL,
+    stop_at INTEGER NOT NULL,
+    PRIMARY KEY (job, chunk)
+);
+CREATE TABLE IF NOT EXISTS job_checkpoints (
+    job TEXT NOT NULL,
+    chunk INTEGER NOT NULL,
+    stats TEXT NOT NULL,
+    seconds REAL NOT NULL,
+    PRIMARY KEY (job, chunk)
+);
+"""
+
+
+class Chunk(NamedTuple):
+    number: int
+    # the scores with ids in (start_after, stop_at]
+    start_after: int
+    stop_at: int
+
+
+# does a chunk's work on the connection without committing it
+ChunkProcessor = Callable[[Any, Chunk], RecalculationStats]
+
+
+def recalculation_processor(recalculator: PagedRecalculator) -> ChunkProcessor:
+    """Recalculate each chunk's scores with `recalculator`: a
+    `BatchRecalculator`, or an `OppaiRecalculator` for osu! relax and
+    autopilot scores."""
+
+    def process(connection: Any, chunk: Chunk) -> RecalculationStats:
+        return recalculator.recalculate_range(
+            connection,
+            chunk.start_after,
+            chunk.stop_at,
+        )
+
+    return process
+
+
+def score_id_range(connection: Any) -> Optional[tuple[int, int]]:
+    """The lowest and highest score ids, or None if there are no scores."""
+    cursor = connection.cursor()
+    cursor.execute("SELECT MIN(id), MAX(id) FROM scores")
+    first_id, last_id = cursor.fetchone()
+    if first_id is None:
+        return None
+
+    return first_id, last_id
+
+
+def plan_chunks(
+    first_id: int,
+    last_id: int,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+) -> list[Chunk]:
+    """Chunks of `chunk_size` ids from `first_id` to `last_id`, numbered
+    from 0."""
+    if chunk_size < 1:
+        raise ValueError("chunk size must be at least 1")
+
+    return [
+        Chunk(number, start, min(start + chunk_size, last_id))
+        for number, start in enumerate(range(first_id - 1, last_id, chunk_size))
+    ]
+
+
+def _add_stats(totals: RecalculationStats, stats: RecalculationStats) -> None:
+    totals.pages += stats.pages
+    totals.rows_read += stats.rows_read
+    totals.rows_written += stats.rows_written
+    totals.rows_without_attributes += stats.rows_without_attributes
+    if stats.last_id is not None:
+        totals.last_id = max(totals.last_id or 0, stats.last_id)
+
+
+@dataclass
+class JobProgress:
+    chunk_count: int
+    chunks_done: int
+    # of every finished chunk, in this run or earlier ones
+    totals: RecalculationStats
+
+    # of the chunks finished in this run
+    elapsed: float
+    rows_per_second: float
+    # seconds left at this run's pace, None until it has finished a chunk
+    eta: Optional[float]
+
+    @property
+    def fraction_done(self) -> float:
+        if not self.chunk_count:
+            return 1.0
+
+        return self.chunks_done / self.chunk_count
+
+
+class CheckpointedJob:
+    """A long job split into numbered chunks, which carries on from its
+    last checkpoint when run again after a crash or deploy.
+
+    Each chunk's output is committed together with its checkpoint, so every
+    chunk's output lands exactly once: an interrupted chunk is rolled back
+    and redone, and a finished one is never done again. `process` must
+    therefore write to the same database and leave committing to the job.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        pool: ConnectionPool,
+        process: ChunkProcessor,
+        paramstyle: str = "qmark",
+        on_progress: Optional[Callable[[JobProgress], None]] = None,
+    ) -> None:
+        self.name = name
+        self.pool = pool
+        self.process = process
+        self.on_progress = on_progress
+
+        self._markers = placeholders(paramstyle, 4)
+
+        with self.pool.connection() as connection:
+            cursor = connection.cursor()
+            for statement in CHECKPOINT_SCHEMA.split(";"):
+                if statement.strip():
+                    cursor.execute(statement)
+
+            connection.commit()
+
+    def plan(self, chunks: Sequence[Chunk]) -> list[Chunk]:
+        """Store the job's chunks, unless it already has some, and return
+        the stored ones. Restarts keep the first plan, so chunk numbers
+        stay the same however the table grows in the meantime."""
+        planned = self.chunks()
+        if planned:
+            return planned
+
+        with self.pool.connection() as connection:
+            cursor = connection.cursor()
+            cursor.executemany(
+                "INSERT INTO job_chunks (job, chunk, start_after, stop_at)"
+                " VALUES ({}, {}, {}, {})".format(*self._markers),
+                [(self.name, *chunk) for chunk in chunks],
+            )
+            connection.commit()
+
+        return list(chunks)
+
+    def chunks(self) -> list[Chunk]:
+        with self.pool.connection() as connection:
+            cursor = connection.cursor()
+            cursor.execute(
+                "SELECT chunk, start_after, stop_at FROM job_chunks"
+                f" WHERE job = {self._markers[0]} ORDER BY chunk",
+                (self.name,),
+            )
+            return [Chunk(*row) for row in cursor.fetchall()]
+
+    def completed(self) -> dict[int, RecalculationStats]:
+        """The stats of every finished chunk, by chunk number."""
+        with self.pool.connection() as connection:
+            cursor = connection.cursor()
+            cursor.execute(
+                "SELECT chunk, stats FROM job_checkpoints"
+                f" WHERE job = {self._markers[0]}",
+                (self.name,),
+            )
+            return {
+                chunk: RecalculationStats(**json.loads(stats))
+                for chunk, stats in cursor.fetchall()
+            }
+
+    def _progress(
+        self,
+        chunk_count: int,
+        chunks_done: int,
+        totals: RecalculationStats,
+        started: float,
+        chunks_this_run: int,
+        rows_this_run: int,
+    ) -> JobProgress:
+        elapsed = time.monotonic() - started
+
+        eta = None
+        if chunks_this_run:
+            eta = (chunk_count - chunks_done) * elapsed / chunks_this_run
+
+        return JobProgress(
+            chunk_count=chunk_count,
+            chunks_done=chunks_done,
+            totals=dataclasses.replace(totals),
+            elapsed=elapsed,
+            rows_per_second=rows_this_run / elapsed if elapsed > 0 else 0.0,
+            eta=eta,
+        )
+
+    def progress(self) -> JobProgress:
+        """How far the job has got, from its checkpoints alone."""
+        totals = RecalculationStats()
+        completed = self.completed()
+        for stats in completed.values():
+            _add_stats(totals, stats)
+
+        return self._progress(
+            len(self.chunks()),
+            len(completed),
+            totals,
+            time.monotonic(),
+            chunks_this_run=0,
+            rows_this_run=0,
+        )
+
+    def run(self, max_chunks: Optional[int] = None) -> JobProgress:
+        """Process every chunk without a checkpoint, in order, or only the
+        first `max_chunks` of them."""
+        chunks = self.chunks()
+        completed = self.completed()
+
+        totals = RecalculationStats()
+        for stats in completed.values():
+            _add_stats(totals, stats)
+
+        pending = [chunk for chunk in chunks if chunk.number not in completed]
+        if max_chunks is not None:
+            pending = pending[:max_chunks]
+
+        chunks_done = len(completed)
+        chunks_this_run = 0
+        rows_this_run = 0
+
+        started = time.monotonic()
+        for chunk in pending:
+            chunk_started = time.monotonic()
+            with self.pool.connection() as connection:
+                stats = self.process(connection, chunk)
+
+                cursor = connection.cursor()
+                cursor.execute(
+                    "INSERT INTO job_checkpoints (job, chunk, stats, seconds)"
+                    " VALUES ({}, {}, {}, {})".format(*self._markers),
+                    (
+                        self.name,
+                        chunk.number,
+                        json.dumps(dataclasses.asdict(stats)),
+                        time.monotonic() - chunk_started,
+                    ),
+                )
+                connection.commit()
+
+            _add_stats(totals, stats)
+            chunks_done += 1
+            chunks_this_run += 1
+            rows_this_run += stats.rows_read
+
+            if self.on_progress is not None:
+                self.on_progress(
+                    self._progress(
+                        len(chunks),
+                        chunks_done,
+                        totals,
+                        started,
+                        chunks_this_run,
+                        rows_this_run,
+                    ),
+                )
+
+        return self._progress(
+            len(chunks),
+            chunks_done,
+            totals,
+            started,
+            chunks_this_run,
+            rows_this_run,
+        )
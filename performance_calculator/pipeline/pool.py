@@ -0,0 +1,62 @@
+from __future__ import annotations
+
+import queue
+import threading
+from contextlib import contextmanager
+from typing import Any
+from typing import Callable
+from typing import Iterator
+
+DEFAULT_POOL_SIZE = 4
+
+
+class ConnectionPool:
+    """Up to `size` DB-API connections, made by `connect` as needed."""
+
+    def __init__(
+        self,
+        connect: Callable[[], Any],
+        size: int = DEFAULT_POOL_SIZE,
+    ) -> None:
+        self._connect = connect
+        self.size = size
+
+        self._idle: queue.LifoQueue[Any] = queue.LifoQueue()
+        self._created = 0
+        self._lock = threading.Lock()
+
+    def _acquire(self) -> Any:
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+
+        with self._lock:
+            create = self._created < self.size
+            if create:
+                self._created += 1
+
+        if create:
+            return self._connect()
+
+        return self._idle.get()
+
+    @contextmanager
+    def connection(self) -> Iterator[Any]:
+        """A connection for the duration of the block, rolled back if it
+        raises."""
+        connection = self._acquire()
+        try:
+            yield connection
+        except BaseException:
+            connection.rollback()
+            raise
+        finally:
+            self._idle.put(connection)
+
+    def close(self) -> None:
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                break
@@ -0,0 +1,189 @@
+from __future__ import annotations
+
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Callable
+from typing import Generic
+from typing import Hashable
+from typing import Iterable
+from typing import Iterator
+from typing import Optional
+from typing import TypeVar
+
+from performance_calculator.models.path import Path
+
+T = TypeVar("T")
+
+DEFAULT_DEPTH = 8
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+# how many items (not beatmaps) may wait in the look-ahead window,
+# so long runs of scores on one map can't pull the whole stream in
+MAX_PENDING_ITEMS = 1024
+
+
+def read_beatmap(beatmap: Hashable) -> bytes:
+    """Read a .osu file path or anything with `read_bytes`,
+    like the sources in `performance_calculator.models.beatmap_source`."""
+    if isinstance(beatmap, str):
+        return Path(beatmap).read_bytes()
+
+    return beatmap.read_bytes()  # type: ignore
+
+
+@dataclass
+class PrefetchStats:
+    loads: int = 0
+    bytes_loaded: int = 0
+    # how long, and how often, the calculation stage waited on a read
+    stall_time: float = 0.0
+    stalls: int = 0
+    # most buffered bytes held at once
+    peak_bytes: int = 0
+
+
+class BeatmapPrefetcher(Generic[T]):
+    """Reads the beatmaps of the next `depth` distinct maps in a stream of
+    items (usually scores) on background threads, yielding each item with
+    its beatmap's contents once they're ready.
+
+    Items are yielded in order. No new map is read while `max_bytes` of
+    read-ahead buffers are held or being read, and a map's buffer is
+    dropped as soon as no item in the window needs it.
+    """
+
+    def __init__(
+        self,
+        items: Iterable[T],
+        beatmap_of: Callable[[T], Hashable],
+        load: Callable[[Hashable], bytes] = read_beatmap,
+        depth: int = DEFAULT_DEPTH,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+        workers: Optional[int] = None,
+    ) -> None:
+        if depth < 1:
+            raise ValueError("depth must be at least 1")
+
+        self.items = items
+        self.beatmap_of = beatmap_of
+        self.load = load
+        self.depth = depth
+        self.max_bytes = max_bytes
+        self.workers = workers or depth
+
+        self.stats = PrefetchStats()
+        self._stats_lock = threading.Lock()
+
+    def _load(self, beatmap: Hashable) -> bytes:
+        content = self.load(beatmap)
+
+        with self._stats_lock:
+            self.stats.loads += 1
+            self.stats.bytes_loaded += len(content)
+
+        return content
+
+    @staticmethod
+    def _held_bytes(buffers: dict[Hashable, Future[bytes]]) -> int:
+        return sum(
+            len(future.result())
+            for future in buffers.values()
+            if future.done() and future.exception() is None
+        )
+
+    def _expected_bytes(self, buffers: dict[Hashable, Future[bytes]]) -> int:
+        """Bytes held, counting reads still in flight at the average size."""
+        with self._stats_lock:
+            loads = self.stats.loads
+            bytes_loaded = self.stats.bytes_loaded
+
+        if not loads:
+            # nothing to estimate from, read one map at a time until then
+            return self.max_bytes
+
+        in_flight = sum(not future.done() for future in buffers.values())
+        return self._held_bytes(buffers) + in_flight * bytes_loaded // loads
+
+    def __iter__(self) -> Iterator[tuple[T, bytes]]:
+        items = iter(self.items)
+        window: deque[tuple[T, Hashable]] = deque()
+        buffers: dict[Hashable, Future[bytes]] = {}
+        references: dict[Hashable, int] = {}
+        upcoming: Optional[tuple[T, Hashable]] = None
+        exhausted = False
+
+        executor = ThreadPoolExecutor(self.workers)
+
+        def fill() -> None:
+            nonlocal upcoming, exhausted
+
+            while not exhausted and len(window) < MAX_PENDING_ITEMS:
+                if upcoming is None:
+                    try:
+                        item = next(items)
+                    except StopIteration:
+                        exhausted = True
+                        break
+
+                    upcoming = (item, self.beatmap_of(item))
+
+                beatmap = upcoming[1]
+                if beatmap not in buffers:
+                    if buffers and (
+                        len(buffers) >= self.depth
+                        or self._expected_bytes(buffers) >= self.max_bytes
+                    ):
+                        break
+
+                    buffers[beatmap] = executor.submit(self._load, beatmap)
+                    references[beatmap] = 0
+
+                references[beatmap] += 1
+                window.append(upcoming)
+                upcoming = None
+
+        try:
+            fill()
+
+            while window:
+                item, beatmap = window.popleft()
+
+                future = buffers[beatmap]
+                if not future.done():
+                    started_at = time.perf_counter()
+                    future.exception()  # waits without raising
+                    self.stats.stall_time += time.perf_counter() - started_at
+                    self.stats.stalls += 1
+
+                self.stats.peak_bytes = max(
+                    self.stats.peak_bytes,
+                    self._held_bytes(buffers),
+                )
+                content = future.result()
+
+                references[beatmap] -= 1
+                if not references[beatmap]:
+                    del buffers[beatmap]
+                    del references[beatmap]
+
+                fill()
+                yield item, content
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+
+def prefetch_beatmaps(
+    items: Iterable[T],
+    beatmap_of: Callable[[T], Hashable],
+    load: Callable[[Hashable], bytes] = read_beatmap,
+    depth: int = DEFAULT_DEPTH,
+    max_bytes: int = DEFAULT_MAX_BYTES,
+    workers: Optional[int] = None,
+) -> Iterator[tuple[T, bytes]]:
+    return iter(
+        BeatmapPrefetcher(items, beatmap_of, load, depth, max_bytes, workers),
+    )
@@ -0,0 +1,332 @@
+from __future__ import annotations
+
+from abc import ABC
+from abc import abstractmethod
+from dataclasses import dataclass
+from typing import Any
+from typing import Callable
+from typing import Mapping
+from typing import Optional
+from typing import Sequence
+from typing import Union
+
+import numpy as np
+
+from performance_calculator.attribute_provider import AttributeKey
+from performance_calculator.attribute_provider import canonical_key
+from performance_calculator.live import performance_calculator_for
+from performance_calculator.models.beatmap_source import BeatmapFile
+from performance_calculator.models.difficulty import DifficultyAttributes
+from performance_calculator.models.score_arrays import SCORE_DTYPE
+from performance_calculator.pipeline.batch import calculate_batch
+from performance_calculator.pipeline.batch import CalculatorFactory
+from performance_calculator.pipeline.batch import ScoreBatch
+from performance_calculator.pipeline.incremental import DEFAULT_EPSILON
+from performance_calculator.pipeline.incremental import OPPAI_MODS
+from performance_calculator.pipeline.pool import ConnectionPool
+from performance_calculator.pipeline.score_table import placeholders
+from performance_calculator.pipeline.score_table import SCORE_COLUMNS
+from performance_calculator.rulesets.osu.oppai_performance import (
+    calculate_oppai_pp_many,
+)
+from performance_calculator.rulesets.osu.oppai_performance import (
+    OppaiAttributeCache,
+)
+
+DEFAULT_PAGE_SIZE = 10_000
+
+# every distinct (beatmap id, mode, difficulty mods) of a page, to the
+# attributes of the ones that have any
+AttributeLookup = Callable[
+    [Sequence[AttributeKey]],
+    Mapping[AttributeKey, DifficultyAttributes],
+]
+
+# an osu! map's file by beatmap id, or None if there isn't one
+BeatmapLookup = Callable[[int], Optional[Union[str, BeatmapFile]]]
+
+
+@dataclass
+class RecalculationStats:
+    pages: int = 0
+    rows_read: int = 0
+    rows_written: int = 0
+    rows_without_attributes: int = 0
+    # the id of the last score read, to carry on after
+    last_id: Optional[int] = None
+
+
+class PagedRecalculator(ABC):
+    """Recalculates the pp of some of a score table's rows over any DB-API
+    driver.
+
+    Rows are read a page at a time in id order, and only scores whose pp
+    moved by more than `epsilon` are written back, in one `executemany` per
+    page. Subclasses pick the rows with `conditions` and score them.
+    """
+
+    def __init__(
+        self,
+        pool: ConnectionPool,
+        # SQL conditions with a `{}` for each of `parameters`
+        conditions: Sequence[str],
+        parameters: Sequence[Any],
+        paramstyle: str,
+        page_size: int,
+        epsilon: float,
+    ) -> None:
+        self.pool = pool
+        self.page_size = page_size
+        self.epsilon = epsilon
+        self._parameters = list(parameters)
+
+        # keyset pagination, rather than an ever slower OFFSET
+        conditions = ["id > {}", "id <= {}", *conditions]
+
+        markers = placeholders(paramstyle, len(parameters) + 3)
+        self._select = (
+            "SELECT id, user_id, beatmap_id, mode, pp, "
+            + ", ".join(SCORE_COLUMNS)
+            + " FROM scores WHERE "
+            + " AND ".join(conditions)
+            + " ORDER BY id LIMIT {}"
+        ).format(*markers)
+        self._update = "UPDATE scores SET pp = {} WHERE id = {}".format(
+            *placeholders(paramstyle, 2),
+        )
+
+    def _read_page(self, connection: Any, after_id: int, stop_id: int) -> list[Any]:
+        cursor = connection.cursor()
+        cursor.execute(
+            self._select,
+            [after_id, stop_id, *self._parameters, self.page_size],
+        )
+        return cursor.fetchall()
+
+    @abstractmethod
+    def recalculate_rows(
+        self,
+        rows: Sequence[Sequence[Any]],
+    ) -> tuple[list[tuple[float, int]], int]:
+        """(pp, id) of the rows whose pp changed, and how many rows had no
+        attributes. Rows are (id, user_id, beatmap_id, mode, pp,
+        *SCORE_COLUMNS)."""
+        ...
+
+    def _recalculate_page(
+        self,
+        connection: Any,
+        after_id: int,
+        stop_at: int,
+        stats: RecalculationStats,
+    ) -> list[Any]:
+        """Recalculate the next page after `after_id` without committing, and
+        return its rows."""
+        rows = self._read_page(connection, after_id, stop_at)
+        if not rows:
+            return rows
+
+        updates, without_attributes = self.recalculate_rows(rows)
+        if updates:
+            cursor = connection.cursor()
+            cursor.executemany(self._update, updates)
+
+        stats.pages += 1
+        stats.rows_read += len(rows)
+        stats.rows_written += len(updates)
+        stats.rows_without_attributes += without_attributes
+        stats.last_id = rows[-1][0]
+        return rows
+
+    def run(
+        self,
+        start_after: int = 0,
+        stop_at: int = 2**63 - 1,
+        stats: Optional[RecalculationStats] = None,
+    ) -> RecalculationStats:
+        """Recalculate the scores with ids in (start_after, stop_at],
+        committing after every page."""
+        if stats is None:
+            stats = RecalculationStats()
+
+        after_id = start_after
+        while True:
+            with self.pool.connection() as connection:
+                rows = self._recalculate_page(connection, after_id, stop_at, stats)
+                connection.commit()
+
+            if len(rows) < self.page_size:
+                break
+
+            after_id = rows[-1][0]
+
+        return stats
+
+    def recalculate_range(
+        self,
+        connection: Any,
+        start_after: int,
+        stop_at: int,
+    ) -> RecalculationStats:
+        """Recalculate the scores with ids in (start_after, stop_at] on
+        `connection`, leaving the caller to commit them all at once."""
+        stats = RecalculationStats()
+
+        after_id = start_after
+        while True:
+            rows = self._recalculate_page(connection, after_id, stop_at, stats)
+            if len(rows) < self.page_size:
+                break
+
+            after_id = rows[-1][0]
+
+        return stats
+
+
+class BatchRecalculator(PagedRecalculator):
+    """Recalculates the pp of a score table with the lazer formulas.
+
+    Each page's attributes are looked up in one call. osu! relax and
+    autopilot scores are left alone, as they're oppai's to score; see
+    `OppaiRecalculator`.
+    """
+
+    def __init__(
+        self,
+        pool: ConnectionPool,
+        attributes_for: AttributeLookup,
+        paramstyle: str = "qmark",
+        page_size: int = DEFAULT_PAGE_SIZE,
+        epsilon: float = DEFAULT_EPSILON,
+        calculator_factory: CalculatorFactory = performance_calculator_for,
+        mode: Optional[int] = None,
+        # only the scores on maps with ids in [first, last]
+        beatmap_range: Optional[tuple[int, int]] = None,
+    ) -> None:
+        self.attributes_for = attributes_for
+        self.calculator_factory = calculator_factory
+        self.mode = mode
+        self.beatmap_range = beatmap_range
+
+        conditions: list[str] = []
+        parameters: list[int] = []
+        if mode is not None:
+            conditions.append("mode = {}")
+            parameters.append(mode)
+        if mode is None or mode == 0:
+            conditions.append("(mode != 0 OR (mods & {}) = 0)")
+            parameters.append(OPPAI_MODS)
+        if beatmap_range is not None:
+            conditions.extend(("beatmap_id >= {}", "beatmap_id <= {}"))
+            parameters.extend(beatmap_range)
+
+        super().__init__(
+            pool,
+            conditions,
+            parameters,
+            paramstyle,
+            page_size,
+            epsilon,
+        )
+
+    def recalculate_rows(
+        self,
+        rows: Sequence[Sequence[Any]],
+    ) -> tuple[list[tuple[float, int]], int]:
+        """(pp, id) of the rows whose pp changed, and how many rows had no
+        attributes. Rows are (id, user_id, beatmap_id, mode, pp,
+        *SCORE_COLUMNS)."""
+        keys = [canonical_key(AttributeKey(row[2], row[3], row[5])) for row in rows]
+        attributes = self.attributes_for(list(dict.fromkeys(keys)))
+
+        known = [i for i, key in enumerate(keys) if key in attributes]
+        if not known:
+            return [], len(rows)
+
+        key_list = list(attributes)
+        key_indices = {key: i for i, key in enumerate(key_list)}
+
+        batch = ScoreBatch(
+            scores=np.array([tuple(rows[i][5:]) for i in known], dtype=SCORE_DTYPE),
+            user_ids=np.array([rows[i][1] for i in known], dtype=np.int64),
+            beatmap_ids=np.array([rows[i][2] for i in known], dtype=np.int64),
+            attributes=[attributes[key] for key in key_list],
+            attribute_indices=np.array(
+                [key_indices[keys[i]] for i in known],
+                dtype=np.int64,
+            ),
+        )
+        ids = np.array([rows[i][0] for i in known], dtype=np.int64)
+        old_pp = np.array([rows[i][4] for i in known], dtype=np.float64)
+
+        new_pp = calculate_batch(batch, self.calculator_factory)
+        changed = np.abs(new_pp - old_pp) > self.epsilon
+
+        updates = list(zip(new_pp[changed].tolist(), ids[changed].tolist()))
+        return updates, len(rows) - len(known)
+
+
+class OppaiRecalculator(PagedRecalculator):
+    """Recalculates the pp of a score table's osu! relax and autopilot
+    scores with oppai's formulas.
+
+    Each (map, mods) is only parsed once, through `cache`, keyed by beatmap
+    id. Scores on maps `beatmap_for` has no file of count as without
+    attributes.
+    """
+
+    def __init__(
+        self,
+        pool: ConnectionPool,
+        cache: OppaiAttributeCache,
+        beatmap_for: BeatmapLookup,
+        paramstyle: str = "qmark",
+        page_size: int = DEFAULT_PAGE_SIZE,
+        epsilon: float = DEFAULT_EPSILON,
+    ) -> None:
+        self.cache = cache
+        self.beatmap_for = beatmap_for
+
+        super().__init__(
+            pool,
+            ["mode = 0", "(mods & {}) != 0"],
+            [OPPAI_MODS],
+            paramstyle,
+            page_size,
+            epsilon,
+        )
+
+    def recalculate_rows(
+        self,
+        rows: Sequence[Sequence[Any]],
+    ) -> tuple[list[tuple[float, int]], int]:
+        groups: dict[tuple[int, int], list[int]] = {}
+        for i, row in enumerate(rows):
+            groups.setdefault((row[2], row[5]), []).append(i)
+
+        updates: list[tuple[float, int]] = []
+        without_attributes = 0
+        for (beatmap_id, mods), indices in groups.items():
+            beatmap = self.beatmap_for(beatmap_id)
+            if beatmap is None:
+                without_attributes += len(indices)
+                continue
+
+            attributes = self.cache.get(beatmap, mods, beatmap_id)
+            group = [rows[i] for i in indices]
+
+            # stored as a fraction or as a percentage, which oppai takes
+            accuracy = np.array([row[7] for row in group], dtype=np.float64)
+            new_pp = calculate_oppai_pp_many(
+                attributes,
+                np.where(accuracy > 1.0, accuracy, accuracy * 100.0),
+                np.array([row[6] for row in group], dtype=np.float64),
+                np.array([row[13] for row in group], dtype=np.float64),
+            )
+            old_pp = np.array([row[4] for row in group], dtype=np.float64)
+            changed = np.abs(new_pp - old_pp) > self.epsilon
+
+            ids = np.array([row[0] for row in group], dtype=np.int64)
+            updates.extend(zip(new_pp[changed].tolist(), ids[changed].tolist()))
+
+        return updates, without_attributes
@@ -0,0 +1,65 @@
+from __future__ import annotations
+
+from typing import Any
+
+SCORE_COLUMNS = (
+    "mods",
+    "max_combo",
+    "accuracy",
+    "num_300s",
+    "num_100s",
+    "num_50s",
+    "num_gekis",
+    "num_katus",
+    "num_misses",
+)
+
+# a stand-in for the real score and stats tables
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS scores (
+    id INTEGER PRIMARY KEY,
+    user_id INTEGER NOT NULL,
+    beatmap_id INTEGER NOT NULL,
+    mode INTEGER NOT NULL,
+    mods INTEGER NOT NULL,
+    max_combo INTEGER NOT NULL,
+    accuracy REAL NOT NULL,
+    num_300s INTEGER NOT NULL,
+    num_100s INTEGER NOT NULL,
+    num_50s INTEGER NOT NULL,
+    num_gekis INTEGER NOT NULL,
+    num_katus INTEGER NOT NULL,
+    num_misses INTEGER NOT NULL,
+    pp REAL NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS scores_beatmap ON scores (beatmap_id, mods);
+CREATE INDEX IF NOT EXISTS scores_user ON scores (user_id, mode);
+CREATE TABLE IF NOT EXISTS user_stats (
+    user_id INTEGER NOT NULL,
+    mode INTEGER NOT NULL,
+    pp REAL NOT NULL,
+    PRIMARY KEY (user_id, mode)
+);
+"""
+
+
+def create_tables(connection: Any) -> None:
+    """Create the stand-in tables over any DB-API connection."""
+    cursor = connection.cursor()
+    for statement in SCHEMA.split(";"):
+        if statement.strip():
+            cursor.execute(statement)
+
+    connection.commit()
+
+
+def placeholders(paramstyle: str, count: int) -> list[str]:
+    """`count` positional parameter markers in a DB-API `paramstyle`."""
+    if paramstyle == "qmark":
+        return ["?"] * count
+    elif paramstyle in ("format", "pyformat"):
+        return ["%s"] * count
+    elif paramstyle == "numeric":
+        return [f":{i}" for i in range(1, count + 1)]
+
+    raise ValueError(f"unsupported paramstyle {paramstyle}")
@@ -0,0 +1,402 @@
+from __future__ import annotations
+
+import dataclasses
+import json
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any
+from typing import Callable
+from typing import NamedTuple
+from typing import Optional
+from typing import Sequence
+
+from performance_calculator.pipeline.pool import ConnectionPool
+from performance_calculator.pipeline.recalculate import RecalculationStats
+from performance_calculator.pipeline.score_table import placeholders
+
+DEFAULT_LEASE_SECONDS = 300.0
+# a lease is renewed this many times over its length, so one late
+# heartbeat doesn't lose it
+HEARTBEATS_PER_LEASE = 3
+# how often an idle worker asks again while other workers hold the last shards
+DEFAULT_POLL_SECONDS = 5.0
+
+MAX_BEATMAP_ID = 2**63 - 1
+
+QUEUE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS work_shards (
+    queue TEXT NOT NULL,
+    shard INTEGER NOT NULL,
+    first_beatmap_id INTEGER NOT NULL,
+    last_beatmap_id INTEGER NOT NULL,
+    status INTEGER NOT NULL,
+    worker TEXT,
+    lease_expires REAL,
+    attempts INTEGER NOT NULL,
+    stats TEXT,
+    PRIMARY KEY (queue, shard)
+);
+"""
+
+
+class ShardStatus:
+    PENDING = 0
+    LEASED = 1
+    DONE = 2
+
+
+class Shard(NamedTuple):
+    number: int
+    # the scores on maps with ids in [first_beatmap_id, last_beatmap_id]
+    first_beatmap_id: int
+    last_beatmap_id: int
+
+
+def beatmap_score_counts(
+    connection: Any,
+    mode: Optional[int] = None,
+    paramstyle: str = "qmark",
+) -> list[tuple[int, int]]:
+    """(beatmap id, score count) of every map with scores, by beatmap id."""
+    query = "SELECT beatmap_id, COUNT(*) FROM scores"
+    parameters: list[int] = []
+    if mode is not None:
+        query += " WHERE mode = " + placeholders(paramstyle, 1)[0]
+        parameters.append(mode)
+
+    cursor = connection.cursor()
+    cursor.execute(query + " GROUP BY beatmap_id ORDER BY beatmap_id", parameters)
+    return [tuple(row) for row in cursor.fetchall()]
+
+
+def plan_shards(
+    score_counts: Sequence[tuple[int, int]],
+    shard_count: int,
+) -> list[Shard]:
+    """Up to `shard_count` contiguous beatmap id ranges with about as many
+    scores each, from `beatmap_score_counts`.
+
+    Every map's scores land in one shard, so each node only needs the
+    attributes of its own maps. The same counts always give the same
+    shards, and together they cover every beatmap id, so maps added since
+    the counts were taken still belong to a shard.
+    """
+    if shard_count < 1:
+        raise ValueError("shard count must be at least 1")
+
+    total = sum(count for _, count in score_counts)
+
+    shards = []
+    first_beatmap_id = 0
+    previous_beatmap_id = -1
+    running_count = 0
+    for beatmap_id, count in score_counts:
+        target = total * (len(shards) + 1) / shard_count
+
+        # cut where the running count comes closest to this shard's share
+        if (
+            len(shards) < shard_count - 1
+            and previous_beatmap_id >= first_beatmap_id
+            and running_count + count - target > target - running_count
+        ):
+            shards.append(Shard(len(shards), first_beatmap_id, previous_beatmap_id))
+            first_beatmap_id = previous_beatmap_id + 1
+
+        running_count += count
+        previous_beatmap_id = beatmap_id
+
+    shards.append(Shard(len(shards), first_beatmap_id, MAX_BEATMAP_ID))
+    return shards
+
+
+@dataclass
+class Lease:
+    shard: Shard
+    worker: str
+    # which claim of the shard this is, so a reclaimed lease can't be
+    # renewed or completed by its old holder
+    token: int
+
+
+class WorkQueue:
+    """Shards of a recalculation in a database shared by every node.
+
+    Workers claim shards with a lease of `lease_seconds`, renewed by
+    heartbeats while they work. A shard whose lease runs out, because its
+    worker died, goes to the next worker that asks for one. Lease times
+    are wall clock times, so nodes' clocks should roughly agree.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        pool: ConnectionPool,
+        paramstyle: str = "qmark",
+        lease_seconds: float = DEFAULT_LEASE_SECONDS,
+    ) -> None:
+        self.name = name
+        self.pool = pool
+        self.lease_seconds = lease_seconds
+
+        self._markers = placeholders(paramstyle, 9)
+
+        with self.pool.connection() as connection:
+            cursor = connection.cursor()
+            cursor.execute(QUEUE_SCHEMA)
+            connection.commit()
+
+    @classmethod
+    def open(
+        cls,
+        name: str,
+        path: str,
+        lease_seconds: float = DEFAULT_LEASE_SECONDS,
+        pool_size: int = 2,
+    ) -> WorkQueue:
+        """A queue in a SQLite file, which several local processes can share."""
+        return cls(
+            name,
+            ConnectionPool(
+                lambda: sqlite3.connect(path, timeout=60, check_same_thread=False),
+                pool_size,
+            ),
+            lease_seconds=lease_seconds,
+        )
+
+    def _execute(self, query: str, parameters: Sequence[Any]) -> int:
+        """Run one statement in its own transaction, and return how many
+        rows it changed."""
+        with self.pool.connection() as connection:
+            cursor = connection.cursor()
+            cursor.execute(query.format(*self._markers), parameters)
+            connection.commit()
+            return cursor.rowcount
+
+    def _select(self, query: str, parameters: Sequence[Any]) -> list[Any]:
+        with self.pool.connection() as connection:
+            cursor = connection.cursor()
+            cursor.execute(query.format(*self._markers), parameters)
+            rows = cursor.fetchall()
+            connection.commit()
+            return rows
+
+    def plan(self, shards: Sequence[Shard]) -> list[Shard]:
+        """Store the queue's shards, unless it already has some, and return
+        the stored ones."""
+        planned = self.shards()
+        if planned:
+            return planned
+
+        with self.pool.connection() as connection:
+            cursor = connection.cursor()
+            cursor.executemany(
+                "INSERT INTO work_shards (queue, shard, first_beatmap_id,"
+                " last_beatmap_id, status, attempts)"
+                " VALUES ({}, {}, {}, {}, {}, 0)".format(*self._markers),
+                [(self.name, *shard, ShardStatus.PENDING) for shard in shards],
+            )
+            connection.commit()
+
+        return list(shards)
+
+    def shards(self) -> list[Shard]:
+        rows = self._select(
+            "SELECT shard, first_beatmap_id, last_beatmap_id FROM work_shards"
+            " WHERE queue = {} ORDER BY shard",
+            (self.name,),
+        )
+        return [Shard(*row) for row in rows]
+
+    def claim(self, worker: str) -> Optional[Lease]:
+        """Lease the first shard that's pending or whose lease ran out, or
+        None if there are none right now."""
+        now = time.time()
+        candidates = self._select(
+            "SELECT shard, first_beatmap_id, last_beatmap_id, attempts"
+            " FROM work_shards WHERE queue = {} AND (status = {}"
+            " OR (status = {} AND lease_expires < {})) ORDER BY shard",
+            (self.name, ShardStatus.PENDING, ShardStatus.LEASED, now),
+        )
+
+        for number, first_beatmap_id, last_beatmap_id, attempts in candidates:
+            # only takes it if nobody has claimed or renewed it since
+            claimed = self._execute(
+                "UPDATE work_shards SET status = {}, worker = {},"
+                " lease_expires = {}, attempts = attempts + 1"
+                " WHERE queue = {} AND shard = {} AND attempts = {}"
+                " AND (status = {} OR (status = {} AND lease_expires < {}))",
+                (
+                    ShardStatus.LEASED,
+                    worker,
+                    now + self.lease_seconds,
+                    self.name,
+                    number,
+                    attempts,
+                    ShardStatus.PENDING,
+                    ShardStatus.LEASED,
+                    now,
+                ),
+            )
+            if claimed:
+                return Lease(
+                    Shard(number, first_beatmap_id, last_beatmap_id),
+                    worker,
+                    attempts + 1,
+                )
+
+        return None
+
+    def heartbeat(self, lease: Lease) -> bool:
+        """Renew a lease, or return False if it was lost to another worker."""
+        return bool(
+            self._execute(
+                "UPDATE work_shards SET lease_expires = {}"
+                " WHERE queue = {} AND shard = {} AND attempts = {}"
+                " AND status = {}",
+                (
+                    time.time() + self.lease_seconds,
+                    self.name,
+                    lease.shard.number,
+                    lease.token,
+                    ShardStatus.LEASED,
+                ),
+            ),
+        )
+
+    def complete(self, lease: Lease, stats: RecalculationStats) -> bool:
+        """Mark a shard done, or return False if its lease was lost to
+        another worker, which will do it again."""
+        return bool(
+            self._execute(
+                "UPDATE work_shards SET status = {}, stats = {}"
+                " WHERE queue = {} AND shard = {} AND attempts = {}"
+                " AND status = {}",
+                (
+                    ShardStatus.DONE,
+                    json.dumps(dataclasses.asdict(stats)),
+                    self.name,
+                    lease.shard.number,
+                    lease.token,
+                    ShardStatus.LEASED,
+                ),
+            ),
+        )
+
+    def release(self, lease: Lease) -> None:
+        """Give a shard back straight away, after failing it."""
+        self._execute(
+            "UPDATE work_shards SET status = {}, lease_expires = NULL"
+            " WHERE queue = {} AND shard = {} AND attempts = {}"
+            " AND status = {}",
+            (
+                ShardStatus.PENDING,
+                self.name,
+                lease.shard.number,
+                lease.token,
+                ShardStatus.LEASED,
+            ),
+        )
+
+    def status_counts(self) -> dict[int, int]:
+        """How many shards have each `ShardStatus`."""
+        rows = self._select(
+            "SELECT status, COUNT(*) FROM work_shards WHERE queue = {}"
+            " GROUP BY status",
+            (self.name,),
+        )
+        return dict(rows)
+
+    def finished(self) -> bool:
+        counts = self.status_counts()
+        return sum(counts.values()) == counts.get(ShardStatus.DONE, 0)
+
+    def completed(self) -> dict[int, RecalculationStats]:
+        """The stats of every finished shard, by shard number."""
+        rows = self._select(
+            "SELECT shard, stats FROM work_shards WHERE queue = {} AND status = {}",
+            (self.name, ShardStatus.DONE),
+        )
+        return {
+            number: RecalculationStats(**json.loads(stats)) for number, stats in rows
+        }
+
+
+class _Heartbeat(threading.Thread):
+    def __init__(self, queue: WorkQueue, lease: Lease) -> None:
+        super().__init__(daemon=True)
+        self.queue = queue
+        self.lease = lease
+
+        self._stopped = threading.Event()
+
+    def run(self) -> None:
+        interval = self.queue.lease_seconds / HEARTBEATS_PER_LEASE
+        while not self._stopped.wait(interval):
+            if not self.queue.heartbeat(self.lease):
+                # lost to another worker, which will do the shard again
+                return
+
+    def stop(self) -> None:
+        self._stopped.set()
+        self.join()
+
+
+class ShardWorker:
+    """Claims and processes shards until the queue is finished.
+
+    `process` recalculates one shard and commits its own writes. A shard
+    whose lease is lost midway is done again by whoever reclaimed it, so
+    processing has to be idempotent, as recalculating pp is.
+    """
+
+    def __init__(
+        self,
+        queue: WorkQueue,
+        worker: str,
+        process: Callable[[Shard], RecalculationStats],
+        poll_seconds: float = DEFAULT_POLL_SECONDS,
+    ) -> None:
+        self.queue = queue
+        self.worker = worker
+        self.process = process
+        self.poll_seconds = poll_seconds
+
+    def run_one(self) -> Optional[Lease]:
+        """Claim and process one shard, if any can be claimed. Returns the
+        lease, whether or not it was still held at the end."""
+        lease = self.queue.claim(self.worker)
+        if lease is None:
+            return None
+
+        heartbeat = _Heartbeat(self.queue, lease)
+        heartbeat.start()
+        try:
+            stats = self.process(lease.shard)
+        except BaseException:
+            heartbeat.stop()
+            self.queue.release(lease)
+            raise
+
+        heartbeat.stop()
+        self.queue.complete(lease, stats)
+        return lease
+
+    def run(self, max_shards: Optional[int] = None) -> list[int]:
+        """Process shards until none are left, or `max_shards` of them, and
+        return the numbers of the ones processed."""
+        processed: list[int] = []
+        while max_shards is None or len(processed) < max_shards:
+            lease = self.run_one()
+            if lease is not None:
+                processed.append(lease.shard.number)
+                continue
+
+            # the rest are leased, wait in case a lease runs out
+            if self.queue.finished():
+                break
+
+            time.sleep(self.poll_seconds)
+
+        return processed
@@ -1,13 +1,13 @@
 from __future__ import annotations
 
-import math
 from dataclasses import dataclass
-from typing import Callable
+from typing import Any
 
+from performance_calculator.models.difficulty import DifficultyAttributes
 from performance_calculator.models.mods import Mods
 from performance_calculator.models.performance import PerformanceAttributes
 from performance_calculator.models.performance import PerformanceCalculator
-from performance_calculator.models.score import Score
+from performance_calculator.models.performance import ScalarMath
 from performance_calculator.rulesets.catch.difficulty import CatchDifficultyAttributes
 
 
@@ -16,29 +16,54 @@ class CatchPerformanceAttributes(PerformanceAttributes):
     ...
 
 
-clamp: Callable[[float, float, float], float] = (
-    lambda x, l, u: l if x < l else u if x > u else x
-)
-
-
 class CatchPerformanceCalculator(PerformanceCalculator):
     difficulty_attributes: CatchDifficultyAttributes
 
-    def calculate(self, score: Score) -> CatchPerformanceAttributes:
+    def __init__(
+        self,
+        difficulty_attributes: DifficultyAttributes,
+        xp: Any = ScalarMath,
+    ) -> None:
+        super().__init__(difficulty_attributes, xp)
+        attributes = self.difficulty_attributes
+
+        # everything that only depends on the map,
+        # so calculators can be reused for many scores
+        self._base_value = (
+            xp.power(5.0 * xp.maximum(1.0, attributes.star_rating / 0.0049) - 4.0, 2.0)
+            / 100000.0
+        )
+        # maps without combo don't scale by it
+        self._scaled_max_combo = xp.power(xp.maximum(attributes.max_combo, 1), 0.8)
+
+        approach_rate = attributes.approach_rate
+        self._approach_rate_factor = 1.0
+
+        self._approach_rate_factor += xp.where(
+            approach_rate > 9.0,
+            0.1 * (approach_rate - 9.0),
+            0.0,
+        )
+
+        self._approach_rate_factor += xp.where(
+            approach_rate > 10.0,
+            0.1 * (approach_rate - 10.0),
+            xp.where(approach_rate < 8.0, 0.025 * (8.0 - approach_rate), 0.0),
+        )
+
+        self._hidden_bonus = xp.where(
+            approach_rate <= 10.0,
+            1.05 + 0.075 * (10.0 - approach_rate),
+            1.01 + 0.04 * (11.0 - xp.minimum(11.0, approach_rate)),
+        )
+
+    def _calculate(self, xp: Any, score: Any) -> CatchPerformanceAttributes:
         fruits_hit = score.num_300s
         ticks_hit = score.num_100s
         tiny_ticks_hit = score.num_50s
         tiny_ticks_missed = score.num_katus
         misses = score.num_misses
 
-        value = (
-            math.pow(
-                5.0 * max(1.0, self.difficulty_attributes.star_rating / 0.0049) - 4.0,
-                2.0,
-            )
-            / 100000.0
-        )
-
         total_combo_hits = misses + ticks_hit + fruits_hit
         total_hits = (
             tiny_ticks_hit + ticks_hit + fruits_hit + misses + tiny_ticks_missed
@@ -47,52 +72,36 @@ class CatchPerformanceCalculator(PerformanceCalculator):
 
         length_bonus = (
             0.95
-            + 0.3 * min(1.0, total_combo_hits / 2500.0)
-            + (
-                (math.log10(total_combo_hits / 2500.0) * 0.475)
-                * int(total_combo_hits > 2500)
+            + 0.3 * xp.minimum(1.0, total_combo_hits / 2500.0)
+            + xp.where(
+                total_combo_hits > 2500,
+                xp.log10(xp.maximum(total_combo_hits, 2500) / 2500.0) * 0.475,
+                0.0,
             )
         )
-        value *= length_bonus
-
-        value *= math.pow(0.97, misses)
+        value = self._base_value * length_bonus
 
-        if self.difficulty_attributes.max_combo > 0:
-            value *= min(
-                math.pow(score.max_combo, 0.8)
-                / math.pow(self.difficulty_attributes.max_combo, 0.8),
-                1.0,
-            )
+        value *= xp.power(0.97, misses)
 
-        approach_rate = self.difficulty_attributes.approach_rate
-        approach_rate_factor = 1.0
-
-        if approach_rate > 9.0:
-            approach_rate_factor += 0.1 * (approach_rate - 9.0)
-
-        if approach_rate > 10.0:
-            approach_rate_factor += 0.1 * (approach_rate - 10.0)
-        elif approach_rate < 8.0:
-            approach_rate_factor += 0.025 * (8.0 - approach_rate)
-
-        value *= approach_rate_factor
+        value *= xp.where(
+            self.difficulty_attributes.max_combo > 0,
+            xp.minimum(xp.power(score.max_combo, 0.8) / self._scaled_max_combo, 1.0),
+            1.0,
+        )
 
-        if score.mods & Mods.HIDDEN:
-            if approach_rate <= 10.0:
-                value *= 1.05 + 0.075 * (10.0 - approach_rate)
-            elif approach_rate > 10.0:
-                value *= 1.01 + 0.04 * (11.0 - min(11.0, approach_rate))
+        value *= self._approach_rate_factor
 
-        if score.mods & Mods.FLASHLIGHT:
-            value *= 1.35 * length_bonus
+        value *= xp.where(score.mods & Mods.HIDDEN, self._hidden_bonus, 1.0)
+        value *= xp.where(score.mods & Mods.FLASHLIGHT, 1.35 * length_bonus, 1.0)
 
-        accuracy = 0.0
-        if total_hits != 0:
-            accuracy = clamp(float(successful_hits) / total_hits, 0.0, 1.0)
+        accuracy = xp.where(
+            total_hits != 0,
+            xp.clip(successful_hits / xp.maximum(total_hits, 1), 0.0, 1.0),
+            0.0,
+        )
 
-        value *= math.pow(accuracy, 5.5)
+        value *= xp.power(accuracy, 5.5)
 
-        if score.mods & Mods.NOFAIL:
-            value *= 0.90
+        value *= xp.where(score.mods & Mods.NOFAIL, 0.90, 1.0)
 
         return CatchPerformanceAttributes(total=value)
@@ -0,0 +1,286 @@
+from __future__ import annotations
+
+import math
+from dataclasses import dataclass
+from typing import Union
+
+import numpy as np
+
+from performance_calculator.models.beatmap import Beatmap
+from performance_calculator.models.beatmap import HitObjectType
+from performance_calculator.models.beatmap_arrays import BeatmapArrays
+from performance_calculator.models.beatmap_stats import calculate_beatmap_stats
+from performance_calculator.models.difficulty_calculator import DifficultyCalculator
+from performance_calculator.models.mods import Mods
+from performance_calculator.models.strain import decayed_cumsum
+from performance_calculator.models.strain import strain_decay
+from performance_calculator.models.strain import strain_peaks
+from performance_calculator.models.strain import weighted_peak_sum
+from performance_calculator.rulesets.mania.difficulty import ManiaDifficultyAttributes
+
+STAR_SCALING_FACTOR = 0.018
+
+INDIVIDUAL_DECAY_BASE = 0.125
+OVERALL_DECAY_BASE = 0.30
+RELEASE_THRESHOLD = 24.0
+
+PLAYFIELD_WIDTH = 512.0
+
+KEY_MODS = {
+    Mods.KEY1: 1,
+    Mods.KEY2: 2,
+    Mods.KEY3: 3,
+    Mods.KEY4: 4,
+    Mods.KEY5: 5,
+    Mods.KEY6: 6,
+    Mods.KEY7: 7,
+    Mods.KEY8: 8,
+    Mods.KEY9: 9,
+}
+
+
+@dataclass
+class _ManiaObjects:
+    """The notes of a map for one key count, sorted the way lazer
+    processes them. Nothing here depends on the clock rate."""
+
+    start_time: np.ndarray
+    end_time: np.ndarray
+    column: np.ndarray
+
+    # for every object after the first, the index (into the objects
+    # after the first) of the last earlier object in each column, or -1
+    previous_in_column: np.ndarray
+
+
+def total_columns(beatmap: Union[Beatmap, BeatmapArrays], mods: int) -> int:
+    """The key count a map is played with, lazer's `ManiaBeatmapConverter`."""
+    circle_size = beatmap.difficulty.circle_size
+
+    if beatmap.mode == 3:
+        # key mods and co-op only apply to converts
+        return max(1, round(circle_size))
+
+    columns = 0
+    for mod, key_count in KEY_MODS.items():
+        if mods & mod:
+            columns = key_count
+            break
+
+    if not columns:
+        object_count = beatmap.hit_circle_count + beatmap.slider_count
+        object_count += beatmap.spinner_count
+        slider_or_spinner_ratio = 0.0
+        if object_count:
+            slider_or_spinner_ratio = (
+                beatmap.slider_count + beatmap.spinner_count
+            ) / object_count
+
+        rounded_overall_difficulty = round(beatmap.difficulty.overall_difficulty)
+
+        if slider_or_spinner_ratio < 0.2:
+            columns = 7
+        elif slider_or_spinner_ratio < 0.3 or round(circle_size) >= 5:
+            columns = 7 if rounded_overall_difficulty > 5 else 6
+        elif slider_or_spinner_ratio > 0.6:
+            columns = 5 if rounded_overall_difficulty > 4 else 4
+        else:
+            columns = max(4, min(rounded_overall_difficulty + 1, 7))
+
+    if mods & Mods.KEYCOOP:
+        columns *= 2
+
+    return columns
+
+
+class ManiaDifficultyCalculator(DifficultyCalculator):
+    """lazer's 2022 mania star rating.
+
+    osu!standard maps are converted by placing every object in the column
+    under its x position, with sliders and spinners held until they end.
+    lazer's pattern generators aren't replicated, so converts are close
+    to, but not exactly, their official ratings.
+    """
+
+    def __init__(self, beatmap: Union[Beatmap, BeatmapArrays]) -> None:
+        super().__init__(beatmap)
+
+        if self.beatmap.mode not in (0, 3):
+            raise ValueError(f"mode {self.beatmap.mode} can't be converted to mania")
+
+        # keyed by column count, shared by every speed mod
+        self._objects: dict[int, _ManiaObjects] = {}
+
+    @property
+    def is_converted(self) -> bool:
+        return self.beatmap.mode != 3
+
+    def _build_objects(self, columns: int) -> _ManiaObjects:
+        hit_objects = self.beatmap.hit_objects
+
+        # lazer sorts by the rounded start time only
+        order = np.argsort(np.round(hit_objects["time"]), kind="stable")
+        hit_objects = hit_objects[order]
+
+        start_times = hit_objects["time"]
+        end_times = np.where(
+            hit_objects["type"]
+            & (HitObjectType.HOLD | HitObjectType.SLIDER | HitObjectType.SPINNER),
+            hit_objects["end_time"],
+            start_times,
+        )
+        column = np.clip(
+            np.floor(hit_objects["x"] / (PLAYFIELD_WIDTH / columns)),
+            0,
+            columns - 1,
+        ).astype(np.int64)
+
+        # the first object isn't a difficulty object
+        difficulty_columns = column[1:]
+        positions = np.arange(len(difficulty_columns))
+
+        previous_in_column = np.full((len(positions), columns), -1, dtype=np.int64)
+        for current_column in range(columns):
+            indices = np.flatnonzero(difficulty_columns == current_column)
+            if not len(indices):
+                continue
+
+            previous = np.searchsorted(indices, positions, side="left") - 1
+            previous_in_column[:, current_column] = np.where(
+                previous >= 0,
+                indices[np.maximum(previous, 0)],
+                -1,
+            )
+
+        return _ManiaObjects(
+            start_time=start_times,
+            end_time=end_times,
+            column=column,
+            previous_in_column=previous_in_column,
+        )
+
+    def _max_combo(self) -> int:
+        hit_objects = self.beatmap.hit_objects
+
+        held = (
+            hit_objects["type"]
+            & (HitObjectType.HOLD | HitObjectType.SLIDER | HitObjectType.SPINNER)
+        ) != 0
+        # a hold ticks every 100ms on top of its head
+        ticks = ((hit_objects["end_time"] - hit_objects["time"]) / 100).astype(
+            np.int64,
+        )
+
+        return len(hit_objects) + int(np.sum(np.where(held, ticks, 0)))
+
+    def _star_rating(self, objects: _ManiaObjects, clock_rate: float) -> float:
+        if len(objects.start_time) < 2:
+            return 0.0
+
+        start_times = objects.start_time[1:] / clock_rate
+        end_times = objects.end_time[1:] / clock_rate
+        delta_times = np.diff(objects.start_time) / clock_rate
+        columns = objects.column[1:]
+        previous_in_column = objects.previous_in_column
+
+        # the end time held in each column when each object is hit
+        column_end_times = np.where(
+            previous_in_column >= 0,
+            end_times[np.maximum(previous_in_column, 0)],
+            0.0,
+        )
+
+        # something ending after this note is held meanwhile
+        hold_factor = np.where(
+            np.any(column_end_times - 1 > end_times[:, None], axis=1),
+            1.25,
+            1.0,
+        )
+
+        # a note is overlapped if an earlier end lies within its body
+        is_overlapping = np.any(
+            (column_end_times - 1 > start_times[:, None])
+            & (end_times[:, None] - 1 > column_end_times),
+            axis=1,
+        )
+        closest_end_time = np.minimum(
+            np.abs(end_times - start_times),
+            np.abs(end_times[:, None] - column_end_times).min(axis=1),
+        )
+
+        # releasing several notes together is as easy as releasing one,
+        # so the hold addition fades out when another release is close
+        hold_addition = np.where(
+            is_overlapping,
+            1 / (1 + np.exp(0.5 * (RELEASE_THRESHOLD - closest_end_time))),
+            0.0,
+        )
+
+        column_strains = np.empty(len(start_times))
+        for column in np.unique(columns):
+            indices = np.flatnonzero(columns == column)
+            column_strains[indices] = decayed_cumsum(
+                2.0 * hold_factor[indices],
+                strain_decay(
+                    np.diff(start_times[indices], prepend=0.0),
+                    INDIVIDUAL_DECAY_BASE,
+                ),
+            )
+
+        # notes in a chord take the hardest column strain of the chord
+        individual_strains = column_strains
+        chords = np.cumsum(delta_times > 1)
+        shift = 1
+        while shift < len(chords):
+            same_chord = chords[shift:] == chords[:-shift]
+            if not same_chord.any():
+                break
+
+            individual_strains = individual_strains.copy()
+            individual_strains[shift:] = np.where(
+                same_chord,
+                np.maximum(individual_strains[shift:], individual_strains[:-shift]),
+                individual_strains[shift:],
+            )
+            shift *= 2
+
+        overall_decays = strain_decay(delta_times, OVERALL_DECAY_BASE)
+        overall_values = (1 + hold_addition) * hold_factor
+        # the overall strain starts at 1
+        overall_values[0] += math.exp(overall_decays[0])
+        overall_strains = decayed_cumsum(overall_values, overall_decays)
+
+        peaks = strain_peaks(
+            start_times,
+            individual_strains + overall_strains,
+            (
+                (individual_strains, INDIVIDUAL_DECAY_BASE),
+                (overall_strains, OVERALL_DECAY_BASE),
+            ),
+        )
+        return weighted_peak_sum(peaks) * STAR_SCALING_FACTOR
+
+    def calculate(self, mods: int = 0) -> ManiaDifficultyAttributes:
+        columns = total_columns(self.beatmap, mods)
+        if columns not in self._objects:
+            self._objects[columns] = self._build_objects(columns)
+
+        difficulty = self.beatmap.difficulty
+        stats = calculate_beatmap_stats(
+            mode=3,
+            circle_size=difficulty.circle_size,
+            approach_rate=difficulty.approach_rate,
+            overall_difficulty=difficulty.overall_difficulty,
+            drain_rate=difficulty.hp_drain_rate,
+            mods=mods,
+            converted=self.is_converted,
+        )
+
+        return ManiaDifficultyAttributes(
+            star_rating=self._star_rating(
+                self._objects[columns],
+                float(stats.clock_rate),
+            ),
+            max_combo=self._max_combo(),
+            great_hit_window=int(stats.great_hit_window),
+        )
@@ -1,12 +1,13 @@
 from __future__ import annotations
 
-import math
 from dataclasses import dataclass
+from typing import Any
 
+from performance_calculator.models.difficulty import DifficultyAttributes
 from performance_calculator.models.mods import Mods
 from performance_calculator.models.performance import PerformanceAttributes
 from performance_calculator.models.performance import PerformanceCalculator
-from performance_calculator.models.score import Score
+from performance_calculator.models.performance import ScalarMath
 from performance_calculator.rulesets.mania.difficulty import ManiaDifficultyAttributes
 
 
@@ -18,7 +19,20 @@ class ManiaPerformanceAttributes(PerformanceAttributes):
 class ManiaPerformanceCalculator(PerformanceCalculator):
     difficulty_attributes: ManiaDifficultyAttributes
 
-    def calculate(self, score: Score) -> ManiaPerformanceAttributes:
+    def __init__(
+        self,
+        difficulty_attributes: DifficultyAttributes,
+        xp: Any = ScalarMath,
+    ) -> None:
+        super().__init__(difficulty_attributes, xp)
+
+        # only depends on the map, so calculators can be reused for many scores
+        self._base_difficulty_value = xp.power(
+            xp.maximum(self.difficulty_attributes.star_rating - 0.15, 0.05),
+            2.2,
+        )
+
+    def _calculate(self, xp: Any, score: Any) -> ManiaPerformanceAttributes:
         count_perfect = score.num_gekis
         count_great = score.num_300s
         count_good = score.num_katus
@@ -30,25 +44,25 @@ class ManiaPerformanceCalculator(PerformanceCalculator):
             count_perfect + count_ok + count_great + count_good + count_meh + count_miss
         )
 
-        accuracy = 0.0
-        if total_hits != 0:
-            accuracy = (
+        accuracy = xp.where(
+            total_hits != 0,
+            (
                 (count_perfect * 320)
                 + (count_great * 300)
                 + (count_good * 200)
                 + (count_ok * 100)
                 + (count_meh * 50)
-            ) / (total_hits * 320)
+            )
+            / (xp.maximum(total_hits, 1) * 320),
+            0.0,
+        )
 
         multiplier = 8.0
 
-        if score.mods & Mods.NOFAIL:
-            multiplier *= 0.75
-
-        if score.mods & Mods.EASY:
-            multiplier *= 0.5
+        multiplier *= xp.where(score.mods & Mods.NOFAIL, 0.75, 1.0)
+        multiplier *= xp.where(score.mods & Mods.EASY, 0.5, 1.0)
 
-        difficulty_value = self._compute_difficulty_value(accuracy, total_hits)
+        difficulty_value = self._compute_difficulty_value(xp, accuracy, total_hits)
         total_value = difficulty_value * multiplier
 
         return ManiaPerformanceAttributes(
@@ -56,11 +70,11 @@ class ManiaPerformanceCalculator(PerformanceCalculator):
             difficulty=difficulty_value,
         )
 
-    def _compute_difficulty_value(self, accuracy: float, total_hits: int) -> float:
+    def _compute_difficulty_value(self, xp: Any, accuracy: Any, total_hits: Any) -> Any:
         difficulty_value = (
-            math.pow(max(self.difficulty_attributes.star_rating - 0.15, 0.05), 2.2)
-            * max(0.0, 5.0 * accuracy - 4.0)
-            * (1.0 + 0.1 * min(1.0, total_hits / 1500))
+            self._base_difficulty_value
+            * xp.maximum(0.0, 5.0 * accuracy - 4.0)
+            * (1.0 + 0.1 * xp.minimum(1.0, total_hits / 1500))
         )
 
         return difficulty_value
@@ -0,0 +1,1332 @@
+from __future__ import annotations
+
+import dataclasses
+import math
+from dataclasses import dataclass
+from typing import Optional
+from typing import Sequence
+from typing import Union
+
+import numpy as np
+
+from performance_calculator.models.beatmap import BASE_SCORING_DISTANCE
+from performance_calculator.models.beatmap import Beatmap
+from performance_calculator.models.beatmap import HitObjectType
+from performance_calculator.models.beatmap import MAX_SLIDER_LENGTH
+from performance_calculator.models.beatmap_arrays import BeatmapArrays
+from performance_calculator.models.beatmap_stats import calculate_beatmap_stats
+from performance_calculator.models.beatmap_stats import difficulty_range
+from performance_calculator.models.difficulty_calculator import DifficultyCalculator
+from performance_calculator.models.mods import Mods
+from performance_calculator.models.slider_path import SliderPath
+from performance_calculator.models.strain import decayed_cumsum
+from performance_calculator.models.strain import prefix_peaks
+from performance_calculator.models.strain import progressive_strain_peaks
+from performance_calculator.models.strain import strain_decay
+from performance_calculator.models.strain import strain_peaks
+from performance_calculator.models.strain import weighted_peak_sum
+from performance_calculator.rulesets.osu.difficulty import OsuDifficultyAttributes
+
+DIFFICULTY_MULTIPLIER = 0.0675
+PERFORMANCE_BASE_MULTIPLIER = 1.14
+
+PLAYFIELD_HEIGHT = 384.0
+OBJECT_RADIUS = 64.0
+NORMALISED_RADIUS = 50.0
+MIN_DELTA_TIME = 25.0
+MAXIMUM_SLIDER_RADIUS = NORMALISED_RADIUS * 2.4
+ASSUMED_SLIDER_RADIUS = NORMALISED_RADIUS * 1.8
+STACK_DISTANCE = 3.0
+LEGACY_LAST_TICK_OFFSET = 36.0
+
+# aim
+WIDE_ANGLE_MULTIPLIER = 1.5
+ACUTE_ANGLE_MULTIPLIER = 1.95
+SLIDER_MULTIPLIER = 1.35
+VELOCITY_CHANGE_MULTIPLIER = 0.75
+AIM_SKILL_MULTIPLIER = 23.55
+AIM_STRAIN_DECAY_BASE = 0.15
+
+# speed
+SINGLE_SPACING_THRESHOLD = 125.0
+MIN_SPEED_BONUS = 75.0
+SPEED_BALANCING_FACTOR = 40.0
+SPEED_SKILL_MULTIPLIER = 1375.0
+SPEED_STRAIN_DECAY_BASE = 0.3
+HISTORY_TIME_MAX = 5000.0
+HISTORY_OBJECTS_MAX = 32
+RHYTHM_MULTIPLIER = 0.75
+
+# flashlight
+MAX_OPACITY_BONUS = 0.4
+HIDDEN_BONUS = 0.2
+MIN_VELOCITY = 0.5
+FLASHLIGHT_SLIDER_MULTIPLIER = 1.3
+MIN_ANGLE_MULTIPLIER = 0.2
+FLASHLIGHT_SKILL_MULTIPLIER = 0.052
+FLASHLIGHT_STRAIN_DECAY_BASE = 0.15
+
+
+@dataclass
+class _Slider:
+    path: SliderPath
+    span_duration: float
+    end_time: float
+    # relative to the head, (n, 2)
+    end_position: np.ndarray
+    # every nested object after the head, sorted by time
+    nested_times: np.ndarray
+    nested_positions: np.ndarray
+    nested_is_repeat: np.ndarray
+
+
+@dataclass
+class _OsuObjects:
+    """Per-object preprocessing, lazer's `OsuDifficultyHitObject`.
+
+    Every array has one entry per difficulty object, which is every
+    hit object except the first.
+    """
+
+    start_time: np.ndarray
+    base_start_time: np.ndarray
+    delta_time: np.ndarray
+    strain_time: np.ndarray
+    is_slider: np.ndarray
+    is_spinner: np.ndarray
+    repeat_count: np.ndarray
+    position: np.ndarray
+    end_position: np.ndarray
+    lazy_jump_distance: np.ndarray
+    minimum_jump_distance: np.ndarray
+    minimum_jump_time: np.ndarray
+    lazy_travel_distance: np.ndarray
+    travel_distance: np.ndarray
+    travel_time: np.ndarray
+    angle: np.ndarray
+
+
+def _shift(values: np.ndarray, count: int, fill: Union[float, bool] = 0) -> np.ndarray:
+    """`values[i - count]`, padded with `fill`. Negative counts look ahead."""
+    shifted = np.full_like(values, fill)
+
+    if count > 0:
+        shifted[count:] = values[:-count]
+    elif count < 0:
+        shifted[:count] = values[-count:]
+    else:
+        shifted[:] = values
+
+    return shifted
+
+
+def _lerp(start: float, end: float, amount: np.ndarray) -> np.ndarray:
+    return start + (end - start) * amount
+
+
+def _wide_angle_bonus(angle: np.ndarray) -> np.ndarray:
+    return (
+        np.sin(0.75 * (np.clip(angle, math.pi / 6, 5 / 6 * math.pi) - math.pi / 6)) ** 2
+    )
+
+
+def _acute_angle_bonus(angle: np.ndarray) -> np.ndarray:
+    return 1 - _wide_angle_bonus(angle)
+
+
+def _safe_divide(numerator: np.ndarray, denominator: np.ndarray) -> np.ndarray:
+    return np.divide(
+        numerator,
+        denominator,
+        out=np.zeros(np.broadcast(numerator, denominator).shape),
+        where=denominator != 0,
+    )
+
+
+def _stack_heights(
+    beatmap: BeatmapArrays,
+    positions: np.ndarray,
+    end_positions: np.ndarray,
+    path_end_positions: np.ndarray,
+    end_times: np.ndarray,
+    stack_threshold: float,
+) -> np.ndarray:
+    """lazer's `OsuBeatmapProcessor` stacking."""
+    object_types = beatmap.hit_objects["type"]
+    times = beatmap.hit_objects["time"]
+
+    is_slider = (object_types & HitObjectType.SLIDER) != 0
+    is_spinner = (object_types & HitObjectType.SPINNER) != 0
+    is_circle = (object_types & HitObjectType.CIRCLE) != 0
+
+    heights = np.zeros(len(times), dtype=np.int64)
+
+    def distance(a: np.ndarray, b: np.ndarray) -> float:
+        return math.hypot(a[0] - b[0], a[1] - b[1])
+
+    if beatmap.format_version < 6:
+        for i in range(len(times)):
+            if heights[i] != 0 and not is_slider[i]:
+                continue
+
+            start_time = end_times[i]
+            slider_stack = 0
+
+            for j in range(i + 1, len(times)):
+                if times[j] - stack_threshold > start_time:
+                    break
+
+                if distance(positions[j], positions[i]) < STACK_DISTANCE:
+                    heights[i] += 1
+                    start_time = times[j]
+                elif distance(positions[j], path_end_positions[i]) < STACK_DISTANCE:
+                    # sliders bump notes down and right rather than up and left
+                    slider_stack += 1
+                    heights[j] -= slider_stack
+                    start_time = times[j]
+
+        return heights
+
+    for i in range(len(times) - 1, 0, -1):
+        object_i = i
+        if heights[object_i] != 0 or is_spinner[object_i]:
+            continue
+
+        if is_circle[object_i]:
+            for n in range(i - 1, -1, -1):
+                if is_spinner[n]:
+                    continue
+
+                if times[object_i] - end_times[n] > stack_threshold:
+                    break
+
+                if (
+                    is_slider[n]
+                    and distance(end_positions[n], positions[object_i]) < STACK_DISTANCE
+                ):
+                    offset = heights[object_i] - heights[n] + 1
+
+                    for j in range(n + 1, i + 1):
+                        if distance(end_positions[n], positions[j]) < STACK_DISTANCE:
+                            heights[j] -= offset
+
+                    break
+
+                if distance(positions[n], positions[object_i]) < STACK_DISTANCE:
+                    heights[n] = heights[object_i] + 1
+                    object_i = n
+        elif is_slider[object_i]:
+            for n in range(i - 1, -1, -1):
+                if is_spinner[n]:
+                    continue
+
+                if times[object_i] - times[n] > stack_threshold:
+                    break
+
+                if distance(end_positions[n], positions[object_i]) < STACK_DISTANCE:
+                    heights[n] = heights[object_i] + 1
+                    object_i = n
+
+    return heights
+
+
+class OsuDifficultyCalculator(DifficultyCalculator):
+    def __init__(self, beatmap: Union[Beatmap, BeatmapArrays]) -> None:
+        super().__init__(beatmap)
+
+        # slider geometry only changes when HR flips the map
+        self._sliders: dict[bool, dict[int, _Slider]] = {}
+
+    def _build_sliders(self, flip: bool) -> dict[int, _Slider]:
+        hit_objects = self.beatmap.hit_objects
+        slider_indices = np.flatnonzero(hit_objects["type"] & HitObjectType.SLIDER)
+
+        slider_times = hit_objects["time"][slider_indices]
+        beat_lengths = self.beatmap.beat_lengths_at(slider_times)
+        slider_velocities = self.beatmap.slider_velocities_at(slider_times)
+
+        difficulty = self.beatmap.difficulty
+        scoring_distances = (
+            BASE_SCORING_DISTANCE * difficulty.slider_multiplier * slider_velocities
+        )
+        velocities = scoring_distances / beat_lengths
+        tick_distances = scoring_distances / difficulty.slider_tick_rate
+        if self.beatmap.format_version < 8:
+            tick_distances /= slider_velocities
+
+        sliders = {}
+        for index, velocity, tick_distance in zip(
+            slider_indices,
+            velocities,
+            tick_distances,
+        ):
+            hit_object = hit_objects[index]
+            head = np.array([hit_object["x"], hit_object["y"]], dtype=np.float64)
+
+            control_points = self.beatmap.curve_points_of(index).astype(np.float64)
+            control_points = np.concatenate(([head], control_points)) - head
+            if flip:
+                control_points[:, 1] = -control_points[:, 1]
+
+            path = SliderPath(
+                hit_object["curve_type"].decode(),
+                control_points,
+                hit_object["pixel_length"],
+            )
+
+            start_time = hit_object["time"]
+            span_count = int(hit_object["repeat_count"]) + 1
+            span_duration = path.distance / velocity if velocity > 0 else 0.0
+            end_time = start_time + span_count * span_duration
+
+            length = min(MAX_SLIDER_LENGTH, path.distance)
+            tick_distance = min(max(tick_distance, 0.0), length)
+
+            tick_progress = np.empty(0)
+            if tick_distance > 0 and length > 0:
+                tick_count = max(
+                    math.ceil((length - velocity * 10) / tick_distance) - 1,
+                    0,
+                )
+                tick_progress = tick_distance * np.arange(1, tick_count + 1) / length
+
+            times = []
+            progress = []
+            is_repeat = []
+            for span in range(span_count):
+                span_start_time = start_time + span * span_duration
+                reversed_span = span % 2 == 1
+
+                span_progress = tick_progress[::-1] if reversed_span else tick_progress
+                time_progress = 1 - span_progress if reversed_span else span_progress
+
+                times.extend(span_start_time + time_progress * span_duration)
+                progress.extend(span_progress)
+                is_repeat.extend([False] * len(span_progress))
+
+                if span < span_count - 1:
+                    times.append(span_start_time + span_duration)
+                    progress.append((span + 1) % 2)
+                    is_repeat.append(True)
+
+            end_position = path.position_at(span_count % 2)
+
+            # the legacy last tick stands in for the tail
+            final_span_start_time = start_time + (span_count - 1) * span_duration
+            times.append(
+                max(
+                    start_time + span_count * span_duration / 2,
+                    final_span_start_time + span_duration - LEGACY_LAST_TICK_OFFSET,
+                ),
+            )
+            positions = np.concatenate(
+                (path.position_at(np.array(progress)), [end_position]),
+            )
+            is_repeat.append(False)
+
+            order = np.argsort(np.array(times), kind="stable")
+            sliders[int(index)] = _Slider(
+                path=path,
+                span_duration=span_duration,
+                end_time=end_time,
+                end_position=end_position,
+                nested_times=np.array(times)[order],
+                nested_positions=positions[order],
+                nested_is_repeat=np.array(is_repeat)[order],
+            )
+
+        return sliders
+
+    def _lazy_travel(
+        self,
+        slider: _Slider,
+        start_time: float,
+        radius: float,
+    ) -> tuple[np.ndarray, float, float]:
+        """The lazy end position (relative to the head),
+        travel distance and travel time of a slider."""
+        lazy_travel_time = slider.nested_times[-1] - start_time
+
+        end_time_min = 0.0
+        if slider.span_duration > 0:
+            end_time_min = lazy_travel_time / slider.span_duration
+        if end_time_min % 2 >= 1:
+            end_time_min = 1 - end_time_min % 1
+        else:
+            end_time_min %= 1
+
+        lazy_end_position = slider.path.position_at(end_time_min)
+        cursor_position = np.zeros(2)
+        scaling_factor = NORMALISED_RADIUS / radius
+        lazy_travel_distance = 0.0
+
+        nested_count = len(slider.nested_times)
+        for i in range(nested_count):
+            movement = slider.nested_positions[i] - cursor_position
+            movement_length = scaling_factor * math.hypot(*movement)
+            required_movement = ASSUMED_SLIDER_RADIUS
+
+            if i == nested_count - 1:
+                lazy_movement = lazy_end_position - cursor_position
+                if math.hypot(*lazy_movement) < math.hypot(*movement):
+                    movement = lazy_movement
+
+                movement_length = scaling_factor * math.hypot(*movement)
+            elif slider.nested_is_repeat[i]:
+                required_movement = NORMALISED_RADIUS
+
+            if movement_length > required_movement:
+                cursor_position = cursor_position + movement * (
+                    (movement_length - required_movement) / movement_length
+                )
+                movement_length *= (
+                    movement_length - required_movement
+                ) / movement_length
+                lazy_travel_distance += movement_length
+
+            if i == nested_count - 1:
+                lazy_end_position = cursor_position
+
+        return lazy_end_position, lazy_travel_distance, lazy_travel_time
+
+    def _preprocess(
+        self,
+        mods: int,
+        radius: float,
+        preempt: float,
+        clock_rate: float,
+    ) -> _OsuObjects:
+        hit_objects = self.beatmap.hit_objects
+        flip = bool(mods & Mods.HARDROCK)
+
+        if flip not in self._sliders:
+            self._sliders[flip] = self._build_sliders(flip)
+
+        sliders = self._sliders[flip]
+
+        object_types = hit_objects["type"]
+        is_slider = (object_types & HitObjectType.SLIDER) != 0
+        is_spinner = (object_types & HitObjectType.SPINNER) != 0
+
+        times = hit_objects["time"]
+        end_times = hit_objects["end_time"].copy()
+
+        positions = np.stack(
+            [hit_objects["x"], hit_objects["y"]],
+            axis=1,
+        ).astype(np.float64)
+        if flip:
+            positions[:, 1] = PLAYFIELD_HEIGHT - positions[:, 1]
+
+        end_positions = positions.copy()
+        path_end_positions = positions.copy()
+        lazy_end_positions = positions.copy()
+        lazy_travel_distances = np.zeros(len(times))
+        lazy_travel_times = np.zeros(len(times))
+
+        for index, slider in sliders.items():
+            end_times[index] = slider.end_time
+            end_positions[index] += slider.end_position
+            path_end_positions[index] += slider.path.end_position
+
+            (
+                lazy_end_position,
+                lazy_travel_distances[index],
+                lazy_travel_times[index],
+            ) = self._lazy_travel(slider, times[index], radius)
+            lazy_end_positions[index] += lazy_end_position
+
+        stack_heights = _stack_heights(
+            self.beatmap,
+            positions,
+            end_positions,
+            path_end_positions,
+            end_times,
+            preempt * self.beatmap.stack_leniency,
+        )
+        stack_offset = (stack_heights * (radius / OBJECT_RADIUS) * -6.4)[:, None]
+
+        positions += stack_offset
+        end_positions += stack_offset
+        lazy_end_positions += stack_offset
+
+        start_times = times / clock_rate
+        delta_times = np.diff(start_times)
+        strain_times = np.maximum(delta_times, MIN_DELTA_TIME)
+
+        scaling_factor = NORMALISED_RADIUS / radius
+        if radius < 30:
+            scaling_factor *= 1 + min(30 - radius, 5) / 50
+
+        current = slice(1, None)
+        last = slice(None, -1)
+
+        has_distances = ~is_spinner[current] & ~is_spinner[last]
+
+        lazy_jump_distances = np.where(
+            has_distances,
+            np.hypot(
+                *((positions[current] - lazy_end_positions[last]) * scaling_factor).T,
+            ),
+            0.0,
+        )
+
+        travel_times = np.where(
+            is_slider,
+            np.maximum(lazy_travel_times / clock_rate, MIN_DELTA_TIME),
+            0.0,
+        )
+        travel_distances = lazy_travel_distances * np.power(
+            1 + hit_objects["repeat_count"] / 2.5,
+            1 / 2.5,
+        )
+
+        minimum_jump_times = strain_times.copy()
+        minimum_jump_distances = lazy_jump_distances.copy()
+
+        after_slider = has_distances & is_slider[last]
+        tail_jump_distances = (
+            np.hypot(*(end_positions[last] - positions[current]).T) * scaling_factor
+        )
+        minimum_jump_times = np.where(
+            after_slider,
+            np.maximum(strain_times - travel_times[last], MIN_DELTA_TIME),
+            minimum_jump_times,
+        )
+        minimum_jump_distances = np.where(
+            after_slider,
+            np.maximum(
+                0,
+                np.minimum(
+                    lazy_jump_distances
+                    - (MAXIMUM_SLIDER_RADIUS - ASSUMED_SLIDER_RADIUS),
+                    tail_jump_distances - MAXIMUM_SLIDER_RADIUS,
+                ),
+            ),
+            minimum_jump_distances,
+        )
+
+        angles = np.full(len(delta_times), np.nan)
+        if len(times) > 2:
+            has_angle = has_distances[1:] & ~is_spinner[:-2]
+
+            v1 = lazy_end_positions[:-2] - positions[1:-1]
+            v2 = positions[2:] - lazy_end_positions[1:-1]
+            dot = (v1 * v2).sum(axis=1)
+            det = v1[:, 0] * v2[:, 1] - v1[:, 1] * v2[:, 0]
+
+            angles[1:] = np.where(has_angle, np.abs(np.arctan2(det, dot)), np.nan)
+
+        return _OsuObjects(
+            start_time=start_times[current],
+            base_start_time=times[current],
+            delta_time=delta_times,
+            strain_time=strain_times,
+            is_slider=is_slider[current],
+            is_spinner=is_spinner[current],
+            repeat_count=hit_objects["repeat_count"][current],
+            position=positions[current],
+            end_position=end_positions[current],
+            lazy_jump_distance=lazy_jump_distances,
+            minimum_jump_distance=minimum_jump_distances,
+            minimum_jump_time=minimum_jump_times,
+            lazy_travel_distance=lazy_travel_distances[current],
+            travel_distance=np.where(is_slider, travel_distances, 0.0)[current],
+            travel_time=travel_times[current],
+            angle=angles,
+        )
+
+    @staticmethod
+    def _aim_values(objects: _OsuObjects, with_sliders: bool) -> np.ndarray:
+        strain_time = objects.strain_time
+        last_strain_time = _shift(strain_time, 1, 1.0)
+        lazy_jump = objects.lazy_jump_distance
+        last_lazy_jump = _shift(lazy_jump, 1)
+        travel_distance = objects.travel_distance
+        travel_time = objects.travel_time
+
+        last_is_slider = _shift(objects.is_slider, 1, False)
+        last_last_is_slider = _shift(objects.is_slider, 2, False)
+
+        travel_velocity = _safe_divide(travel_distance, travel_time)
+        movement_velocity = _safe_divide(
+            objects.minimum_jump_distance,
+            objects.minimum_jump_time,
+        )
+
+        current_velocity = lazy_jump / strain_time
+        previous_velocity = last_lazy_jump / last_strain_time
+
+        if with_sliders:
+            current_velocity = np.where(
+                last_is_slider,
+                np.maximum(
+                    current_velocity,
+                    movement_velocity + _shift(travel_velocity, 1),
+                ),
+                current_velocity,
+            )
+            previous_velocity = np.where(
+                last_last_is_slider,
+                np.maximum(
+                    previous_velocity,
+                    _shift(movement_velocity, 1) + _shift(travel_velocity, 2),
+                ),
+                previous_velocity,
+            )
+
+        angle = objects.angle
+        last_angle = _shift(angle, 1, np.nan)
+        last_last_angle = _shift(angle, 2, np.nan)
+
+        has_angle_bonus = (
+            (
+                np.maximum(strain_time, last_strain_time)
+                < 1.25 * np.minimum(strain_time, last_strain_time)
+            )
+            & ~np.isnan(angle)
+            & ~np.isnan(last_angle)
+            & ~np.isnan(last_last_angle)
+        )
+
+        angle = np.nan_to_num(angle)
+        last_angle = np.nan_to_num(last_angle)
+        last_last_angle = np.nan_to_num(last_last_angle)
+
+        angle_bonus = np.minimum(current_velocity, previous_velocity)
+
+        wide_angle_bonus = _wide_angle_bonus(angle)
+        acute_angle_bonus = np.where(
+            strain_time > 100,
+            0.0,
+            _acute_angle_bonus(angle)
+            * _acute_angle_bonus(last_angle)
+            * np.minimum(angle_bonus, 125 / strain_time)
+            * np.sin(math.pi / 2 * np.minimum(1, (100 - strain_time) / 25)) ** 2
+            * np.sin(math.pi / 2 * (np.clip(lazy_jump, 50, 100) - 50) / 50) ** 2,
+        )
+
+        # penalise repeated wide angles, less so as the last angle gets more acute
+        wide_angle_bonus *= angle_bonus * (
+            1 - np.minimum(wide_angle_bonus, _wide_angle_bonus(last_angle) ** 3)
+        )
+        # penalise repeated acute angles, less so as the last last angle gets wider
+        acute_angle_bonus *= 0.5 + 0.5 * (
+            1 - np.minimum(acute_angle_bonus, _acute_angle_bonus(last_last_angle) ** 3)
+        )
+
+        wide_angle_bonus = np.where(has_angle_bonus, wide_angle_bonus, 0.0)
+        acute_angle_bonus = np.where(has_angle_bonus, acute_angle_bonus, 0.0)
+
+        # reward velocity changes, using the average velocity over whole objects
+        average_previous_velocity = (
+            last_lazy_jump + _shift(travel_distance, 2)
+        ) / last_strain_time
+        average_current_velocity = (
+            lazy_jump + _shift(travel_distance, 1)
+        ) / strain_time
+        velocity_difference = np.abs(
+            average_previous_velocity - average_current_velocity,
+        )
+
+        distance_ratio = (
+            np.sin(
+                math.pi
+                / 2
+                * _safe_divide(
+                    velocity_difference,
+                    np.maximum(average_previous_velocity, average_current_velocity),
+                ),
+            )
+            ** 2
+        )
+        overlap_velocity_buff = np.minimum(
+            125 / np.minimum(strain_time, last_strain_time),
+            velocity_difference,
+        )
+        velocity_change_bonus = np.where(
+            np.maximum(previous_velocity, current_velocity) != 0,
+            overlap_velocity_buff
+            * distance_ratio
+            * (
+                np.minimum(strain_time, last_strain_time)
+                / np.maximum(strain_time, last_strain_time)
+            )
+            ** 2,
+            0.0,
+        )
+
+        aim_strain = current_velocity + np.maximum(
+            acute_angle_bonus * ACUTE_ANGLE_MULTIPLIER,
+            wide_angle_bonus * WIDE_ANGLE_MULTIPLIER
+            + velocity_change_bonus * VELOCITY_CHANGE_MULTIPLIER,
+        )
+
+        if with_sliders:
+            aim_strain += (
+                np.where(last_is_slider, _shift(travel_velocity, 1), 0.0)
+                * SLIDER_MULTIPLIER
+            )
+
+        indices = np.arange(len(strain_time))
+        return np.where(
+            (indices > 1) & ~objects.is_spinner & ~_shift(objects.is_spinner, 1, True),
+            aim_strain,
+            0.0,
+        )
+
+    @staticmethod
+    def _speed_values(objects: _OsuObjects, great_window: float) -> np.ndarray:
+        great_window_full = great_window * 2
+        strain_time = objects.strain_time
+
+        # nerf doubletappable doubles
+        current_delta_time = np.maximum(1, objects.delta_time)
+        next_delta_time = np.maximum(1, _shift(objects.delta_time, -1))
+        delta_difference = np.abs(next_delta_time - current_delta_time)
+        speed_ratio = current_delta_time / np.maximum(
+            current_delta_time,
+            delta_difference,
+        )
+        window_ratio = np.minimum(1, current_delta_time / great_window_full) ** 2
+        doubletapness = np.where(
+            np.arange(len(strain_time)) < len(strain_time) - 1,
+            speed_ratio ** (1 - window_ratio),
+            1.0,
+        )
+
+        # cap delta time to the OD 300 hit window
+        strain_time = strain_time / np.clip(
+            (strain_time / great_window_full) / 0.93,
+            0.92,
+            1,
+        )
+
+        speed_bonus = np.where(
+            strain_time < MIN_SPEED_BONUS,
+            1 + 0.75 * ((MIN_SPEED_BONUS - strain_time) / SPEED_BALANCING_FACTOR) ** 2,
+            1.0,
+        )
+
+        distance = np.minimum(
+            SINGLE_SPACING_THRESHOLD,
+            _shift(objects.travel_distance, 1) + objects.minimum_jump_distance,
+        )
+
+        speed = (
+            (speed_bonus + speed_bonus * (distance / SINGLE_SPACING_THRESHOLD) ** 3.5)
+            * doubletapness
+            / strain_time
+        )
+        return np.where(objects.is_spinner, 0.0, speed)
+
+    @staticmethod
+    def _rhythm_values(objects: _OsuObjects, great_window: float) -> np.ndarray:
+        start_time = objects.start_time
+        strain_time = objects.strain_time
+        indices = np.arange(len(start_time))
+
+        historical_note_count = np.minimum(indices, HISTORY_OBJECTS_MAX)
+        objects_in_history = indices - np.searchsorted(
+            start_time,
+            start_time - HISTORY_TIME_MAX,
+            side="right",
+        )
+        rhythm_start = np.clip(
+            np.minimum(objects_in_history, historical_note_count - 2),
+            0,
+            None,
+        )
+
+        previous_island_size = np.zeros(len(start_time), dtype=np.int64)
+        island_size = np.ones(len(start_time), dtype=np.int64)
+        rhythm_complexity_sum = np.zeros(len(start_time))
+        start_ratio = np.zeros(len(start_time))
+        first_delta_switch = np.zeros(len(start_time), dtype=bool)
+
+        # walk each object's history from the oldest note forward,
+        # for every object at once
+        for i in range(HISTORY_OBJECTS_MAX, 0, -1):
+            active = rhythm_start >= i
+            if not active.any():
+                continue
+
+            current_index = np.maximum(indices - i, 0)
+            previous_index = np.maximum(indices - i - 1, 0)
+            last_index = np.maximum(indices - i - 2, 0)
+
+            historical_decay = np.minimum(
+                (historical_note_count - i) / np.maximum(historical_note_count, 1),
+                (HISTORY_TIME_MAX - (start_time - start_time[current_index]))
+                / HISTORY_TIME_MAX,
+            )
+
+            current_delta = strain_time[current_index]
+            previous_delta = strain_time[previous_index]
+            last_delta = strain_time[last_index]
+
+            current_ratio = 1.0 + 6.0 * np.minimum(
+                0.5,
+                np.sin(
+                    math.pi
+                    / (
+                        np.minimum(previous_delta, current_delta)
+                        / np.maximum(previous_delta, current_delta)
+                    ),
+                )
+                ** 2,
+            )
+
+            window_penalty = np.minimum(
+                1,
+                np.maximum(
+                    0,
+                    np.abs(previous_delta - current_delta) - great_window * 0.6,
+                )
+                / (great_window * 0.6),
+            )
+
+            effective_ratio = window_penalty * current_ratio
+
+            same_speed = ~(
+                (previous_delta > 1.25 * current_delta)
+                | (previous_delta * 1.25 < current_delta)
+            )
+
+            # the island is still progressing, count its size
+            growing = active & first_delta_switch & same_speed
+            island_size = np.where(
+                growing & (island_size < 7),
+                island_size + 1,
+                island_size,
+            )
+
+            changing = active & first_delta_switch & ~same_speed
+
+            # bpm change into a slider, this is an easy acc window
+            effective_ratio = np.where(
+                changing & objects.is_slider[current_index],
+                effective_ratio * 0.125,
+                effective_ratio,
+            )
+            # bpm change from a slider, typically easier than circle -> circle
+            effective_ratio = np.where(
+                changing & objects.is_slider[previous_index],
+                effective_ratio * 0.25,
+                effective_ratio,
+            )
+            # repeated island size (ex: triplet -> triplet)
+            effective_ratio = np.where(
+                changing & (previous_island_size == island_size),
+                effective_ratio * 0.25,
+                effective_ratio,
+            )
+            # repeated island polarity (2 -> 4, 3 -> 5)
+            effective_ratio = np.where(
+                changing & (previous_island_size % 2 == island_size % 2),
+                effective_ratio * 0.5,
+                effective_ratio,
+            )
+            # the previous increase happened a note ago, 1/1 -> 1/2 -> 1/4
+            effective_ratio = np.where(
+                changing
+                & (last_delta > previous_delta + 10)
+                & (previous_delta > current_delta + 10),
+                effective_ratio * 0.125,
+                effective_ratio,
+            )
+
+            rhythm_complexity_sum = np.where(
+                changing,
+                rhythm_complexity_sum
+                + np.sqrt(effective_ratio * start_ratio)
+                * historical_decay
+                * np.sqrt(4 + island_size)
+                / 2
+                * np.sqrt(4 + previous_island_size)
+                / 2,
+                rhythm_complexity_sum,
+            )
+
+            starting = (
+                active & ~first_delta_switch & (previous_delta > 1.25 * current_delta)
+            )
+
+            start_ratio = np.where(changing | starting, effective_ratio, start_ratio)
+            previous_island_size = np.where(
+                changing,
+                island_size,
+                previous_island_size,
+            )
+            first_delta_switch = np.where(
+                changing & (previous_delta * 1.25 < current_delta),
+                False,
+                first_delta_switch | starting,
+            )
+            island_size = np.where(changing | starting, 1, island_size)
+
+        rhythm = np.sqrt(4 + rhythm_complexity_sum * RHYTHM_MULTIPLIER) / 2
+        return np.where(objects.is_spinner, 0.0, rhythm)
+
+    @staticmethod
+    def _flashlight_values(
+        objects: _OsuObjects,
+        radius: float,
+        preempt: float,
+        hidden: bool,
+    ) -> np.ndarray:
+        scaling_factor = 52.0 / radius
+        indices = np.arange(len(objects.start_time))
+
+        fade_in = preempt * 0.4 if hidden else 400 * min(1.0, preempt / 450)
+
+        small_distance_nerf = np.ones(len(indices))
+        cumulative_strain_time = np.zeros(len(indices))
+        angle_repeat_count = np.zeros(len(indices))
+        result = np.zeros(len(indices))
+        last_strain_time = objects.strain_time
+
+        for i in range(10):
+            previous_index = indices - i - 1
+            active = previous_index >= 0
+            previous_index = np.maximum(previous_index, 0)
+
+            counted = active & ~objects.is_spinner[previous_index]
+
+            jump_distance = np.hypot(
+                *(objects.position - objects.end_position[previous_index]).T,
+            )
+            cumulative_strain_time += np.where(counted, last_strain_time, 0.0)
+
+            # nerf objects that can easily be seen within the flashlight circle
+            if i == 0:
+                small_distance_nerf = np.where(
+                    counted,
+                    np.minimum(1.0, jump_distance / 75.0),
+                    small_distance_nerf,
+                )
+
+            # nerf stacks so only the first object of one counts
+            stack_nerf = np.minimum(
+                1.0,
+                objects.lazy_jump_distance[previous_index] / scaling_factor / 25.0,
+            )
+
+            # bonus based on how visible the object is
+            time = objects.base_start_time[previous_index]
+            fade_in_start_time = objects.base_start_time - preempt
+            opacity = np.clip((time - fade_in_start_time) / fade_in, 0, 1)
+            if hidden:
+                fade_out_start_time = fade_in_start_time + fade_in
+                opacity = np.minimum(
+                    opacity,
+                    1 - np.clip((time - fade_out_start_time) / (preempt * 0.3), 0, 1),
+                )
+            opacity = np.where(time > objects.base_start_time, 0.0, opacity)
+            opacity_bonus = 1.0 + MAX_OPACITY_BONUS * (1.0 - opacity)
+
+            result += np.where(
+                counted,
+                stack_nerf
+                * opacity_bonus
+                * scaling_factor
+                * jump_distance
+                / np.maximum(cumulative_strain_time, MIN_DELTA_TIME),
+                0.0,
+            )
+
+            # objects further back in time count less for the nerf
+            repeated_angle = (
+                counted
+                & ~np.isnan(objects.angle[previous_index])
+                & ~np.isnan(objects.angle)
+                & (np.abs(objects.angle[previous_index] - objects.angle) < 0.02)
+            )
+            angle_repeat_count += np.where(
+                repeated_angle,
+                max(1.0 - 0.1 * i, 0.0),
+                0.0,
+            )
+
+            last_strain_time = np.where(
+                active,
+                objects.strain_time[previous_index],
+                last_strain_time,
+            )
+
+        result = (small_distance_nerf * result) ** 2
+
+        if hidden:
+            result *= 1.0 + HIDDEN_BONUS
+
+        result *= MIN_ANGLE_MULTIPLIER + (1.0 - MIN_ANGLE_MULTIPLIER) / (
+            angle_repeat_count + 1.0
+        )
+
+        # reward fast sliders, and long ones which take more memorisation
+        pixel_travel_distance = objects.lazy_travel_distance / scaling_factor
+        slider_bonus = (
+            np.sqrt(
+                np.maximum(
+                    0.0,
+                    _safe_divide(pixel_travel_distance, objects.travel_time)
+                    - MIN_VELOCITY,
+                ),
+            )
+            * pixel_travel_distance
+            / np.where(objects.repeat_count > 0, objects.repeat_count + 1, 1)
+        )
+        result += (
+            np.where(objects.is_slider, slider_bonus, 0.0)
+            * FLASHLIGHT_SLIDER_MULTIPLIER
+        )
+
+        return np.where(objects.is_spinner, 0.0, result)
+
+    @staticmethod
+    def _osu_strain_difficulty(
+        peaks: np.ndarray,
+        reduced_section_count: int,
+        difficulty_multiplier: float,
+        reduced_strain_baseline: float = 0.75,
+    ) -> float:
+        strains = np.sort(peaks[peaks > 0])[::-1]
+
+        # reduce the highest strains to account for extreme difficulty spikes
+        reduced_count = min(len(strains), reduced_section_count)
+        scale = np.log10(
+            _lerp(
+                1,
+                10,
+                np.clip(np.arange(reduced_count) / reduced_section_count, 0, 1),
+            ),
+        )
+        strains[:reduced_count] *= _lerp(reduced_strain_baseline, 1.0, scale)
+
+        return weighted_peak_sum(strains) * difficulty_multiplier
+
+    def _aim_strains(self, objects: _OsuObjects, with_sliders: bool) -> np.ndarray:
+        return decayed_cumsum(
+            self._aim_values(objects, with_sliders) * AIM_SKILL_MULTIPLIER,
+            strain_decay(objects.delta_time, AIM_STRAIN_DECAY_BASE),
+        )
+
+    def _aim_difficulty(self, objects: _OsuObjects, with_sliders: bool) -> float:
+        strains = self._aim_strains(objects, with_sliders)
+        peaks = strain_peaks(
+            objects.start_time,
+            strains,
+            ((strains, AIM_STRAIN_DECAY_BASE),),
+        )
+        return self._osu_strain_difficulty(peaks, 10, 1.06)
+
+    def _speed_strains(self, objects: _OsuObjects, great_window: float) -> np.ndarray:
+        speed_strains = decayed_cumsum(
+            self._speed_values(objects, great_window) * SPEED_SKILL_MULTIPLIER,
+            strain_decay(objects.strain_time, SPEED_STRAIN_DECAY_BASE),
+        )
+        return speed_strains * self._rhythm_values(objects, great_window)
+
+    @staticmethod
+    def _relevant_note_count(strains: np.ndarray) -> float:
+        max_strain = strains.max(initial=0.0)
+        if max_strain <= 0:
+            return 0.0
+
+        return float(
+            np.sum(1.0 / (1.0 + np.exp(-(strains / max_strain * 12.0 - 6.0)))),
+        )
+
+    def _speed_difficulty(
+        self,
+        objects: _OsuObjects,
+        great_window: float,
+    ) -> tuple[float, float]:
+        strains = self._speed_strains(objects, great_window)
+        peaks = strain_peaks(
+            objects.start_time,
+            strains,
+            ((strains, SPEED_STRAIN_DECAY_BASE),),
+        )
+
+        return (
+            self._osu_strain_difficulty(peaks, 5, 1.04),
+            self._relevant_note_count(strains),
+        )
+
+    def _flashlight_strains(
+        self,
+        objects: _OsuObjects,
+        radius: float,
+        preempt: float,
+        hidden: bool,
+    ) -> np.ndarray:
+        return decayed_cumsum(
+            self._flashlight_values(objects, radius, preempt, hidden)
+            * FLASHLIGHT_SKILL_MULTIPLIER,
+            strain_decay(objects.delta_time, FLASHLIGHT_STRAIN_DECAY_BASE),
+        )
+
+    def _flashlight_difficulty(
+        self,
+        objects: _OsuObjects,
+        radius: float,
+        preempt: float,
+        hidden: bool,
+    ) -> float:
+        strains = self._flashlight_strains(objects, radius, preempt, hidden)
+        peaks = strain_peaks(
+            objects.start_time,
+            strains,
+            ((strains, FLASHLIGHT_STRAIN_DECAY_BASE),),
+        )
+        return float(peaks.sum()) * 1.06
+
+    def _base_attributes(
+        self,
+        mods: int,
+    ) -> tuple[OsuDifficultyAttributes, float, float, float, float]:
+        """Attributes with only the map stats filled in, along with the
+        clock rate, great hit window, circle radius and preempt time."""
+        difficulty = self.beatmap.difficulty
+        stats = calculate_beatmap_stats(
+            mode=0,
+            circle_size=difficulty.circle_size,
+            approach_rate=difficulty.approach_rate,
+            overall_difficulty=difficulty.overall_difficulty,
+            drain_rate=difficulty.hp_drain_rate,
+            mods=mods,
+        )
+
+        clock_rate = float(stats.clock_rate)
+        approach_rate = float(stats.approach_rate)
+        great_window = float(stats.great_hit_window)
+
+        # HR/EZ apply to these, the clock rate doesn't
+        radius = OBJECT_RADIUS * (1.0 - 0.7 * (float(stats.circle_size) - 5) / 5) / 2
+        preempt = float(difficulty_range(approach_rate, 1800, 1200, 450)) * clock_rate
+
+        attributes = OsuDifficultyAttributes(
+            star_rating=0.0,
+            max_combo=self.beatmap.max_combo,
+            aim_difficulty=0.0,
+            speed_difficulty=0.0,
+            speed_note_count=0.0,
+            flashlight_difficulty=0.0,
+            slider_factor=1.0,
+            approach_rate=approach_rate,
+            overall_difficulty=float(stats.overall_difficulty),
+            drain_rate=float(stats.drain_rate),
+            hit_circle_count=self.beatmap.hit_circle_count,
+            slider_count=self.beatmap.slider_count,
+            spinner_count=self.beatmap.spinner_count,
+        )
+
+        return attributes, clock_rate, great_window, radius, preempt
+
+    @staticmethod
+    def _rate(
+        attributes: OsuDifficultyAttributes,
+        mods: int,
+        aim_difficulty: float,
+        aim_difficulty_no_sliders: float,
+        speed_difficulty: float,
+        speed_note_count: float,
+        flashlight_difficulty: float,
+    ) -> None:
+        """Fill in the ratings and star rating from skill difficulties."""
+        aim_rating = math.sqrt(aim_difficulty) * DIFFICULTY_MULTIPLIER
+        aim_rating_no_sliders = (
+            math.sqrt(aim_difficulty_no_sliders) * DIFFICULTY_MULTIPLIER
+        )
+        speed_rating = math.sqrt(speed_difficulty) * DIFFICULTY_MULTIPLIER
+        flashlight_rating = math.sqrt(flashlight_difficulty) * DIFFICULTY_MULTIPLIER
+
+        slider_factor = aim_rating_no_sliders / aim_rating if aim_rating > 0 else 1.0
+
+        if mods & Mods.TOUCHSCREEN:
+            aim_rating = math.pow(aim_rating, 0.8)
+            flashlight_rating = math.pow(flashlight_rating, 0.8)
+
+        if mods & Mods.RELAX:
+            speed_rating = 0.0
+
+        base_aim_performance = (
+            math.pow(5 * max(1, aim_rating / DIFFICULTY_MULTIPLIER) - 4, 3) / 100000
+        )
+        base_speed_performance = (
+            math.pow(5 * max(1, speed_rating / DIFFICULTY_MULTIPLIER) - 4, 3) / 100000
+        )
+        base_flashlight_performance = 0.0
+        if mods & Mods.FLASHLIGHT:
+            base_flashlight_performance = math.pow(flashlight_rating, 2) * 25.0
+
+        base_performance = math.pow(
+            math.pow(base_aim_performance, 1.1)
+            + math.pow(base_speed_performance, 1.1)
+            + math.pow(base_flashlight_performance, 1.1),
+            1.0 / 1.1,
+        )
+
+        star_rating = 0.0
+        if base_performance > 0.00001:
+            star_rating = (
+                math.pow(PERFORMANCE_BASE_MULTIPLIER, 1 / 3)
+                * 0.027
+                * (
+                    math.pow(
+                        100000 / math.pow(2, 1 / 1.1) * base_performance,
+                        1 / 3,
+                    )
+                    + 4
+                )
+            )
+
+        attributes.star_rating = star_rating
+        attributes.aim_difficulty = aim_rating
+        attributes.speed_difficulty = speed_rating
+        attributes.speed_note_count = speed_note_count
+        attributes.flashlight_difficulty = flashlight_rating
+        attributes.slider_factor = slider_factor
+
+    def calculate(self, mods: int = 0) -> OsuDifficultyAttributes:
+        (
+            attributes,
+            clock_rate,
+            great_window,
+            radius,
+            preempt,
+        ) = self._base_attributes(mods)
+
+        if len(self.beatmap.hit_objects) < 2:
+            return attributes
+
+        objects = self._preprocess(mods, radius, preempt, clock_rate)
+        speed_difficulty, speed_note_count = self._speed_difficulty(
+            objects,
+            great_window,
+        )
+
+        self._rate(
+            attributes,
+            mods,
+            aim_difficulty=self._aim_difficulty(objects, True),
+            aim_difficulty_no_sliders=self._aim_difficulty(objects, False),
+            speed_difficulty=speed_difficulty,
+            speed_note_count=speed_note_count,
+            flashlight_difficulty=self._flashlight_difficulty(
+                objects,
+                radius,
+                preempt,
+                bool(mods & Mods.HIDDEN),
+            ),
+        )
+
+        return attributes
+
+    def calculate_prefixes(
+        self,
+        mods: int = 0,
+        object_counts: Optional[Sequence[int]] = None,
+    ) -> list[OsuDifficultyAttributes]:
+        """Attributes of the first `n` hit objects for every `n` in
+        `object_counts`, every prefix of the map by default.
+
+        Like lazer's timed attributes, strains are calculated once for the
+        whole map and each prefix only re-weighs its section peaks.
+        """
+        hit_objects = self.beatmap.hit_objects
+        if object_counts is None:
+            object_counts = range(1, len(hit_objects) + 1)
+
+        (
+            base_attributes,
+            clock_rate,
+            great_window,
+            radius,
+            preempt,
+        ) = self._base_attributes(mods)
+
+        object_types = hit_objects["type"]
+        circle_counts = np.cumsum((object_types & HitObjectType.CIRCLE) != 0)
+        slider_counts = np.cumsum((object_types & HitObjectType.SLIDER) != 0)
+        spinner_counts = np.cumsum((object_types & HitObjectType.SPINNER) != 0)
+        max_combos = np.cumsum(self.beatmap.object_combos())
+
+        if len(hit_objects) >= 2:
+            objects = self._preprocess(mods, radius, preempt, clock_rate)
+
+            def progress(
+                strains: np.ndarray,
+                decay_base: float,
+            ) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+                return progressive_strain_peaks(
+                    objects.start_time,
+                    strains,
+                    ((strains, decay_base),),
+                )
+
+            speed_strains = self._speed_strains(objects, great_window)
+
+            aim = progress(self._aim_strains(objects, True), AIM_STRAIN_DECAY_BASE)
+            aim_no_sliders = progress(
+                self._aim_strains(objects, False),
+                AIM_STRAIN_DECAY_BASE,
+            )
+            speed = progress(speed_strains, SPEED_STRAIN_DECAY_BASE)
+            flashlight = progress(
+                self._flashlight_strains(
+                    objects,
+                    radius,
+                    preempt,
+                    bool(mods & Mods.HIDDEN),
+                ),
+                FLASHLIGHT_STRAIN_DECAY_BASE,
+            )
+
+        results = []
+        for object_count in object_counts:
+            if not 1 <= object_count <= len(hit_objects):
+                raise ValueError(f"the map has no prefix of {object_count} objects")
+
+            attributes = dataclasses.replace(
+                base_attributes,
+                max_combo=int(max_combos[object_count - 1]),
+                hit_circle_count=int(circle_counts[object_count - 1]),
+                slider_count=int(slider_counts[object_count - 1]),
+                spinner_count=int(spinner_counts[object_count - 1]),
+            )
+
+            # the first object has no difficulty object
+            index = object_count - 2
+            if index >= 0:
+                self._rate(
+                    attributes,
+                    mods,
+                    aim_difficulty=self._osu_strain_difficulty(
+                        prefix_peaks(*aim, index),
+                        10,
+                        1.06,
+                    ),
+                    aim_difficulty_no_sliders=self._osu_strain_difficulty(
+                        prefix_peaks(*aim_no_sliders, index),
+                        10,
+                        1.06,
+                    ),
+                    speed_difficulty=self._osu_strain_difficulty(
+                        prefix_peaks(*speed, index),
+                        5,
+                        1.04,
+                    ),
+                    speed_note_count=self._relevant_note_count(
+                        speed_strains[: index + 1],
+                    ),
+                    flashlight_difficulty=float(
+                        prefix_peaks(*flashlight, index).sum(),
+                    )
+                    * 1.06,
+                )
+
+            results.append(attributes)
+
+        return results
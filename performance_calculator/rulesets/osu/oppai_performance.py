@@ -0,0 +1,306 @@
+from __future__ import annotations
+
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Hashable
+from typing import Optional
+from typing import Sequence
+from typing import TYPE_CHECKING
+from typing import Union
+
+import numpy as np
+
+from performance_calculator.models.mods import Mods
+from performance_calculator.models.oppai import OppaiWrapper
+from performance_calculator.models.path import Path
+from performance_calculator.models.score import Score
+
+if TYPE_CHECKING:
+    from performance_calculator.models.beatmap_source import BeatmapFile
+
+DEFAULT_CACHE_SIZE = 1024
+
+
+@dataclass
+class OppaiBeatmapAttributes:
+    """Everything oppai's pp formula needs that only depends on (map, mods)."""
+
+    mods: int
+    star_rating: float
+    aim_stars: float
+    speed_stars: float
+    # with mods applied
+    approach_rate: float
+    overall_difficulty: float
+    max_combo: int
+    circle_count: int
+    slider_count: int
+    spinner_count: int
+    object_count: int
+
+
+def read_oppai_attributes(ezpp: OppaiWrapper, mods: int) -> OppaiBeatmapAttributes:
+    """Read the map attributes of the last map `ezpp` calculated."""
+    return OppaiBeatmapAttributes(
+        mods=mods,
+        star_rating=ezpp.get_sr(),
+        aim_stars=ezpp.get_aim_stars(),
+        speed_stars=ezpp.get_speed_stars(),
+        approach_rate=ezpp.get_ar(),
+        overall_difficulty=ezpp.get_od(),
+        max_combo=ezpp.get_max_combo(),
+        circle_count=ezpp.get_ncircles(),
+        slider_count=ezpp.get_nsliders(),
+        spinner_count=ezpp.get_nspinners(),
+        object_count=ezpp.get_nobjects(),
+    )
+
+
+def calculate_oppai_attributes(
+    oppai_path: str,
+    osu_file_path: Union[str, BeatmapFile],
+    mods: int = 0,
+) -> OppaiBeatmapAttributes:
+    with OppaiWrapper(oppai_path) as ezpp:
+        ezpp.configure(mods=mods)
+        if isinstance(osu_file_path, str):
+            ezpp.calculate(Path(osu_file_path))
+        else:
+            ezpp.calculate_data(osu_file_path.read_bytes())
+
+        return read_oppai_attributes(ezpp, mods)
+
+
+class OppaiAttributeCache:
+    """Oppai map attributes, calculated once per (map, mods)."""
+
+    def __init__(self, oppai_path: str, maxsize: int = DEFAULT_CACHE_SIZE) -> None:
+        self.oppai_path = oppai_path
+        self.maxsize = maxsize
+
+        self._attributes: OrderedDict[
+            tuple[Hashable, int],
+            OppaiBeatmapAttributes,
+        ] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._attributes)
+
+    def get(
+        self,
+        osu_file_path: Union[str, BeatmapFile],
+        mods: int = 0,
+        beatmap_key: Optional[Hashable] = None,
+    ) -> OppaiBeatmapAttributes:
+        """The attributes of a map, keyed by its path unless a key (like its
+        checksum or id) is given. Sources other than paths need a key."""
+        if beatmap_key is None:
+            if not isinstance(osu_file_path, str):
+                raise ValueError("You must provide a key for beatmap sources")
+
+            beatmap_key = osu_file_path
+
+        key = (beatmap_key, mods)
+        with self._lock:
+            attributes = self._attributes.get(key)
+            if attributes is not None:
+                self._attributes.move_to_end(key)
+                return attributes
+
+        attributes = calculate_oppai_attributes(self.oppai_path, osu_file_path, mods)
+
+        with self._lock:
+            self._attributes[key] = attributes
+            while len(self._attributes) > self.maxsize:
+                self._attributes.popitem(last=False)
+
+        return attributes
+
+
+def _accuracy(
+    n300: np.ndarray,
+    n100: np.ndarray,
+    n50: np.ndarray,
+    nmiss: np.ndarray,
+) -> np.ndarray:
+    total_hits = n300 + n100 + n50 + nmiss
+    return np.where(
+        total_hits > 0,
+        (n50 * 50.0 + n100 * 100.0 + n300 * 300.0) / np.maximum(total_hits, 1) / 300.0,
+        0.0,
+    )
+
+
+def round_accuracy(
+    accuracy_percent: np.ndarray,
+    object_count: int,
+    nmiss: np.ndarray,
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """oppai's `acc_round`: the 300s, 100s and 50s closest to an accuracy."""
+    nmiss = np.minimum(object_count, nmiss)
+    max300 = object_count - nmiss
+
+    max_accuracy = _accuracy(max300, 0, 0, nmiss) * 100.0
+    accuracy_percent = np.maximum(0.0, np.minimum(max_accuracy, accuracy_percent))
+
+    missing = (accuracy_percent * 0.01 - 1.0) * object_count + nmiss
+    n100 = np.floor(-3.0 * missing * 0.5 + 0.5)
+    n50 = np.zeros_like(n100)
+
+    # lower than all 100s, use 50s
+    too_low = n100 > max300
+    n50 = np.where(
+        too_low,
+        np.minimum(max300, np.floor(-6.0 * missing * 0.5 + 0.5)),
+        n50,
+    )
+    n100 = np.where(too_low, 0, n100)
+
+    return max300 - n100 - n50, n100, n50
+
+
+def _base_pp(stars: float) -> float:
+    return (5.0 * max(1.0, stars / 0.0675) - 4.0) ** 3.0 / 100000.0
+
+
+def calculate_oppai_pp_many(
+    attributes: OppaiBeatmapAttributes,
+    accuracy_percent: np.ndarray,
+    combo: np.ndarray,
+    nmiss: np.ndarray,
+    score_version: int = 1,
+) -> np.ndarray:
+    """oppai's ppv2 for many scores on one map, with scores described the
+    way `OppaiWrapper.configure` takes them: 0 accuracy means SS and 0 combo
+    means full combo."""
+    accuracy_percent = np.asarray(accuracy_percent, dtype=np.float64)
+    combo = np.asarray(combo, dtype=np.float64)
+    nmiss = np.asarray(nmiss, dtype=np.float64)
+
+    mods = attributes.mods
+    ar = attributes.approach_rate
+    od = attributes.overall_difficulty
+    nobjects = attributes.object_count
+    ncircles = attributes.circle_count
+    max_combo = max(attributes.max_combo, 1)
+
+    accuracy_percent = np.where(accuracy_percent > 0, accuracy_percent, 100.0)
+    n300, n100, n50 = round_accuracy(accuracy_percent, nobjects, nmiss)
+    combo = np.where(combo > 0, combo, max_combo)
+
+    accuracy = _accuracy(n300, n100, n50, nmiss)
+
+    if score_version == 1:
+        # scorev1 ignores sliders and spinners, as they're free 300s
+        free_300s = attributes.slider_count + attributes.spinner_count
+        real_accuracy = np.maximum(0.0, _accuracy(n300 - free_300s, n100, n50, nmiss))
+    elif score_version == 2:
+        real_accuracy = accuracy
+        ncircles = nobjects
+    else:
+        raise ValueError(f"unsupported score version {score_version}")
+
+    nobjects_over_2k = nobjects / 2000.0
+    length_bonus = 0.95 + 0.4 * min(1.0, nobjects_over_2k)
+    if nobjects > 2000:
+        length_bonus += np.log10(nobjects_over_2k) * 0.5
+
+    miss_ratio = np.power(nmiss / max(nobjects, 1), 0.775)
+    miss_penalty_aim = np.where(nmiss > 0, 0.97 * np.power(1 - miss_ratio, nmiss), 1.0)
+    miss_penalty_speed = np.where(
+        nmiss > 0,
+        0.97 * np.power(1 - miss_ratio, np.power(nmiss, 0.875)),
+        1.0,
+    )
+    combo_break = np.power(combo, 0.8) / max_combo**0.8
+
+    ar_bonus = 0.0
+    if ar > 10.33:
+        ar_bonus += 0.4 * (ar - 10.33)
+    elif ar < 8.0:
+        ar_bonus += 0.01 * (8.0 - ar)
+    ar_bonus = 1.0 + min(ar_bonus, ar_bonus * (nobjects / 1000.0))
+
+    hd_bonus = 1.0
+    if mods & Mods.HIDDEN:
+        hd_bonus += 0.04 * (12.0 - ar)
+
+    # aim
+    aim = _base_pp(attributes.aim_stars) * length_bonus
+    aim = aim * miss_penalty_aim * combo_break * ar_bonus * hd_bonus
+
+    if mods & Mods.FLASHLIGHT:
+        fl_bonus = 1.0 + 0.35 * min(1.0, nobjects / 200.0)
+        if nobjects > 200:
+            fl_bonus += 0.3 * min(1.0, (nobjects - 200) / 300.0)
+        if nobjects > 500:
+            fl_bonus += (nobjects - 500) / 1200.0
+        aim *= fl_bonus
+
+    od_squared = od**2
+    aim *= (0.5 + accuracy / 2.0) * (0.98 + od_squared / 2500.0)
+
+    # speed
+    speed = _base_pp(attributes.speed_stars) * length_bonus
+    speed = speed * miss_penalty_speed * combo_break * hd_bonus
+    if ar > 10.33:
+        speed *= ar_bonus
+
+    speed *= (0.95 + od_squared / 750.0) * np.power(accuracy, (14.5 - max(od, 8.0)) / 2)
+    speed *= np.power(0.98, np.maximum(0.0, n50 - nobjects / 500.0))
+
+    # accuracy
+    acc = 1.52163**od * np.power(real_accuracy, 24.0) * 2.83
+    acc *= min(1.15, (ncircles / 1000.0) ** 0.3)
+    if mods & Mods.HIDDEN:
+        acc *= 1.08
+    if mods & Mods.FLASHLIGHT:
+        acc *= 1.02
+
+    final_multiplier = np.full_like(nmiss, 1.12)
+    if mods & Mods.NOFAIL:
+        final_multiplier *= np.maximum(0.9, 1.0 - 0.2 * nmiss)
+    if mods & Mods.SPUNOUT:
+        final_multiplier *= 1.0 - (attributes.spinner_count / max(nobjects, 1)) ** 0.85
+
+    total = (
+        np.power(
+            np.power(aim, 1.1) + np.power(speed, 1.1) + np.power(acc, 1.1),
+            1.0 / 1.1,
+        )
+        * final_multiplier
+    )
+
+    # like _calculate_oppai, broken results are worth nothing
+    return np.where(np.isfinite(total), total, 0.0)
+
+
+def calculate_oppai_pp(
+    attributes: OppaiBeatmapAttributes,
+    score: Score,
+    score_version: int = 1,
+) -> float:
+    return float(
+        calculate_oppai_pp_many(
+            attributes,
+            np.float64(score.accuracy),
+            np.float64(score.max_combo),
+            np.float64(score.num_misses),
+            score_version,
+        ),
+    )
+
+
+def calculate_oppai_scores(
+    attributes: OppaiBeatmapAttributes,
+    scores: Sequence[Score],
+) -> np.ndarray:
+    """pp of many scores, all set on the map and mods of `attributes`."""
+    return calculate_oppai_pp_many(
+        attributes,
+        np.array([score.accuracy for score in scores], dtype=np.float64),
+        np.array([score.max_combo for score in scores], dtype=np.float64),
+        np.array([score.num_misses for score in scores], dtype=np.float64),
+    )
@@ -1,16 +1,15 @@
 from __future__ import annotations
 
-import math
 from dataclasses import dataclass
 from typing import Any
-from typing import Callable
 
+from performance_calculator.models.difficulty import DifficultyAttributes
 from performance_calculator.models.mods import Mods
 from performance_calculator.models.oppai import OppaiWrapper
 from performance_calculator.models.path import Path
 from performance_calculator.models.performance import PerformanceAttributes
 from performance_calculator.models.performance import PerformanceCalculator
-from performance_calculator.models.score import Score
+from performance_calculator.models.performance import ScalarMath
 from performance_calculator.rulesets.osu.difficulty import OsuDifficultyAttributes
 
 
@@ -25,44 +24,131 @@ class OsuPerformanceAttributes(PerformanceAttributes):
 
 PERFORMANCE_BASE_MULTIPLIER = 1.14
 
-clamp: Callable[[float, float, float], float] = (
-    lambda x, l, u: l if x < l else u if x > u else x
-)
-
 
 class OsuPerformanceCalculator(PerformanceCalculator):
     difficulty_attributes: OsuDifficultyAttributes
 
-    def calculate(self, score: Score) -> OsuPerformanceAttributes:
-        effective_miss_count = self._calculate_effective_miss_count(score)
+    def __init__(
+        self,
+        difficulty_attributes: DifficultyAttributes,
+        xp: Any = ScalarMath,
+    ) -> None:
+        super().__init__(difficulty_attributes, xp)
+        attributes = self.difficulty_attributes
+
+        # everything that only depends on the map,
+        # so calculators can be reused for many scores
+        self._base_aim_value = (
+            xp.power(
+                5.0 * xp.maximum(1.0, attributes.aim_difficulty / 0.0675) - 4.0,
+                3.0,
+            )
+            / 100000.0
+        )
+        self._base_speed_value = (
+            xp.power(
+                5.0 * xp.maximum(1.0, attributes.speed_difficulty / 0.0675) - 4.0,
+                3.0,
+            )
+            / 100000.0
+        )
+        self._base_flashlight_value = (
+            xp.power(attributes.flashlight_difficulty, 2.0) * 25.0
+        )
+
+        approach_rate = attributes.approach_rate
+        self._speed_approach_rate_factor = xp.where(
+            approach_rate > 10.33,
+            0.3 * (approach_rate - 10.33),
+            0.0,
+        )
+        self._aim_approach_rate_factor = xp.where(
+            approach_rate < 8.0,
+            0.05 * (8.0 - approach_rate),
+            self._speed_approach_rate_factor,
+        )
+
+        self._hidden_bonus = 1.0 + 0.04 * (12.0 - approach_rate)
+
+        overall_difficulty = attributes.overall_difficulty
+        self._overall_difficulty_bonus = 0.98 + xp.power(overall_difficulty, 2) / 2500
+        self._speed_overall_difficulty_bonus = (
+            0.95 + xp.power(overall_difficulty, 2) / 750
+        )
+        self._speed_accuracy_exponent = (14.5 - xp.maximum(overall_difficulty, 8)) / 2
+        self._accuracy_scale = xp.power(1.52163, overall_difficulty)
+        self._accuracy_length_bonus = xp.minimum(
+            1.15,
+            xp.power(attributes.hit_circle_count / 1000.0, 0.3),
+        )
+
+        # maps without combo don't scale by it
+        self._scaled_max_combo = xp.power(xp.maximum(attributes.max_combo, 1), 0.8)
+        self._full_combo_threshold = (
+            attributes.max_combo - 0.1 * attributes.slider_count
+        )
+
+        # the divisors of terms only used on maps with sliders or notes
+        self._has_sliders = attributes.slider_count > 0
+        self._difficult_sliders = xp.where(
+            self._has_sliders,
+            attributes.slider_count * 0.15,
+            1.0,
+        )
+        self._speed_note_count = xp.where(
+            attributes.speed_note_count > 0,
+            attributes.speed_note_count,
+            1.0,
+        )
+        self._accuracy_object_count = xp.where(
+            attributes.hit_circle_count > 0,
+            attributes.hit_circle_count,
+            1,
+        )
+
+    def _calculate(self, xp: Any, score: Any) -> OsuPerformanceAttributes:
+        effective_miss_count = self._calculate_effective_miss_count(xp, score)
         total_hits = score.num_300s + score.num_100s + score.num_50s + score.num_misses
 
         multiplier = PERFORMANCE_BASE_MULTIPLIER
 
-        if score.mods & Mods.NOFAIL:
-            multiplier *= max(0.9, 1.0 - 0.02 * effective_miss_count)
+        multiplier *= xp.where(
+            score.mods & Mods.NOFAIL,
+            xp.maximum(0.9, 1.0 - 0.02 * effective_miss_count),
+            1.0,
+        )
 
-        if score.mods & Mods.SPUNOUT and total_hits > 0:
-            multiplier *= 1.0 - math.pow(
-                (self.difficulty_attributes.spinner_count / total_hits),
+        multiplier *= xp.where(
+            ((score.mods & Mods.SPUNOUT) != 0) & (total_hits > 0),
+            1.0
+            - xp.power(
+                (self.difficulty_attributes.spinner_count / xp.maximum(total_hits, 1)),
                 0.85,
-            )
+            ),
+            1.0,
+        )
 
-        aim_value = self._compute_aim_value(score, effective_miss_count, total_hits)
-        speed_value = self._compute_speed_value(score, effective_miss_count, total_hits)
-        accuracy_value = self._compute_accuracy_value(score, total_hits)
+        aim_value = self._compute_aim_value(xp, score, effective_miss_count, total_hits)
+        speed_value = self._compute_speed_value(
+            xp,
+            score,
+            effective_miss_count,
+            total_hits,
+        )
+        accuracy_value = self._compute_accuracy_value(xp, score, total_hits)
         flashlight_value = self._compute_flashlight_value(
+            xp,
             score,
             effective_miss_count,
             total_hits,
         )
 
         total_value = (
-            math.pow(
-                math.pow(aim_value, 1.1)
-                + math.pow(speed_value, 1.1)
-                + math.pow(accuracy_value, 1.1)
-                + math.pow(flashlight_value, 1.1),
+            xp.power(
+                xp.power(aim_value, 1.1)
+                + xp.power(speed_value, 1.1)
+                + xp.power(accuracy_value, 1.1)
+                + xp.power(flashlight_value, 1.1),
                 1.0 / 1.1,
             )
             * multiplier
@@ -79,260 +165,218 @@ class OsuPerformanceCalculator(PerformanceCalculator):
 
     def _compute_aim_value(
         self,
-        score: Score,
-        effective_miss_count: float,
-        total_hits: int,
-    ) -> float:
-        aim_value = (
-            math.pow(
-                5.0 * max(1.0, self.difficulty_attributes.aim_difficulty / 0.0675)
-                - 4.0,
-                3.0,
-            )
-            / 100000.0
-        )
-
-        length_bonus = (
-            0.95
-            + 0.4 * min(1.0, total_hits / 2000.0)
-            + ((math.log10(total_hits / 2000.0) * 0.5) * int(total_hits > 2000))
-        )
-        aim_value *= length_bonus
-
-        if effective_miss_count > 0:
-            aim_value *= 0.97 * math.pow(
-                1 - math.pow(effective_miss_count / total_hits, 0.775),
+        xp: Any,
+        score: Any,
+        effective_miss_count: Any,
+        total_hits: Any,
+    ) -> Any:
+        # a new value, as the map's terms may be arrays it mustn't change
+        length_bonus = _length_bonus(xp, total_hits)
+        aim_value = self._base_aim_value * length_bonus
+
+        aim_value *= xp.where(
+            effective_miss_count > 0,
+            0.97
+            * xp.power(
+                1 - _miss_ratio(xp, effective_miss_count, total_hits),
                 effective_miss_count,
-            )
-
-        aim_value *= self._get_combo_scaling_factor(score)
+            ),
+            1.0,
+        )
 
-        approach_rate_factor = 0.0
-        if self.difficulty_attributes.approach_rate > 10.33:
-            approach_rate_factor = 0.3 * (
-                self.difficulty_attributes.approach_rate - 10.33
-            )
-        elif self.difficulty_attributes.approach_rate < 8.0:
-            approach_rate_factor = 0.05 * (
-                8.0 - self.difficulty_attributes.approach_rate
-            )
+        aim_value *= self._get_combo_scaling_factor(xp, score)
 
-        aim_value *= 1.0 + approach_rate_factor * length_bonus
+        aim_value *= 1.0 + self._aim_approach_rate_factor * length_bonus
 
-        if score.mods & Mods.HIDDEN:
-            aim_value *= 1.0 + 0.04 * (12.0 - self.difficulty_attributes.approach_rate)
+        aim_value *= xp.where(score.mods & Mods.HIDDEN, self._hidden_bonus, 1.0)
 
-        if self.difficulty_attributes.slider_count > 0:
-            estimate_difficult_sliders = self.difficulty_attributes.slider_count * 0.15
+        estimate_difficult_sliders = self._difficult_sliders
 
-            estimate_slider_ends_dropped = clamp(
-                min(
-                    score.num_100s + score.num_50s + score.num_misses,
-                    self.difficulty_attributes.max_combo - score.max_combo,
-                ),
-                0,
-                estimate_difficult_sliders,
-            )
+        estimate_slider_ends_dropped = xp.clip(
+            xp.minimum(
+                score.num_100s + score.num_50s + score.num_misses,
+                self.difficulty_attributes.max_combo - score.max_combo,
+            ),
+            0,
+            estimate_difficult_sliders,
+        )
 
-            slider_nerf_factor = (
-                1 - self.difficulty_attributes.slider_factor
-            ) * math.pow(
-                1 - estimate_slider_ends_dropped / estimate_difficult_sliders,
-                3,
-            ) + self.difficulty_attributes.slider_factor
+        slider_nerf_factor = (1 - self.difficulty_attributes.slider_factor) * xp.power(
+            1 - estimate_slider_ends_dropped / estimate_difficult_sliders,
+            3,
+        ) + self.difficulty_attributes.slider_factor
 
-            aim_value *= slider_nerf_factor
+        aim_value *= xp.where(self._has_sliders, slider_nerf_factor, 1.0)
 
-        accuracy = score.accuracy if score.accuracy <= 1.0 else score.accuracy / 100
-        aim_value *= accuracy
-        aim_value *= (
-            0.98 + math.pow(self.difficulty_attributes.overall_difficulty, 2) / 2500
-        )
+        aim_value *= _accuracy(xp, score)
+        aim_value *= self._overall_difficulty_bonus
 
         return aim_value
 
     def _compute_speed_value(
         self,
-        score: Score,
-        effective_miss_count: float,
-        total_hits: int,
-    ) -> float:
-        speed_value = (
-            math.pow(
-                5.0 * max(1.0, self.difficulty_attributes.speed_difficulty / 0.0675)
-                - 4.0,
-                3.0,
-            )
-            / 100000.0
-        )
-
-        length_bonus = (
-            0.95
-            + 0.4 * min(1.0, total_hits / 2000.0)
-            + ((math.log10(total_hits / 2000.0) * 0.5) * int(total_hits > 2000))
+        xp: Any,
+        score: Any,
+        effective_miss_count: Any,
+        total_hits: Any,
+    ) -> Any:
+        length_bonus = _length_bonus(xp, total_hits)
+        speed_value = self._base_speed_value * length_bonus
+
+        speed_value *= xp.where(
+            effective_miss_count > 0,
+            0.97
+            * xp.power(
+                1 - _miss_ratio(xp, effective_miss_count, total_hits),
+                xp.power(effective_miss_count, 0.875),
+            ),
+            1.0,
         )
-        speed_value *= length_bonus
-
-        if effective_miss_count > 0:
-            speed_value *= 0.97 * math.pow(
-                1 - math.pow(effective_miss_count / total_hits, 0.775),
-                math.pow(effective_miss_count, 0.875),
-            )
-
-        speed_value *= self._get_combo_scaling_factor(score)
 
-        approach_rate_factor = 0.0
-        if self.difficulty_attributes.approach_rate > 10.33:
-            approach_rate_factor = 0.3 * (
-                self.difficulty_attributes.approach_rate - 10.33
-            )
+        speed_value *= self._get_combo_scaling_factor(xp, score)
 
-        speed_value *= 1.0 + approach_rate_factor * length_bonus
+        speed_value *= 1.0 + self._speed_approach_rate_factor * length_bonus
 
-        if score.mods & Mods.HIDDEN:
-            speed_value *= 1.0 + 0.04 * (
-                12.0 - self.difficulty_attributes.approach_rate
-            )
+        speed_value *= xp.where(score.mods & Mods.HIDDEN, self._hidden_bonus, 1.0)
 
         relevant_total_diff = total_hits - self.difficulty_attributes.speed_note_count
-        relevant_count_great = max(0, score.num_300s - relevant_total_diff)
-        relevant_count_ok = max(
+        relevant_count_great = xp.maximum(0, score.num_300s - relevant_total_diff)
+        relevant_count_ok = xp.maximum(
             0,
-            score.num_100s - max(0, relevant_total_diff - score.num_300s),
+            score.num_100s - xp.maximum(0, relevant_total_diff - score.num_300s),
         )
-        relevant_count_meh = max(
+        relevant_count_meh = xp.maximum(
             0,
             score.num_50s
-            - max(0, relevant_total_diff - score.num_300s - score.num_100s),
+            - xp.maximum(0, relevant_total_diff - score.num_300s - score.num_100s),
         )
 
-        relevant_accuracy = 0
-        if self.difficulty_attributes.speed_note_count > 0:
-            relevant_accuracy = (
-                relevant_count_great * 6.0
-                + relevant_count_ok * 2.0
-                + relevant_count_meh
-            ) / (self.difficulty_attributes.speed_note_count * 6.0)
-
-        accuracy = score.accuracy if score.accuracy <= 1.0 else score.accuracy / 100
+        relevant_accuracy = xp.where(
+            self.difficulty_attributes.speed_note_count > 0,
+            (relevant_count_great * 6.0 + relevant_count_ok * 2.0 + relevant_count_meh)
+            / (self._speed_note_count * 6.0),
+            0,
+        )
 
-        speed_value *= (
-            0.95 + math.pow(self.difficulty_attributes.overall_difficulty, 2) / 750
-        ) * math.pow(
-            (accuracy + relevant_accuracy) / 2.0,
-            (14.5 - max(self.difficulty_attributes.overall_difficulty, 8)) / 2,
+        speed_value *= self._speed_overall_difficulty_bonus * xp.power(
+            (_accuracy(xp, score) + relevant_accuracy) / 2.0,
+            self._speed_accuracy_exponent,
         )
 
-        speed_value *= math.pow(
+        speed_value *= xp.power(
             0.99,
-            (score.num_50s - total_hits / 500.0)
-            * int(score.num_50s > total_hits / 500.0),
+            xp.where(
+                score.num_50s > total_hits / 500.0,
+                score.num_50s - total_hits / 500.0,
+                0.0,
+            ),
         )
 
         return speed_value
 
-    def _compute_accuracy_value(
-        self,
-        score: Score,
-        total_hits: int,
-    ) -> float:
+    def _compute_accuracy_value(self, xp: Any, score: Any, total_hits: Any) -> Any:
         amount_hit_objects_with_accuracy = self.difficulty_attributes.hit_circle_count
 
-        better_accuracy_percentage = 0.0
-        if amount_hit_objects_with_accuracy > 0:
-            better_accuracy_percentage = max(
+        better_accuracy_percentage = xp.where(
+            amount_hit_objects_with_accuracy > 0,
+            xp.maximum(
                 (
                     (score.num_300s - (total_hits - amount_hit_objects_with_accuracy))
                     * 6
                     + score.num_100s * 2
                     + score.num_50s
                 )
-                / (amount_hit_objects_with_accuracy * 6),
+                / (self._accuracy_object_count * 6),
                 0,
-            )
-
-        accuracy_value = (
-            math.pow(1.52163, self.difficulty_attributes.overall_difficulty)
-            * math.pow(better_accuracy_percentage, 24)
-            * 2.83
+            ),
+            0.0,
         )
 
-        accuracy_value *= min(
-            1.15,
-            math.pow(amount_hit_objects_with_accuracy / 1000.0, 0.3),
+        accuracy_value = (
+            self._accuracy_scale * xp.power(better_accuracy_percentage, 24) * 2.83
         )
 
-        if score.mods & Mods.HIDDEN:
-            accuracy_value *= 1.08
+        accuracy_value *= self._accuracy_length_bonus
 
-        if score.mods & Mods.FLASHLIGHT:
-            accuracy_value *= 1.02
+        accuracy_value *= xp.where(score.mods & Mods.HIDDEN, 1.08, 1.0)
+        accuracy_value *= xp.where(score.mods & Mods.FLASHLIGHT, 1.02, 1.0)
 
         return accuracy_value
 
     def _compute_flashlight_value(
         self,
-        score: Score,
-        effective_miss_count: float,
-        total_hits: int,
-    ) -> float:
-        if not score.mods & Mods.FLASHLIGHT:
-            return 0.0
-
-        flashlight_value = (
-            math.pow(self.difficulty_attributes.flashlight_difficulty, 2.0) * 25.0
+        xp: Any,
+        score: Any,
+        effective_miss_count: Any,
+        total_hits: Any,
+    ) -> Any:
+        flashlight_value = self._base_flashlight_value * xp.where(
+            effective_miss_count > 0,
+            0.97
+            * xp.power(
+                1 - _miss_ratio(xp, effective_miss_count, total_hits),
+                xp.power(effective_miss_count, 0.875),
+            ),
+            1.0,
         )
 
-        if effective_miss_count > 0:
-            flashlight_value *= 0.97 * math.pow(
-                1 - math.pow(effective_miss_count / total_hits, 0.775),
-                math.pow(effective_miss_count, 0.875),
-            )
-
-        flashlight_value *= self._get_combo_scaling_factor(score)
+        flashlight_value *= self._get_combo_scaling_factor(xp, score)
 
         flashlight_value *= (
             0.7
-            + 0.1 * min(1.0, total_hits / 200.0)
-            + 0.2 * (min(1.0, (total_hits - 200) / 200.0) * int(total_hits > 200))
+            + 0.1 * xp.minimum(1.0, total_hits / 200.0)
+            + xp.where(
+                total_hits > 200,
+                0.2 * xp.minimum(1.0, (total_hits - 200) / 200.0),
+                0.0,
+            )
         )
 
-        accuracy = score.accuracy if score.accuracy <= 1.0 else score.accuracy / 100
-        flashlight_value *= 0.5 + accuracy / 2.0
-        flashlight_value *= (
-            0.98 + math.pow(self.difficulty_attributes.overall_difficulty, 2) / 2500.0
-        )
+        flashlight_value *= 0.5 + _accuracy(xp, score) / 2.0
+        flashlight_value *= self._overall_difficulty_bonus
 
-        return flashlight_value
+        return xp.where(score.mods & Mods.FLASHLIGHT, flashlight_value, 0.0)
 
-    def _calculate_effective_miss_count(self, score: Score) -> float:
-        combo_based_miss_count = 0.0
+    def _calculate_effective_miss_count(self, xp: Any, score: Any) -> Any:
+        full_combo_threshold = self._full_combo_threshold
 
-        if self.difficulty_attributes.slider_count > 0:
-            full_combo_threshold = (
-                self.difficulty_attributes.max_combo
-                - 0.1 * self.difficulty_attributes.slider_count
-            )
-
-            if score.max_combo < full_combo_threshold:
-                combo_based_miss_count = full_combo_threshold / max(
-                    1.0,
-                    score.max_combo,
-                )
+        combo_based_miss_count = xp.where(
+            self._has_sliders & (score.max_combo < full_combo_threshold),
+            full_combo_threshold / xp.maximum(1.0, score.max_combo),
+            0.0,
+        )
 
-        combo_based_miss_count = min(
+        combo_based_miss_count = xp.minimum(
             combo_based_miss_count,
             score.num_100s + score.num_50s + score.num_misses,
         )
 
-        return max(score.num_misses, combo_based_miss_count)
+        return xp.maximum(score.num_misses, combo_based_miss_count)
 
-    def _get_combo_scaling_factor(self, score: Score) -> float:
-        if self.difficulty_attributes.max_combo <= 0:
-            return 1.0
-
-        return min(
-            math.pow(score.max_combo, 0.8)
-            / math.pow(self.difficulty_attributes.max_combo, 0.8),
+    def _get_combo_scaling_factor(self, xp: Any, score: Any) -> Any:
+        return xp.where(
+            self.difficulty_attributes.max_combo > 0,
+            xp.minimum(xp.power(score.max_combo, 0.8) / self._scaled_max_combo, 1.0),
             1.0,
         )
+
+
+def _length_bonus(xp: Any, total_hits: Any) -> Any:
+    return (
+        0.95
+        + 0.4 * xp.minimum(1.0, total_hits / 2000.0)
+        + xp.where(
+            total_hits > 2000,
+            xp.log10(xp.maximum(total_hits, 2000) / 2000.0) * 0.5,
+            0.0,
+        )
+    )
+
+
+def _miss_ratio(xp: Any, effective_miss_count: Any, total_hits: Any) -> Any:
+    # only used where there are hits
+    return xp.power(effective_miss_count / xp.maximum(total_hits, 1), 0.775)
+
+
+def _accuracy(xp: Any, score: Any) -> Any:
+    return xp.where(score.accuracy <= 1.0, score.accuracy, score.accuracy / 100)
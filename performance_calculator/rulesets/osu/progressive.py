@@ -0,0 +1,239 @@
+from __future__ import annotations
+
+import dataclasses
+import math
+from dataclasses import dataclass
+from typing import Optional
+from typing import Sequence
+from typing import Union
+
+import numpy as np
+
+from performance_calculator.models.beatmap import Beatmap
+from performance_calculator.models.beatmap import HitObjectType
+from performance_calculator.models.beatmap import parse_beatmap
+from performance_calculator.models.beatmap_arrays import BeatmapArrays
+from performance_calculator.models.beatmap_source import BeatmapFile
+from performance_calculator.models.beatmap_stats import clock_rate
+from performance_calculator.models.oppai import OppaiWrapper
+from performance_calculator.models.oppai_graph import read_oppai_graph
+from performance_calculator.models.oppai_graph import StrainGraph
+from performance_calculator.models.path import Path
+from performance_calculator.models.score import Score
+from performance_calculator.models.strain import prefix_peaks
+from performance_calculator.models.strain import progressive_strain_peaks
+from performance_calculator.models.strain import SECTION_LENGTH
+from performance_calculator.models.strain import weighted_peak_sum
+from performance_calculator.rulesets.osu.difficulty_calculator import (
+    OsuDifficultyCalculator,
+)
+from performance_calculator.rulesets.osu.oppai_performance import calculate_oppai_pp
+from performance_calculator.rulesets.osu.oppai_performance import (
+    read_oppai_attributes,
+)
+from performance_calculator.rulesets.osu.performance import OsuPerformanceCalculator
+
+# oppai-ng's star rating constants
+OPPAI_STAR_SCALING_FACTOR = 0.0675
+OPPAI_EXTREME_SCALING_FACTOR = 0.5
+OPPAI_AIM_DECAY_BASE = 0.15
+OPPAI_SPEED_DECAY_BASE = 0.3
+
+
+@dataclass
+class PrefixPerformance:
+    # the first `object_count` hit objects, ending at `time`
+    object_count: int
+    time: float
+    star_rating: float
+    pp: float
+
+
+def _perfect_score(mods: int, object_count: int, max_combo: int) -> Score:
+    return Score(
+        mode=0,
+        score=0,
+        max_combo=max_combo,
+        mods=mods,
+        accuracy=1.0,
+        num_300s=object_count,
+        num_100s=0,
+        num_50s=0,
+        num_gekis=0,
+        num_katus=0,
+        num_misses=0,
+    )
+
+
+def _object_counts(
+    object_count: int,
+    object_counts: Optional[Sequence[int]],
+    scores: Optional[Sequence[Score]],
+) -> Sequence[int]:
+    if object_counts is None:
+        object_counts = range(1, object_count + 1)
+
+    if scores is not None and len(scores) != len(object_counts):
+        raise ValueError("scores must match the prefixes one to one")
+
+    return object_counts
+
+
+def calculate_progressive(
+    beatmap: Union[Beatmap, BeatmapArrays],
+    mods: int = 0,
+    object_counts: Optional[Sequence[int]] = None,
+    scores: Optional[Sequence[Score]] = None,
+) -> list[PrefixPerformance]:
+    """Star rating and lazer pp after each of `object_counts` objects,
+    every prefix by default. Each prefix is scored with the matching score
+    in `scores`, or as a perfect play up to that point if none are given.
+    """
+    calculator = OsuDifficultyCalculator(beatmap)
+    hit_objects = calculator.beatmap.hit_objects
+    object_counts = _object_counts(len(hit_objects), object_counts, scores)
+
+    results = []
+    prefixes = calculator.calculate_prefixes(mods, object_counts)
+    for i, (object_count, attributes) in enumerate(zip(object_counts, prefixes)):
+        if scores is not None:
+            score = scores[i]
+        else:
+            score = _perfect_score(mods, object_count, attributes.max_combo)
+
+        results.append(
+            PrefixPerformance(
+                object_count=object_count,
+                time=float(hit_objects["time"][object_count - 1]),
+                star_rating=attributes.star_rating,
+                pp=OsuPerformanceCalculator(attributes).calculate(score).total,
+            ),
+        )
+
+    return results
+
+
+def oppai_prefix_stars(
+    strains: StrainGraph,
+    mods: int,
+    object_counts: Sequence[int],
+) -> list[tuple[float, float, float]]:
+    """oppai-ng's (stars, aim stars, speed stars) after each of
+    `object_counts` objects, from the per-object strains it exported."""
+    section_length = SECTION_LENGTH * float(clock_rate(mods))
+    times = np.asarray(strains.times, dtype=np.float64)
+
+    progress = []
+    for values, decay_base in (
+        (strains.aim, OPPAI_AIM_DECAY_BASE),
+        (strains.speed, OPPAI_SPEED_DECAY_BASE),
+    ):
+        values = np.asarray(values, dtype=np.float64)
+        progress.append(
+            progressive_strain_peaks(
+                times,
+                values,
+                ((values, decay_base),),
+                section_length,
+            ),
+        )
+
+    aim, speed = progress
+
+    results = []
+    for object_count in object_counts:
+        if not 1 <= object_count <= len(times):
+            raise ValueError(f"the map has no prefix of {object_count} objects")
+
+        aim_stars = (
+            math.sqrt(weighted_peak_sum(prefix_peaks(*aim, object_count - 1)))
+            * OPPAI_STAR_SCALING_FACTOR
+        )
+        speed_stars = (
+            math.sqrt(weighted_peak_sum(prefix_peaks(*speed, object_count - 1)))
+            * OPPAI_STAR_SCALING_FACTOR
+        )
+        stars = (
+            aim_stars
+            + speed_stars
+            + abs(speed_stars - aim_stars) * OPPAI_EXTREME_SCALING_FACTOR
+        )
+        results.append((stars, aim_stars, speed_stars))
+
+    return results
+
+
+def calculate_progressive_oppai(
+    oppai_path: str,
+    osu_file_path: Union[str, BeatmapFile],
+    mods: int = 0,
+    object_counts: Optional[Sequence[int]] = None,
+    scores: Optional[Sequence[Score]] = None,
+) -> list[PrefixPerformance]:
+    """`calculate_progressive` for relax and autopilot, which oppai scores.
+
+    oppai calculates the whole map once, and each prefix is rated from its
+    exported strains and scored with the Python port of its pp formula,
+    rather than re-parsing the map with `set_end` for every prefix.
+    """
+    if isinstance(osu_file_path, str):
+        content = Path(osu_file_path).read_bytes()
+    else:
+        content = osu_file_path.read_bytes()
+
+    with OppaiWrapper(oppai_path) as ezpp:
+        ezpp.configure(mods=mods)
+        ezpp.calculate_data(content)
+
+        graph = read_oppai_graph(ezpp)
+        map_attributes = read_oppai_attributes(ezpp, mods)
+
+    beatmap = BeatmapArrays.from_beatmap(parse_beatmap(content))
+    hit_objects = beatmap.hit_objects
+    if len(hit_objects) != len(graph.strains.times):
+        raise ValueError("oppai and the beatmap parser disagree on the objects")
+
+    object_counts = _object_counts(len(hit_objects), object_counts, scores)
+
+    object_types = hit_objects["type"]
+    circle_counts = np.cumsum((object_types & HitObjectType.CIRCLE) != 0)
+    slider_counts = np.cumsum((object_types & HitObjectType.SLIDER) != 0)
+    spinner_counts = np.cumsum((object_types & HitObjectType.SPINNER) != 0)
+    max_combos = np.cumsum(beatmap.object_combos())
+
+    results = []
+    stars = oppai_prefix_stars(graph.strains, mods, object_counts)
+    for i, (object_count, (star_rating, aim_stars, speed_stars)) in enumerate(
+        zip(object_counts, stars),
+    ):
+        attributes = dataclasses.replace(
+            map_attributes,
+            star_rating=star_rating,
+            aim_stars=aim_stars,
+            speed_stars=speed_stars,
+            max_combo=int(max_combos[object_count - 1]),
+            circle_count=int(circle_counts[object_count - 1]),
+            slider_count=int(slider_counts[object_count - 1]),
+            spinner_count=int(spinner_counts[object_count - 1]),
+            object_count=object_count,
+        )
+
+        if scores is not None:
+            score = scores[i]
+        else:
+            # oppai takes accuracy as a percentage
+            score = dataclasses.replace(
+                _perfect_score(mods, object_count, attributes.max_combo),
+                accuracy=100.0,
+            )
+
+        results.append(
+            PrefixPerformance(
+                object_count=object_count,
+                time=float(hit_objects["time"][object_count - 1]),
+                star_rating=star_rating,
+                pp=calculate_oppai_pp(attributes, score),
+            ),
+        )
+
+    return results
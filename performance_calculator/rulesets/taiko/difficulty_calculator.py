@@ -0,0 +1,556 @@
+from __future__ import annotations
+
+import math
+from dataclasses import dataclass
+from typing import Union
+
+import numpy as np
+
+from performance_calculator.models.beatmap import BASE_SCORING_DISTANCE
+from performance_calculator.models.beatmap import Beatmap
+from performance_calculator.models.beatmap import HitObjectType
+from performance_calculator.models.beatmap_arrays import BeatmapArrays
+from performance_calculator.models.beatmap_stats import calculate_beatmap_stats
+from performance_calculator.models.difficulty_calculator import DifficultyCalculator
+from performance_calculator.models.strain import decayed_cumsum
+from performance_calculator.models.strain import strain_decay
+from performance_calculator.models.strain import strain_peaks
+from performance_calculator.models.strain import weighted_peak_sum
+from performance_calculator.rulesets.taiko.difficulty import TaikoDifficultyAttributes
+
+DIFFICULTY_MULTIPLIER = 1.35
+
+FINAL_MULTIPLIER = 0.0625
+RHYTHM_SKILL_MULTIPLIER = 0.2 * FINAL_MULTIPLIER
+COLOUR_SKILL_MULTIPLIER = 0.375 * FINAL_MULTIPLIER
+STAMINA_SKILL_MULTIPLIER = 0.375 * FINAL_MULTIPLIER
+
+LEGACY_TAIKO_VELOCITY_MULTIPLIER = 1.4
+
+# hitsounds played on the rim
+RIM_HITSOUNDS = (1 << 1) | (1 << 3)
+
+# colour
+COLOUR_STRAIN_MULTIPLIER = 0.12
+COLOUR_STRAIN_DECAY_BASE = 0.8
+MAX_REPETITION_INTERVAL = 16
+
+# stamina
+STAMINA_STRAIN_MULTIPLIER = 1.1
+STAMINA_STRAIN_DECAY_BASE = 0.4
+
+# rhythm
+RHYTHM_STRAIN_MULTIPLIER = 10.0
+RHYTHM_STRAIN_DECAY = 0.96
+RHYTHM_HISTORY_MAX_LENGTH = 8
+
+# (ratio between consecutive note lengths, difficulty)
+COMMON_RHYTHMS = (
+    (1 / 1, 0.0),
+    (2 / 1, 0.3),
+    (1 / 2, 0.5),
+    (3 / 1, 0.3),
+    (1 / 3, 0.35),
+    # purposefully higher, this needs a hand switch when fully alternating
+    (3 / 2, 0.6),
+    (2 / 3, 0.4),
+    (5 / 4, 0.5),
+    (4 / 5, 0.7),
+)
+
+
+@dataclass
+class _TaikoObjects:
+    """Everything about a map's difficulty objects that doesn't
+    depend on the clock rate, lazer's `TaikoDifficultyHitObject`.
+
+    Arrays are indexed by difficulty object, which is every object
+    after the first two.
+    """
+
+    # of every object, including the first two
+    start_time: np.ndarray
+    is_hit: np.ndarray
+
+    # `PreviousMono(1)`, the last object hit with the same key, or -1
+    previous_mono: np.ndarray
+    colour_difficulty: np.ndarray
+
+    # rhythm difficulty with its repetition and pattern length penalties,
+    # only non-zero where the rhythm changes
+    rhythm_difficulty: np.ndarray
+
+
+def _sigmoid(
+    value: np.ndarray,
+    center: float,
+    width: float,
+    middle: float,
+    height: float,
+) -> np.ndarray:
+    return np.tanh(math.e * -(value - center) / width) * (height / 2) + middle
+
+
+def _rescale(star_rating: float) -> float:
+    if star_rating < 0:
+        return star_rating
+
+    return 10.43 * math.log(star_rating / 8 + 1)
+
+
+def _last_index(mask: np.ndarray) -> np.ndarray:
+    """The index of the last `True` at or before each position, or -1."""
+    return np.maximum.accumulate(np.where(mask, np.arange(len(mask)), -1))
+
+
+def _colour_difficulty(hit_types: np.ndarray) -> np.ndarray:
+    """lazer's `TaikoColourDifficultyPreprocessor` and `ColourEvaluator`.
+
+    `hit_types` is 0 for centre hits, 1 for rims and -1 for anything
+    which isn't a hit.
+    """
+    object_count = len(hit_types)
+    is_hit = hit_types >= 0
+
+    # mono streaks: runs of the same colour
+    previous_note = np.concatenate(([-1], _last_index(is_hit)[:-1]))
+    new_streak = (
+        ~is_hit
+        | (previous_note < 0)
+        | (hit_types != hit_types[np.maximum(previous_note, 0)])
+    )
+    new_streak[0] = True
+
+    streak_starts = np.flatnonzero(new_streak)
+    streak_lengths = np.diff(np.append(streak_starts, object_count))
+    streak_types = hit_types[streak_starts]
+
+    # alternating mono patterns: consecutive streaks of the same length
+    new_pattern = np.concatenate(([True], streak_lengths[1:] != streak_lengths[:-1]))
+    pattern_of_streak = np.cumsum(new_pattern) - 1
+    pattern_first_streaks = np.flatnonzero(new_pattern)
+    pattern_streak_counts = np.diff(
+        np.append(pattern_first_streaks, len(streak_starts)),
+    )
+    pattern_lengths = streak_lengths[pattern_first_streaks]
+    pattern_types = streak_types[pattern_first_streaks]
+    pattern_count = len(pattern_first_streaks)
+
+    # repeating hit patterns: patterns which repeat two patterns later
+    coupled = np.zeros(pattern_count, dtype=bool)
+    coupled[:-2] = (
+        (pattern_lengths[:-2] == pattern_lengths[2:])
+        & (pattern_streak_counts[:-2] == pattern_streak_counts[2:])
+        & (pattern_types[:-2] == pattern_types[2:])
+    )
+
+    group_starts = []
+    pattern = 0
+    while pattern < pattern_count:
+        group_starts.append(pattern)
+
+        if not coupled[pattern]:
+            pattern += 1
+            continue
+
+        while coupled[pattern]:
+            pattern += 1
+
+        pattern += 2
+
+    group_starts = np.array(group_starts, dtype=np.int64)
+    new_group = np.zeros(pattern_count, dtype=bool)
+    new_group[group_starts] = True
+    group_of_pattern = np.cumsum(new_group) - 1
+    group_pattern_counts = np.diff(np.append(group_starts, pattern_count))
+
+    # groups repeat each other if their first two patterns have the same lengths
+    group_lengths = pattern_lengths[group_starts]
+    group_second_lengths = np.where(
+        group_pattern_counts >= 2,
+        pattern_lengths[np.minimum(group_starts + 1, pattern_count - 1)],
+        -1,
+    )
+
+    repetition_intervals = np.full(
+        len(group_starts),
+        MAX_REPETITION_INTERVAL + 1,
+        dtype=np.int64,
+    )
+    for interval in range(MAX_REPETITION_INTERVAL - 1, 0, -1):
+        repeats = np.zeros(len(group_starts), dtype=bool)
+        repeats[interval:] = (
+            (group_pattern_counts[interval:] == group_pattern_counts[:-interval])
+            & (group_lengths[interval:] == group_lengths[:-interval])
+            & (group_second_lengths[interval:] == group_second_lengths[:-interval])
+        )
+        repetition_intervals[repeats] = interval
+
+    group_difficulty = 2 * (1 - _sigmoid(repetition_intervals, 2, 2, 0.5, 1))
+
+    pattern_index = np.arange(pattern_count) - group_starts[group_of_pattern]
+    pattern_difficulty = (
+        _sigmoid(pattern_index, 2, 2, 0.5, 1) * group_difficulty[group_of_pattern]
+    )
+
+    streak_index = (
+        np.arange(len(streak_starts)) - pattern_first_streaks[pattern_of_streak]
+    )
+    streak_difficulty = (
+        _sigmoid(streak_index, 2, 2, 0.5, 1)
+        * pattern_difficulty[pattern_of_streak]
+        * 0.5
+    )
+
+    # only the first object of each streak, pattern and group is rated
+    difficulty = np.zeros(object_count)
+    np.add.at(difficulty, streak_starts, streak_difficulty)
+    np.add.at(
+        difficulty,
+        streak_starts[pattern_first_streaks],
+        pattern_difficulty,
+    )
+    np.add.at(
+        difficulty,
+        streak_starts[pattern_first_streaks[group_starts]],
+        group_difficulty,
+    )
+
+    return difficulty
+
+
+def _repetition_penalties(rhythms: np.ndarray, indices: np.ndarray) -> np.ndarray:
+    """lazer's `Rhythm.repetitionPenalties`, for each rhythm change at once.
+
+    `rhythms` and `indices` are the rhythm and object index of each change.
+    """
+    penalties = np.ones(len(rhythms))
+    positions = np.arange(len(rhythms))
+
+    for pattern_length in range(2, RHYTHM_HISTORY_MAX_LENGTH // 2 + 1):
+        found = np.zeros(len(rhythms), dtype=bool)
+
+        # the most recent earlier occurrence of the last `pattern_length`
+        # rhythms, within the history
+        for offset in range(pattern_length, RHYTHM_HISTORY_MAX_LENGTH):
+            start = positions - offset
+            candidates = ~found & (start >= 0) & (positions - pattern_length + 1 >= 0)
+
+            for i in range(pattern_length):
+                candidates &= (
+                    rhythms[np.maximum(start + i, 0)]
+                    == rhythms[np.maximum(positions - pattern_length + 1 + i, 0)]
+                )
+
+            notes_since = indices - indices[np.maximum(start, 0)]
+            penalties = np.where(
+                candidates,
+                penalties * np.minimum(1.0, 0.032 * notes_since),
+                penalties,
+            )
+            found |= candidates
+
+    return penalties
+
+
+class TaikoDifficultyCalculator(DifficultyCalculator):
+    """lazer's 2022 taiko star rating.
+
+    osu!standard sliders are converted into hits or drum rolls the way
+    lazer decides between them, but every generated hit takes the colour
+    of the slider's own hitsound since per-node hitsounds aren't parsed.
+    """
+
+    def __init__(self, beatmap: Union[Beatmap, BeatmapArrays]) -> None:
+        super().__init__(beatmap)
+
+        if self.beatmap.mode not in (0, 1):
+            raise ValueError(f"mode {self.beatmap.mode} can't be converted to taiko")
+
+        # shared by every mod combination
+        self._objects = self._build_objects()
+
+    @property
+    def is_converted(self) -> bool:
+        return self.beatmap.mode != 1
+
+    def _convert(self) -> tuple[np.ndarray, np.ndarray]:
+        """Start times and hit types (see `_colour_difficulty`) of
+        the map's taiko objects."""
+        hit_objects = self.beatmap.hit_objects
+        start_times = hit_objects["time"]
+
+        hit_types = np.where(
+            hit_objects["type"] & HitObjectType.CIRCLE,
+            (hit_objects["hitsound"] & RIM_HITSOUNDS) != 0,
+            -1,
+        ).astype(np.int64)
+
+        if not self.is_converted:
+            return start_times, hit_types
+
+        difficulty = self.beatmap.difficulty
+        is_slider = (hit_objects["type"] & HitObjectType.SLIDER) != 0
+
+        timing_beat_lengths = self.beatmap.beat_lengths_at(start_times)
+        beat_lengths = timing_beat_lengths / self.beatmap.slider_velocities_at(
+            start_times,
+        )
+
+        span_counts = hit_objects["repeat_count"] + 1
+        distances = (
+            hit_objects["pixel_length"] * span_counts * LEGACY_TAIKO_VELOCITY_MULTIPLIER
+        )
+        taiko_velocity = (
+            BASE_SCORING_DISTANCE
+            * difficulty.slider_multiplier
+            * LEGACY_TAIKO_VELOCITY_MULTIPLIER
+        )
+        taiko_durations = np.trunc(distances / taiko_velocity * beat_lengths)
+
+        if self.beatmap.format_version >= 8:
+            tick_beat_lengths = timing_beat_lengths
+        else:
+            tick_beat_lengths = beat_lengths
+
+        tick_spacings = np.minimum(
+            tick_beat_lengths / difficulty.slider_tick_rate,
+            taiko_durations / span_counts,
+        )
+
+        # short sliders become a hit on every tick
+        split = (
+            is_slider
+            & (tick_spacings > 0)
+            & (distances / taiko_velocity * beat_lengths < 2 * tick_beat_lengths)
+        )
+        hit_counts = np.ones(len(start_times), dtype=np.int64)
+        hit_counts[split] += np.floor(
+            (taiko_durations[split] + tick_spacings[split] / 8) / tick_spacings[split],
+        ).astype(np.int64)
+
+        hit_types = np.where(
+            split,
+            (hit_objects["hitsound"] & RIM_HITSOUNDS) != 0,
+            hit_types,
+        )
+
+        first_hits = np.cumsum(hit_counts) - hit_counts
+        tick_indices = np.arange(hit_counts.sum()) - np.repeat(first_hits, hit_counts)
+        converted_times = np.repeat(start_times, hit_counts) + tick_indices * np.repeat(
+            np.where(split, tick_spacings, 0),
+            hit_counts,
+        )
+        converted_types = np.repeat(hit_types, hit_counts)
+
+        order = np.argsort(converted_times, kind="stable")
+        return converted_times[order], converted_types[order]
+
+    def _build_objects(self) -> _TaikoObjects:
+        start_times, hit_types = self._convert()
+        is_hit = hit_types >= 0
+
+        if len(start_times) < 3:
+            return _TaikoObjects(
+                start_time=start_times,
+                is_hit=is_hit,
+                previous_mono=np.empty(0, dtype=np.int64),
+                colour_difficulty=np.empty(0),
+                rhythm_difficulty=np.empty(0),
+            )
+
+        # difficulty objects start from the third object
+        hit_types = hit_types[2:]
+        object_hits = is_hit[2:]
+        indices = np.arange(len(hit_types))
+
+        previous_mono = np.full(len(hit_types), -1, dtype=np.int64)
+        for hit_type in (0, 1):
+            mono_indices = np.flatnonzero(hit_types == hit_type)
+            previous_mono[mono_indices[2:]] = mono_indices[:-2]
+
+        lengths = np.diff(start_times)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            ratios = lengths[1:] / lengths[:-1]
+
+        common_ratios = np.array([ratio for ratio, _ in COMMON_RHYTHMS])
+        common_difficulties = np.array([difficulty for _, difficulty in COMMON_RHYTHMS])
+        rhythms = np.argmin(
+            np.nan_to_num(np.abs(ratios[:, None] - common_ratios), nan=np.inf),
+            axis=1,
+        )
+
+        changes = object_hits & (common_difficulties[rhythms] != 0)
+        change_indices = np.flatnonzero(changes)
+
+        # hits since the last rhythm change, or since the last non-hit
+        resets = ~object_hits | changes
+        last_reset = np.concatenate(([-1], _last_index(resets)[:-1]))
+        pattern_lengths = indices - last_reset
+        pattern_length_penalties = np.minimum(
+            np.minimum(0.15 * pattern_lengths, 1.0),
+            np.clip(2.5 - 0.15 * pattern_lengths, 0.0, 1.0),
+        )
+
+        rhythm_difficulty = np.zeros(len(hit_types))
+        rhythm_difficulty[change_indices] = (
+            common_difficulties[rhythms[change_indices]]
+            * _repetition_penalties(rhythms[change_indices], change_indices)
+            * pattern_length_penalties[change_indices]
+        )
+
+        return _TaikoObjects(
+            start_time=start_times,
+            is_hit=is_hit,
+            previous_mono=previous_mono,
+            colour_difficulty=_colour_difficulty(hit_types),
+            rhythm_difficulty=rhythm_difficulty,
+        )
+
+    def _rhythm_strains(
+        self,
+        delta_times: np.ndarray,
+        is_hit: np.ndarray,
+    ) -> np.ndarray:
+        rhythm_difficulty = self._objects.rhythm_difficulty
+        changes = rhythm_difficulty != 0
+
+        speed_penalties = np.where(
+            delta_times < 80,
+            1.0,
+            np.maximum(0, 1.4 - 0.005 * delta_times),
+        )
+
+        # non-hits and slow rhythm changes reset the strain
+        resets = ~is_hit | (changes & (delta_times >= 210))
+        values = np.where(changes & ~resets, rhythm_difficulty * speed_penalties, 0.0)
+
+        decays = np.where(is_hit, math.log(RHYTHM_STRAIN_DECAY), 0.0)
+        strains = decayed_cumsum(values, decays)
+
+        last_reset = _last_index(resets)
+        cumulative_decays = np.cumsum(decays)
+        strains -= np.where(
+            last_reset >= 0,
+            strains[np.maximum(last_reset, 0)]
+            * np.exp(cumulative_decays - cumulative_decays[np.maximum(last_reset, 0)]),
+            0.0,
+        )
+
+        # the skill itself has a decay base of 0, so its strain is the
+        # current value unless objects are simultaneous
+        values = np.where(changes, strains, 0.0) * RHYTHM_STRAIN_MULTIPLIER
+        simultaneous_start = _last_index(delta_times > 0)
+        cumulative_values = np.cumsum(values)
+        return cumulative_values - np.where(
+            simultaneous_start > 0,
+            cumulative_values[np.maximum(simultaneous_start - 1, 0)],
+            0.0,
+        )
+
+    def calculate(self, mods: int = 0) -> TaikoDifficultyAttributes:
+        difficulty = self.beatmap.difficulty
+        stats = calculate_beatmap_stats(
+            mode=1,
+            circle_size=difficulty.circle_size,
+            approach_rate=difficulty.approach_rate,
+            overall_difficulty=difficulty.overall_difficulty,
+            drain_rate=difficulty.hp_drain_rate,
+            mods=mods,
+        )
+        clock_rate = float(stats.clock_rate)
+
+        objects = self._objects
+        attributes = TaikoDifficultyAttributes(
+            star_rating=0.0,
+            max_combo=int(np.count_nonzero(objects.is_hit)),
+            stamina_difficulty=0.0,
+            rhythm_difficulty=0.0,
+            colour_difficulty=0.0,
+            peak_difficulty=0.0,
+            great_hit_window=float(stats.great_hit_window),
+        )
+
+        if not len(objects.colour_difficulty):
+            return attributes
+
+        start_times = objects.start_time[2:] / clock_rate
+        delta_times = np.diff(objects.start_time)[1:] / clock_rate
+        is_hit = objects.is_hit[2:]
+
+        colour_strains = decayed_cumsum(
+            objects.colour_difficulty * COLOUR_STRAIN_MULTIPLIER,
+            strain_decay(delta_times, COLOUR_STRAIN_DECAY_BASE),
+        )
+
+        # the time since the same key was last pressed
+        key_intervals = start_times - start_times[np.maximum(objects.previous_mono, 0)]
+        stamina_values = np.where(
+            objects.previous_mono >= 0,
+            0.5 + 30 / np.maximum(key_intervals, 50),
+            0.0,
+        )
+        stamina_strains = decayed_cumsum(
+            stamina_values * STAMINA_STRAIN_MULTIPLIER,
+            strain_decay(delta_times, STAMINA_STRAIN_DECAY_BASE),
+        )
+
+        rhythm_strains = self._rhythm_strains(delta_times, is_hit)
+
+        colour_peaks = strain_peaks(
+            start_times,
+            colour_strains,
+            ((colour_strains, COLOUR_STRAIN_DECAY_BASE),),
+        )
+        stamina_peaks = strain_peaks(
+            start_times,
+            stamina_strains,
+            ((stamina_strains, STAMINA_STRAIN_DECAY_BASE),),
+        )
+        rhythm_peaks = strain_peaks(
+            start_times,
+            rhythm_strains,
+            ((rhythm_strains, 0.0),),
+        )
+
+        peaks = np.power(
+            np.power(colour_peaks * COLOUR_SKILL_MULTIPLIER, 1.5)
+            + np.power(stamina_peaks * STAMINA_SKILL_MULTIPLIER, 1.5),
+            1 / 1.5,
+        )
+        peaks = np.hypot(peaks, rhythm_peaks * RHYTHM_SKILL_MULTIPLIER)
+
+        colour_rating = (
+            weighted_peak_sum(colour_peaks)
+            * COLOUR_SKILL_MULTIPLIER
+            * DIFFICULTY_MULTIPLIER
+        )
+        rhythm_rating = (
+            weighted_peak_sum(rhythm_peaks)
+            * RHYTHM_SKILL_MULTIPLIER
+            * DIFFICULTY_MULTIPLIER
+        )
+        stamina_rating = (
+            weighted_peak_sum(stamina_peaks)
+            * STAMINA_SKILL_MULTIPLIER
+            * DIFFICULTY_MULTIPLIER
+        )
+        combined_rating = weighted_peak_sum(peaks) * DIFFICULTY_MULTIPLIER
+
+        star_rating = _rescale(combined_rating * 1.4)
+
+        # multiple-input playstyles aren't detected yet, so converts are nerfed
+        if self.is_converted:
+            star_rating *= 0.925
+
+            # especially those with low colour variance and high stamina
+            if colour_rating < 2 and stamina_rating > 8:
+                star_rating *= 0.80
+
+        attributes.star_rating = star_rating
+        attributes.stamina_difficulty = stamina_rating
+        attributes.rhythm_difficulty = rhythm_rating
+        attributes.colour_difficulty = colour_rating
+        attributes.peak_difficulty = combined_rating
+
+        return attributes
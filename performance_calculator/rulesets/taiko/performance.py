@@ -1,12 +1,13 @@
 from __future__ import annotations
 
-import math
 from dataclasses import dataclass
+from typing import Any
 
+from performance_calculator.models.difficulty import DifficultyAttributes
 from performance_calculator.models.mods import Mods
 from performance_calculator.models.performance import PerformanceAttributes
 from performance_calculator.models.performance import PerformanceCalculator
-from performance_calculator.models.score import Score
+from performance_calculator.models.performance import ScalarMath
 from performance_calculator.rulesets.taiko.difficulty import TaikoDifficultyAttributes
 
 
@@ -20,44 +21,71 @@ class TaikoPerformanceAttributes(PerformanceAttributes):
 class TaikoPerformanceCalculator(PerformanceCalculator):
     difficulty_attributes: TaikoDifficultyAttributes
 
-    def calculate(self, score: Score) -> TaikoPerformanceAttributes:
+    def __init__(
+        self,
+        difficulty_attributes: DifficultyAttributes,
+        xp: Any = ScalarMath,
+    ) -> None:
+        super().__init__(difficulty_attributes, xp)
+        attributes = self.difficulty_attributes
+
+        # everything that only depends on the map,
+        # so calculators can be reused for many scores
+        self._base_difficulty_value = (
+            xp.power(5 * xp.maximum(1.0, attributes.star_rating / 0.115) - 4.0, 2.25)
+            / 1150.0
+        )
+
+        self._has_hit_window = attributes.great_hit_window > 0
+        self._accuracy_window_scale = xp.where(
+            self._has_hit_window,
+            xp.power(
+                60.0 / xp.where(self._has_hit_window, attributes.great_hit_window, 1.0),
+                1.1,
+            ),
+            0.0,
+        )
+        self._accuracy_star_scale = xp.power(attributes.star_rating, 0.4)
+
+    def _calculate(self, xp: Any, score: Any) -> TaikoPerformanceAttributes:
         total_successful_hits = score.num_300s + score.num_100s + score.num_50s
         total_hits = total_successful_hits + score.num_misses
 
-        accuracy = 0.0
-        if total_hits > 0:
-            accuracy = (score.num_300s * 300 + score.num_100s * 150) / (
-                total_hits * 300.0
-            )
+        accuracy = xp.where(
+            total_hits > 0,
+            (score.num_300s * 300 + score.num_100s * 150)
+            / (xp.maximum(total_hits, 1) * 300.0),
+            0.0,
+        )
 
-        effective_miss_count = 0.0
-        if total_successful_hits > 0:
-            effective_miss_count = (
-                max(1.0, 1000.0 / total_successful_hits) * score.num_misses
-            )
+        effective_miss_count = xp.where(
+            total_successful_hits > 0,
+            xp.maximum(1.0, 1000.0 / xp.maximum(total_successful_hits, 1))
+            * score.num_misses,
+            0.0,
+        )
 
         multiplier = 1.13
 
-        if score.mods & Mods.HIDDEN:
-            multiplier *= 1.075
-
-        if score.mods & Mods.EASY:
-            multiplier *= 0.975
+        multiplier *= xp.where(score.mods & Mods.HIDDEN, 1.075, 1.0)
+        multiplier *= xp.where(score.mods & Mods.EASY, 0.975, 1.0)
 
         difficulty_value = self._compute_difficulty_value(
+            xp,
             score,
             total_hits,
             effective_miss_count,
             accuracy,
         )
         accuracy_value = self._compute_accuracy_value(
+            xp,
             score,
             total_hits,
             accuracy,
         )
         total_value = (
-            math.pow(
-                math.pow(difficulty_value, 1.1) + math.pow(accuracy_value, 1.1),
+            xp.power(
+                xp.power(difficulty_value, 1.1) + xp.power(accuracy_value, 1.1),
                 1.0 / 1.1,
             )
             * multiplier
@@ -72,59 +100,50 @@ class TaikoPerformanceCalculator(PerformanceCalculator):
 
     def _compute_difficulty_value(
         self,
-        score: Score,
-        total_hits: int,
-        effective_miss_count: float,
-        accuracy: float,
-    ) -> float:
-        difficulty_value = (
-            math.pow(
-                5 * max(1.0, self.difficulty_attributes.star_rating / 0.115) - 4.0,
-                2.25,
-            )
-            / 1150.0
+        xp: Any,
+        score: Any,
+        total_hits: Any,
+        effective_miss_count: Any,
+        accuracy: Any,
+    ) -> Any:
+        length_bonus = 1 + 0.1 * xp.minimum(1.0, total_hits / 1500.0)
+        difficulty_value = self._base_difficulty_value * length_bonus
+
+        difficulty_value *= xp.power(0.986, effective_miss_count)
+
+        difficulty_value *= xp.where(score.mods & Mods.EASY, 0.985, 1.0)
+        difficulty_value *= xp.where(score.mods & Mods.HIDDEN, 1.025, 1.0)
+        difficulty_value *= xp.where(score.mods & Mods.HARDROCK, 1.050, 1.0)
+        difficulty_value *= xp.where(
+            score.mods & Mods.FLASHLIGHT,
+            1.050 * length_bonus,
+            1.0,
         )
 
-        length_bonus = 1 + 0.1 * min(1.0, total_hits / 1500.0)
-        difficulty_value *= length_bonus
-
-        difficulty_value *= math.pow(0.986, effective_miss_count)
-
-        if score.mods & Mods.EASY:
-            difficulty_value *= 0.985
-
-        if score.mods & Mods.HIDDEN:
-            difficulty_value *= 1.025
-
-        if score.mods & Mods.HARDROCK:
-            difficulty_value *= 1.050
-
-        if score.mods & Mods.FLASHLIGHT:
-            difficulty_value *= 1.050 * length_bonus
-
-        difficulty_value *= math.pow(accuracy, 2.0)
+        difficulty_value *= xp.power(accuracy, 2.0)
         return difficulty_value
 
     def _compute_accuracy_value(
         self,
-        score: Score,
-        total_hits: int,
-        accuracy: float,
-    ) -> float:
-        if self.difficulty_attributes.great_hit_window <= 0:
-            return 0
-
+        xp: Any,
+        score: Any,
+        total_hits: Any,
+        accuracy: Any,
+    ) -> Any:
         accuracy_value = (
-            math.pow(60.0 / self.difficulty_attributes.great_hit_window, 1.1)
-            * math.pow(accuracy, 8.0)
-            * math.pow(self.difficulty_attributes.star_rating, 0.4)
+            self._accuracy_window_scale
+            * xp.power(accuracy, 8.0)
+            * self._accuracy_star_scale
             * 27.0
         )
 
-        length_bonus = min(1.15, math.pow(total_hits / 1500.0, 0.3))
+        length_bonus = xp.minimum(1.15, xp.power(total_hits / 1500.0, 0.3))
         accuracy_value *= length_bonus
 
-        if score.mods & Mods.FLASHLIGHT and score.mods & Mods.HIDDEN:
-            accuracy_value *= max(1.050, 1.075 * length_bonus)
+        accuracy_value *= xp.where(
+            ((score.mods & Mods.FLASHLIGHT) != 0) & ((score.mods & Mods.HIDDEN) != 0),
+            xp.maximum(1.050, 1.075 * length_bonus),
+            1.0,
+        )
 
-        return accuracy_value
+        return xp.where(self._has_hit_window, accuracy_value, 0.0)
@@ -0,0 +1,217 @@
+from __future__ import annotations
+
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from dataclasses import dataclass
+from dataclasses import field
+from typing import Any
+from typing import Callable
+from typing import Optional
+from typing import TypeVar
+
+from performance_calculator import calculate_score
+from performance_calculator.models.score import Score
+
+T = TypeVar("T")
+
+DEFAULT_WORKERS = 4
+
+
+class Priority:
+    INTERACTIVE = 0  # live submissions, which always go first
+    BATCH = 1  # recalculation chunks
+
+
+@dataclass
+class PriorityStats:
+    tasks: int = 0
+    # seconds between being submitted and starting
+    total_wait: float = 0.0
+    max_wait: float = 0.0
+    # cpu seconds spent running
+    cpu_time: float = 0.0
+
+    @property
+    def mean_wait(self) -> float:
+        return self.total_wait / self.tasks if self.tasks else 0.0
+
+
+@dataclass
+class _Task:
+    future: Future[Any]
+    function: Callable[..., Any]
+    args: tuple[Any, ...]
+    kwargs: dict[str, Any]
+    priority: int
+    submitted_at: float = field(default_factory=time.monotonic)
+
+
+class PriorityScheduler:
+    """Runs calculations on `workers` threads, interactive ones first.
+
+    Batch work is submitted a chunk at a time, and a worker always takes
+    the oldest interactive task before the next chunk, so a live submission
+    waits for at most the chunks already running. Batch chunks can also be
+    limited to `batch_rate` a second across all workers, and to
+    `batch_cpu_share` of each worker's time: after a chunk used some cpu
+    time, its worker only takes interactive tasks until the chunk's share
+    of its time is back under the limit.
+    """
+
+    def __init__(
+        self,
+        workers: int = DEFAULT_WORKERS,
+        batch_rate: Optional[float] = None,
+        batch_cpu_share: float = 1.0,
+    ) -> None:
+        if workers < 1:
+            raise ValueError("workers must be at least 1")
+
+        if batch_rate is not None and batch_rate <= 0:
+            raise ValueError("batch rate must be positive")
+
+        if not 0 < batch_cpu_share <= 1:
+            raise ValueError("batch cpu share must be in (0, 1]")
+
+        self.batch_rate = batch_rate
+        self.batch_cpu_share = batch_cpu_share
+
+        self._queues: dict[int, deque[_Task]] = {
+            Priority.INTERACTIVE: deque(),
+            Priority.BATCH: deque(),
+        }
+        self._stats = {priority: PriorityStats() for priority in self._queues}
+        self._condition = threading.Condition()
+        self._next_batch_at = 0.0
+        self._shutdown = False
+
+        self._workers = [
+            threading.Thread(target=self._work, daemon=True) for _ in range(workers)
+        ]
+        for worker in self._workers:
+            worker.start()
+
+    def __enter__(self) -> PriorityScheduler:
+        return self
+
+    def __exit__(self, *args: Any) -> None:
+        self.shutdown()
+
+    def submit(
+        self,
+        function: Callable[..., T],
+        *args: Any,
+        priority: int = Priority.BATCH,
+        **kwargs: Any,
+    ) -> Future[T]:
+        if priority not in self._queues:
+            raise ValueError(f"unknown priority {priority}")
+
+        future: Future[T] = Future()
+        with self._condition:
+            if self._shutdown:
+                raise RuntimeError("the scheduler has been shut down")
+
+            self._queues[priority].append(
+                _Task(future, function, args, kwargs, priority),
+            )
+            # a single woken worker may be cooling down from its last chunk
+            # and go back to waiting, so batch work wakes every worker
+            if priority == Priority.INTERACTIVE:
+                self._condition.notify()
+            else:
+                self._condition.notify_all()
+
+        return future
+
+    def calculate_score(self, score: Score, *args: Any, **kwargs: Any) -> Any:
+        """`calculate_score`, ahead of any batch work."""
+        return self.submit(
+            calculate_score,
+            score,
+            *args,
+            priority=Priority.INTERACTIVE,
+            **kwargs,
+        ).result()
+
+    def stats(self) -> dict[int, PriorityStats]:
+        """A copy of each priority's stats so far."""
+        with self._condition:
+            return {
+                priority: PriorityStats(**vars(stats))
+                for priority, stats in self._stats.items()
+            }
+
+    def _next_task(self, batch_ready_at: float) -> Optional[_Task]:
+        with self._condition:
+            while True:
+                if self._queues[Priority.INTERACTIVE]:
+                    return self._queues[Priority.INTERACTIVE].popleft()
+
+                timeout = None
+                if self._queues[Priority.BATCH]:
+                    now = time.monotonic()
+                    ready_at = max(self._next_batch_at, batch_ready_at)
+                    if now >= ready_at:
+                        if self.batch_rate is not None:
+                            self._next_batch_at = (
+                                max(now, self._next_batch_at) + 1 / self.batch_rate
+                            )
+
+                        return self._queues[Priority.BATCH].popleft()
+
+                    timeout = ready_at - now
+                elif self._shutdown:
+                    return None
+
+                self._condition.wait(timeout)
+
+    def _work(self) -> None:
+        batch_ready_at = 0.0
+        while True:
+            task = self._next_task(batch_ready_at)
+            if task is None:
+                return
+
+            if not task.future.set_running_or_notify_cancel():
+                continue
+
+            wait = time.monotonic() - task.submitted_at
+            started_at = time.thread_time()
+            try:
+                result = task.function(*task.args, **task.kwargs)
+            except BaseException as e:
+                task.future.set_exception(e)
+            else:
+                task.future.set_result(result)
+
+            cpu_time = time.thread_time() - started_at
+            if task.priority == Priority.BATCH and self.batch_cpu_share < 1:
+                batch_ready_at = time.monotonic() + cpu_time * (
+                    1 / self.batch_cpu_share - 1
+                )
+
+            with self._condition:
+                stats = self._stats[task.priority]
+                stats.tasks += 1
+                stats.total_wait += wait
+                stats.max_wait = max(stats.max_wait, wait)
+                stats.cpu_time += cpu_time
+
+    def shutdown(self, wait: bool = True) -> None:
+        """Stop taking tasks, and finish the queued ones, or cancel them if
+        not `wait`."""
+        with self._condition:
+            self._shutdown = True
+            if not wait:
+                for queue in self._queues.values():
+                    while queue:
+                        queue.popleft().future.cancel()
+
+            self._condition.notify_all()
+
+        if wait:
+            for worker in self._workers:
+                worker.join()
@@ -0,0 +1,364 @@
+from __future__ import annotations
+
+import dataclasses
+import multiprocessing
+import time
+from multiprocessing import shared_memory
+from multiprocessing.context import BaseContext
+from typing import Any
+from typing import Hashable
+from typing import Optional
+from typing import Sequence
+from typing import Union
+
+import numpy as np
+
+from performance_calculator.attribute_provider import ATTRIBUTE_CLASSES
+from performance_calculator.attribute_provider import AttributeKey
+from performance_calculator.attribute_provider import DifficultyAttributeProvider
+from performance_calculator.models.beatmap_source import BeatmapFile
+from performance_calculator.models.difficulty import DifficultyAttributes
+from performance_calculator.rulesets.osu.oppai_performance import (
+    OppaiAttributeCache,
+)
+from performance_calculator.rulesets.osu.oppai_performance import (
+    OppaiBeatmapAttributes,
+)
+
+DEFAULT_SLOTS = 1 << 16
+DEFAULT_BUCKET_SIZE = 8
+DEFAULT_STRIPES = 64
+
+# enough for the attributes of any mode, the most being osu!'s 13
+MAX_FIELDS = 16
+
+# the mode oppai's attributes are stored under, keyed by beatmap id and
+# every mod rather than canonical keys
+OPPAI_MODE = 4
+
+# what a slot holds
+Record = Union[DifficultyAttributes, OppaiBeatmapAttributes]
+
+RECORD_CLASSES: dict[int, type[Record]] = {
+    **ATTRIBUTE_CLASSES,
+    OPPAI_MODE: OppaiBeatmapAttributes,
+}
+
+# a read that keeps racing writers gives up and counts as a miss
+READ_RETRIES = 4
+
+TABLE_MAGIC = 0x7070_6174_7472_7331
+
+HEADER_DTYPE = np.dtype(
+    [
+        ("magic", np.uint64),
+        ("slot_count", np.uint64),
+        ("bucket_size", np.uint64),
+        ("padding", np.uint64, (5,)),
+    ],
+)
+SLOT_DTYPE = np.dtype(
+    [
+        # odd while the slot is being written
+        ("sequence", np.uint64),
+        ("beatmap_id", np.int64),
+        # -1 for an empty slot
+        ("mode", np.int64),
+        ("mods", np.int64),
+        ("last_used", np.float64),
+        ("values", np.float64, (MAX_FIELDS,)),
+    ],
+)
+
+
+def _bucket(key: AttributeKey, bucket_count: int) -> int:
+    # the same in every process, unlike hashing strings
+    mixed = (
+        key.beatmap_id * 0x9E3779B97F4A7C15
+        ^ key.mods * 0xC2B2AE3D27D4EB4F
+        ^ key.mode * 0x165667B19E3779F9
+    ) & 0xFFFF_FFFF_FFFF_FFFF
+    return (mixed ^ (mixed >> 29)) % bucket_count
+
+
+def _encode(attributes: Record) -> np.ndarray:
+    values = np.zeros(MAX_FIELDS, dtype=np.float64)
+    fields = dataclasses.fields(attributes)
+    if len(fields) > MAX_FIELDS:
+        raise ValueError(f"{type(attributes).__name__} has too many fields")
+
+    values[: len(fields)] = [getattr(attributes, f.name) for f in fields]
+    return values
+
+
+def _decode(mode: int, values: np.ndarray) -> Record:
+    attributes_class = RECORD_CLASSES[mode]
+    return attributes_class(
+        **{
+            f.name: int(value) if f.type == "int" else float(value)
+            for f, value in zip(dataclasses.fields(attributes_class), values)
+        },
+    )
+
+
+class SharedAttributeTable:
+    """A fixed-size hash table of difficulty attributes in shared memory,
+    so every worker process reads the same warm cache.
+
+    Keys are canonical (beatmap id, mode, mods), hashed to a bucket of
+    `bucket_size` slots. Reads take no lock: each slot has a sequence
+    number that writers make odd while they write, and a read that saw it
+    odd or changed is retried. Writers lock one of `stripes` locks per
+    bucket, and a full bucket evicts its least recently read slot.
+
+    oppai's map attributes share the table, under `OPPAI_MODE`.
+
+    The process that `create`s a table owns it and should `unlink` it when
+    done. Others get it by pickling, such as through `Process` arguments,
+    which also shares the locks, so it can only be passed on when a
+    process starts.
+    """
+
+    def __init__(
+        self,
+        memory: shared_memory.SharedMemory,
+        locks: Sequence[Any],
+        owner: bool = False,
+    ) -> None:
+        self._memory = memory
+        self._locks = locks
+        self.owner = owner
+
+        header = np.ndarray((), dtype=HEADER_DTYPE, buffer=memory.buf)
+        if header["magic"] != TABLE_MAGIC:
+            raise ValueError(f"{memory.name} is not a shared attribute table")
+
+        self.slot_count = int(header["slot_count"])
+        self.bucket_size = int(header["bucket_size"])
+        self.bucket_count = self.slot_count // self.bucket_size
+
+        self._slots = np.ndarray(
+            (self.slot_count,),
+            dtype=SLOT_DTYPE,
+            buffer=memory.buf,
+            offset=HEADER_DTYPE.itemsize,
+        )
+
+    @classmethod
+    def create(
+        cls,
+        slots: int = DEFAULT_SLOTS,
+        bucket_size: int = DEFAULT_BUCKET_SIZE,
+        stripes: int = DEFAULT_STRIPES,
+        # of the worker processes, which the locks have to come from too
+        context: Optional[BaseContext] = None,
+    ) -> SharedAttributeTable:
+        if bucket_size < 1 or slots < bucket_size:
+            raise ValueError("there must be at least one bucket of at least one slot")
+
+        slots -= slots % bucket_size
+        memory = shared_memory.SharedMemory(
+            create=True,
+            size=HEADER_DTYPE.itemsize + slots * SLOT_DTYPE.itemsize,
+        )
+
+        header = np.ndarray((), dtype=HEADER_DTYPE, buffer=memory.buf)
+        header["slot_count"] = slots
+        header["bucket_size"] = bucket_size
+        table_slots = np.ndarray(
+            (slots,),
+            dtype=SLOT_DTYPE,
+            buffer=memory.buf,
+            offset=HEADER_DTYPE.itemsize,
+        )
+        table_slots["mode"] = -1
+        header["magic"] = TABLE_MAGIC
+
+        if context is None:
+            context = multiprocessing.get_context()
+
+        locks = [context.Lock() for _ in range(stripes)]
+        return cls(memory, locks, owner=True)
+
+    def __reduce__(self) -> tuple[Any, ...]:
+        return (_attach, (self._memory.name, self._locks))
+
+    @property
+    def name(self) -> str:
+        return self._memory.name
+
+    def __len__(self) -> int:
+        return int(np.count_nonzero(self._slots["mode"] >= 0))
+
+    def _read_bucket(self, key: AttributeKey) -> Optional[Record]:
+        start = _bucket(key, self.bucket_count) * self.bucket_size
+        stop = start + self.bucket_size
+
+        for _ in range(READ_RETRIES):
+            before = self._slots["sequence"][start:stop].copy()
+            bucket = self._slots[start:stop].copy()
+            after = self._slots["sequence"][start:stop]
+
+            matches = np.flatnonzero(
+                (bucket["beatmap_id"] == key.beatmap_id)
+                & (bucket["mode"] == key.mode)
+                & (bucket["mods"] == key.mods),
+            )
+            if not len(matches):
+                # a slot mid-write may be about to hold it
+                if np.any((before != after) | (before & 1)):
+                    continue
+
+                return None
+
+            slot = matches[0]
+            if before[slot] != after[slot] or before[slot] & 1:
+                continue
+
+            # racing another reader here at worst loses its update
+            self._slots["last_used"][start + slot] = time.monotonic()
+            return _decode(key.mode, bucket["values"][slot])
+
+        return None
+
+    def get_many(
+        self,
+        keys: Sequence[AttributeKey],
+    ) -> dict[AttributeKey, DifficultyAttributes]:
+        """The attributes of the (canonical) keys in the table."""
+        found = {}
+        for key in keys:
+            attributes = self._read_bucket(key)
+            if attributes is not None:
+                found[key] = attributes  # type: ignore
+
+        return found
+
+    def put(self, key: AttributeKey, attributes: Record) -> None:
+        bucket = _bucket(key, self.bucket_count)
+        start = bucket * self.bucket_size
+        stop = start + self.bucket_size
+        values = _encode(attributes)
+
+        with self._locks[bucket % len(self._locks)]:
+            slots = self._slots[start:stop]
+            matches = np.flatnonzero(
+                (slots["beatmap_id"] == key.beatmap_id)
+                & (slots["mode"] == key.mode)
+                & (slots["mods"] == key.mods),
+            )
+            empty = np.flatnonzero(slots["mode"] < 0)
+            if len(matches):
+                slot = start + matches[0]
+            elif len(empty):
+                slot = start + empty[0]
+            else:
+                slot = start + int(np.argmin(slots["last_used"]))
+
+            self._slots["sequence"][slot] += 1
+            self._slots["beatmap_id"][slot] = key.beatmap_id
+            self._slots["mode"][slot] = key.mode
+            self._slots["mods"][slot] = key.mods
+            self._slots["values"][slot] = values
+            self._slots["last_used"][slot] = time.monotonic()
+            self._slots["sequence"][slot] += 1
+
+    def put_many(self, attributes: dict[AttributeKey, DifficultyAttributes]) -> None:
+        for key, map_attributes in attributes.items():
+            self.put(key, map_attributes)
+
+    def get_oppai(self, beatmap_id: int, mods: int) -> Optional[OppaiBeatmapAttributes]:
+        """oppai's attributes of a map with exactly `mods`, if in the table."""
+        return self._read_bucket(  # type: ignore
+            AttributeKey(beatmap_id, OPPAI_MODE, mods),
+        )
+
+    def put_oppai(self, beatmap_id: int, attributes: OppaiBeatmapAttributes) -> None:
+        self.put(AttributeKey(beatmap_id, OPPAI_MODE, attributes.mods), attributes)
+
+    def close(self) -> None:
+        # views of the buffer have to go before it can be closed
+        del self._slots
+        self._memory.close()
+
+    def unlink(self) -> None:
+        """Free the table once every process is done with it."""
+        if not self.owner:
+            raise ValueError("only the process that created a table can unlink it")
+
+        self._memory.unlink()
+
+
+def _attach(name: str, locks: Sequence[Any]) -> SharedAttributeTable:
+    # child processes share their parent's resource tracker, so attaching
+    # doesn't get the table unlinked when a child exits
+    return SharedAttributeTable(shared_memory.SharedMemory(name=name), locks)
+
+
+class SharedAttributeCache(DifficultyAttributeProvider):
+    """A `SharedAttributeTable` in front of another provider. Each worker
+    process makes its own, around the table its parent created."""
+
+    def __init__(
+        self,
+        table: SharedAttributeTable,
+        provider: DifficultyAttributeProvider,
+    ) -> None:
+        self.table = table
+        self.provider = provider
+
+        self.hits = 0
+        self.misses = 0
+
+    def _fetch_many(
+        self,
+        keys: Sequence[AttributeKey],
+    ) -> dict[AttributeKey, DifficultyAttributes]:
+        found = self.table.get_many(keys)
+        fetch = [key for key in keys if key not in found]
+
+        self.hits += len(found)
+        self.misses += len(fetch)
+        if not fetch:
+            return found
+
+        fetched = self.provider._fetch_many(fetch)
+        self.table.put_many(fetched)
+        found.update(fetched)
+        return found
+
+
+class SharedOppaiAttributeCache(OppaiAttributeCache):
+    """An `OppaiAttributeCache` in front of a `SharedAttributeTable`, so
+    each (map, mods) is only parsed once by all the worker processes. Maps
+    are keyed by beatmap id."""
+
+    def __init__(
+        self,
+        table: SharedAttributeTable,
+        oppai_path: str,
+    ) -> None:
+        super().__init__(oppai_path)
+        self.table = table
+
+        self.hits = 0
+        self.misses = 0
+
+    def get(
+        self,
+        osu_file_path: Union[str, BeatmapFile],
+        mods: int = 0,
+        beatmap_key: Optional[Hashable] = None,
+    ) -> OppaiBeatmapAttributes:
+        if not isinstance(beatmap_key, int):
+            raise ValueError("You must provide the beatmap id as the key")
+
+        attributes = self.table.get_oppai(beatmap_key, mods)
+        if attributes is not None:
+            self.hits += 1
+            return attributes
+
+        self.misses += 1
+        attributes = super().get(osu_file_path, mods, beatmap_key)
+        self.table.put_oppai(beatmap_key, attributes)
+        return attributes
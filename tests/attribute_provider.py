@@ -0,0 +1,270 @@
+from __future__ import annotations
+
+import math
+import sqlite3
+from pathlib import Path
+from typing import Callable
+from typing import Sequence
+
+import pytest
+from helpers import ATTRIBUTES as OSU_ATTRIBUTES
+
+from performance_calculator import calculate_score
+from performance_calculator.attribute_provider import attribute_lookup
+from performance_calculator.attribute_provider import AttributeKey
+from performance_calculator.attribute_provider import CachedAttributeProvider
+from performance_calculator.attribute_provider import DifficultyAttributeProvider
+from performance_calculator.attribute_provider import FileAttributeStore
+from performance_calculator.attribute_provider import SQLiteAttributeStore
+from performance_calculator.full_combo import calculate_full_combo
+from performance_calculator.goals import minimum_accuracy
+from performance_calculator.models.difficulty import DifficultyAttributes
+from performance_calculator.models.mods import Mods
+from performance_calculator.models.score import Score
+from performance_calculator.pipeline.pool import ConnectionPool
+from performance_calculator.pipeline.recalculate import BatchRecalculator
+from performance_calculator.pipeline.score_table import create_tables
+from performance_calculator.rulesets.osu.difficulty import OsuDifficultyAttributes
+from performance_calculator.rulesets.taiko.difficulty import TaikoDifficultyAttributes
+
+DT_ATTRIBUTES = OsuDifficultyAttributes(
+    star_rating=8.3,
+    max_combo=1500,
+    aim_difficulty=4.2,
+    speed_difficulty=3.9,
+    speed_note_count=420.0,
+    flashlight_difficulty=2.7,
+    slider_factor=0.97,
+    approach_rate=10.7,
+    overall_difficulty=10.1,
+    drain_rate=5.0,
+    hit_circle_count=700,
+    slider_count=300,
+    spinner_count=2,
+)
+TAIKO_ATTRIBUTES = TaikoDifficultyAttributes(
+    star_rating=4.5,
+    max_combo=900,
+    stamina_difficulty=2.1,
+    rhythm_difficulty=1.2,
+    colour_difficulty=1.6,
+    peak_difficulty=2.4,
+    great_hit_window=29.0,
+)
+
+STORED = {
+    AttributeKey(1, 0, 0): OSU_ATTRIBUTES,
+    AttributeKey(1, 0, Mods.DOUBLETIME): DT_ATTRIBUTES,
+    AttributeKey(2, 1, 0): TAIKO_ATTRIBUTES,
+}
+
+
+def _score(mode: int = 0, mods: int = 0) -> Score:
+    return Score(
+        mode=mode,
+        score=0,
+        mods=mods,
+        max_combo=1400,
+        accuracy=97.5,
+        num_300s=950,
+        num_100s=45,
+        num_50s=5,
+        num_gekis=0,
+        num_katus=0,
+        num_misses=2,
+    )
+
+
+def _sqlite_store(tmp_path: Path) -> SQLiteAttributeStore:
+    store = SQLiteAttributeStore.open(tmp_path / "attributes.db")
+    store.put_many(STORED)
+    return store
+
+
+def _file_store(tmp_path: Path) -> FileAttributeStore:
+    store = FileAttributeStore(tmp_path / "attributes")
+    store.put_many(STORED)
+    return store
+
+
+@pytest.mark.parametrize("make_store", [_sqlite_store, _file_store])
+def test_stores_round_trip(
+    tmp_path: Path,
+    make_store: Callable[[Path], DifficultyAttributeProvider],
+) -> None:
+    store = make_store(tmp_path)
+
+    found = store.get_many([*STORED, AttributeKey(3, 0, 0)])
+    assert found == STORED
+
+    # nightcore and mods that don't change difficulty share the DT entry
+    nightcore = AttributeKey(1, 0, Mods.NIGHTCORE | Mods.DOUBLETIME | Mods.NOFAIL)
+    assert store.get(nightcore) == DT_ATTRIBUTES
+
+
+def test_keys_sharing_attributes_share_one_object(tmp_path: Path) -> None:
+    store = _sqlite_store(tmp_path)
+
+    found = store.get_many(
+        [
+            AttributeKey(1, 0, Mods.DOUBLETIME),
+            AttributeKey(1, 0, Mods.DOUBLETIME | Mods.NIGHTCORE),
+        ],
+    )
+    first, second = found.values()
+    assert first is second
+
+
+class CountingStore(SQLiteAttributeStore):
+    def __init__(self, pool: ConnectionPool) -> None:
+        super().__init__(pool)
+        self.fetched: list[AttributeKey] = []
+
+    def _fetch_many(
+        self,
+        keys: Sequence[AttributeKey],
+    ) -> dict[AttributeKey, DifficultyAttributes]:
+        self.fetched.extend(keys)
+        return super()._fetch_many(keys)
+
+
+def test_cache_hits_and_negative_caching(tmp_path: Path) -> None:
+    store = CountingStore(
+        ConnectionPool(lambda: sqlite3.connect(tmp_path / "attributes.db")),
+    )
+    store.put_many(STORED)
+    cache = CachedAttributeProvider(store, maxsize=2, negative_ttl=60.0)
+
+    missing = AttributeKey(3, 0, 0)
+    assert cache.get(AttributeKey(1, 0, 0)) == OSU_ATTRIBUTES
+    assert cache.get(missing) is None
+
+    assert cache.get(AttributeKey(1, 0, Mods.HIDDEN)) is None  # not stored
+    assert cache.get(AttributeKey(1, 0, 0)) == OSU_ATTRIBUTES
+    assert cache.get(missing) is None
+    assert store.fetched == [
+        AttributeKey(1, 0, 0),
+        missing,
+        AttributeKey(1, 0, Mods.HIDDEN),
+    ]
+    assert cache.hits == 2
+    assert cache.misses == 3
+
+    # the least recently used entry goes first
+    cache.get_many([AttributeKey(1, 0, Mods.DOUBLETIME), AttributeKey(2, 1, 0)])
+    assert len(cache) == 2
+    cache.get(AttributeKey(1, 0, 0))
+    assert store.fetched[-1] == AttributeKey(1, 0, 0)
+
+    cache.invalidate([missing])
+    cache.get(missing)
+    assert store.fetched[-1] == missing
+
+
+def test_negative_entries_expire(tmp_path: Path) -> None:
+    store = CountingStore(
+        ConnectionPool(lambda: sqlite3.connect(tmp_path / "attributes.db")),
+    )
+    cache = CachedAttributeProvider(store, negative_ttl=0.0)
+
+    key = AttributeKey(1, 0, 0)
+    assert cache.get(key) is None
+
+    store.put_many(STORED)
+    assert cache.get(key) == OSU_ATTRIBUTES
+
+
+def test_calculate_score_with_keys(tmp_path: Path) -> None:
+    store = CachedAttributeProvider(_sqlite_store(tmp_path))
+
+    for score, key, attributes in (
+        (_score(), AttributeKey(1, 0, 0), OSU_ATTRIBUTES),
+        (
+            _score(mods=Mods.NIGHTCORE),
+            AttributeKey(1, 0, Mods.NIGHTCORE),
+            DT_ATTRIBUTES,
+        ),
+        (_score(mode=1), AttributeKey(2, 1, 0), TAIKO_ATTRIBUTES),
+    ):
+        assert calculate_score(
+            score,
+            key,
+            attribute_provider=store,
+        ) == calculate_score(score, attributes)
+
+    with pytest.raises(ValueError):
+        calculate_score(_score(), AttributeKey(1, 0, 0))
+
+    with pytest.raises(ValueError):
+        calculate_score(_score(), AttributeKey(3, 0, 0), attribute_provider=store)
+
+
+def test_batch_apis_with_keys(tmp_path: Path) -> None:
+    store = _file_store(tmp_path)
+    scores = [_score(), _score(mods=Mods.DOUBLETIME), _score()]
+    keys = [
+        AttributeKey(1, 0, 0),
+        AttributeKey(1, 0, Mods.DOUBLETIME),
+        AttributeKey(1, 0, 0),
+    ]
+    attributes = [OSU_ATTRIBUTES, DT_ATTRIBUTES, OSU_ATTRIBUTES]
+
+    from_keys = calculate_full_combo(scores, keys, provider=store)
+    expected = calculate_full_combo(scores, attributes)
+    assert from_keys.pp.tolist() == expected.pp.tolist()
+    assert from_keys.full_combo_pp.tolist() == expected.full_combo_pp.tolist()
+
+    assert (
+        minimum_accuracy(keys, 300.0, provider=store).tolist()
+        == minimum_accuracy(attributes, 300.0).tolist()
+    )
+
+    with pytest.raises(ValueError):
+        calculate_full_combo(scores, keys)
+
+
+def test_attribute_lookup_for_batch_recalculation(tmp_path: Path) -> None:
+    path = tmp_path / "scores.db"
+    pool = ConnectionPool(lambda: sqlite3.connect(path))
+    with pool.connection() as connection:
+        create_tables(connection)
+        connection.executemany(
+            "INSERT INTO scores (id, user_id, beatmap_id, mode, pp, mods,"
+            " max_combo, accuracy, num_300s, num_100s, num_50s, num_gekis,"
+            " num_katus, num_misses) VALUES (?, ?, ?, ?, 0, ?, 1400, 97.5,"
+            " 950, 45, 5, 0, 0, 2)",
+            [
+                (1, 10, 1, 0, 0),
+                (2, 10, 1, 0, Mods.NIGHTCORE | Mods.DOUBLETIME),
+                (3, 11, 3, 0, 0),
+                (4, 12, 2, 1, 0),
+                # map 1's taiko convert, which has no attributes of its own
+                (5, 12, 1, 1, 0),
+            ],
+        )
+        connection.commit()
+
+    store = CachedAttributeProvider(_sqlite_store(tmp_path))
+    stats = BatchRecalculator(pool, attribute_lookup(store)).run()
+    assert stats.rows_written == 3
+    assert stats.rows_without_attributes == 2
+
+    with pool.connection() as connection:
+        pp = dict(connection.execute("SELECT id, pp FROM scores").fetchall())
+
+    assert math.isclose(pp[1], calculate_score(_score(), OSU_ATTRIBUTES)[1])
+    assert math.isclose(
+        pp[2],
+        calculate_score(_score(mods=Mods.DOUBLETIME), DT_ATTRIBUTES)[1],
+    )
+    assert pp[3] == 0
+    assert math.isclose(
+        pp[4],
+        calculate_score(_score(mode=1), TAIKO_ATTRIBUTES)[1],
+    )
+    assert pp[5] == 0
+
+    # one mode's scores alone
+    stats = BatchRecalculator(pool, attribute_lookup(store), mode=1).run()
+    assert stats.rows_read == 2
+    assert stats.rows_written == 0
@@ -0,0 +1,145 @@
+from __future__ import annotations
+
+import dataclasses
+import math
+import sqlite3
+from pathlib import Path
+from typing import Sequence
+
+import numpy as np
+from helpers import ATTRIBUTES
+
+from performance_calculator.attribute_provider import AttributeKey
+from performance_calculator.live import performance_calculator_for
+from performance_calculator.models.difficulty import DifficultyAttributes
+from performance_calculator.models.hit_distribution import osu_hit_distribution
+from performance_calculator.models.mods import Mods
+from performance_calculator.models.score import Score
+from performance_calculator.pipeline.pool import ConnectionPool
+from performance_calculator.pipeline.recalculate import BatchRecalculator
+from performance_calculator.pipeline.score_table import create_tables
+from performance_calculator.pipeline.score_table import placeholders
+
+
+def _pool(path: Path, score_count: int) -> ConnectionPool:
+    pool = ConnectionPool(lambda: sqlite3.connect(path), size=2)
+
+    rng = np.random.default_rng(0)
+    distribution = osu_hit_distribution(rng.uniform(0.9, 1.0, score_count), 1002)
+    with pool.connection() as connection:
+        create_tables(connection)
+        connection.executemany(
+            "INSERT INTO scores (user_id, beatmap_id, mode, mods, max_combo,"
+            " accuracy, num_300s, num_100s, num_50s, num_gekis, num_katus,"
+            " num_misses) VALUES (?, ?, 0, ?, 1500, ?, ?, ?, ?, 0, 0, 0)",
+            [
+                (
+                    i % 7,
+                    i % 5 + 1,
+                    Mods.HIDDEN if i % 2 else 0,
+                    score.accuracy,
+                    score.num_300s,
+                    score.num_100s,
+                    score.num_50s,
+                )
+                for i, score in enumerate(distribution.scores(0, 0, 1500))
+            ],
+        )
+        connection.commit()
+
+    return pool
+
+
+class AttributeTable:
+    """Attributes for maps 1 to 4; map 5 has none."""
+
+    def __init__(self) -> None:
+        self.attributes = {
+            beatmap_id: dataclasses.replace(ATTRIBUTES, aim_difficulty=beatmap_id)
+            for beatmap_id in range(1, 5)
+        }
+        self.lookups: list[Sequence[AttributeKey]] = []
+
+    def __call__(
+        self,
+        keys: Sequence[AttributeKey],
+    ) -> dict[AttributeKey, DifficultyAttributes]:
+        self.lookups.append(keys)
+        return {
+            key: self.attributes[key.beatmap_id]
+            for key in keys
+            if key.beatmap_id in self.attributes
+        }
+
+
+def test_recalculation_writes_only_changes(tmp_path: Path) -> None:
+    pool = _pool(tmp_path / "scores.db", 1000)
+    attribute_table = AttributeTable()
+    recalculator = BatchRecalculator(pool, attribute_table, page_size=300)
+
+    stats = recalculator.run()
+    assert stats.pages == 4
+    assert stats.rows_read == 1000
+    assert stats.rows_without_attributes == 200
+    assert stats.rows_written == 800
+    assert stats.last_id == 1000
+    # one bulk lookup per page, each (map, mods) once
+    assert len(attribute_table.lookups) == 4
+    assert len(attribute_table.lookups[0]) == 10
+
+    with pool.connection() as connection:
+        rows = connection.execute(
+            "SELECT beatmap_id, mods, accuracy, num_300s, num_100s, num_50s, pp"
+            " FROM scores WHERE beatmap_id = 2 LIMIT 5",
+        ).fetchall()
+
+    calculator = performance_calculator_for(attribute_table.attributes[2])
+    for beatmap_id, mods, accuracy, n300, n100, n50, pp in rows:
+        score = Score(0, 0, 1500, mods, accuracy, n300, n100, n50, 0, 0, 0)
+        assert math.isclose(pp, calculator.calculate(score).total)
+
+    assert recalculator.run().rows_written == 0
+
+    attribute_table.attributes[3] = dataclasses.replace(ATTRIBUTES, aim_difficulty=1)
+    stats = recalculator.run()
+    assert stats.rows_written == 200
+
+    # ranges of ids, for splitting the work up
+    stats = recalculator.run(start_after=100, stop_at=250)
+    assert stats.rows_read == 150
+    assert stats.last_id == 250
+
+    pool.close()
+
+
+def test_placeholders() -> None:
+    assert placeholders("qmark", 2) == ["?", "?"]
+    assert placeholders("format", 2) == ["%s", "%s"]
+    assert placeholders("numeric", 2) == [":1", ":2"]
+
+
+def test_relax_and_autopilot_are_left_alone(tmp_path: Path) -> None:
+    pool = _pool(tmp_path / "scores.db", 100)
+    with pool.connection() as connection:
+        connection.execute(
+            "UPDATE scores SET mods = mods | ?, pp = 123.0 WHERE id % 10 = 0",
+            (Mods.RELAX,),
+        )
+        connection.execute(
+            "UPDATE scores SET mods = mods | ?, pp = 123.0 WHERE id % 10 = 5",
+            (Mods.AUTOPILOT,),
+        )
+        connection.commit()
+
+    for mode in (0, None):
+        recalculator = BatchRecalculator(pool, AttributeTable(), mode=mode)
+        stats = recalculator.run()
+        assert stats.rows_read == 80
+
+        with pool.connection() as connection:
+            pp = connection.execute(
+                "SELECT pp FROM scores WHERE id % 5 = 0",
+            ).fetchall()
+        assert pp == [(123.0,)] * 20
+
+    pool.close()
@@ -0,0 +1,101 @@
+from __future__ import annotations
+
+import os
+import pathlib
+
+import pytest
+
+from performance_calculator.models import beatmap_index
+from performance_calculator.models.beatmap_index import BeatmapIndex
+from performance_calculator.models.compiled_beatmap import beatmap_checksum
+from performance_calculator.models.compiled_beatmap import load_beatmap_arrays
+from performance_calculator.models.path import Path
+
+SAMPLE_PATH = Path(__file__.rpartition("/")[0]) / "data/sample.osu"
+
+
+def test_incremental_rescan(tmp_path: pathlib.Path) -> None:
+    directory = Path(str(tmp_path))
+    (directory / "set").mkdir()
+
+    content = SAMPLE_PATH.read_bytes()
+    first_path = directory / "first.osu"
+    second_path = directory / "set/second.osu"
+    first_path.write_bytes(content)
+    second_path.write_bytes(content.replace(b"CircleSize:4", b"CircleSize:5"))
+
+    index = BeatmapIndex(directory)
+    result = index.rescan()
+    assert sorted(result.added) == sorted([str(first_path), str(second_path)])
+
+    checksum = beatmap_checksum(content)
+    assert checksum in index
+    assert str(index.path_of(checksum)) == str(first_path)
+
+    # nothing changed, nothing is hashed
+    result = index.rescan()
+    assert result.unchanged == 2
+    assert not result.added and not result.changed and not result.removed
+
+    # the index persists
+    assert str(BeatmapIndex(directory).path_of(checksum)) == str(first_path)
+
+    load_beatmap_arrays(first_path)
+    invalidated = []
+    index.on_invalidate.append(invalidated.append)
+
+    first_path.write_bytes(content.replace(b"CircleSize:4", b"CircleSize:6"))
+    os.utime(str(first_path), ns=(0, 0))
+    os.remove(str(second_path))
+
+    result = index.rescan()
+    assert result.changed == [str(first_path)]
+    assert result.removed == [str(second_path)]
+    assert checksum not in index
+    assert checksum in invalidated
+    # the stale compiled beatmap is gone
+    assert not first_path.compiled_path().exists()
+
+
+def test_files_deleted_during_rescan(
+    tmp_path: pathlib.Path,
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    directory = Path(str(tmp_path))
+    content = SAMPLE_PATH.read_bytes()
+    kept_path = directory / "kept.osu"
+    deleted_path = directory / "deleted.osu"
+    kept_path.write_bytes(content)
+    deleted_path.write_bytes(content.replace(b"CircleSize:4", b"CircleSize:5"))
+
+    index = BeatmapIndex(directory)
+    index.rescan()
+    deleted_checksum = index.checksum_of(deleted_path)
+
+    invalidated: list[str] = []
+    index.on_invalidate.append(invalidated.append)
+
+    # both change, and one is deleted after it's listed but before it's hashed
+    kept_path.write_bytes(content.replace(b"CircleSize:4", b"CircleSize:6"))
+    deleted_path.write_bytes(content.replace(b"CircleSize:4", b"CircleSize:7"))
+    os.utime(str(kept_path), ns=(0, 0))
+    os.utime(str(deleted_path), ns=(0, 0))
+
+    hash_file = beatmap_index._hash_file
+
+    def delete_then_hash(path: str) -> str:
+        if path == str(deleted_path):
+            os.remove(path)
+
+        return hash_file(path)
+
+    monkeypatch.setattr(beatmap_index, "_hash_file", delete_then_hash)
+    result = index.rescan()
+
+    assert result.changed == [str(kept_path)]
+    assert result.removed == [str(deleted_path)]
+    assert index.checksum_of(deleted_path) is None
+    assert deleted_checksum in invalidated
+
+    # and the index was saved without it
+    assert len(BeatmapIndex(directory)) == 1
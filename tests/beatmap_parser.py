@@ -0,0 +1,52 @@
+from __future__ import annotations
+
+from performance_calculator.models.beatmap import BeatmapQuery
+from performance_calculator.models.beatmap import parse_beatmap
+from performance_calculator.models.path import Path
+
+SAMPLE_PATH = Path(__file__.rpartition("/")[0]) / "data/sample.osu"
+
+
+def test_full_parse() -> None:
+    beatmap = parse_beatmap(SAMPLE_PATH)
+
+    assert beatmap.format_version == 14
+    assert beatmap.mode == 0
+    assert beatmap.difficulty.circle_size == 4
+    assert beatmap.difficulty.approach_rate == 9
+    assert beatmap.difficulty.overall_difficulty == 8
+
+    assert beatmap.hit_circle_count == 2
+    assert beatmap.slider_count == 3
+    assert beatmap.spinner_count == 1
+    assert beatmap.max_combo == 13
+
+    assert len(beatmap.hit_objects) == 6
+    assert len(beatmap.timing_points) == 2
+
+    slider = beatmap.hit_objects[2]
+    assert slider.curve_type == "B"
+    assert slider.curve_points == [(350, 300), (400, 250), (450, 300)]
+    assert slider.tick_count == 1
+    assert slider.end_time == 4500
+
+
+def test_queries_stop_early() -> None:
+    file_bytes = SAMPLE_PATH.read_bytes()
+
+    stats = parse_beatmap(file_bytes, BeatmapQuery.STATS)
+    assert stats.difficulty.overall_difficulty == 8
+    assert stats.object_count == 0
+    assert not stats.timing_points
+
+    counts = parse_beatmap(file_bytes, BeatmapQuery.COUNTS)
+    assert (counts.hit_circle_count, counts.slider_count, counts.spinner_count) == (
+        2,
+        3,
+        1,
+    )
+    assert counts.max_combo == 0
+
+    max_combo = parse_beatmap(file_bytes, BeatmapQuery.MAX_COMBO)
+    assert max_combo.max_combo == 13
+    assert not max_combo.hit_objects
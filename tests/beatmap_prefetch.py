@@ -0,0 +1,64 @@
+from __future__ import annotations
+
+import threading
+import time
+
+from performance_calculator.pipeline.prefetch import BeatmapPrefetcher
+
+
+def test_prefetch_order_and_depth() -> None:
+    lock = threading.Lock()
+    loaded = []
+    reading = 0
+    most_reading = 0
+
+    def load(beatmap_id: int) -> bytes:
+        nonlocal reading, most_reading
+        with lock:
+            reading += 1
+            most_reading = max(most_reading, reading)
+            loaded.append(beatmap_id)
+
+        time.sleep(0.01)
+
+        with lock:
+            reading -= 1
+
+        return str(beatmap_id).encode() * 10
+
+    # (score id, beatmap id), with runs of scores on the same map
+    scores = [(i, i // 3) for i in range(60)]
+
+    prefetcher = BeatmapPrefetcher(
+        scores,
+        beatmap_of=lambda score: score[1],
+        load=load,
+        depth=4,
+    )
+    results = list(prefetcher)
+
+    assert [score for score, _ in results] == scores
+    assert all(content == str(score[1]).encode() * 10 for score, content in results)
+
+    # every map is read once, several at a time
+    assert sorted(loaded) == list(range(20))
+    assert 1 < most_reading <= 4
+    assert prefetcher.stats.loads == 20
+    assert prefetcher.stats.stall_time > 0
+
+
+def test_prefetch_memory_cap() -> None:
+    prefetcher = BeatmapPrefetcher(
+        range(20),
+        beatmap_of=lambda beatmap_id: beatmap_id,
+        load=lambda beatmap_id: b"\0" * 1000,
+        depth=8,
+        max_bytes=2500,
+    )
+
+    for _ in prefetcher:
+        time.sleep(0.001)
+
+    assert prefetcher.stats.loads == 20
+    # one map past the cap can be in flight when it's reached
+    assert prefetcher.stats.peak_bytes <= 4000
@@ -0,0 +1,80 @@
+from __future__ import annotations
+
+import lzma
+import pathlib
+import zipfile
+
+import pytest
+
+from performance_calculator import calculate_score
+from performance_calculator.models import beatmap_source
+from performance_calculator.models.beatmap_source import ArchivedBeatmapFile
+from performance_calculator.models.beatmap_source import CompressedBeatmapFile
+from performance_calculator.models.beatmap_source import open_beatmap
+from performance_calculator.models.path import Path
+from performance_calculator.models.score import Score
+
+SAMPLE_PATH = Path(__file__.rpartition("/")[0]) / "data/sample.osu"
+
+
+def test_archived_beatmap(tmp_path: pathlib.Path) -> None:
+    content = SAMPLE_PATH.read_bytes()
+
+    archive_path = Path(str(tmp_path)) / "set.osz"
+    with zipfile.ZipFile(str(archive_path), "w") as archive:
+        archive.writestr("bg.jpg", b"\0" * 64)
+        archive.writestr("easy.osu", content, zipfile.ZIP_DEFLATED)
+        archive.writestr("hard.osu", content, zipfile.ZIP_STORED)
+
+    beatmap_source.clear_archive_cache()
+    assert open_beatmap(archive_path, "easy.osu").read_bytes() == content
+    assert open_beatmap(archive_path, "hard.osu").read_bytes() == content
+    assert len(beatmap_source._archive_directories) == 1
+
+    with pytest.raises(FileNotFoundError):
+        ArchivedBeatmapFile(archive_path, "insane.osu").read_bytes()
+
+    with pytest.raises(ValueError):
+        open_beatmap(archive_path)
+
+
+def test_compressed_beatmap(tmp_path: pathlib.Path) -> None:
+    content = SAMPLE_PATH.read_bytes()
+
+    assert CompressedBeatmapFile(lzma.compress(content)).read_bytes() == content
+    legacy = lzma.compress(content, format=lzma.FORMAT_ALONE)
+    assert CompressedBeatmapFile(legacy).read_bytes() == content
+
+    compressed_path = Path(str(tmp_path)) / "sample.osu.xz"
+    compressed_path.write_bytes(lzma.compress(content))
+    assert open_beatmap(compressed_path).read_bytes() == content
+
+
+def test_zstd_beatmap() -> None:
+    zstandard = pytest.importorskip("zstandard")
+
+    content = SAMPLE_PATH.read_bytes()
+    compressed = zstandard.ZstdCompressor().compress(content)
+    assert CompressedBeatmapFile(compressed).read_bytes() == content
+
+
+def test_calculate_score_from_blob() -> None:
+    score = Score(
+        mode=1,
+        score=1_000_000,
+        max_combo=13,
+        mods=0,
+        accuracy=1.0,
+        num_300s=13,
+        num_100s=0,
+        num_50s=0,
+        num_gekis=0,
+        num_katus=0,
+        num_misses=0,
+    )
+
+    source = CompressedBeatmapFile(lzma.compress(SAMPLE_PATH.read_bytes()))
+    assert calculate_score(score, osu_file_path=source) == calculate_score(
+        score,
+        osu_file_path=str(SAMPLE_PATH),
+    )
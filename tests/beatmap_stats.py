@@ -0,0 +1,78 @@
+from __future__ import annotations
+
+import numpy as np
+
+from performance_calculator.models.beatmap_stats import calculate_beatmap_stats
+from performance_calculator.models.mods import Mods
+
+# how far the values can be from the real result
+TOLERANCE = 1e-6
+
+
+def test_osu_stats() -> None:
+    # https://osu.ppy.sh/beatmapsets/475886#osu/1016701
+    # https://osu.ppy.sh/beatmapsets/1002271#osu/2097898
+    stats = calculate_beatmap_stats(
+        mode=0,
+        circle_size=[4, 4],
+        approach_rate=[9.5, 9.3],
+        overall_difficulty=[9, 8.8],
+        drain_rate=[6, 6.2],
+        mods=[
+            Mods.HIDDEN | Mods.DOUBLETIME,
+            Mods.HIDDEN | Mods.DOUBLETIME | Mods.HARDROCK,
+        ],
+    )
+
+    assert np.allclose(stats.clock_rate, [1.5, 1.5])
+    assert np.allclose(stats.approach_rate, [10.666666666666668, 11], atol=TOLERANCE)
+    assert np.allclose(
+        stats.overall_difficulty,
+        [10.444444444444445, 11.111111111111112],
+        atol=TOLERANCE,
+    )
+    assert np.allclose(stats.circle_size, [4, 5.2])
+
+
+def test_taiko_and_mania_hit_windows() -> None:
+    taiko_stats = calculate_beatmap_stats(
+        mode=1,
+        circle_size=5,
+        approach_rate=5,
+        overall_difficulty=[7.2, 7],
+        drain_rate=5,
+        mods=Mods.DOUBLETIME,
+    )
+    assert np.allclose(
+        taiko_stats.great_hit_window,
+        [18.93333371480306, 19.333333333333332],
+        atol=1e-5,
+    )
+
+    mania_stats = calculate_beatmap_stats(
+        mode=3,
+        circle_size=7,
+        approach_rate=5,
+        overall_difficulty=8,
+        drain_rate=8,
+        mods=[0, Mods.DOUBLETIME, Mods.HARDROCK, Mods.EASY | Mods.HALFTIME],
+    )
+    assert mania_stats.great_hit_window.tolist() == [40, 40, 29, 56]
+
+
+def test_every_mod_combination() -> None:
+    mod_combinations = np.array(
+        [0, Mods.HARDROCK, Mods.DOUBLETIME, Mods.HARDROCK | Mods.DOUBLETIME],
+    )
+
+    stats = calculate_beatmap_stats(
+        mode=0,
+        circle_size=np.array([[4], [5], [6]]),
+        approach_rate=np.array([[9], [8], [10]]),
+        overall_difficulty=np.array([[8], [7], [9]]),
+        drain_rate=np.array([[5], [5], [5]]),
+        mods=mod_combinations,
+    )
+
+    assert stats.approach_rate.shape == (3, 4)
+    assert np.all(stats.approach_rate[:, 3] >= stats.approach_rate[:, 0])
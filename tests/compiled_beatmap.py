@@ -0,0 +1,65 @@
+from __future__ import annotations
+
+import pathlib
+
+import numpy as np
+
+from performance_calculator.models.beatmap import parse_beatmap
+from performance_calculator.models.beatmap_arrays import BeatmapArrays
+from performance_calculator.models.compiled_beatmap import beatmap_checksum
+from performance_calculator.models.compiled_beatmap import load_beatmap_arrays
+from performance_calculator.models.compiled_beatmap import read_compiled_beatmap
+from performance_calculator.models.compiled_beatmap import write_compiled_beatmap
+from performance_calculator.models.path import Path
+from performance_calculator.rulesets.osu.difficulty_calculator import (
+    OsuDifficultyCalculator,
+)
+
+SAMPLE_PATH = Path(__file__.rpartition("/")[0]) / "data/sample.osu"
+
+
+def test_round_trip(tmp_path: pathlib.Path) -> None:
+    content = SAMPLE_PATH.read_bytes()
+    beatmap = BeatmapArrays.from_beatmap(parse_beatmap(content))
+
+    compiled_path = Path(str(tmp_path)) / "sample.osuc"
+    write_compiled_beatmap(compiled_path, beatmap, beatmap_checksum(content))
+
+    compiled = read_compiled_beatmap(compiled_path, beatmap_checksum(content))
+    assert compiled is not None
+    assert compiled.difficulty == beatmap.difficulty
+    assert compiled.max_combo == beatmap.max_combo
+    assert np.array_equal(compiled.hit_objects, beatmap.hit_objects)
+    assert np.array_equal(compiled.timing_points, beatmap.timing_points)
+    assert np.array_equal(compiled.curve_points, beatmap.curve_points)
+
+    assert (
+        OsuDifficultyCalculator(compiled).calculate()
+        == OsuDifficultyCalculator(beatmap).calculate()
+    )
+
+    # compiled from different content
+    assert read_compiled_beatmap(compiled_path, beatmap_checksum(b"")) is None
+
+
+def test_load_recompiles_changed_files(tmp_path: pathlib.Path) -> None:
+    directory = Path(str(tmp_path))
+    osu_file_path = directory / "sample.osu"
+    osu_file_path.write_bytes(SAMPLE_PATH.read_bytes())
+
+    compiled_directory = directory / "compiled"
+    compiled_directory.mkdir()
+
+    beatmap = load_beatmap_arrays(osu_file_path, compiled_directory)
+    assert osu_file_path.compiled_path(compiled_directory).exists()
+    assert beatmap.hit_circle_count == 2
+
+    # a known checksum skips reading the .osu file
+    checksum = beatmap_checksum(osu_file_path.read_bytes())
+    assert load_beatmap_arrays(osu_file_path, compiled_directory, checksum).max_combo
+
+    osu_file_path.write_bytes(
+        SAMPLE_PATH.read_bytes().replace(b"CircleSize:4", b"CircleSize:7"),
+    )
+    beatmap = load_beatmap_arrays(osu_file_path, compiled_directory)
+    assert beatmap.difficulty.circle_size == 7
@@ -0,0 +1,126 @@
+from __future__ import annotations
+
+import dataclasses
+import math
+from typing import Any
+
+import numpy as np
+from helpers import ATTRIBUTES
+
+from performance_calculator.live import performance_calculator_for
+from performance_calculator.models.difficulty import DifficultyAttributes
+from performance_calculator.models.hit_distribution import osu_hit_distribution
+from performance_calculator.models.mods import Mods
+from performance_calculator.models.score import Score
+from performance_calculator.pipeline.batch import calculate_batch
+from performance_calculator.pipeline.batch import ScoreBatch
+from performance_calculator.pipeline.impact import estimate_impact
+from performance_calculator.pipeline.impact import FormulaVersions
+from performance_calculator.pipeline.impact import impact_report
+from performance_calculator.pipeline.impact import user_totals
+from performance_calculator.rulesets.osu.performance import OsuPerformanceAttributes
+from performance_calculator.rulesets.osu.performance import OsuPerformanceCalculator
+
+
+class BuffedCalculator(OsuPerformanceCalculator):
+    # a rework of the formula, which both `calculate` and `calculate_many` use
+    def _calculate(self, xp: Any, score: Any) -> OsuPerformanceAttributes:
+        attributes = super()._calculate(xp, score)
+        return dataclasses.replace(attributes, total=attributes.total * 1.1)
+
+
+def _buffed(attributes: DifficultyAttributes) -> OsuPerformanceCalculator:
+    return BuffedCalculator(attributes)
+
+
+def _batch(count: int, seed: int = 0) -> ScoreBatch:
+    rng = np.random.default_rng(seed)
+
+    attributes = [
+        dataclasses.replace(ATTRIBUTES, aim_difficulty=aim_difficulty)
+        for aim_difficulty in (2.0, 2.5, 3.0, 3.5)
+    ]
+    attribute_indices = rng.integers(0, len(attributes), count)
+
+    distribution = osu_hit_distribution(
+        rng.uniform(0.9, 1.0, count),
+        1002,
+        rng.integers(0, 5, count),
+    )
+    scores = distribution.score_arrays(
+        rng.choice([0, Mods.HIDDEN], count),
+        rng.integers(100, 1500, count),
+    )
+
+    return ScoreBatch(
+        scores=scores,
+        user_ids=rng.integers(0, 50, count),
+        beatmap_ids=attribute_indices + 1000,
+        attributes=attributes,
+        attribute_indices=attribute_indices,
+    )
+
+
+def test_versions_evaluate_side_by_side() -> None:
+    batch = _batch(500)
+
+    versions = FormulaVersions()
+    versions.register("live", performance_calculator_for)
+    versions.register("buffed", _buffed)
+    results = versions.evaluate(batch)
+
+    assert np.allclose(results["live"], calculate_batch(batch))
+    assert np.allclose(results["buffed"], results["live"] * 1.1)
+
+    # what's previewed is what single scores get
+    score = Score(
+        mode=0,
+        score=0,
+        mods=int(batch.scores["mods"][0]),
+        max_combo=int(batch.scores["max_combo"][0]),
+        accuracy=float(batch.scores["accuracy"][0]),
+        num_300s=int(batch.scores["num_300s"][0]),
+        num_100s=int(batch.scores["num_100s"][0]),
+        num_50s=int(batch.scores["num_50s"][0]),
+        num_gekis=0,
+        num_katus=0,
+        num_misses=int(batch.scores["num_misses"][0]),
+    )
+    buffed = _buffed(batch.attributes[batch.attribute_indices[0]])
+    assert math.isclose(buffed.calculate(score).total, results["buffed"][0])
+
+    report = impact_report(batch, results["live"], results["buffed"], top=3)
+    assert report.histogram.sum() == len(batch)
+    assert list(report.beatmap_ids) == [1000, 1001, 1002, 1003]
+    assert (report.map_deltas > 0).all()
+
+    users, totals = user_totals(batch.user_ids, results["live"])
+    assert np.allclose(report.user_deltas, totals * 0.1)
+    assert list(report.top_users) == list(users[np.argsort(-totals)[:3]])
+
+
+def test_user_totals() -> None:
+    users, totals = user_totals(
+        np.array([2, 1, 2, 2]),
+        np.array([100.0, 50.0, 300.0, 200.0]),
+    )
+    assert list(users) == [1, 2]
+    assert math.isclose(totals[0], 50.0)
+    assert math.isclose(totals[1], 300.0 + 200.0 * 0.95 + 100.0 * 0.95**2)
+
+
+def test_estimate_impact() -> None:
+    batch = _batch(5000, seed=1)
+
+    versions = FormulaVersions()
+    versions.register("live", performance_calculator_for)
+    versions.register("buffed", _buffed)
+    results = versions.evaluate(batch)
+    true_mean = float(np.mean(results["buffed"] - results["live"]))
+
+    estimate = estimate_impact(versions, batch, "live", "buffed", 500, seed=2)
+    assert estimate.sample_size == 500
+
+    low, high = estimate.mean_delta_interval
+    assert low <= true_mean <= high
+    assert math.isclose(estimate.mean_relative_delta, 0.1)
@@ -0,0 +1,154 @@
+from __future__ import annotations
+
+import dataclasses
+import math
+import os
+import random
+
+import pytest
+from helpers import ATTRIBUTES as OSU_ATTRIBUTES
+
+from performance_calculator.full_combo import calculate_full_combo
+from performance_calculator.full_combo import calculate_full_combo_oppai
+from performance_calculator.live import performance_calculator_for
+from performance_calculator.models.difficulty import DifficultyAttributes
+from performance_calculator.models.mods import Mods
+from performance_calculator.models.path import Path
+from performance_calculator.models.score import Score
+from performance_calculator.models.score_arrays import score_arrays
+from performance_calculator.rulesets.catch.difficulty import CatchDifficultyAttributes
+from performance_calculator.rulesets.mania.difficulty import ManiaDifficultyAttributes
+from performance_calculator.rulesets.osu.oppai_performance import calculate_oppai_pp
+from performance_calculator.rulesets.osu.oppai_performance import (
+    OppaiAttributeCache,
+)
+from performance_calculator.rulesets.taiko.difficulty import TaikoDifficultyAttributes
+
+SAMPLE_PATH = Path(__file__.rpartition("/")[0]) / "data/sample.osu"
+
+ATTRIBUTES: list[tuple[int, DifficultyAttributes]] = [
+    (
+        0,
+        dataclasses.replace(OSU_ATTRIBUTES, approach_rate=10.6),
+    ),
+    (
+        1,
+        TaikoDifficultyAttributes(
+            star_rating=5.0,
+            max_combo=1200,
+            stamina_difficulty=2.0,
+            rhythm_difficulty=1.0,
+            colour_difficulty=1.5,
+            peak_difficulty=3.0,
+            great_hit_window=25.0,
+        ),
+    ),
+    (2, CatchDifficultyAttributes(star_rating=6.0, max_combo=900, approach_rate=9.5)),
+    (
+        3,
+        ManiaDifficultyAttributes(star_rating=4.2, max_combo=3000, great_hit_window=40),
+    ),
+]
+
+MODS = (0, Mods.HIDDEN, Mods.HIDDEN | Mods.FLASHLIGHT, Mods.NOFAIL | Mods.SPUNOUT)
+
+
+def _random_score(rng: random.Random, mode: int, max_combo: int) -> Score:
+    return Score(
+        mode=mode,
+        score=0,
+        max_combo=rng.randint(0, max_combo),
+        mods=rng.choice(MODS),
+        accuracy=rng.uniform(0.8, 1.0),
+        num_300s=rng.randint(0, 2500),
+        num_100s=rng.randint(0, 100),
+        num_50s=rng.randint(0, 20),
+        num_gekis=rng.randint(0, 500),
+        num_katus=rng.randint(0, 100),
+        num_misses=rng.choice((0, rng.randint(0, 30))),
+    )
+
+
+def test_calculate_many_matches_calculate() -> None:
+    rng = random.Random(0)
+
+    for mode, attributes in ATTRIBUTES:
+        calculator = performance_calculator_for(attributes)
+        scores = [_random_score(rng, mode, attributes.max_combo) for _ in range(200)]
+
+        for score, pp in zip(scores, calculator.calculate_many(score_arrays(scores))):
+            assert math.isclose(pp, calculator.calculate(score).total, rel_tol=1e-12)
+
+
+def test_full_combo() -> None:
+    rng = random.Random(1)
+
+    scores = []
+    attributes = []
+    for _ in range(100):
+        mode, map_attributes = rng.choice(ATTRIBUTES)
+        scores.append(_random_score(rng, mode, map_attributes.max_combo))
+        attributes.append(map_attributes)
+
+    result = calculate_full_combo(scores, attributes)
+
+    for i, (score, map_attributes) in enumerate(zip(scores, attributes)):
+        calculator = performance_calculator_for(map_attributes)
+        full_combo = dataclasses.replace(
+            score,
+            max_combo=map_attributes.max_combo,
+            num_300s=score.num_300s + score.num_misses,
+            num_misses=0,
+        )
+        if score.mode == 0:
+            full_combo.accuracy = (
+                full_combo.num_300s * 6 + full_combo.num_100s * 2 + full_combo.num_50s
+            ) / (6 * (full_combo.num_300s + full_combo.num_100s + full_combo.num_50s))
+
+        assert math.isclose(result.pp[i], calculator.calculate(score).total)
+        assert math.isclose(
+            result.full_combo_pp[i],
+            calculator.calculate(full_combo).total,
+        )
+        assert result.full_combo_pp[i] >= result.pp[i]
+
+
+def test_relax_is_left_to_oppai() -> None:
+    rng = random.Random(2)
+    (mode, osu_attributes), (_, taiko_attributes) = ATTRIBUTES[:2]
+
+    relax = dataclasses.replace(
+        _random_score(rng, mode, osu_attributes.max_combo),
+        mods=Mods.RELAX | Mods.HIDDEN,
+    )
+    with pytest.raises(ValueError):
+        calculate_full_combo([relax], [osu_attributes])
+
+    autopilot = dataclasses.replace(relax, mods=Mods.AUTOPILOT)
+    with pytest.raises(ValueError):
+        calculate_full_combo([autopilot], [osu_attributes])
+
+    # only osu! sends them to oppai
+    taiko_relax = dataclasses.replace(
+        _random_score(rng, 1, taiko_attributes.max_combo),
+        mods=Mods.RELAX,
+    )
+    result = calculate_full_combo([taiko_relax], [taiko_attributes])
+    assert result.pp[0] > 0
+
+
+@pytest.mark.skipif("OPPAI_PATH" not in os.environ, reason="needs oppai-ng")
+def test_full_combo_oppai() -> None:
+    cache = OppaiAttributeCache(os.environ["OPPAI_PATH"])
+    scores = [
+        Score(0, 0, 100, Mods.RELAX, 97.5, 200, 10, 0, 0, 0, 3),
+        Score(0, 0, 50, Mods.RELAX, 99.0, 210, 2, 0, 0, 0, 1),
+    ]
+
+    result = calculate_full_combo_oppai(scores, [str(SAMPLE_PATH)] * 2, cache)
+    assert len(cache) == 1
+
+    attributes = cache.get(str(SAMPLE_PATH), Mods.RELAX)
+    for i, score in enumerate(scores):
+        assert math.isclose(result.pp[i], calculate_oppai_pp(attributes, score))
+        assert result.full_combo_pp[i] > result.pp[i]
@@ -0,0 +1,95 @@
+from __future__ import annotations
+
+from typing import Any
+from typing import Callable
+from typing import Sequence
+
+from performance_calculator.attribute_provider import AttributeKey
+from performance_calculator.models.difficulty import DifficultyAttributes
+from performance_calculator.models.hit_distribution import osu_hit_distribution
+from performance_calculator.pipeline.pool import ConnectionPool
+from performance_calculator.pipeline.score_table import create_tables
+from performance_calculator.rulesets.osu.difficulty import OsuDifficultyAttributes
+from performance_calculator.rulesets.osu.oppai_performance import (
+    OppaiBeatmapAttributes,
+)
+
+ATTRIBUTES = OsuDifficultyAttributes(
+    star_rating=6.1,
+    max_combo=1500,
+    aim_difficulty=3.1,
+    speed_difficulty=2.8,
+    speed_note_count=400.0,
+    flashlight_difficulty=2.0,
+    slider_factor=0.98,
+    approach_rate=9.6,
+    overall_difficulty=9.0,
+    drain_rate=5.0,
+    hit_circle_count=700,
+    slider_count=300,
+    spinner_count=2,
+)
+# oppai's attributes of the same map
+OPPAI_ATTRIBUTES = OppaiBeatmapAttributes(
+    mods=0,
+    star_rating=5.2,
+    aim_stars=2.6,
+    speed_stars=2.3,
+    approach_rate=9.3,
+    overall_difficulty=8.5,
+    max_combo=1500,
+    circle_count=700,
+    slider_count=300,
+    spinner_count=2,
+    object_count=1002,
+)
+
+
+def score_pool(
+    connect: Callable[[], Any],
+    beatmap_ids: Sequence[int],
+    size: int = 1,
+) -> ConnectionPool:
+    """A pool over a new score table, with a nomod osu! score on each of
+    `beatmap_ids` by one of seven users, from 90% to 100% accuracy."""
+    pool = ConnectionPool(connect, size=size)
+
+    distribution = osu_hit_distribution(
+        [0.9 + 0.1 * i / len(beatmap_ids) for i in range(len(beatmap_ids))],
+        1002,
+    )
+    with pool.connection() as connection:
+        create_tables(connection)
+        connection.executemany(
+            "INSERT INTO scores (user_id, beatmap_id, mode, mods, max_combo,"
+            " accuracy, num_300s, num_100s, num_50s, num_gekis, num_katus,"
+            " num_misses) VALUES (?, ?, 0, 0, 1500, ?, ?, ?, ?, 0, 0, 0)",
+            [
+                (
+                    i % 7,
+                    beatmap_id,
+                    score.accuracy,
+                    score.num_300s,
+                    score.num_100s,
+                    score.num_50s,
+                )
+                for i, (beatmap_id, score) in enumerate(
+                    zip(beatmap_ids, distribution.scores(0, 0, 1500)),
+                )
+            ],
+        )
+        connection.commit()
+
+    return pool
+
+
+def lookup(
+    keys: Sequence[AttributeKey],
+) -> dict[AttributeKey, DifficultyAttributes]:
+    """`ATTRIBUTES` for every map."""
+    return {key: ATTRIBUTES for key in keys}
+
+
+def all_pp(pool: ConnectionPool) -> list[float]:
+    with pool.connection() as connection:
+        return [pp for pp, in connection.execute("SELECT pp FROM scores ORDER BY id")]
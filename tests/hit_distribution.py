@@ -0,0 +1,77 @@
+from __future__ import annotations
+
+import numpy as np
+
+from performance_calculator.models.hit_distribution import catch_hit_distribution
+from performance_calculator.models.hit_distribution import mania_hit_distribution
+from performance_calculator.models.hit_distribution import osu_hit_distribution
+from performance_calculator.models.hit_distribution import taiko_hit_distribution
+
+
+def _counted(distribution) -> np.ndarray:
+    return (
+        distribution.num_300s
+        + distribution.num_100s
+        + distribution.num_50s
+        + distribution.num_gekis
+        + distribution.num_katus
+        + distribution.num_misses
+    )
+
+
+def test_accuracy_is_reached() -> None:
+    rng = np.random.default_rng(0)
+    total_hits = rng.integers(100, 3000, 500)
+    misses = rng.integers(0, 20, 500)
+    accuracy = 1 - rng.random(500) * 0.25
+
+    # rounding to whole judgements is off by at most half the biggest step
+    for solve, max_step in (
+        (osu_hit_distribution, 4 / 6),
+        (taiko_hit_distribution, 1 / 2),
+        (mania_hit_distribution, 20 / 64),
+    ):
+        distribution = solve(accuracy, total_hits, misses)
+        assert (_counted(distribution) == total_hits).all()
+        assert (distribution.num_misses == misses).all()
+
+        reachable = accuracy * total_hits <= total_hits - misses
+        error = np.abs(distribution.accuracy - accuracy)[reachable]
+        assert (error <= max_step / 2 / total_hits[reachable] + 1e-9).all()
+
+
+def test_osu_prefers_100s() -> None:
+    distribution = osu_hit_distribution([1.0, 0.95, 98.0, 0.2], 1000, [0, 0, 0, 0])
+    assert distribution.num_300s[0] == 1000
+    assert distribution.num_50s[1] == 0
+    assert distribution.num_100s[1] == 75
+    # percentages work too
+    assert distribution.num_100s[2] == 30
+    # below all 100s, 100s become 50s
+    assert distribution.num_300s[3] == 0
+    assert distribution.num_50s[3] > 0
+
+
+def test_mania_turns_perfects_into_greats_first() -> None:
+    distribution = mania_hit_distribution([0.98, 0.9], 1000)
+    assert distribution.num_katus[0] == 0
+    assert distribution.num_gekis[0] + distribution.num_300s[0] == 1000
+    assert distribution.num_gekis[1] == 0
+    assert distribution.num_katus[1] > 0
+
+
+def test_catch_misses_take_droplets_first() -> None:
+    distribution = catch_hit_distribution(
+        [1.0, 0.9],
+        fruits=500,
+        droplets=50,
+        tiny_droplets=300,
+        misses=[0, 60],
+    )
+    assert distribution.num_50s[0] == 300
+    assert distribution.num_katus[0] == 0
+
+    assert distribution.num_100s[1] == 0
+    assert distribution.num_300s[1] == 490
+    assert distribution.num_50s[1] + distribution.num_katus[1] == 300
+    assert abs(distribution.accuracy[1] - 0.9) < 1 / 850
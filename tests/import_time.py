@@ -0,0 +1,94 @@
+from __future__ import annotations
+
+import os
+import subprocess
+import sys
+
+# microseconds the package's own modules may take to import, ten times what
+# they take now, and a third of what they took loading everything up front
+OWN_IMPORT_BUDGET = 5_000
+RUNS = 5
+
+# none of these should be loaded until a calculation needs them
+LAZY_MODULES = (
+    "ctypes",
+    "numpy",
+    "performance_calculator.models.oppai",
+    "performance_calculator.rulesets",
+)
+
+
+def _loaded_modules(statement: str) -> list[str]:
+    """The modules loaded after running `statement`."""
+    result = subprocess.run(
+        [sys.executable, "-c", f"{statement}; import sys; print(*sys.modules)"],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return result.stdout.split()
+
+
+def _import_times(statement: str) -> dict[str, int]:
+    """The time each module `statement` imports took, not counting the
+    modules it imported."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", statement],
+        capture_output=True,
+        text=True,
+        check=True,
+        # so the first run caches the package's bytecode for the others
+        env={
+            name: value
+            for name, value in os.environ.items()
+            if name != "PYTHONDONTWRITEBYTECODE"
+        },
+    )
+
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+
+        own, _, name = line.split("|")
+        times[name.strip()] = int(own.split(":")[1])
+
+    return times
+
+
+def _own_import_time(times: dict[str, int]) -> int:
+    return sum(
+        own
+        for name, own in times.items()
+        if name.split(".")[0] == "performance_calculator"
+    )
+
+
+def test_import_is_lazy() -> None:
+    loaded = [
+        name
+        for name in _loaded_modules("import performance_calculator")
+        if any(
+            name == module or name.startswith(f"{module}.") for module in LAZY_MODULES
+        )
+    ]
+    assert loaded == []
+
+
+def test_lazy_attributes_are_loaded_on_use() -> None:
+    loaded = _loaded_modules(
+        "import performance_calculator; performance_calculator.OsuPerformanceCalculator",
+    )
+
+    assert "performance_calculator.rulesets.osu.performance" in loaded
+    assert "performance_calculator.rulesets.mania.performance" not in loaded
+
+
+def test_import_time_budget() -> None:
+    # the fastest of a few runs, as the first may compile the package and
+    # the slower ones are mostly noise
+    own_time = min(
+        _own_import_time(_import_times("import performance_calculator"))
+        for _ in range(RUNS)
+    )
+    assert own_time < OWN_IMPORT_BUDGET
@@ -0,0 +1,184 @@
+from __future__ import annotations
+
+import dataclasses
+import math
+import sqlite3
+
+import numpy as np
+from helpers import ATTRIBUTES
+
+from performance_calculator.live import performance_calculator_for
+from performance_calculator.models.hit_distribution import osu_hit_distribution
+from performance_calculator.models.mods import Mods
+from performance_calculator.models.score import Score
+from performance_calculator.pipeline.incremental import DependencyIndex
+from performance_calculator.pipeline.incremental import IncrementalRecalculator
+from performance_calculator.pipeline.score_table import create_tables
+from performance_calculator.rulesets.osu.difficulty import OsuDifficultyAttributes
+from performance_calculator.rulesets.taiko.difficulty import TaikoDifficultyAttributes
+
+MODS = (0, Mods.HIDDEN, Mods.DOUBLETIME, Mods.NIGHTCORE | Mods.DOUBLETIME)
+
+
+def _connection() -> sqlite3.Connection:
+    connection = sqlite3.connect(":memory:")
+    create_tables(connection)
+
+    rng = np.random.default_rng(0)
+    distribution = osu_hit_distribution(rng.uniform(0.9, 1.0, 300), 1002)
+    for i, score in enumerate(distribution.scores(0, 0, 1500)):
+        connection.execute(
+            "INSERT INTO scores (user_id, beatmap_id, mode, mods, max_combo,"
+            " accuracy, num_300s, num_100s, num_50s, num_gekis, num_katus,"
+            " num_misses) VALUES (?, ?, 0, ?, ?, ?, ?, ?, ?, 0, 0, 0)",
+            (
+                i % 20,
+                i % 3 + 1,
+                MODS[i % 4],
+                int(rng.integers(500, 1500)),
+                score.accuracy,
+                score.num_300s,
+                score.num_100s,
+                score.num_50s,
+            ),
+        )
+
+    return connection
+
+
+def _attributes(aim_difficulty: float) -> OsuDifficultyAttributes:
+    return dataclasses.replace(ATTRIBUTES, aim_difficulty=aim_difficulty)
+
+
+def test_index_keys_by_difficulty_mods() -> None:
+    index = DependencyIndex.from_connection(_connection())
+    assert len(index) == 300
+    assert index.user_count == 20
+
+    # nightcore is double time, and there's 25 of each mods per map
+    assert len(index.scores_for(1, 0, Mods.DOUBLETIME)) == 50
+    assert len(index.scores_for(1, 0, Mods.NIGHTCORE)) == 50
+    assert len(index.scores_for(1, mods=Mods.DOUBLETIME)) == 50
+    assert len(index.scores_for(1, 0)) == 100
+    assert len(index.scores_for(1)) == 100
+    assert index.scores_for(1, 1) == []
+    assert index.scores_for(4) == []
+
+
+def test_only_affected_scores_are_recalculated() -> None:
+    connection = _connection()
+    recalculator = IncrementalRecalculator(connection)
+
+    everything = {
+        (beatmap_id, 0, mods): _attributes(3.0)
+        for beatmap_id in (1, 2, 3)
+        for mods in MODS[:3]
+    }
+    report = recalculator.attributes_changed(everything)
+    assert report.scores_touched == 300
+    assert report.scores_skipped == 0
+    assert report.users_touched == 20
+
+    before = dict(connection.execute("SELECT id, pp FROM scores"))
+
+    changed = _attributes(3.5)
+    report = recalculator.attributes_changed({(2, 0, Mods.HIDDEN): changed})
+    assert report.scores_touched == 25
+    assert report.scores_changed == 25
+    assert report.scores_skipped == 275
+    assert report.users_touched + report.users_skipped == 20
+
+    calculator = performance_calculator_for(changed)
+    rows = connection.execute(
+        "SELECT id, beatmap_id, mods, max_combo, accuracy, num_300s, num_100s,"
+        " num_50s, pp FROM scores",
+    )
+    for score_id, beatmap_id, mods, combo, accuracy, n300, n100, n50, pp in rows:
+        if beatmap_id == 2 and mods == Mods.HIDDEN:
+            score = Score(0, 0, combo, mods, accuracy, n300, n100, n50, 0, 0, 0)
+            assert math.isclose(pp, calculator.calculate(score).total)
+            assert pp > before[score_id]
+        else:
+            assert pp == before[score_id]
+
+    # every user has five scores on each map, and only the best one counts
+    best: dict[tuple[int, int], float] = {}
+    for user_id, beatmap_id, pp in connection.execute(
+        "SELECT user_id, beatmap_id, pp FROM scores",
+    ):
+        best[user_id, beatmap_id] = max(best.get((user_id, beatmap_id), 0.0), pp)
+
+    stats = dict(connection.execute("SELECT user_id, pp FROM user_stats"))
+    assert len(stats) == 20
+    for user_id, total in stats.items():
+        pp = sorted(
+            (pp for (user, _), pp in best.items() if user == user_id),
+            reverse=True,
+        )
+        assert len(pp) == 3
+        assert math.isclose(total, pp[0] + 0.95 * pp[1] + 0.95**2 * pp[2])
+
+    # unchanged attributes touch the scores but don't write anything
+    report = recalculator.attributes_changed({(2, 0, Mods.HIDDEN): changed})
+    assert report.scores_touched == 25
+    assert report.scores_changed == 0
+    assert report.users_touched == 0
+
+
+def test_modes_and_oppai_scores_are_kept_apart() -> None:
+    connection = sqlite3.connect(":memory:")
+    create_tables(connection)
+
+    # one map's osu! scores, its taiko convert's and osu! relax and
+    # autopilot ones, which keep the pp oppai gave them
+    scores = [
+        (0, 0),
+        (0, Mods.HIDDEN),
+        (0, Mods.RELAX),
+        (0, Mods.AUTOPILOT | Mods.HIDDEN),
+        (1, 0),
+        (1, Mods.RELAX),
+    ]
+    connection.executemany(
+        "INSERT INTO scores (user_id, beatmap_id, mode, mods, max_combo,"
+        " accuracy, num_300s, num_100s, num_50s, num_gekis, num_katus,"
+        " num_misses, pp) VALUES (?, 5, ?, ?, 1000, 0.98, 970, 30, 0, 0, 0, 0,"
+        " 100.0)",
+        [(i, mode, mods) for i, (mode, mods) in enumerate(scores)],
+    )
+
+    index = DependencyIndex.from_connection(connection)
+    assert len(index) == 4
+    assert index.scores_for(5, 0, 0) == [1]
+    assert index.scores_for(5, 0) == [1, 2]
+    assert index.scores_for(5, 1, 0) == [5, 6]
+    assert index.scores_for(5, mods=0) == [1, 5, 6]
+
+    taiko = TaikoDifficultyAttributes(
+        star_rating=5.2,
+        max_combo=1000,
+        stamina_difficulty=2.9,
+        rhythm_difficulty=1.4,
+        colour_difficulty=2.6,
+        peak_difficulty=4.8,
+        great_hit_window=25.0,
+    )
+    recalculator = IncrementalRecalculator(connection, index)
+    report = recalculator.attributes_changed({(5, 1, Mods.RELAX): taiko})
+    assert report.scores_touched == 2
+    assert report.scores_skipped == 2
+
+    calculator = performance_calculator_for(taiko)
+    pp = dict(connection.execute("SELECT id, pp FROM scores"))
+    expected = calculator.calculate(
+        Score(1, 0, 1000, 0, 0.98, 970, 30, 0, 0, 0, 0),
+    ).total
+    assert math.isclose(pp[5], expected)
+    assert math.isclose(pp[6], expected)
+    assert [pp[score_id] for score_id in (1, 2, 3, 4)] == [100.0] * 4
+
+    report = recalculator.attributes_changed({(5, 0, 0): _attributes(3.0)})
+    assert report.scores_touched == 1
+    pp = dict(connection.execute("SELECT id, pp FROM scores"))
+    assert pp[1] != 100.0
+    assert [pp[score_id] for score_id in (2, 3, 4)] == [100.0] * 3
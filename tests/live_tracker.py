@@ -0,0 +1,61 @@
+from __future__ import annotations
+
+import dataclasses
+import random
+
+from helpers import ATTRIBUTES as OSU_ATTRIBUTES
+
+from performance_calculator.live import Judgement
+from performance_calculator.live import LivePerformanceTracker
+from performance_calculator.models.mods import Mods
+from performance_calculator.rulesets.catch.difficulty import CatchDifficultyAttributes
+from performance_calculator.rulesets.catch.performance import CatchPerformanceCalculator
+from performance_calculator.rulesets.osu.performance import OsuPerformanceCalculator
+
+
+def test_osu_tracker_matches_full_calculation() -> None:
+    rng = random.Random(0)
+    tracker = LivePerformanceTracker.from_attributes(
+        OSU_ATTRIBUTES,
+        Mods.HIDDEN | Mods.DOUBLETIME,
+    )
+    assert tracker.star_rating == OSU_ATTRIBUTES.star_rating
+
+    for i in range(1000):
+        judgement = rng.choices(
+            [Judgement.GREAT, Judgement.OK, Judgement.MEH, Judgement.MISS],
+            [90, 6, 2, 2],
+        )[0]
+        tracker.judge(judgement)
+        if i % 3 == 0:
+            tracker.add_combo()
+
+        if i % 97 == 0:
+            score = dataclasses.replace(tracker.score)
+            score.accuracy = (
+                score.num_300s * 300 + score.num_100s * 100 + score.num_50s * 50
+            ) / (300 * (i + 1))
+
+            expected = OsuPerformanceCalculator(OSU_ATTRIBUTES).calculate(score)
+            assert abs(tracker.pp - expected.total) < 1e-9
+
+    assert tracker.score.num_300s + tracker.score.num_misses > 900
+    assert tracker.combo <= tracker.score.max_combo
+
+
+def test_catch_tiny_droplets_keep_combo() -> None:
+    calculator = CatchPerformanceCalculator(
+        CatchDifficultyAttributes(star_rating=5.0, max_combo=100, approach_rate=9.0),
+    )
+    tracker = LivePerformanceTracker(calculator)
+
+    tracker.judge(Judgement.GREAT, 10)
+    tracker.judge(Judgement.KATU)
+    tracker.judge(Judgement.MEH, 5)
+    assert tracker.combo == 10
+
+    before = tracker.pp
+    tracker.judge(Judgement.MISS)
+    assert tracker.combo == 0
+    assert tracker.score.max_combo == 10
+    assert tracker.pp < before
@@ -0,0 +1,76 @@
+from __future__ import annotations
+
+from performance_calculator.models.beatmap import parse_beatmap
+from performance_calculator.models.mods import Mods
+from performance_calculator.models.path import Path
+from performance_calculator.rulesets.mania.difficulty_calculator import (
+    ManiaDifficultyCalculator,
+)
+from performance_calculator.rulesets.mania.difficulty_calculator import total_columns
+
+SAMPLE_PATH = Path(__file__.rpartition("/")[0]) / "data/sample.osu"
+
+
+def _mania_beatmap(key_count: int) -> bytes:
+    lines = [
+        "osu file format v14",
+        "[General]",
+        "Mode: 3",
+        "[Difficulty]",
+        f"CircleSize:{key_count}",
+        "OverallDifficulty:8",
+        "[TimingPoints]",
+        "0,300,4,2,0,50,1,0",
+        "[HitObjects]",
+    ]
+
+    time = 1000
+    for i in range(400):
+        column = i % key_count
+        x = int((column + 0.5) * 512 / key_count)
+
+        if i % 10 == 0:
+            lines.append(f"{x},192,{time},128,0,{time + 450}:0:0:0:0:")
+        else:
+            lines.append(f"{x},192,{time},1,0,0:0:0:0:")
+
+        # a chord every 4 notes
+        if i % 4 != 0:
+            time += 150
+
+    return "\n".join(lines).encode()
+
+
+def test_total_columns() -> None:
+    mania_beatmap = parse_beatmap(_mania_beatmap(7))
+    assert total_columns(mania_beatmap, 0) == 7
+    # key mods don't apply to maps made for mania
+    assert total_columns(mania_beatmap, Mods.KEY4 | Mods.KEYCOOP) == 7
+
+    converted_beatmap = parse_beatmap(SAMPLE_PATH)
+    assert total_columns(converted_beatmap, 0) == 5
+    assert total_columns(converted_beatmap, Mods.KEY9) == 9
+    assert total_columns(converted_beatmap, Mods.KEY4 | Mods.KEYCOOP) == 8
+
+
+def test_mania_attributes() -> None:
+    calculator = ManiaDifficultyCalculator(parse_beatmap(_mania_beatmap(4)))
+    nomod, doubletime, halftime = calculator.calculate_many(
+        [0, Mods.DOUBLETIME, Mods.HALFTIME],
+    )
+
+    # 40 holds, each 450ms long
+    assert nomod.max_combo == 400 + 40 * 4
+    assert nomod.great_hit_window == 40
+
+    assert nomod.star_rating > 0
+    assert halftime.star_rating < nomod.star_rating < doubletime.star_rating
+
+
+def test_converted_attributes() -> None:
+    calculator = ManiaDifficultyCalculator(parse_beatmap(SAMPLE_PATH))
+    attributes = calculator.calculate(Mods.KEY4)
+
+    assert attributes.star_rating > 0
+    # OD 8 converts always use a 34ms window
+    assert attributes.great_hit_window == 34
@@ -0,0 +1,32 @@
+from __future__ import annotations
+
+import numpy as np
+
+from performance_calculator.models.oppai_graph import downsample
+from performance_calculator.models.oppai_graph import StrainGraph
+
+
+def test_downsample_keeps_peaks() -> None:
+    times = np.arange(0, 1000, 10, dtype=np.float32)
+    values = np.zeros(len(times), dtype=np.float32)
+    values[5] = 3.0
+    values[50] = 7.0
+
+    bucket_times, peaks = downsample(times, values, 10)
+    assert len(bucket_times) == len(peaks) == 10
+    assert bucket_times[0] == 0
+    assert peaks[0] == 3.0
+    assert peaks[5] == 7.0
+    assert peaks.sum() == 10.0
+
+
+def test_downsample_more_buckets_than_objects() -> None:
+    graph = StrainGraph(
+        times=np.array([0.0, 100.0]),
+        aim=np.array([1.0, 2.0]),
+        speed=np.array([2.0, 1.0]),
+    )
+
+    downsampled = graph.downsampled(4)
+    assert list(downsampled.aim) == [1.0, 0.0, 0.0, 2.0]
+    assert list(downsampled.speed) == [2.0, 0.0, 0.0, 1.0]
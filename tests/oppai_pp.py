@@ -0,0 +1,125 @@
+from __future__ import annotations
+
+import numpy as np
+import pytest
+
+from performance_calculator.models.mods import Mods
+from performance_calculator.models.score import Score
+from performance_calculator.rulesets.osu.oppai_performance import (
+    calculate_oppai_pp,
+)
+from performance_calculator.rulesets.osu.oppai_performance import (
+    calculate_oppai_pp_many,
+)
+from performance_calculator.rulesets.osu.oppai_performance import (
+    OppaiBeatmapAttributes,
+)
+from performance_calculator.rulesets.osu.oppai_performance import round_accuracy
+
+ATTRIBUTES = OppaiBeatmapAttributes(
+    mods=Mods.HIDDEN,
+    star_rating=5.2,
+    aim_stars=2.6,
+    speed_stars=2.3,
+    approach_rate=9.3,
+    overall_difficulty=8.5,
+    max_combo=1200,
+    circle_count=600,
+    slider_count=300,
+    spinner_count=2,
+    object_count=902,
+)
+
+# oppai-ng's (4.1.0) attributes of data/sample.osu, and its pp for some
+# (accuracy, combo, misses) on them
+SAMPLE_PP = (
+    (
+        OppaiBeatmapAttributes(
+            mods=Mods.RELAX,
+            star_rating=0.8183026,
+            aim_stars=0.4398637,
+            speed_stars=0.3170140,
+            approach_rate=9.0,
+            overall_difficulty=8.0,
+            max_combo=13,
+            circle_count=2,
+            slider_count=3,
+            spinner_count=1,
+            object_count=6,
+        ),
+        (
+            (100.0, 0, 0, 14.314508),
+            (95.0, 10, 0, 14.274103),
+            (93.5, 5, 1, 0.08946288),
+            (80.0, 2, 3, 0.003051727),
+        ),
+    ),
+    (
+        OppaiBeatmapAttributes(
+            mods=Mods.RELAX | Mods.HIDDEN | Mods.DOUBLETIME,
+            star_rating=0.9386438,
+            aim_stars=0.5033907,
+            speed_stars=0.3671157,
+            approach_rate=10.333334,
+            overall_difficulty=9.777778,
+            max_combo=13,
+            circle_count=2,
+            slider_count=3,
+            spinner_count=1,
+            object_count=6,
+        ),
+        (
+            (100.0, 0, 0, 32.492931),
+            (95.0, 10, 0, 32.424301),
+            (93.5, 5, 1, 0.1590722),
+            (80.0, 2, 3, 0.005465961),
+        ),
+    ),
+)
+
+
+def _score(accuracy: float, max_combo: int, num_misses: int, mods: int) -> Score:
+    return Score(
+        mode=0,
+        score=0,
+        max_combo=max_combo,
+        mods=mods,
+        accuracy=accuracy,
+        num_300s=0,
+        num_100s=0,
+        num_50s=0,
+        num_gekis=0,
+        num_katus=0,
+        num_misses=num_misses,
+    )
+
+
+def test_round_accuracy() -> None:
+    n300, n100, n50 = round_accuracy(np.array([100.0, 95.0, 20.0]), 902, np.zeros(3))
+    assert list(n300 + n100 + n50) == [902, 902, 902]
+    assert (n100[0], n50[0]) == (0, 0)
+    assert n100[1] > 0 and n50[1] == 0
+    assert n50[2] > 0
+
+
+def test_vectorized_matches_scalar() -> None:
+    accuracy = np.array([0.0, 99.0, 95.0, 95.0, 90.0])
+    combo = np.array([0, 1200, 1200, 600, 300])
+    nmiss = np.array([0, 0, 0, 3, 10])
+
+    pp = calculate_oppai_pp_many(ATTRIBUTES, accuracy, combo, nmiss)
+    assert all(np.diff(pp) < 0)
+
+    for i in range(len(pp)):
+        score = _score(accuracy[i], combo[i], nmiss[i], Mods.HIDDEN)
+        assert calculate_oppai_pp(ATTRIBUTES, score) == pytest.approx(pp[i])
+
+
+def test_parity_with_oppai() -> None:
+    for attributes, expected in SAMPLE_PP:
+        for accuracy, combo, nmiss, pp in expected:
+            score = _score(accuracy, combo, nmiss, attributes.mods)
+            assert calculate_oppai_pp(attributes, score) == pytest.approx(
+                pp,
+                rel=1e-5,
+            )
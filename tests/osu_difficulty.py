@@ -0,0 +1,107 @@
+from __future__ import annotations
+
+import math
+
+import numpy as np
+import pytest
+
+from performance_calculator.models.beatmap import parse_beatmap
+from performance_calculator.models.mods import Mods
+from performance_calculator.models.path import Path
+from performance_calculator.models.strain import decayed_cumsum
+from performance_calculator.models.strain import strain_decay
+from performance_calculator.rulesets.osu.difficulty_calculator import (
+    OsuDifficultyCalculator,
+)
+
+DATA_PATH = Path(__file__.rpartition("/")[0]) / "data"
+SAMPLE_PATH = DATA_PATH / "sample.osu"
+
+# (star rating, aim, speed, speed note count, flashlight, slider factor) of
+# each map and mods, from rosu-pp 0.9.1, a port of lazer's difficulty
+# calculation as of the 2022 pp update. Sliders are sampled uniformly rather
+# than adaptively, which moves sample.osu's bezier by a few hundredths of a
+# percent
+REFERENCE_ATTRIBUTES = {
+    "sample.osu": {
+        0: (0.807512, 0.443783, 0.28724, 1.864129, 0.009187, 0.385278),
+        Mods.HARDROCK: (0.893075, 0.496925, 0.297576, 2.009993, 0.010775, 0.365687),
+        Mods.DOUBLETIME: (0.955191, 0.524816, 0.342616, 2.063269, 0.30913, 0.385278),
+    },
+    # slider velocity changes, repeats and every curve type
+    "velocity.osu": {
+        0: (3.163496, 1.619844, 1.387154, 33.20982, 0.378715, 0.87335),
+        Mods.HARDROCK: (3.447666, 1.813254, 1.435874, 33.384282, 0.447066, 0.842786),
+        Mods.DOUBLETIME: (4.266145, 2.177127, 1.881429, 34.281967, 0.708842, 0.853121),
+    },
+}
+REFERENCE_TOLERANCE = 2e-3
+
+
+def test_decayed_cumsum() -> None:
+    rng = np.random.default_rng(0)
+    values = rng.random(5000)
+    # long enough gaps to force the rebasing
+    delta_times = rng.random(5000) * 10000
+
+    expected = []
+    strain = 0.0
+    for value, delta_time in zip(values, delta_times):
+        strain = strain * math.pow(0.15, delta_time / 1000) + value
+        expected.append(strain)
+
+    assert np.allclose(
+        decayed_cumsum(values, strain_decay(delta_times, 0.15)),
+        expected,
+    )
+
+
+def test_sample_attributes() -> None:
+    calculator = OsuDifficultyCalculator(parse_beatmap(SAMPLE_PATH))
+    nomod, doubletime, halftime, relax = calculator.calculate_many(
+        [0, Mods.DOUBLETIME, Mods.HALFTIME, Mods.RELAX],
+    )
+
+    assert nomod.max_combo == 13
+    assert nomod.hit_circle_count == 2
+    assert nomod.slider_count == 3
+    assert nomod.spinner_count == 1
+    assert nomod.approach_rate == 9
+    assert nomod.overall_difficulty == 8
+
+    assert nomod.star_rating > 0
+    assert 0 < nomod.slider_factor <= 1
+    assert halftime.star_rating < nomod.star_rating < doubletime.star_rating
+    assert doubletime.aim_difficulty > nomod.aim_difficulty
+    assert doubletime.speed_difficulty > nomod.speed_difficulty
+
+    assert relax.speed_difficulty == 0
+    assert relax.aim_difficulty == nomod.aim_difficulty
+
+
+@pytest.mark.parametrize("name", REFERENCE_ATTRIBUTES)
+def test_reference_attributes(name: str) -> None:
+    calculator = OsuDifficultyCalculator(parse_beatmap(DATA_PATH / name))
+    references = REFERENCE_ATTRIBUTES[name]
+
+    for mods, attributes in zip(references, calculator.calculate_many(references)):
+        assert (
+            attributes.star_rating,
+            attributes.aim_difficulty,
+            attributes.speed_difficulty,
+            attributes.speed_note_count,
+            attributes.flashlight_difficulty,
+            attributes.slider_factor,
+        ) == pytest.approx(references[mods], rel=REFERENCE_TOLERANCE)
+
+
+def test_flashlight_and_hidden() -> None:
+    calculator = OsuDifficultyCalculator(parse_beatmap(SAMPLE_PATH))
+    nomod, hidden, flashlight = calculator.calculate_many(
+        [0, Mods.HIDDEN, Mods.HIDDEN | Mods.FLASHLIGHT],
+    )
+
+    assert hidden.flashlight_difficulty > nomod.flashlight_difficulty
+    assert hidden.star_rating == nomod.star_rating
+    # flashlight only counts towards star rating when it's enabled
+    assert flashlight.star_rating > hidden.star_rating
@@ -0,0 +1,92 @@
+from __future__ import annotations
+
+import math
+
+import numpy as np
+
+from performance_calculator.models.beatmap import parse_beatmap
+from performance_calculator.models.beatmap_arrays import BeatmapArrays
+from performance_calculator.models.mods import Mods
+from performance_calculator.models.oppai_graph import StrainGraph
+from performance_calculator.models.path import Path
+from performance_calculator.models.strain import strain_peaks
+from performance_calculator.models.strain import weighted_peak_sum
+from performance_calculator.rulesets.osu.difficulty_calculator import (
+    OsuDifficultyCalculator,
+)
+from performance_calculator.rulesets.osu.progressive import calculate_progressive
+from performance_calculator.rulesets.osu.progressive import oppai_prefix_stars
+
+SAMPLE_PATH = Path(__file__.rpartition("/")[0]) / "data/sample.osu"
+
+
+def _osu_beatmap(object_count: int) -> bytes:
+    lines = [
+        "osu file format v14",
+        "[General]",
+        "Mode: 0",
+        "[Difficulty]",
+        "CircleSize:4",
+        "OverallDifficulty:8",
+        "ApproachRate:9",
+        "SliderMultiplier:1.6",
+        "[TimingPoints]",
+        "0,300,4,2,0,50,1,0",
+        "[HitObjects]",
+    ]
+
+    time = 1000
+    for i in range(object_count):
+        x, y = (i * 137) % 512, (i * 89) % 384
+        if i % 7 == 3:
+            lines.append(f"{x},{y},{time},2,0,L|{(x + 100) % 512}:{y},1,100")
+            time += 600
+        else:
+            lines.append(f"{x},{y},{time},1,0")
+            time += 150 if i % 5 else 300
+
+    return "\n".join(lines).encode()
+
+
+def test_prefixes_match_truncated_maps() -> None:
+    content = _osu_beatmap(200)
+    calculator = OsuDifficultyCalculator(parse_beatmap(content))
+    mods = Mods.HIDDEN | Mods.FLASHLIGHT
+
+    prefixes = calculator.calculate_prefixes(mods)
+    assert len(prefixes) == 200
+    assert prefixes[-1] == calculator.calculate(mods)
+
+    lines = content.split(b"\n")
+    hit_objects_start = lines.index(b"[HitObjects]") + 1
+    for object_count in (1, 2, 5, 64, 150):
+        truncated = b"\n".join(lines[: hit_objects_start + object_count])
+        expected = OsuDifficultyCalculator(parse_beatmap(truncated)).calculate(mods)
+
+        prefix = prefixes[object_count - 1]
+        assert prefix.max_combo == expected.max_combo
+        assert math.isclose(prefix.star_rating, expected.star_rating)
+        assert math.isclose(prefix.speed_note_count, expected.speed_note_count)
+
+
+def test_progressive_pp() -> None:
+    beatmap = BeatmapArrays.from_beatmap(parse_beatmap(SAMPLE_PATH))
+    assert beatmap.object_combos().sum() == beatmap.max_combo
+
+    results = calculate_progressive(beatmap, object_counts=[2, 4, 6])
+    assert [result.object_count for result in results] == [2, 4, 6]
+    assert results[0].pp <= results[1].pp <= results[2].pp
+    assert results[0].time < results[2].time
+
+
+def test_oppai_prefix_stars() -> None:
+    rng = np.random.default_rng(0)
+    times = np.cumsum(rng.integers(50, 400, 300)).astype(np.float64)
+    strains = StrainGraph(times=times, aim=rng.random(300), speed=rng.random(300))
+
+    stars = oppai_prefix_stars(strains, Mods.DOUBLETIME, [1, 100, 300])
+    assert [star for star, _, _ in stars] == sorted(star for star, _, _ in stars)
+
+    aim_peaks = strain_peaks(times, strains.aim, ((strains.aim, 0.15),), 600.0)
+    _, aim_stars, _ = stars[-1]
+    assert math.isclose(aim_stars, math.sqrt(weighted_peak_sum(aim_peaks)) * 0.0675)
@@ -0,0 +1,108 @@
+from __future__ import annotations
+
+import dataclasses
+import math
+
+import numpy as np
+import pytest
+from helpers import ATTRIBUTES as OSU_ATTRIBUTES
+
+from performance_calculator.goals import minimum_accuracy
+from performance_calculator.goals import minimum_combo
+from performance_calculator.goals import SEARCH_ROUNDS
+from performance_calculator.live import performance_calculator_for
+from performance_calculator.models.hit_distribution import mania_hit_distribution
+from performance_calculator.models.hit_distribution import osu_hit_distribution
+from performance_calculator.models.mods import Mods
+from performance_calculator.models.performance import PerformanceCalculator
+from performance_calculator.rulesets.mania.difficulty import ManiaDifficultyAttributes
+
+MANIA_ATTRIBUTES = ManiaDifficultyAttributes(
+    star_rating=4.2,
+    max_combo=2000,
+    great_hit_window=40,
+)
+
+
+def _osu_pp(accuracy: float, max_combo: int, mods: int) -> float:
+    distribution = osu_hit_distribution([accuracy], 1002)
+    scores = distribution.score_arrays(mods, max_combo)
+    return performance_calculator_for(OSU_ATTRIBUTES).calculate_many(scores)[0]
+
+
+def test_minimum_accuracy() -> None:
+    targets = np.array([150.0, 250.0, 300.0, 10_000.0, 0.0])
+    mods = np.array([0, 0, Mods.HIDDEN, 0, 0])
+    accuracy = minimum_accuracy([OSU_ATTRIBUTES] * 5, targets, mods)
+
+    assert math.isnan(accuracy[3])
+    # all 50s, the lowest accuracy there is without misses
+    assert accuracy[4] == 1 / 6
+    assert accuracy[0] < accuracy[1]
+
+    for i in range(3):
+        assert _osu_pp(accuracy[i], 1500, mods[i]) >= targets[i]
+        assert _osu_pp(accuracy[i] - 1e-3, 1500, mods[i]) < targets[i]
+
+        # whole judgements give exactly this accuracy
+        distribution = osu_hit_distribution([accuracy[i]], 1002)
+        assert distribution.accuracy[0] == accuracy[i]
+
+
+def test_minimum_accuracy_mixed_maps() -> None:
+    attributes = [OSU_ATTRIBUTES, MANIA_ATTRIBUTES, OSU_ATTRIBUTES]
+    accuracy = minimum_accuracy(attributes, [200.0, 100.0, 210.0])
+    assert accuracy[0] < accuracy[2]
+
+    distribution = mania_hit_distribution([accuracy[1]], MANIA_ATTRIBUTES.max_combo)
+    scores = distribution.score_arrays(0, MANIA_ATTRIBUTES.max_combo)
+    pp = performance_calculator_for(MANIA_ATTRIBUTES).calculate_many(scores)[0]
+    assert math.isclose(pp, 100.0, rel_tol=1e-3)
+
+
+def test_minimum_combo() -> None:
+    targets = np.array([100.0, 200.0, 10_000.0])
+    combo = minimum_combo([OSU_ATTRIBUTES] * 3, targets, 0.98)
+
+    assert math.isnan(combo[2])
+    for i in range(2):
+        assert _osu_pp(0.98, int(combo[i]), 0) >= targets[i]
+        assert _osu_pp(0.98, int(combo[i]) - 1, 0) < targets[i]
+
+
+def test_maps_are_solved_together(monkeypatch: pytest.MonkeyPatch) -> None:
+    attributes = [
+        dataclasses.replace(
+            OSU_ATTRIBUTES,
+            aim_difficulty=2.0 + i / 10,
+            max_combo=1000 + 50 * i,
+            slider_count=20 * (i % 3),
+        )
+        for i in range(20)
+    ] + [dataclasses.replace(MANIA_ATTRIBUTES, star_rating=3.0 + i) for i in range(3)]
+    targets = np.linspace(100.0, 400.0, len(attributes))
+
+    calculate_many = PerformanceCalculator.calculate_many
+    passes = []
+
+    def counted(self: PerformanceCalculator, scores: np.ndarray) -> np.ndarray:
+        passes.append(scores.shape)
+        return calculate_many(self, scores)
+
+    monkeypatch.setattr(PerformanceCalculator, "calculate_many", counted)
+    accuracy = minimum_accuracy(attributes, targets)
+    combo = minimum_combo(attributes, targets, 0.99)
+
+    # a pass for the bracket's ends and one a round, for each ruleset and goal
+    assert len(passes) <= 2 * 2 * (SEARCH_ROUNDS + 1)
+    monkeypatch.undo()
+
+    # the same as solving each map alone
+    for i, map_attributes in enumerate(attributes):
+        alone = minimum_accuracy([map_attributes], targets[i])[0]
+        assert alone == accuracy[i] or math.isnan(alone) and math.isnan(accuracy[i])
+        alone = minimum_combo([map_attributes], targets[i], 0.99)[0]
+        assert alone == combo[i] or math.isnan(alone) and math.isnan(combo[i])
+
+    assert not np.isnan(accuracy).all()
+    assert not np.isnan(combo).all()
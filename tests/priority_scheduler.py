@@ -0,0 +1,166 @@
+from __future__ import annotations
+
+import threading
+import time
+
+import pytest
+from helpers import ATTRIBUTES
+
+from performance_calculator import calculate_score
+from performance_calculator.models.score import Score
+from performance_calculator.scheduler import Priority
+from performance_calculator.scheduler import PriorityScheduler
+
+SCORE = Score(
+    mode=0,
+    score=0,
+    max_combo=1400,
+    mods=0,
+    accuracy=97.5,
+    num_300s=950,
+    num_100s=45,
+    num_50s=5,
+    num_gekis=0,
+    num_katus=0,
+    num_misses=2,
+)
+
+
+def _spin(seconds: float) -> None:
+    """Use `seconds` of cpu time."""
+    started_at = time.thread_time()
+    while time.thread_time() - started_at < seconds:
+        pass
+
+
+def test_interactive_preempts_batch_at_chunk_boundaries() -> None:
+    order: list[str] = []
+    release = threading.Event()
+
+    def chunk(name: str) -> None:
+        if name == "batch 0":
+            release.wait()
+
+        order.append(name)
+
+    with PriorityScheduler(workers=1) as scheduler:
+        futures = [scheduler.submit(chunk, f"batch {i}") for i in range(3)]
+        # wait for the first chunk to start, so the rest are queued behind it
+        while not futures[0].running():
+            time.sleep(0.001)
+
+        futures.append(
+            scheduler.submit(chunk, "live", priority=Priority.INTERACTIVE),
+        )
+        release.set()
+        for future in futures:
+            future.result()
+
+    assert order == ["batch 0", "live", "batch 1", "batch 2"]
+
+
+def test_calculate_score() -> None:
+    with PriorityScheduler(workers=2) as scheduler:
+        assert scheduler.calculate_score(SCORE, ATTRIBUTES) == calculate_score(
+            SCORE,
+            ATTRIBUTES,
+        )
+
+        with pytest.raises(ValueError):
+            scheduler.calculate_score(SCORE)
+
+        stats = scheduler.stats()
+        assert stats[Priority.INTERACTIVE].tasks == 2
+        assert stats[Priority.BATCH].tasks == 0
+
+
+def test_batch_rate_limit() -> None:
+    with PriorityScheduler(workers=4, batch_rate=50) as scheduler:
+        started_at = time.monotonic()
+        for future in [scheduler.submit(lambda: None) for _ in range(6)]:
+            future.result()
+
+        # the first starts straight away, then one every 20ms
+        assert time.monotonic() - started_at >= 0.09
+
+        # interactive work isn't limited
+        started_at = time.monotonic()
+        for future in [
+            scheduler.submit(lambda: None, priority=Priority.INTERACTIVE)
+            for _ in range(20)
+        ]:
+            future.result()
+        assert time.monotonic() - started_at < 0.09
+
+
+def test_batch_cpu_share() -> None:
+    with PriorityScheduler(workers=1, batch_cpu_share=0.5) as scheduler:
+        started_at = time.monotonic()
+        for future in [scheduler.submit(_spin, 0.02) for _ in range(4)]:
+            future.result()
+
+        # 80ms of work, with a 20ms gap after each chunk but the last
+        assert time.monotonic() - started_at >= 0.13
+
+    stats = scheduler.stats()[Priority.BATCH]
+    assert stats.tasks == 4
+    assert stats.cpu_time >= 0.08
+
+
+def test_idle_workers_take_batch_work_during_cooldowns() -> None:
+    with PriorityScheduler(workers=2, batch_cpu_share=0.1) as scheduler:
+        # the first worker to finish is cooling down for 180ms, and is the
+        # first one woken when the next chunk comes in
+        cooling = scheduler.submit(_spin, 0.02)
+        idle = scheduler.submit(time.sleep, 0.1)
+        cooling.result()
+        idle.result()
+        time.sleep(0.01)
+
+        submitted_at = time.monotonic()
+        started_at = scheduler.submit(time.monotonic).result()
+        assert started_at - submitted_at < 0.05
+
+
+def test_queue_wait_is_reported_per_priority() -> None:
+    with PriorityScheduler(workers=1) as scheduler:
+        futures = [scheduler.submit(_spin, 0.01) for _ in range(5)]
+        futures.append(
+            scheduler.submit(lambda: None, priority=Priority.INTERACTIVE),
+        )
+        for future in futures:
+            future.result()
+
+        stats = scheduler.stats()
+
+    interactive = stats[Priority.INTERACTIVE]
+    batch = stats[Priority.BATCH]
+    assert (interactive.tasks, batch.tasks) == (1, 5)
+    # the live task only waited on the chunk already running
+    assert interactive.max_wait < batch.max_wait
+    assert batch.mean_wait > 0
+
+
+def test_shutdown() -> None:
+    release = threading.Event()
+    scheduler = PriorityScheduler(workers=1)
+    running = scheduler.submit(release.wait)
+    queued = scheduler.submit(lambda: None)
+    while not running.running():
+        time.sleep(0.001)
+
+    scheduler.shutdown(wait=False)
+    assert queued.cancelled()
+    with pytest.raises(RuntimeError):
+        scheduler.submit(lambda: None)
+
+    release.set()
+    assert running.result() is True
+
+
+def test_invalid_limits() -> None:
+    with pytest.raises(ValueError):
+        PriorityScheduler(batch_rate=0)
+
+    with pytest.raises(ValueError):
+        PriorityScheduler(batch_cpu_share=1.5)
@@ -0,0 +1,247 @@
+from __future__ import annotations
+
+import dataclasses
+import math
+import sqlite3
+from pathlib import Path
+from typing import Any
+from typing import Optional
+
+import pytest
+from helpers import all_pp
+from helpers import lookup
+from helpers import OPPAI_ATTRIBUTES
+from helpers import score_pool
+
+from performance_calculator.models.mods import Mods
+from performance_calculator.models.score import Score
+from performance_calculator.pipeline.jobs import CheckpointedJob
+from performance_calculator.pipeline.jobs import Chunk
+from performance_calculator.pipeline.jobs import JobProgress
+from performance_calculator.pipeline.jobs import plan_chunks
+from performance_calculator.pipeline.jobs import recalculation_processor
+from performance_calculator.pipeline.jobs import score_id_range
+from performance_calculator.pipeline.pool import ConnectionPool
+from performance_calculator.pipeline.recalculate import BatchRecalculator
+from performance_calculator.pipeline.recalculate import OppaiRecalculator
+from performance_calculator.pipeline.recalculate import PagedRecalculator
+from performance_calculator.pipeline.recalculate import RecalculationStats
+from performance_calculator.rulesets.osu import oppai_performance
+from performance_calculator.rulesets.osu.oppai_performance import (
+    calculate_oppai_pp,
+)
+from performance_calculator.rulesets.osu.oppai_performance import (
+    OppaiAttributeCache,
+)
+from performance_calculator.rulesets.osu.oppai_performance import (
+    OppaiBeatmapAttributes,
+)
+
+SCORE_COUNT = 230
+
+
+def _pool(path: Path) -> ConnectionPool:
+    return score_pool(lambda: sqlite3.connect(path), [1] * SCORE_COUNT)
+
+
+class FlakyProcessor:
+    """Recalculates chunks, but crashes once after writing `fail_on`."""
+
+    def __init__(self, recalculator: PagedRecalculator, fail_on: int) -> None:
+        self.process = recalculation_processor(recalculator)
+        self.fail_on = fail_on
+        self.finished: list[int] = []
+
+    def __call__(self, connection: Any, chunk: Chunk) -> RecalculationStats:
+        stats = self.process(connection, chunk)
+        if chunk.number == self.fail_on:
+            self.fail_on = -1
+            raise RuntimeError("deployed mid chunk")
+
+        self.finished.append(chunk.number)
+        return stats
+
+
+def test_plan_chunks() -> None:
+    assert plan_chunks(1, 10, 4) == [Chunk(0, 0, 4), Chunk(1, 4, 8), Chunk(2, 8, 10)]
+    assert plan_chunks(5, 5, 4) == [Chunk(0, 4, 5)]
+
+    with pytest.raises(ValueError):
+        plan_chunks(1, 10, 0)
+
+
+def test_job_resumes_after_crash(tmp_path: Path) -> None:
+    pool = _pool(tmp_path / "scores.db")
+    recalculator = BatchRecalculator(pool, lookup, page_size=16)
+    processor = FlakyProcessor(recalculator, fail_on=2)
+
+    with pool.connection() as connection:
+        id_range = score_id_range(connection)
+    assert id_range == (1, SCORE_COUNT)
+
+    job = CheckpointedJob("lazer", pool, processor)
+    chunks = job.plan(plan_chunks(*id_range, chunk_size=50))
+    assert len(chunks) == 5
+
+    with pytest.raises(RuntimeError):
+        job.run()
+
+    # the crashed chunk's writes were rolled back with it
+    assert sorted(job.completed()) == [0, 1]
+    pp = all_pp(pool)
+    assert all(value > 0 for value in pp[:100])
+    assert all(value == 0 for value in pp[100:])
+
+    # a restart keeps the first plan and only does what's left
+    restarted = CheckpointedJob("lazer", pool, processor)
+    assert restarted.plan(plan_chunks(1, 10_000, chunk_size=10)) == chunks
+    progress = restarted.run()
+
+    assert processor.finished == [0, 1, 2, 3, 4]
+    assert progress.chunks_done == progress.chunk_count == 5
+    assert progress.fraction_done == 1.0
+    assert progress.eta == 0
+    assert progress.totals.rows_read == SCORE_COUNT
+    assert progress.totals.rows_written == SCORE_COUNT
+    assert progress.totals.last_id == SCORE_COUNT
+
+    # the same as recalculating everything in one go
+    expected_pool = _pool(tmp_path / "expected.db")
+    BatchRecalculator(expected_pool, lookup).run()
+    assert all_pp(pool) == all_pp(expected_pool)
+
+    # and running again does nothing
+    assert restarted.run().totals == progress.totals
+    assert processor.finished == [0, 1, 2, 3, 4]
+
+
+def _oppai_pool(path: Path) -> ConnectionPool:
+    """Scores on maps 1 and 2, a third of them relax and a third autopilot,
+    some of those in taiko."""
+    pool = score_pool(
+        lambda: sqlite3.connect(path),
+        [2 if i % 4 == 0 else 1 for i in range(SCORE_COUNT)],
+    )
+    with pool.connection() as connection:
+        connection.execute(
+            "UPDATE scores SET mods = ? WHERE id % 3 = 0",
+            (Mods.RELAX,),
+        )
+        connection.execute(
+            "UPDATE scores SET mods = ? WHERE id % 3 = 1",
+            (Mods.AUTOPILOT | Mods.HIDDEN,),
+        )
+        connection.execute("UPDATE scores SET mode = 1 WHERE id % 9 = 0")
+        connection.commit()
+
+    return pool
+
+
+def _beatmap_for(beatmap_id: int) -> Optional[str]:
+    # map 2's file is missing
+    return "1.osu" if beatmap_id == 1 else None
+
+
+def test_oppai_job_resumes_after_crash(
+    tmp_path: Path,
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    parsed: list[tuple[str, int]] = []
+
+    def calculate_oppai_attributes(
+        oppai_path: str,
+        osu_file_path: str,
+        mods: int = 0,
+    ) -> OppaiBeatmapAttributes:
+        parsed.append((osu_file_path, mods))
+        return dataclasses.replace(OPPAI_ATTRIBUTES, mods=mods)
+
+    monkeypatch.setattr(
+        oppai_performance,
+        "calculate_oppai_attributes",
+        calculate_oppai_attributes,
+    )
+
+    pool = _oppai_pool(tmp_path / "scores.db")
+    cache = OppaiAttributeCache("oppai")
+    recalculator = OppaiRecalculator(pool, cache, _beatmap_for, page_size=16)
+    processor = FlakyProcessor(recalculator, fail_on=2)
+
+    job = CheckpointedJob("relax", pool, processor)
+    job.plan(plan_chunks(1, SCORE_COUNT, chunk_size=50))
+    with pytest.raises(RuntimeError):
+        job.run()
+
+    oppai_ids = [
+        score_id
+        for score_id in range(1, SCORE_COUNT + 1)
+        if score_id % 3 != 2 and score_id % 9 != 0
+    ]
+    # map 2's scores are the ones with ids 1, 5, 9, ...
+    scored_ids = [score_id for score_id in oppai_ids if score_id % 4 != 1]
+    missing_count = len(oppai_ids) - len(scored_ids)
+
+    assert sorted(job.completed()) == [0, 1]
+    pp = all_pp(pool)
+    for score_id, value in enumerate(pp, 1):
+        assert (value > 0) == (score_id in scored_ids and score_id <= 100)
+
+    progress = CheckpointedJob("relax", pool, processor).run()
+    assert processor.finished == [0, 1, 2, 3, 4]
+    assert progress.totals.rows_read == len(oppai_ids)
+    assert progress.totals.rows_without_attributes == missing_count
+    assert progress.totals.rows_written == len(scored_ids)
+
+    # each (map, mods) was parsed once, whatever the crash
+    assert parsed == [("1.osu", Mods.RELAX), ("1.osu", Mods.AUTOPILOT | Mods.HIDDEN)]
+
+    pp = all_pp(pool)
+    assert [score_id for score_id, value in enumerate(pp, 1) if value] == scored_ids
+
+    with pool.connection() as connection:
+        row = connection.execute(
+            "SELECT max_combo, accuracy, num_300s, num_100s, num_50s, num_misses"
+            " FROM scores WHERE id = 3",
+        ).fetchone()
+    combo, accuracy, n300, n100, n50, nmiss = row
+    score = Score(0, 0, combo, Mods.RELAX, accuracy * 100, n300, n100, n50, 0, 0, 0)
+    attributes = cache.get("1.osu", Mods.RELAX, 1)
+    assert math.isclose(pp[2], calculate_oppai_pp(attributes, score))
+
+    # the same as recalculating everything in one go
+    expected_pool = _oppai_pool(tmp_path / "expected.db")
+    OppaiRecalculator(expected_pool, cache, _beatmap_for).run()
+    assert all_pp(pool) == all_pp(expected_pool)
+
+
+def test_job_progress(tmp_path: Path) -> None:
+    pool = _pool(tmp_path / "scores.db")
+    recalculator = BatchRecalculator(pool, lookup)
+
+    reports: list[JobProgress] = []
+    job = CheckpointedJob(
+        "all",
+        pool,
+        recalculation_processor(recalculator),
+        on_progress=reports.append,
+    )
+    job.plan(plan_chunks(1, SCORE_COUNT, chunk_size=100))
+
+    progress = job.run(max_chunks=2)
+    assert progress.chunks_done == 2
+    assert progress.eta is not None and progress.eta >= 0
+    assert progress.rows_per_second > 0
+    assert [report.chunks_done for report in reports] == [1, 2]
+    assert [report.totals.rows_read for report in reports] == [100, 200]
+
+    # other job names have their own checkpoints
+    other = CheckpointedJob("other", pool, job.process)
+    assert other.progress().chunk_count == 0
+
+    stored = job.progress()
+    assert stored.chunks_done == 2
+    assert stored.fraction_done == pytest.approx(2 / 3)
+    assert stored.eta is None
+
+    job.run()
+    assert job.progress().totals.rows_read == SCORE_COUNT
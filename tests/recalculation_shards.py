@@ -0,0 +1,178 @@
+from __future__ import annotations
+
+import multiprocessing
+import os
+import sqlite3
+import time
+from pathlib import Path
+
+import pytest
+from helpers import all_pp
+from helpers import lookup
+from helpers import score_pool
+
+from performance_calculator.pipeline.pool import ConnectionPool
+from performance_calculator.pipeline.recalculate import BatchRecalculator
+from performance_calculator.pipeline.recalculate import RecalculationStats
+from performance_calculator.pipeline.shards import beatmap_score_counts
+from performance_calculator.pipeline.shards import MAX_BEATMAP_ID
+from performance_calculator.pipeline.shards import plan_shards
+from performance_calculator.pipeline.shards import Shard
+from performance_calculator.pipeline.shards import ShardStatus
+from performance_calculator.pipeline.shards import ShardWorker
+from performance_calculator.pipeline.shards import WorkQueue
+
+SCORE_COUNT = 300
+# maps 10 to 60, with more scores on the lower ones
+BEATMAP_IDS = [10 * (1 + int(6 * (i / SCORE_COUNT) ** 2)) for i in range(SCORE_COUNT)]
+LEASE_SECONDS = 1.0
+
+
+def _connect(path: str) -> sqlite3.Connection:
+    return sqlite3.connect(path, timeout=60, check_same_thread=False)
+
+
+def _node(queue_path: str, scores_path: str, worker: str, crash: bool) -> None:
+    """One node: claims shards until the queue is done, or dies holding
+    its first shard if `crash`."""
+    queue = WorkQueue.open("overnight", queue_path, lease_seconds=LEASE_SECONDS)
+    if crash:
+        queue.claim(worker)
+        os._exit(1)
+
+    scores = ConnectionPool(lambda: _connect(scores_path))
+
+    def process(shard: Shard) -> RecalculationStats:
+        return BatchRecalculator(
+            scores,
+            lookup,
+            page_size=32,
+            beatmap_range=(shard.first_beatmap_id, shard.last_beatmap_id),
+        ).run()
+
+    ShardWorker(queue, worker, process, poll_seconds=0.1).run()
+
+
+def test_plan_shards() -> None:
+    counts = [(1, 10), (2, 10), (5, 40), (9, 10), (12, 10), (20, 20)]
+
+    shards = plan_shards(counts, 3)
+    assert shards == [
+        Shard(0, 0, 2),
+        Shard(1, 3, 9),
+        Shard(2, 10, MAX_BEATMAP_ID),
+    ]
+    assert plan_shards(counts, 3) == shards
+
+    # a map is never split, however many shards are asked for
+    assert len(plan_shards(counts, 100)) == len(counts)
+    assert plan_shards(counts, 1) == [Shard(0, 0, MAX_BEATMAP_ID)]
+    assert plan_shards([], 4) == [Shard(0, 0, MAX_BEATMAP_ID)]
+
+    with pytest.raises(ValueError):
+        plan_shards(counts, 0)
+
+
+def test_leases(tmp_path: Path) -> None:
+    queue = WorkQueue.open("leases", str(tmp_path / "queue.db"), lease_seconds=0.5)
+    queue.plan(plan_shards([(1, 1), (2, 1)], 2))
+
+    first = queue.claim("a")
+    second = queue.claim("b")
+    assert first is not None and second is not None
+    assert (first.shard.number, second.shard.number) == (0, 1)
+    assert queue.claim("c") is None
+
+    # heartbeats keep a lease...
+    for _ in range(2):
+        time.sleep(0.15)
+        assert queue.heartbeat(first)
+    assert queue.claim("c") is None
+
+    # ...and without them it's reclaimed, and its old holder can't finish it
+    time.sleep(0.3)
+    reclaimed = queue.claim("c")
+    assert reclaimed is not None and reclaimed.shard == second.shard
+    assert reclaimed.token == 2
+    assert not queue.heartbeat(second)
+    assert not queue.complete(second, RecalculationStats())
+
+    assert queue.complete(reclaimed, RecalculationStats(rows_read=5))
+    assert not queue.finished()
+
+    queue.release(first)
+    assert queue.status_counts() == {ShardStatus.PENDING: 1, ShardStatus.DONE: 1}
+
+    worker = ShardWorker(queue, "d", lambda shard: RecalculationStats(rows_read=3))
+    assert worker.run() == [0]
+    assert queue.finished()
+    assert {number: stats.rows_read for number, stats in queue.completed().items()} == {
+        0: 3,
+        1: 5,
+    }
+
+
+def test_failed_shards_are_released(tmp_path: Path) -> None:
+    queue = WorkQueue.open("failing", str(tmp_path / "queue.db"))
+    queue.plan([Shard(0, 0, MAX_BEATMAP_ID)])
+
+    def process(shard: Shard) -> RecalculationStats:
+        raise RuntimeError("out of memory")
+
+    with pytest.raises(RuntimeError):
+        ShardWorker(queue, "a", process).run()
+
+    lease = queue.claim("b")
+    assert lease is not None and lease.token == 2
+
+
+def test_nodes_share_the_queue(tmp_path: Path) -> None:
+    queue_path = str(tmp_path / "queue.db")
+    scores_path = str(tmp_path / "scores.db")
+    scores = score_pool(lambda: _connect(scores_path), BEATMAP_IDS)
+
+    with scores.connection() as connection:
+        counts = beatmap_score_counts(connection, mode=0)
+    assert sum(count for _, count in counts) == SCORE_COUNT
+
+    queue = WorkQueue.open("overnight", queue_path, lease_seconds=LEASE_SECONDS)
+    shards = queue.plan(plan_shards(counts, 4))
+    assert len(shards) == 4
+
+    context = multiprocessing.get_context("spawn")
+
+    # one node dies holding the first shard, which the others pick up once
+    # its lease runs out
+    crashed = context.Process(
+        target=_node,
+        args=(queue_path, scores_path, "crashed", True),
+    )
+    crashed.start()
+    crashed.join(60)
+    assert crashed.exitcode == 1
+
+    nodes = [
+        context.Process(target=_node, args=(queue_path, scores_path, name, False))
+        for name in ("a", "b", "c")
+    ]
+    for node in nodes:
+        node.start()
+    for node in nodes:
+        node.join(120)
+        assert node.exitcode == 0
+
+    assert queue.finished()
+    completed = queue.completed()
+    assert sorted(completed) == [0, 1, 2, 3]
+    assert sum(stats.rows_read for stats in completed.values()) == SCORE_COUNT
+
+    with queue.pool.connection() as connection:
+        attempts = dict(
+            connection.execute("SELECT shard, attempts FROM work_shards").fetchall(),
+        )
+    assert attempts == {0: 2, 1: 1, 2: 1, 3: 1}
+
+    expected_path = str(tmp_path / "expected.db")
+    expected = score_pool(lambda: _connect(expected_path), BEATMAP_IDS)
+    BatchRecalculator(expected, lookup).run()
+    assert all_pp(scores) == all_pp(expected)
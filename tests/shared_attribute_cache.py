@@ -0,0 +1,267 @@
+from __future__ import annotations
+
+import dataclasses
+import multiprocessing
+from multiprocessing.queues import Queue
+from typing import Any
+from typing import Iterator
+from typing import Sequence
+
+import pytest
+from helpers import ATTRIBUTES as OSU_ATTRIBUTES
+from helpers import OPPAI_ATTRIBUTES
+
+from performance_calculator.attribute_provider import AttributeKey
+from performance_calculator.attribute_provider import DifficultyAttributeProvider
+from performance_calculator.models.difficulty import DifficultyAttributes
+from performance_calculator.models.mods import Mods
+from performance_calculator.rulesets.mania.difficulty import ManiaDifficultyAttributes
+from performance_calculator.rulesets.osu import oppai_performance
+from performance_calculator.rulesets.osu.difficulty import OsuDifficultyAttributes
+from performance_calculator.rulesets.osu.oppai_performance import (
+    OppaiBeatmapAttributes,
+)
+from performance_calculator.shared_attributes import SharedAttributeCache
+from performance_calculator.shared_attributes import SharedAttributeTable
+from performance_calculator.shared_attributes import SharedOppaiAttributeCache
+
+MANIA_ATTRIBUTES = ManiaDifficultyAttributes(
+    star_rating=3.9,
+    max_combo=2400,
+    great_hit_window=34,
+)
+
+STORED = {
+    AttributeKey(beatmap_id, 0, 0): dataclasses.replace(
+        OSU_ATTRIBUTES,
+        aim_difficulty=beatmap_id / 10,
+    )
+    for beatmap_id in range(1, 41)
+}
+STORED[AttributeKey(7, 0, Mods.DOUBLETIME)] = dataclasses.replace(
+    OSU_ATTRIBUTES,
+    star_rating=8.3,
+)
+STORED[AttributeKey(50, 3, 0)] = MANIA_ATTRIBUTES
+
+OPPAI_KEYS = [
+    (beatmap_id, mods)
+    for beatmap_id in range(1, 21)
+    for mods in (Mods.RELAX, Mods.AUTOPILOT | Mods.HIDDEN)
+]
+
+
+class DictProvider(DifficultyAttributeProvider):
+    def __init__(self) -> None:
+        self.fetched: list[AttributeKey] = []
+
+    def _fetch_many(
+        self,
+        keys: Sequence[AttributeKey],
+    ) -> dict[AttributeKey, DifficultyAttributes]:
+        self.fetched.extend(keys)
+        return {key: STORED[key] for key in keys if key in STORED}
+
+
+@pytest.fixture
+def table() -> Iterator[SharedAttributeTable]:
+    table = SharedAttributeTable.create(256, bucket_size=4, stripes=8)
+    yield table
+    table.close()
+    table.unlink()
+
+
+def _worker(table: SharedAttributeTable, results: Queue[Any]) -> None:
+    provider = DictProvider()
+    cache = SharedAttributeCache(table, provider)
+    found = cache.get_many(list(STORED))
+    results.put((found == STORED, cache.hits, cache.misses))
+    table.close()
+
+
+def _parse(
+    oppai_path: str,
+    osu_file_path: str,
+    mods: int = 0,
+) -> OppaiBeatmapAttributes:
+    """oppai, parsing `<beatmap id>.osu` to attributes with that many stars."""
+    return dataclasses.replace(
+        OPPAI_ATTRIBUTES,
+        mods=mods,
+        star_rating=float(osu_file_path.split(".")[0]),
+    )
+
+
+def _oppai_worker(table: SharedAttributeTable, results: Queue[Any]) -> None:
+    # spawned, so this only stands in for oppai in the worker
+    oppai_performance.calculate_oppai_attributes = _parse
+
+    cache = SharedOppaiAttributeCache(table, "oppai")
+    matches = all(
+        cache.get(f"{beatmap_id}.osu", mods, beatmap_id)
+        == _parse("oppai", f"{beatmap_id}.osu", mods)
+        for beatmap_id, mods in OPPAI_KEYS
+    )
+    results.put((matches, cache.hits, cache.misses))
+    table.close()
+
+
+def test_round_trip(table: SharedAttributeTable) -> None:
+    provider = DictProvider()
+    cache = SharedAttributeCache(table, provider)
+
+    nightcore = AttributeKey(7, 0, Mods.NIGHTCORE | Mods.HIDDEN)
+    keys = [AttributeKey(1, 0, 0), nightcore, AttributeKey(50, 3, 0)]
+    expected = {
+        AttributeKey(1, 0, 0): STORED[AttributeKey(1, 0, 0)],
+        # hidden changes attributes, so this isn't stored
+        AttributeKey(50, 3, 0): MANIA_ATTRIBUTES,
+    }
+    assert cache.get_many(keys) == expected
+    assert cache.get_many(keys) == expected
+    assert (cache.hits, cache.misses) == (2, 4)
+
+    assert (
+        cache.get(AttributeKey(7, 0, Mods.NIGHTCORE))
+        == STORED[AttributeKey(7, 0, Mods.DOUBLETIME)]
+    )
+    assert len(table) == 3
+
+    # ints come back as ints
+    found = table.get_many([AttributeKey(1, 0, 0)])[AttributeKey(1, 0, 0)]
+    assert isinstance(found, OsuDifficultyAttributes)
+    assert type(found.hit_circle_count) is int
+
+
+def test_eviction() -> None:
+    table = SharedAttributeTable.create(2, bucket_size=2, stripes=1)
+    try:
+        first, second, third = list(STORED)[:3]
+        table.put(first, STORED[first])
+        table.put(second, STORED[second])
+        assert len(table.get_many([first])) == 1
+
+        # the least recently read goes
+        table.put(third, STORED[third])
+        assert table.get_many([first, second, third]) == {
+            first: STORED[first],
+            third: STORED[third],
+        }
+
+        # rewriting a key doesn't take another slot
+        table.put(third, OSU_ATTRIBUTES)
+        assert len(table) == 2
+        assert table.get_many([third]) == {third: OSU_ATTRIBUTES}
+    finally:
+        table.close()
+        table.unlink()
+
+
+def test_reads_skip_slots_being_written(table: SharedAttributeTable) -> None:
+    key = AttributeKey(1, 0, 0)
+    table.put(key, STORED[key])
+
+    slot = int(table._slots["beatmap_id"].tolist().index(1))
+    table._slots["sequence"][slot] += 1
+    assert table.get_many([key]) == {}
+
+    table._slots["sequence"][slot] += 1
+    assert table.get_many([key]) == {key: STORED[key]}
+
+
+def test_workers_share_one_cache() -> None:
+    context = multiprocessing.get_context("spawn")
+    table = SharedAttributeTable.create(256, bucket_size=4, context=context)
+    try:
+        results: Queue[Any] = context.Queue()
+
+        workers = [
+            context.Process(target=_worker, args=(table, results)) for _ in range(3)
+        ]
+        for worker in workers:
+            worker.start()
+
+        first_round = [results.get(timeout=60) for _ in workers]
+        for worker in workers:
+            worker.join(60)
+
+        assert all(matches for matches, _, _ in first_round)
+        assert len(table) == len(STORED)
+
+        # a new worker finds everything already there
+        late = context.Process(target=_worker, args=(table, results))
+        late.start()
+        matches, hits, misses = results.get(timeout=60)
+        late.join(60)
+
+        assert matches
+        assert (hits, misses) == (len(STORED), 0)
+    finally:
+        table.close()
+        table.unlink()
+
+
+def test_oppai_attributes_share_the_table(
+    table: SharedAttributeTable,
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    monkeypatch.setattr(oppai_performance, "calculate_oppai_attributes", _parse)
+
+    key = AttributeKey(1, 0, 0)
+    SharedAttributeCache(table, DictProvider()).get(key)
+
+    cache = SharedOppaiAttributeCache(table, "oppai")
+    expected = _parse("oppai", "1.osu", Mods.RELAX)
+    assert cache.get("1.osu", Mods.RELAX, 1) == expected
+    assert cache.get("1.osu", Mods.RELAX, 1) == expected
+    assert (cache.hits, cache.misses) == (1, 1)
+
+    # keyed apart from difficulty attributes, and by every mod
+    assert len(table) == 2
+    assert table.get_many([key]) == {key: STORED[key]}
+    assert table.get_oppai(1, Mods.RELAX) == expected
+    assert table.get_oppai(1, Mods.RELAX | Mods.NIGHTCORE) is None
+
+    found = table.get_oppai(1, Mods.RELAX)
+    assert found is not None and type(found.max_combo) is int
+
+    with pytest.raises(ValueError):
+        cache.get("1.osu", Mods.RELAX)
+
+
+def test_workers_share_oppai_attributes() -> None:
+    context = multiprocessing.get_context("spawn")
+    table = SharedAttributeTable.create(256, bucket_size=4, context=context)
+    try:
+        results: Queue[Any] = context.Queue()
+
+        workers = [
+            context.Process(target=_oppai_worker, args=(table, results))
+            for _ in range(3)
+        ]
+        for worker in workers:
+            worker.start()
+
+        first_round = [results.get(timeout=60) for _ in workers]
+        for worker in workers:
+            worker.join(60)
+
+        assert all(matches for matches, _, _ in first_round)
+        assert len(table) == len(OPPAI_KEYS)
+
+        # a new worker parses nothing
+        late = context.Process(target=_oppai_worker, args=(table, results))
+        late.start()
+        matches, hits, misses = results.get(timeout=60)
+        late.join(60)
+
+        assert matches
+        assert (hits, misses) == (len(OPPAI_KEYS), 0)
+    finally:
+        table.close()
+        table.unlink()
+
+
+def test_invalid_tables() -> None:
+    with pytest.raises(ValueError):
+        SharedAttributeTable.create(2, bucket_size=4)
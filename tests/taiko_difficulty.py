@@ -0,0 +1,121 @@
+from __future__ import annotations
+
+from performance_calculator import calculate_score
+from performance_calculator.models.beatmap import parse_beatmap
+from performance_calculator.models.mods import Mods
+from performance_calculator.models.path import Path
+from performance_calculator.models.score import Score
+from performance_calculator.rulesets.taiko.difficulty_calculator import (
+    TaikoDifficultyCalculator,
+)
+
+SAMPLE_PATH = Path(__file__.rpartition("/")[0]) / "data/sample.osu"
+
+
+def _taiko_beatmap() -> bytes:
+    lines = [
+        "osu file format v14",
+        "[General]",
+        "Mode: 1",
+        "[Difficulty]",
+        "OverallDifficulty:6",
+        "SliderMultiplier:1.4",
+        "[TimingPoints]",
+        "0,300,4,2,0,50,1,0",
+        "[HitObjects]",
+    ]
+
+    time = 1000
+    for i in range(500):
+        if i % 50 == 49:
+            # drum roll
+            lines.append(f"256,192,{time},2,0,L|356:192,1,100")
+            time += 300
+            continue
+
+        # kddk patterns with the odd rhythm change
+        hitsound = 8 if i % 4 in (1, 2) else 0
+        lines.append(f"256,192,{time},1,{hitsound}")
+        time += 150 if i % 16 else 225
+
+    return "\n".join(lines).encode()
+
+
+def test_taiko_attributes() -> None:
+    calculator = TaikoDifficultyCalculator(parse_beatmap(_taiko_beatmap()))
+    nomod, doubletime, hardrock = calculator.calculate_many(
+        [0, Mods.DOUBLETIME, Mods.HARDROCK],
+    )
+
+    # drum rolls don't give combo
+    assert nomod.max_combo == 490
+    assert nomod.great_hit_window == 32
+    assert hardrock.great_hit_window < nomod.great_hit_window
+
+    assert nomod.stamina_difficulty > 0
+    assert nomod.rhythm_difficulty > 0
+    assert nomod.colour_difficulty > 0
+    assert nomod.star_rating > 0
+    assert doubletime.star_rating > nomod.star_rating
+    assert hardrock.star_rating == nomod.star_rating
+
+
+def test_converted_attributes() -> None:
+    calculator = TaikoDifficultyCalculator(parse_beatmap(SAMPLE_PATH))
+    attributes = calculator.calculate()
+
+    assert attributes.max_combo > 0
+    assert attributes.star_rating >= 0
+
+
+def test_converted_sliders_with_slider_velocity() -> None:
+    beatmap = "\n".join(
+        [
+            "osu file format v14",
+            "[General]",
+            "Mode: 0",
+            "[Difficulty]",
+            "OverallDifficulty:6",
+            "SliderMultiplier:1.4",
+            "SliderTickRate:1",
+            "[TimingPoints]",
+            "0,500,4,2,0,50,1,0",
+            "1000,-50,4,2,0,50,0,0",
+            "5000,-200,4,2,0,50,0,0",
+            "[HitObjects]",
+            "256,192,0,1,0",
+            "256,192,250,1,0",
+            "256,192,500,1,8",
+            # three beats long at 2x, so two hits, as it's under two beats of
+            # the uninherited timing point
+            "0,192,1000,2,0,L|420:192,1,420",
+            # a beat and a half at 0.5x, so a drum roll
+            "0,192,5000,2,0,L|210:192,1,210",
+        ],
+    )
+    calculator = TaikoDifficultyCalculator(parse_beatmap(beatmap.encode()))
+
+    start_times, hit_types = calculator._convert()
+    assert start_times.tolist() == [0, 250, 500, 1000, 1500, 5000]
+    assert hit_types.tolist() == [0, 0, 1, 0, 0, -1]
+    assert calculator.calculate().max_combo == 5
+
+
+def test_calculate_score_without_attributes() -> None:
+    score = Score(
+        mode=1,
+        score=1_000_000,
+        max_combo=13,
+        mods=0,
+        accuracy=1.0,
+        num_300s=13,
+        num_100s=0,
+        num_50s=0,
+        num_gekis=0,
+        num_katus=0,
+        num_misses=0,
+    )
+
+    star_rating, pp = calculate_score(score, osu_file_path=str(SAMPLE_PATH))
+    assert star_rating >= 0
+    assert pp >= 0